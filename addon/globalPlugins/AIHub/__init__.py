@@ -40,7 +40,10 @@ class GlobalPlugin(MenuMixin, DialogSessionMixin, AskRecordingMixin, globalPlugi
 
 	def terminate(self):
 		from .consts import cleanup_temp_dir
+		from .conversations import close_store
 		from .ask_question import mci_stop_ask_audio
+		from .apiclient._http import close_idle_connections
+		from .imagehelper import shutdown_image_pool
 
 		dialogs = list(getattr(self, "_openMainDialogs", []) or [])
 		for dlg in dialogs:
@@ -61,6 +64,9 @@ class GlobalPlugin(MenuMixin, DialogSessionMixin, AskRecordingMixin, globalPlugi
 		if self._askAudioPlaying:
 			mci_stop_ask_audio()
 			self._askAudioPlaying = False
+		close_idle_connections()
+		shutdown_image_pool()
+		close_store()
 		cleanup_temp_dir()
 		if AIHubSettingsPanel in gui.settingsDialogs.NVDASettingsDialog.categoryClasses:
 			gui.settingsDialogs.NVDASettingsDialog.categoryClasses.remove(AIHubSettingsPanel)
@@ -11,12 +11,21 @@ Public API (used elsewhere in the addon):
   ``StreamChoice`` — non-streaming and streaming response types.
 * ``Transcription`` — return type of audio transcription/translation calls.
 * ``APIError``, ``APIConnectionError``, ``APIStatusError`` — exception hierarchy.
+* ``CancelToken``, ``use_cancel_token``, ``APICancelledError`` — abort in-flight
+  requests immediately by shutting their sockets down.
+* ``ResponseCache``, ``response_cache`` — opt-in on-disk cache of deterministic
+  chat completions (assign to ``OpenAIClient.response_cache`` to enable).
 * ``transcribe_audio_mistral`` — Mistral Voxtral transcription helper.
 * ``truncate_error_for_user`` — convert an exception to a user-facing message.
 * ``_resolve_error_message`` — extract the human-readable message from an API error body.
 """
 from __future__ import annotations
 
+from ._cancel import (
+	APICancelledError,
+	CancelToken,
+	use_cancel_token,
+)
 from ._client import (
 	OpenAIClient,
 	configure_client_for_provider,
@@ -29,6 +38,10 @@ from ._errors import (
 	_resolve_error_message,
 	truncate_error_for_user,
 )
+from ._response_cache import (
+	ResponseCache,
+	response_cache,
+)
 from ._types import (
 	ChatCompletion,
 	Choice,
@@ -40,19 +53,24 @@ from ._types import (
 )
 
 __all__ = [
+	"APICancelledError",
 	"APIConnectionError",
 	"APIError",
 	"APIStatusError",
+	"CancelToken",
 	"ChatCompletion",
 	"Choice",
 	"ChoiceDelta",
 	"ChoiceMessage",
 	"OpenAIClient",
+	"ResponseCache",
 	"StreamChoice",
 	"StreamEvent",
 	"Transcription",
 	"_resolve_error_message",
 	"configure_client_for_provider",
+	"response_cache",
 	"transcribe_audio_mistral",
 	"truncate_error_for_user",
+	"use_cancel_token",
 ]
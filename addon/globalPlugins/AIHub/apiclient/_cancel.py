@@ -0,0 +1,108 @@
+"""Cooperative-but-immediate cancellation of in-flight HTTP requests.
+
+Setting a flag only stops a worker the next time it looks at it, which for a
+stream stuck in a long reasoning pause can be tens of seconds away. A
+:class:`CancelToken` instead keeps callbacks registered by the HTTP layer for
+every request opened while the token is active on the calling thread; the
+callbacks shut the request's socket down, so a blocked ``read`` returns at once
+on whatever thread is doing it.
+
+Usage::
+
+	token = CancelToken()
+	with use_cancel_token(token):
+		data = _open_json(opener, req, timeout=60)
+	...
+	token.cancel()  # from any thread
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from ._errors import APIError
+
+
+class APICancelledError(APIError):
+	"""Raised when a request is started or interrupted after its token was cancelled."""
+
+	def __init__(self, message: str = "Request cancelled"):
+		super().__init__(message)
+
+
+class CancelToken:
+	"""Thread-safe one-shot cancellation signal with abort callbacks."""
+
+	def __init__(self):
+		self._event = threading.Event()
+		self._lock = threading.Lock()
+		self._callbacks: dict[int, Callable[[], None]] = {}
+		self._next_id = 0
+
+	@property
+	def cancelled(self) -> bool:
+		return self._event.is_set()
+
+	def cancel(self) -> None:
+		"""Cancel once; runs (and drops) every registered callback."""
+		with self._lock:
+			if self._event.is_set():
+				return
+			self._event.set()
+			callbacks = list(self._callbacks.values())
+			self._callbacks.clear()
+		for callback in callbacks:
+			try:
+				callback()
+			except Exception:
+				pass
+
+	def register(self, callback: Callable[[], None]) -> Optional[int]:
+		"""Call ``callback`` on cancellation; returns a handle for :meth:`unregister`.
+
+		When the token is already cancelled the callback runs immediately and
+		``None`` is returned.
+		"""
+		with self._lock:
+			if not self._event.is_set():
+				handle = self._next_id
+				self._next_id += 1
+				self._callbacks[handle] = callback
+				return handle
+		try:
+			callback()
+		except Exception:
+			pass
+		return None
+
+	def unregister(self, handle: Optional[int]) -> None:
+		if handle is None:
+			return
+		with self._lock:
+			self._callbacks.pop(handle, None)
+
+	def raise_if_cancelled(self) -> None:
+		if self._event.is_set():
+			raise APICancelledError()
+
+	def wait(self, timeout: Optional[float] = None) -> bool:
+		return self._event.wait(timeout)
+
+
+_local = threading.local()
+
+
+@contextmanager
+def use_cancel_token(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+	"""Make ``token`` govern every request this thread opens within the block."""
+	previous = getattr(_local, "token", None)
+	_local.token = token
+	try:
+		yield token
+	finally:
+		_local.token = previous
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+	return getattr(_local, "token", None)
@@ -7,12 +7,14 @@ handled by dispatching to focused helpers in the sibling modules.
 """
 from __future__ import annotations
 
+import hashlib
 import json
+import mimetypes
 import os
+import time
 import urllib.error
 import urllib.parse
 import urllib.request
-import uuid
 from typing import Any, BinaryIO, Generator, Optional
 
 from .. import apikeymanager
@@ -26,7 +28,9 @@ from ._content import (
 	_messages_to_responses_input,
 	_normalize_input_files_for_provider,
 )
-from ._errors import APIConnectionError, APIError, APIStatusError, _resolve_error_message
+from . import _json
+from ._errors import APIError, APIStatusError
+from ._file_cache import uploaded_file_cache
 from ._http import (
 	_AUDIO_MIME,
 	_build_anthropic_headers,
@@ -34,14 +38,34 @@ from ._http import (
 	_create_opener,
 	_open_bytes,
 	_open_json,
+	_open_json_with_headers,
 	_open_streaming,
+	preconnect,
 )
-from ._google import create_gemini_generate_content_request
+from ._google import (
+	GEMINI_API_ROOT,
+	GEMINI_UPLOAD_URL,
+	build_google_native_headers,
+	create_gemini_generate_content_request,
+)
+from ._multipart import MultipartEncoder
 from ._parsers import parse_anthropic, parse_chat_completion, parse_gemini_generate_content, parse_responses
 from ._streams import stream_anthropic, stream_chat_completions, stream_gemini_generate_content
+from ._response_cache import is_cacheable_request, request_key
 from ._responses_stream import stream_responses_api
 from ._types import ChatCompletion, Transcription
 
+# Beta flag required by the Anthropic Files API (upload and ``file`` sources).
+_ANTHROPIC_FILES_BETA = "files-api-2025-04-14"
+# Gemini may need a moment to process an uploaded document before it is usable.
+_GEMINI_FILE_ACTIVE_TIMEOUT_SEC = 60.0
+# Anthropic accepts at most this many ``cache_control`` breakpoints per request.
+_ANTHROPIC_MAX_CACHE_BREAKPOINTS = 4
+# Content block types that can carry a ``cache_control`` breakpoint.
+_ANTHROPIC_CACHEABLE_BLOCKS = frozenset({"text", "image", "document"})
+# Throwaway final turn of a cache pre-warm request (breakpoints sit before it).
+_ANTHROPIC_PREWARM_PROMPT = "Reply with OK."
+
 
 class OpenAIClient:
 	"""HTTP-based client for OpenAI-compatible APIs (and Anthropic).
@@ -56,12 +80,18 @@ class OpenAIClient:
 		base_url: str = "https://api.openai.com/v1",
 		organization: Optional[str] = None,
 	):
+		# ``_create_opener`` returns the process-wide keep-alive opener, so clones
+		# share pooled connections instead of each paying a fresh TLS handshake.
 		self.api_key = api_key
 		self.base_url = base_url.rstrip("/")
 		self.organization = organization
 		self.provider: str = Provider.OpenAI
 		self.account_id: Optional[str] = None
 		self._opener = _create_opener()
+		# Opt-in ``ResponseCache`` for deterministic chat requests (``None`` = off).
+		self.response_cache = None
+		# True when the last chat request was answered from ``response_cache``.
+		self.last_response_cached = False
 		self.chat = _ChatCompletions(self)
 		self.audio = _Audio(self)
 
@@ -74,8 +104,52 @@ class OpenAIClient:
 		)
 		other.provider = getattr(self, "provider", Provider.OpenAI)
 		other.account_id = getattr(self, "account_id", None)
+		other.response_cache = getattr(self, "response_cache", None)
 		return other
 
+	def preconnect(self) -> None:
+		"""Start connecting to this client's API host in the background (see ``_http.preconnect``)."""
+		provider = getattr(self, "provider", Provider.OpenAI)
+		preconnect(GEMINI_API_ROOT if provider == Provider.Google else self.base_url)
+
+	# ------------------------------------------------------------------
+	# Uploaded-file cache (documents are uploaded once, then referenced by id).
+	# ------------------------------------------------------------------
+
+	def _upload_cache_account(self) -> str:
+		"""Cache namespace for the current credentials (account id, else a key fingerprint)."""
+		account_id = getattr(self, "account_id", None)
+		if account_id:
+			return str(account_id)
+		digest = hashlib.sha256(str(self.api_key or "").encode("utf-8")).hexdigest()
+		return f"key:{digest[:16]}"
+
+	def _cached_file_upload(self, file_path: str) -> dict:
+		"""Upload ``file_path`` for the current provider unless the same content already was.
+
+		Returns the provider file record (``id`` plus ``uri``/``url`` where
+		relevant). The ids used by the current request are remembered so a
+		"file not found" answer can invalidate them and retry.
+		"""
+		provider = getattr(self, "provider", Provider.OpenAI)
+		uploaders = {
+			Provider.OpenAI: lambda p: {"id": self._upload_openai_user_file(p, purpose="user_data")},
+			Provider.xAI: lambda p: {"id": self._upload_xai_user_file(p)},
+			Provider.Anthropic: self._upload_anthropic_user_file,
+			Provider.Google: self._upload_gemini_user_file,
+			Provider.MistralAI: self._upload_mistral_user_file,
+		}
+		upload = uploaders.get(provider)
+		if upload is None:
+			raise APIError(f"Provider '{provider}' has no files endpoint.")
+		record = uploaded_file_cache.get_or_upload(
+			self._upload_cache_account(), str(provider), file_path, upload,
+		)
+		used = getattr(self, "_request_file_ids", None)
+		if used is not None:
+			used.append(record["id"])
+		return record
+
 	# ------------------------------------------------------------------
 	# Chat completion dispatch.
 	# ------------------------------------------------------------------
@@ -88,7 +162,60 @@ class OpenAIClient:
 		stream: bool = False,
 		**kwargs,
 	) -> ChatCompletion | Generator:
-		"""Create a chat completion. Returns ``ChatCompletion`` or a stream generator."""
+		"""Create a chat completion. Returns ``ChatCompletion`` or a stream generator.
+
+		If the provider reports that a cached uploaded file no longer exists,
+		those cache entries are dropped and the request is retried once with
+		fresh uploads.
+
+		With ``response_cache`` set, deterministic requests without attached
+		documents are answered from the cache when possible and stored after a
+		successful answer otherwise.
+		"""
+		self.last_response_cached = False
+		cache = getattr(self, "response_cache", None)
+		if cache is None or _has_input_file_parts(messages) or not is_cacheable_request(kwargs):
+			return self._chat_completions_with_file_retry(model=model, messages=messages, stream=stream, **kwargs)
+		key = request_key(getattr(self, "provider", Provider.OpenAI), self.base_url, model, messages, kwargs)
+		record = cache.get(key)
+		if record is not None:
+			self.last_response_cached = True
+			return cache.replay(record, stream)
+		result = self._chat_completions_with_file_retry(model=model, messages=messages, stream=stream, **kwargs)
+		if stream:
+			return cache.record_stream(key, result)
+		return cache.store_completion(key, result)
+
+	def _chat_completions_with_file_retry(
+		self,
+		*,
+		model: str,
+		messages: list,
+		stream: bool = False,
+		**kwargs,
+	) -> ChatCompletion | Generator:
+		self._request_file_ids = []
+		try:
+			return self._chat_completions_dispatch(model=model, messages=messages, stream=stream, **kwargs)
+		except APIStatusError as err:
+			used = self._request_file_ids
+			if not _is_missing_file_error(err, getattr(self, "provider", Provider.OpenAI), used):
+				raise
+		account = self._upload_cache_account()
+		provider = str(getattr(self, "provider", Provider.OpenAI))
+		for file_id in used:
+			uploaded_file_cache.invalidate(account, provider, file_id)
+		self._request_file_ids = []
+		return self._chat_completions_dispatch(model=model, messages=messages, stream=stream, **kwargs)
+
+	def _chat_completions_dispatch(
+		self,
+		*,
+		model: str,
+		messages: list,
+		stream: bool = False,
+		**kwargs,
+	) -> ChatCompletion | Generator:
 		provider = getattr(self, "provider", Provider.OpenAI)
 		has_input_files = _has_input_file_parts(messages)
 		if provider == Provider.Anthropic:
@@ -112,7 +239,8 @@ class OpenAIClient:
 			# on its chat-completions endpoint; the helper rewrites the
 			# internal ``input_file`` parts in place (or raises a clear error
 			# for binary docs on providers that don't support them).
-			messages = _normalize_input_files_for_provider(messages, provider)
+			upload_file = self._cached_file_upload if provider == Provider.MistralAI else None
+			messages = _normalize_input_files_for_provider(messages, provider, upload_file=upload_file)
 		body = self._build_chat_body(model, messages, stream, provider, kwargs)
 		req = self._json_request("/chat/completions", body)
 		if stream:
@@ -173,9 +301,9 @@ class OpenAIClient:
 	) -> ChatCompletion | Generator:
 		"""Google chat via native ``generateContent`` (not OpenAI-compat)."""
 		url, headers, body = create_gemini_generate_content_request(
-			self.api_key, model, messages, stream, kwargs
+			self.api_key, model, messages, stream, kwargs, upload_file=self._cached_file_upload,
 		)
-		data = json.dumps(body).encode("utf-8")
+		data = _json.dumps_bytes(body)
 		req = urllib.request.Request(url, data=data, headers=headers, method="POST")
 		if stream:
 			resp = _open_streaming(self._opener, req, timeout=180)
@@ -194,7 +322,7 @@ class OpenAIClient:
 		headers = _build_headers(self.api_key, self.organization)
 		if extra_headers:
 			headers.update(extra_headers)
-		data = json.dumps(body).encode("utf-8") if body is not None else None
+		data = _json.dumps_bytes(body) if body is not None else None
 		return urllib.request.Request(url, data=data, headers=headers, method="POST")
 
 	# ------------------------------------------------------------------
@@ -212,10 +340,8 @@ class OpenAIClient:
 		"""Make a request against ``/v1/responses`` (OpenAI file input, xAI chat)."""
 		provider = getattr(self, "provider", Provider.OpenAI)
 		upload_file = None
-		if provider == Provider.OpenAI:
-			upload_file = lambda p: self._upload_openai_user_file(p, purpose="user_data")
-		elif provider == Provider.xAI:
-			upload_file = self._upload_xai_user_file
+		if provider in (Provider.OpenAI, Provider.xAI):
+			upload_file = lambda p: self._cached_file_upload(p)["id"]
 		input_payload = _messages_to_responses_input(
 			messages,
 			upload_file=upload_file,
@@ -283,40 +409,113 @@ class OpenAIClient:
 		"""Upload a local file to OpenAI ``/v1/files`` and return its file id."""
 		if not isinstance(file_path, str) or not file_path or not os.path.exists(file_path):
 			raise APIError(f"Invalid file path: {file_path}")
-		boundary, body, content_type = _build_file_upload_body(file_path, purpose)
+		body = _build_file_upload_body(file_path, purpose)
 		headers = _build_headers(self.api_key, self.organization)
-		headers["Content-Type"] = content_type
+		headers.update(body.headers())
 		req = urllib.request.Request(
 			f"{self.base_url}/files", data=body, headers=headers, method="POST",
 		)
 		try:
-			with self._opener.open(req, timeout=180) as resp:
-				raw = resp.read().decode("utf-8", errors="replace")
-				if resp.status != 200:
-					raise APIStatusError(
-						_resolve_error_message(raw, resp.status),
-						status_code=resp.status,
-						response_body=raw,
-					)
-				payload = json.loads(raw) if raw else {}
-				file_id = payload.get("id") if isinstance(payload, dict) else ""
-				if not isinstance(file_id, str) or not file_id.strip():
-					raise APIError("File upload succeeded but no file id was returned.")
-				return file_id.strip()
-		except urllib.error.HTTPError as e:
-			text = e.read().decode("utf-8", errors="replace") if e.fp else ""
-			raise APIStatusError(
-				_resolve_error_message(text, e.code),
-				status_code=e.code,
-				response_body=text,
-			)
-		except (urllib.error.URLError, OSError, ConnectionError) as e:
-			raise APIConnectionError(str(e)) from e
+			payload = _open_json(self._opener, req, timeout=180)
+		finally:
+			body.close()
+		return _require_file_id(payload)
 
 	def _upload_xai_user_file(self, file_path: str) -> str:
 		"""Upload a local file to xAI ``/v1/files`` for Responses ``input_file`` parts."""
 		return self._upload_openai_user_file(file_path, purpose="assistants")
 
+	def _upload_anthropic_user_file(self, file_path: str) -> dict:
+		"""Upload a local file to the Anthropic Files API (beta) and return ``{"id": ...}``."""
+		mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+		body = MultipartEncoder()
+		body.add_file("file", file_path, filename=os.path.basename(file_path), content_type=mime)
+		headers = _build_anthropic_headers(self.api_key)
+		headers["anthropic-beta"] = _ANTHROPIC_FILES_BETA
+		headers.update(body.headers())
+		req = urllib.request.Request(
+			f"{self.base_url}/files", data=body, headers=headers, method="POST",
+		)
+		try:
+			payload = _open_json(self._opener, req, timeout=180)
+		finally:
+			body.close()
+		return {"id": _require_file_id(payload)}
+
+	def _upload_gemini_user_file(self, file_path: str) -> dict:
+		"""Upload a local file to the Gemini File API; return ``{"id", "uri", "mime"}``.
+
+		Uses the two-step resumable protocol: a JSON ``start`` call returns an
+		upload URL, then the file bytes are streamed to it with ``finalize``.
+		"""
+		mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+		size = os.path.getsize(file_path)
+		headers = build_google_native_headers(self.api_key)
+		headers.update({
+			"X-Goog-Upload-Protocol": "resumable",
+			"X-Goog-Upload-Command": "start",
+			"X-Goog-Upload-Header-Content-Length": str(size),
+			"X-Goog-Upload-Header-Content-Type": mime,
+		})
+		meta = json.dumps({"file": {"display_name": os.path.basename(file_path)}}).encode("utf-8")
+		req = urllib.request.Request(GEMINI_UPLOAD_URL, data=meta, headers=headers, method="POST")
+		_payload, resp_headers = _open_json_with_headers(self._opener, req, timeout=60)
+		upload_url = resp_headers.get("X-Goog-Upload-URL") if resp_headers is not None else None
+		if not upload_url:
+			raise APIError("Gemini file upload did not return an upload URL.")
+		with open(file_path, "rb") as f:
+			req = urllib.request.Request(
+				upload_url,
+				data=f,
+				headers={
+					"Content-Length": str(size),
+					"X-Goog-Upload-Offset": "0",
+					"X-Goog-Upload-Command": "upload, finalize",
+					"User-Agent": headers["User-Agent"],
+				},
+				method="POST",
+			)
+			payload = _open_json(self._opener, req, timeout=300)
+		info = payload.get("file") if isinstance(payload, dict) else None
+		if not isinstance(info, dict) or not info.get("uri") or not info.get("name"):
+			raise APIError("Gemini file upload succeeded but no file URI was returned.")
+		deadline = time.monotonic() + _GEMINI_FILE_ACTIVE_TIMEOUT_SEC
+		while info.get("state") == "PROCESSING" and time.monotonic() < deadline:
+			time.sleep(1.0)
+			req = urllib.request.Request(
+				f"{GEMINI_API_ROOT}/{info['name']}",
+				headers=build_google_native_headers(self.api_key),
+				method="GET",
+			)
+			info = _open_json(self._opener, req, timeout=30) or info
+		if info.get("state") == "FAILED":
+			raise APIError("Gemini could not process the uploaded file.")
+		return {"id": info["name"], "uri": info["uri"], "mime": info.get("mimeType") or mime}
+
+	def _upload_mistral_user_file(self, file_path: str) -> dict:
+		"""Upload a local file to Mistral ``/v1/files``; return ``{"id", "url"}`` (signed URL)."""
+		body = _build_file_upload_body(file_path, "ocr")
+		headers = _build_headers(self.api_key, None)
+		headers.update(body.headers())
+		req = urllib.request.Request(
+			f"{self.base_url}/files", data=body, headers=headers, method="POST",
+		)
+		try:
+			payload = _open_json(self._opener, req, timeout=180)
+		finally:
+			body.close()
+		file_id = _require_file_id(payload)
+		req = urllib.request.Request(
+			f"{self.base_url}/files/{urllib.parse.quote(file_id, safe='')}/url?expiry=24",
+			headers=_build_headers(self.api_key, None),
+			method="GET",
+		)
+		signed = _open_json(self._opener, req, timeout=60)
+		url = signed.get("url") if isinstance(signed, dict) else None
+		if not isinstance(url, str) or not url:
+			raise APIError("Mistral file upload succeeded but no signed URL was returned.")
+		return {"id": file_id, "url": url}
+
 	# ------------------------------------------------------------------
 	# Anthropic Messages API path.
 	# ------------------------------------------------------------------
@@ -330,13 +529,19 @@ class OpenAIClient:
 		**kwargs,
 	) -> ChatCompletion | Generator:
 		"""Create a chat completion via the Anthropic Messages API."""
-		system, anthropic_msgs = _convert_messages_to_anthropic(messages)
+		system, anthropic_msgs = _convert_messages_to_anthropic(
+			messages, upload_file=self._cached_file_upload,
+		)
 		if not anthropic_msgs:
 			raise APIError("No valid messages for Anthropic")
 		body = self._build_anthropic_body(model, anthropic_msgs, stream, system, kwargs)
 		url = f"{self.base_url}/messages"
 		headers = _build_anthropic_headers(self.api_key)
-		data = json.dumps(body).encode("utf-8")
+		if _anthropic_uses_file_sources(anthropic_msgs):
+			headers["anthropic-beta"] = _ANTHROPIC_FILES_BETA
+		if kwargs.get("prompt_cache"):
+			_apply_anthropic_cache_breakpoints(body)
+		data = _json.dumps_bytes(body)
 		req = urllib.request.Request(url, data=data, headers=headers, method="POST")
 		if stream:
 			resp = _open_streaming(self._opener, req, timeout=120)
@@ -344,6 +549,31 @@ class OpenAIClient:
 		data_dict = _open_json(self._opener, req, timeout=120)
 		return parse_anthropic(data_dict)
 
+	def anthropic_prewarm_prompt_cache(self, *, model: str, messages: list) -> dict:
+		"""Write the Anthropic prompt cache for ``messages`` ahead of the next turn.
+
+		``messages`` is the conversation so far (system and history, without a
+		new prompt). They are sent with the usual breakpoints followed by a
+		throwaway one-token turn, so the next real request reads the cached
+		prefix instead of paying full input price and latency for it. Returns
+		the normalized usage of the pre-warm call.
+		"""
+		system, anthropic_msgs = _convert_messages_to_anthropic(
+			messages, upload_file=self._cached_file_upload,
+		)
+		if not anthropic_msgs and not system:
+			return {}
+		body = self._build_anthropic_body(model, anthropic_msgs, False, system, {"max_tokens": 1})
+		_apply_anthropic_cache_breakpoints(body)
+		body["messages"].append({"role": "user", "content": _ANTHROPIC_PREWARM_PROMPT})
+		headers = _build_anthropic_headers(self.api_key)
+		if _anthropic_uses_file_sources(anthropic_msgs):
+			headers["anthropic-beta"] = _ANTHROPIC_FILES_BETA
+		req = urllib.request.Request(
+			f"{self.base_url}/messages", data=_json.dumps_bytes(body), headers=headers, method="POST",
+		)
+		return parse_anthropic(_open_json(self._opener, req, timeout=120)).usage
+
 	def _build_anthropic_body(
 		self,
 		model: str,
@@ -424,17 +654,17 @@ class OpenAIClient:
 		**kwargs,
 	) -> Transcription:
 		"""Shared multipart handler for /audio/transcriptions and /audio/translations."""
-		body, content_type = _build_audio_text_body(file, model, response_format, kwargs)
+		body = _build_audio_text_body(file, model, response_format, kwargs)
 		headers = _build_headers(self.api_key, self.organization)
-		headers["Content-Type"] = content_type
+		headers.update(body.headers())
 		url = f"{self.base_url}{endpoint}"
 		req = urllib.request.Request(url, data=body, headers=headers, method="POST")
 		raw, _ct = _open_bytes(self._opener, req, timeout=120)
-		text = raw.decode("utf-8", errors="replace")
 		if response_format in ("json", "verbose_json", "diarized_json"):
-			result = json.loads(text) if text else {}
+			result = _json.loads(raw) if raw else {}
 			content = result.get("text", "") if isinstance(result, dict) else str(result)
 			return Transcription(content, payload=result, response_format=response_format)
+		text = raw.decode("utf-8", errors="replace")
 		return Transcription(text, payload=text, response_format=response_format)
 
 	def audio_speech_create(
@@ -463,8 +693,8 @@ class OpenAIClient:
 		# Some providers (Voxtral) return JSON with base64 audio_data instead of binary.
 		if "application/json" in content_type or "text/json" in content_type:
 			try:
-				payload = json.loads(raw.decode("utf-8", errors="replace"))
-			except json.JSONDecodeError:
+				payload = _json.loads(raw)
+			except ValueError:
 				return raw
 			audio = _extract_audio_bytes_from_json_payload(payload)
 			if audio:
@@ -496,41 +726,21 @@ def transcribe_audio_mistral(
 	if not api_key or not api_key.strip():
 		raise ValueError("Mistral API key is required for transcription")
 	url = "https://api.mistral.ai/v1/audio/transcriptions"
-	boundary = uuid.uuid4().hex
-	with open(file_path, "rb") as f:
-		file_data = f.read()
 	ext = "." + file_path.rsplit(".", 1)[-1].lower() if "." in file_path else ".wav"
 	filename = os.path.basename(file_path) or "audio.wav"
-	mime = _AUDIO_MIME.get(ext, "audio/wav")
-	parts = [
-		(
-			f'--{boundary}\r\n'
-			f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
-			f'Content-Type: {mime}\r\n\r\n'
-		).encode("utf-8") + file_data,
-		(
-			f'\r\n--{boundary}\r\n'
-			f'Content-Disposition: form-data; name="model"\r\n\r\n'
-			f'{model}\r\n'
-		).encode("utf-8"),
-	]
+	body = MultipartEncoder()
+	body.add_file("file", file_path, filename=filename, content_type=_AUDIO_MIME.get(ext, "audio/wav"))
+	body.add_field("model", model)
 	if language:
-		parts.append(
-			(
-				f'\r\n--{boundary}\r\n'
-				f'Content-Disposition: form-data; name="language"\r\n\r\n'
-				f'{language}\r\n'
-			).encode("utf-8")
-		)
-	parts.append(f'\r\n--{boundary}--\r\n'.encode("utf-8"))
-	body = b"".join(parts)
-	headers = {
-		"x-api-key": api_key.strip(),
-		"Content-Type": f"multipart/form-data; boundary={boundary}",
-	}
+		body.add_field("language", language)
+	headers = {"x-api-key": api_key.strip()}
+	headers.update(body.headers())
 	req = urllib.request.Request(url, data=body, headers=headers, method="POST")
 	opener = _create_opener()
-	data = _open_json(opener, req, timeout=300)
+	try:
+		data = _open_json(opener, req, timeout=300)
+	finally:
+		body.close()
 	return Transcription(data.get("text", ""))
 
 
@@ -568,25 +778,14 @@ def configure_client_for_provider(
 # Multipart body builders (kept as module-level helpers to keep the client class slim).
 # ---------------------------------------------------------------------------
 
-def _build_file_upload_body(file_path: str, purpose: str) -> tuple[str, bytes, str]:
+def _build_file_upload_body(file_path: str, purpose: str) -> MultipartEncoder:
+	"""Build the streaming multipart body for ``/v1/files`` (file read lazily from disk)."""
 	import mimetypes
-	boundary = uuid.uuid4().hex
-	filename = os.path.basename(file_path)
-	for ch in '\r\n"\\':
-		filename = filename.replace(ch, "_")
 	file_mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
-	with open(file_path, "rb") as f:
-		file_data = f.read()
-	body = (
-		f'--{boundary}\r\n'
-		f'Content-Disposition: form-data; name="purpose"\r\n\r\n'
-		f'{purpose}\r\n'
-		f'--{boundary}\r\n'
-		f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
-		f'Content-Type: {file_mime}\r\n\r\n'
-	).encode("utf-8") + file_data + f"\r\n--{boundary}--\r\n".encode("utf-8")
-	content_type = f"multipart/form-data; boundary={boundary}"
-	return boundary, body, content_type
+	body = MultipartEncoder()
+	body.add_field("purpose", purpose)
+	body.add_file("file", file_path, filename=os.path.basename(file_path), content_type=file_mime)
+	return body
 
 
 def _build_audio_text_body(
@@ -594,50 +793,161 @@ def _build_audio_text_body(
 	model: str,
 	response_format: str,
 	extra_fields: dict,
-) -> tuple[bytes, str]:
-	"""Build the multipart body for /audio/transcriptions or /audio/translations."""
-	boundary = uuid.uuid4().hex
-	file_data = file.read()
+) -> MultipartEncoder:
+	"""Build the multipart body for /audio/transcriptions or /audio/translations.
+
+	The audio is streamed from ``file`` while the request is sent, so the
+	caller must keep it open until the call returns.
+	"""
 	file_name = os.path.basename(getattr(file, "name", "") or "audio.wav")
 	ext = os.path.splitext(file_name)[1].lower() or ".wav"
-	file_mime = _AUDIO_MIME.get(ext, "audio/wav")
-	parts: list[bytes] = []
-
-	def _add_field(name: str, value: Any) -> None:
-		if value is None:
-			return
-		if isinstance(value, (list, tuple)):
-			for item in value:
-				_add_field(name, item)
-			return
-		if isinstance(value, dict):
-			value = json.dumps(value, ensure_ascii=False)
-		parts.append(
-			(
-				f'--{boundary}\r\n'
-				f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
-				f'{value}\r\n'
-			).encode("utf-8")
-		)
-
-	_add_field("model", model)
-	_add_field("response_format", response_format)
+	body = MultipartEncoder()
+	body.add_field("model", model)
+	body.add_field("response_format", response_format)
 	for k, v in extra_fields.items():
-		_add_field(k, v)
-	file_part = (
-		f'--{boundary}\r\n'
-		f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
-		f'Content-Type: {file_mime}\r\n\r\n'
-	).encode("utf-8") + file_data + b"\r\n"
-	body = b"".join(parts) + file_part + f"--{boundary}--\r\n".encode("utf-8")
-	content_type = f"multipart/form-data; boundary={boundary}"
-	return body, content_type
+		body.add_field(k, v)
+	body.add_file("file", file, filename=file_name, content_type=_AUDIO_MIME.get(ext, "audio/wav"))
+	return body
+
+
+def _require_file_id(payload: Any) -> str:
+	"""Return the ``id`` of a files-endpoint response or raise ``APIError``."""
+	file_id = payload.get("id") if isinstance(payload, dict) else ""
+	if not isinstance(file_id, str) or not file_id.strip():
+		raise APIError("File upload succeeded but no file id was returned.")
+	return file_id.strip()
+
+
+# Error statuses/codes each provider answers with when a referenced upload is gone
+# (deleted, expired, or from another project): OpenAI and xAI "No file found
+# with id", Anthropic ``not_found_error``, Gemini ``PERMISSION_DENIED`` ("... or
+# it may not exist") or ``NOT_FOUND``, Mistral a signed URL it cannot fetch.
+_MISSING_FILE_ERRORS = {
+	Provider.OpenAI: ((400, 404), {"file_not_found", "invalid_file_id", "invalid_request_error"}),
+	Provider.xAI: ((400, 404), {"file_not_found", "invalid_file_id", "invalid_request_error", "not_found"}),
+	Provider.Anthropic: ((400, 404), {"not_found_error", "invalid_request_error"}),
+	Provider.Google: ((403, 404), {"PERMISSION_DENIED", "NOT_FOUND"}),
+	Provider.MistralAI: ((400, 404, 422), {"invalid_request_error", "not_found", "invalid_file"}),
+}
+_MISSING_PHRASES = ("not found", "no file", "does not exist", "not exist", "expired", "could not fetch", "failed to download")
+
+
+def _is_missing_file_error(err: APIStatusError, provider, file_ids) -> bool:
+	"""True when ``err`` says one of the uploads in ``file_ids`` no longer exists.
+
+	Only the status and error code ``provider`` uses for a missing file count,
+	and the message has to name one of the files sent, so unrelated 4xx
+	errors (a bad model, a rejected parameter) are not retried.
+	"""
+	expected = _MISSING_FILE_ERRORS.get(provider)
+	if expected is None or not file_ids:
+		return False
+	statuses, codes = expected
+	if err.status_code not in statuses:
+		return False
+	error = {}
+	try:
+		data = json.loads(err.response_body or "")
+	except ValueError:
+		data = None
+	if isinstance(data, dict):
+		error = data.get("error") if isinstance(data.get("error"), dict) else data
+	error_codes = {str(error.get(key)) for key in ("code", "type", "status") if error.get(key)}
+	if error_codes and not error_codes & codes:
+		return False
+	text = f"{err.message} {error.get('message') or ''}".lower()
+	if not any(phrase in text for phrase in _MISSING_PHRASES):
+		return False
+	# Gemini names files "files/<id>"; match the bare id too.
+	return any(
+		str(file_id).lower() in text or str(file_id).rsplit("/", 1)[-1].lower() in text
+		for file_id in file_ids
+	)
 
 
 # ---------------------------------------------------------------------------
 # Anthropic body helpers.
 # ---------------------------------------------------------------------------
 
+def _anthropic_uses_file_sources(anthropic_msgs: list) -> bool:
+	"""True when any content block references a Files API upload."""
+	for msg in anthropic_msgs:
+		content = msg.get("content") if isinstance(msg, dict) else None
+		if not isinstance(content, list):
+			continue
+		for block in content:
+			source = block.get("source") if isinstance(block, dict) else None
+			if isinstance(source, dict) and source.get("type") == "file":
+				return True
+	return False
+
+
+def _mark_anthropic_cache_breakpoint(msg: dict) -> bool:
+	"""Put ``cache_control`` on the last cacheable block of ``msg``; False if there is none."""
+	content = msg.get("content")
+	if isinstance(content, str):
+		if not content:
+			return False
+		msg["content"] = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+		return True
+	if not isinstance(content, list):
+		return False
+	for i in range(len(content) - 1, -1, -1):
+		block = content[i]
+		if isinstance(block, dict) and block.get("type") in _ANTHROPIC_CACHEABLE_BLOCKS:
+			# Copy the list and the block: converted content is shared with the
+			# caller's message list and with later requests (see _message_memo).
+			msg["content"] = content[:i] + [dict(block, cache_control={"type": "ephemeral"})] + content[i + 1:]
+			return True
+	return False
+
+
+def _has_anthropic_attachment(msg: dict) -> bool:
+	content = msg.get("content")
+	return isinstance(content, list) and any(
+		isinstance(b, dict) and b.get("type") in ("image", "document") for b in content
+	)
+
+
+def _apply_anthropic_cache_breakpoints(body: dict) -> None:
+	"""Mark the stable prefix of an Anthropic request for prompt caching.
+
+	Breakpoints go, in priority order, on the system prompt, the newest message
+	(so the next turn can read everything sent now), the previous user turn (to
+	read what the last request wrote) and the latest older message carrying an
+	image or document (so a large attachment stays cached when the turns after
+	it change, e.g. on regenerate). Prefixes shorter than the model's minimum
+	cacheable length are ignored by the API at no cost.
+	"""
+	budget = _ANTHROPIC_MAX_CACHE_BREAKPOINTS
+	system = body.get("system")
+	if isinstance(system, str) and system:
+		body["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+		budget -= 1
+	msgs = body.get("messages") or []
+	if not msgs:
+		return
+	targets = [len(msgs) - 1]
+	prev_user = next(
+		(i for i in range(len(msgs) - 2, -1, -1) if msgs[i].get("role") == "user"),
+		None,
+	)
+	if prev_user is not None:
+		targets.append(prev_user)
+	oldest = min(targets)
+	attachment = next(
+		(i for i in range(oldest - 1, -1, -1) if _has_anthropic_attachment(msgs[i])),
+		None,
+	)
+	if attachment is not None:
+		targets.append(attachment)
+	for i in targets:
+		if budget <= 0:
+			break
+		if _mark_anthropic_cache_breakpoint(msgs[i]):
+			budget -= 1
+
+
 def _normalize_stop_sequences(stop_kw: Any) -> list[str]:
 	"""Convert the OpenAI-style ``stop`` parameter to Anthropic's stop_sequences (max 16)."""
 	if stop_kw is None:
@@ -13,6 +13,7 @@ from typing import Any, Optional
 
 from ..consts import ContentType, Provider
 from ._errors import APIError
+from ._message_memo import convert_content
 
 
 # Mime types we treat as text for inlining purposes (so PDFs etc. stay binary).
@@ -229,11 +230,25 @@ def _convert_input_file_for_openrouter(part: dict) -> dict:
 	return out
 
 
-def _convert_input_file_for_mistral(part: dict) -> dict:
-	"""Mistral chat-completions ``document_url`` shape (URL or data URI)."""
-	data_url, filename, _mime = _input_file_to_data_url(part)
+def _convert_input_file_for_mistral(part: dict, upload_file: Optional[callable] = None) -> dict:
+	"""Mistral chat-completions ``document_url`` shape (URL, signed file URL or data URI).
+
+	When ``upload_file`` is given, local files are uploaded once and referenced
+	by their signed URL; on upload failure the file is inlined as a data URI.
+	"""
 	file_url = part.get("file_url")
-	url_value = file_url if (isinstance(file_url, str) and file_url) else data_url
+	if isinstance(file_url, str) and file_url:
+		return {"type": "document_url", "document_url": file_url}
+	file_path = part.get("file_path")
+	if upload_file is not None and isinstance(file_path, str) and os.path.isfile(file_path):
+		try:
+			record = upload_file(file_path)
+		except (APIError, OSError):
+			record = None
+		if record and record.get("url"):
+			return {"type": "document_url", "document_url": record["url"]}
+	data_url, filename, _mime = _input_file_to_data_url(part)
+	url_value = data_url
 	if not url_value:
 		raise APIError(_unreadable_file_message(filename or "<unknown>"))
 	return {"type": "document_url", "document_url": url_value}
@@ -257,7 +272,11 @@ def _binary_doc_unsupported_message(provider: str, filename: str) -> str:
 	)
 
 
-def _normalize_input_files_for_provider(messages: list, provider: str) -> list:
+def _normalize_input_files_for_provider(
+	messages: list,
+	provider: str,
+	upload_file: Optional[callable] = None,
+) -> list:
 	"""Rewrite ``input_file`` content parts into the shape ``provider`` expects.
 
 	The internal representation produced by the conversation dialog is the
@@ -269,7 +288,8 @@ def _normalize_input_files_for_provider(messages: list, provider: str) -> list:
 
 	The caller is responsible for routing requests with files to the correct
 	endpoint when a provider has a separate Files/Responses API (handled by
-	the dispatch in :class:`OpenAIClient`).
+	the dispatch in :class:`OpenAIClient`). ``upload_file`` lets providers with
+	a files endpoint (Mistral) reference local files instead of inlining them.
 	"""
 	if not isinstance(messages, list):
 		return messages
@@ -287,7 +307,7 @@ def _normalize_input_files_for_provider(messages: list, provider: str) -> list:
 			if not isinstance(part, dict) or part.get("type") != ContentType.INPUT_FILE:
 				new_parts.append(part)
 				continue
-			rewritten = _rewrite_input_file_part(part, provider)
+			rewritten = _rewrite_input_file_part(part, provider, upload_file=upload_file)
 			# A single ``input_file`` may expand to multiple parts (e.g. label
 			# text + inlined content) — accept either a list or a single dict.
 			if isinstance(rewritten, list):
@@ -300,12 +320,16 @@ def _normalize_input_files_for_provider(messages: list, provider: str) -> list:
 	return converted
 
 
-def _rewrite_input_file_part(part: dict, provider: str) -> dict | list[dict]:
+def _rewrite_input_file_part(
+	part: dict,
+	provider: str,
+	upload_file: Optional[callable] = None,
+) -> dict | list[dict]:
 	"""Provider-aware conversion of a single ``input_file`` content part."""
 	if provider == Provider.OpenRouter:
 		return _convert_input_file_for_openrouter(part)
 	if provider == Provider.MistralAI:
-		return _convert_input_file_for_mistral(part)
+		return _convert_input_file_for_mistral(part, upload_file=upload_file)
 	# Generic fallback: try inlining as text; binary docs raise a clear error.
 	text_part = _input_file_to_text_part(part)
 	if text_part is not None:
@@ -360,11 +384,16 @@ def _anthropic_image_block_from_data_url(url: str) -> Optional[dict]:
 	return {"type": "image", "source": {"type": "base64", "media_type": mt, "data": data}}
 
 
-def _anthropic_doc_block_from_input_file(part: dict) -> Optional[dict | list]:
+def _anthropic_doc_block_from_input_file(
+	part: dict,
+	upload_file: Optional[callable] = None,
+) -> Optional[dict | list]:
 	"""Convert an OpenAI ``input_file`` part to one or more Anthropic blocks.
 
 	Returns ``None`` when the file cannot be encoded. May return a list when
 	a text file is inlined as a text block instead of a binary document block.
+	Binary local files go through ``upload_file`` (Files API) when given, and
+	are inlined as base64 if that upload fails.
 	"""
 	source: Optional[dict] = None
 	filename = part.get("filename", "") or ""
@@ -391,20 +420,29 @@ def _anthropic_doc_block_from_input_file(part: dict) -> Optional[dict | list]:
 		else:
 			source = {"type": "base64", "media_type": media_type, "data": data}
 	elif isinstance(file_path, str) and os.path.exists(file_path):
-		try:
-			with open(file_path, "rb") as f:
-				raw = f.read()
-		except OSError:
-			return None
 		media_type = mimetypes.guess_type(file_path)[0] or "application/pdf"
-		if _is_text_media_type(media_type):
-			extracted_text = raw.decode("utf-8", errors="replace")
-		else:
-			source = {
-				"type": "base64",
-				"media_type": media_type,
-				"data": base64.b64encode(raw).decode("utf-8"),
-			}
+		is_text = _is_text_media_type(media_type)
+		if upload_file is not None and not is_text:
+			try:
+				record = upload_file(file_path)
+			except (APIError, OSError):
+				record = None
+			if record and record.get("id"):
+				source = {"type": "file", "file_id": record["id"]}
+		if source is None:
+			try:
+				with open(file_path, "rb") as f:
+					raw = f.read()
+			except OSError:
+				return None
+			if is_text:
+				extracted_text = raw.decode("utf-8", errors="replace")
+			else:
+				source = {
+					"type": "base64",
+					"media_type": media_type,
+					"data": base64.b64encode(raw).decode("utf-8"),
+				}
 		if not filename:
 			filename = os.path.basename(file_path)
 
@@ -419,7 +457,7 @@ def _anthropic_doc_block_from_input_file(part: dict) -> Optional[dict | list]:
 	return None
 
 
-def _convert_content_to_anthropic(content) -> str | list:
+def _convert_content_to_anthropic(content, upload_file: Optional[callable] = None) -> str | list:
 	"""Convert an OpenAI-format ``content`` value to Anthropic content blocks."""
 	if isinstance(content, str):
 		return content
@@ -441,7 +479,7 @@ def _convert_content_to_anthropic(content) -> str | list:
 			if block:
 				blocks.append(block)
 		elif typ == "input_file":
-			block = _anthropic_doc_block_from_input_file(part)
+			block = _anthropic_doc_block_from_input_file(part, upload_file=upload_file)
 			if isinstance(block, list):
 				blocks.extend(block)
 			elif block:
@@ -449,7 +487,10 @@ def _convert_content_to_anthropic(content) -> str | list:
 	return blocks if blocks else ""
 
 
-def _convert_messages_to_anthropic(messages: list) -> tuple[Optional[str], list]:
+def _convert_messages_to_anthropic(
+	messages: list,
+	upload_file: Optional[callable] = None,
+) -> tuple[Optional[str], list]:
 	"""Convert OpenAI messages to Anthropic format. Returns ``(system, messages)``."""
 	system: Optional[str] = None
 	anthropic_msgs: list[dict] = []
@@ -472,7 +513,10 @@ def _convert_messages_to_anthropic(messages: list) -> tuple[Optional[str], list]
 			continue
 		if role not in ("user", "assistant"):
 			continue
-		conv = _convert_content_to_anthropic(content)
+		conv = convert_content(
+			"anthropic", m, lambda c: _convert_content_to_anthropic(c, upload_file=upload_file),
+			memo=m is not messages[-1],
+		)
 		if conv:
 			anthropic_msgs.append({"role": role, "content": conv})
 	return (system, anthropic_msgs)
@@ -524,6 +568,17 @@ def _convert_part_to_responses(
 	return None
 
 
+def _convert_parts_to_responses(content: list, upload_file: Optional[callable] = None) -> list:
+	parts: list[dict] = []
+	for part in content:
+		if not isinstance(part, dict):
+			continue
+		converted = _convert_part_to_responses(part, upload_file=upload_file)
+		if converted:
+			parts.append(converted)
+	return parts
+
+
 def _messages_to_responses_input(
 	messages: list,
 	upload_file: Optional[callable] = None,
@@ -545,13 +600,10 @@ def _messages_to_responses_input(
 			continue
 		if not isinstance(content, list):
 			continue
-		parts: list[dict] = []
-		for part in content:
-			if not isinstance(part, dict):
-				continue
-			converted = _convert_part_to_responses(part, upload_file=upload_file)
-			if converted:
-				parts.append(converted)
+		parts = convert_content(
+			"responses", msg, lambda c: _convert_parts_to_responses(c, upload_file=upload_file),
+			memo=msg is not messages[-1],
+		)
 		if parts:
 			output.append({"role": role, "content": parts})
 	return output
@@ -0,0 +1,153 @@
+"""Persistent cache of provider-side uploaded file ids.
+
+Documents attached to a conversation are re-sent with every turn. Providers
+with a Files API (OpenAI, xAI, Anthropic, Gemini, Mistral) let us upload a
+file once and then reference it by id, so this cache remembers what was
+uploaded where, keyed by ``(account, provider, sha256 of content)``.
+
+Entries expire after a provider-specific lifetime (Gemini deletes files after
+48 hours, Mistral signed URLs are short-lived) and are dropped early when the
+provider answers that a referenced file no longer exists.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from ..consts import DATA_DIR, Provider
+
+UPLOADED_FILES_PATH = os.path.join(DATA_DIR, "uploaded_files.json")
+UPLOADED_FILES_VERSION = 1
+
+# Seconds an uploaded file is trusted to still exist on the provider side.
+_DEFAULT_TTL_SEC = 7 * 24 * 3600
+_PROVIDER_TTL_SEC = {
+	Provider.OpenAI: 30 * 24 * 3600,
+	Provider.xAI: 7 * 24 * 3600,
+	Provider.Anthropic: 30 * 24 * 3600,
+	# Gemini File API deletes uploads after 48 hours.
+	Provider.Google: 46 * 3600,
+	# We cache the signed URL, which is requested with a 24 hour expiry.
+	Provider.MistralAI: 23 * 3600,
+}
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadedFileCache:
+	"""Thread-safe, JSON-persisted map of content hash to provider file reference.
+
+	A cached record is a dict with at least ``id``; providers may add extra keys
+	(``uri`` for Gemini, ``url`` for Mistral signed URLs).
+	"""
+
+	def __init__(self, path: str = UPLOADED_FILES_PATH):
+		self.path = path
+		self._entries: Optional[dict] = None
+		self._hashes: dict[tuple, str] = {}
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _key(account: str, provider: str, digest: str) -> str:
+		return f"{account}|{provider}|{digest}"
+
+	def _load(self) -> dict:
+		if self._entries is not None:
+			return self._entries
+		entries: dict = {}
+		try:
+			with open(self.path, "r", encoding="utf-8") as f:
+				data = json.load(f)
+			raw = data.get("entries") if isinstance(data, dict) else None
+			if isinstance(raw, dict):
+				now = time.time()
+				entries = {
+					k: v for k, v in raw.items()
+					if isinstance(v, dict) and float(v.get("expiresAt") or 0) > now
+				}
+		except (OSError, ValueError):
+			entries = {}
+		self._entries = entries
+		return entries
+
+	def _save(self) -> None:
+		payload = {"version": UPLOADED_FILES_VERSION, "entries": self._entries or {}}
+		try:
+			os.makedirs(os.path.dirname(self.path), exist_ok=True)
+			tmp = f"{self.path}.tmp"
+			with open(tmp, "w", encoding="utf-8") as f:
+				json.dump(payload, f, indent=2, ensure_ascii=False)
+			os.replace(tmp, self.path)
+		except OSError:
+			pass
+
+	def content_hash(self, path: str) -> str:
+		"""SHA-256 of the file, memoized per (path, mtime, size) for this process."""
+		st = os.stat(path)
+		memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+		with self._lock:
+			digest = self._hashes.get(memo_key)
+		if digest:
+			return digest
+		h = hashlib.sha256()
+		with open(path, "rb") as f:
+			for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+				h.update(block)
+		digest = h.hexdigest()
+		with self._lock:
+			self._hashes[memo_key] = digest
+		return digest
+
+	def get(self, account: str, provider: str, digest: str) -> Optional[dict]:
+		with self._lock:
+			entry = self._load().get(self._key(account, provider, digest))
+			if not entry:
+				return None
+			if float(entry.get("expiresAt") or 0) <= time.time():
+				del self._entries[self._key(account, provider, digest)]
+				self._save()
+				return None
+			return dict(entry)
+
+	def put(self, account: str, provider: str, digest: str, record: dict) -> None:
+		now = time.time()
+		entry = dict(record)
+		entry["uploadedAt"] = now
+		entry["expiresAt"] = now + _PROVIDER_TTL_SEC.get(provider, _DEFAULT_TTL_SEC)
+		with self._lock:
+			self._load()[self._key(account, provider, digest)] = entry
+			self._save()
+
+	def get_or_upload(
+		self,
+		account: str,
+		provider: str,
+		path: str,
+		upload: Callable[[str], dict],
+	) -> dict:
+		"""Return the cached record for ``path``'s content, uploading it on a miss."""
+		digest = self.content_hash(path)
+		record = self.get(account, provider, digest)
+		if record is not None:
+			return record
+		record = upload(path)
+		self.put(account, provider, digest, record)
+		return record
+
+	def invalidate(self, account: str, provider: str, file_id: str) -> None:
+		"""Forget every entry pointing at ``file_id`` for this account and provider."""
+		prefix = f"{account}|{provider}|"
+		with self._lock:
+			entries = self._load()
+			stale = [k for k, v in entries.items() if k.startswith(prefix) and v.get("id") == file_id]
+			for k in stale:
+				del entries[k]
+			if stale:
+				self._save()
+
+
+uploaded_file_cache = UploadedFileCache()
@@ -11,6 +11,8 @@ Official references:
 from __future__ import annotations
 
 import base64
+import mimetypes
+import os
 import urllib.parse
 from typing import Any, Optional
 
@@ -18,8 +20,10 @@ from ..consts import ContentType, Role
 from ._content import _decode_data_url_to_bytes, _input_file_to_data_url, _is_text_media_type
 from ._errors import APIError
 from ._http import _USER_AGENT
+from ._message_memo import convert_content
 
 GEMINI_API_ROOT = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
 
 _AUDIO_FORMAT_MIME = {
 	"wav": "audio/wav",
@@ -89,7 +93,23 @@ def _gemini_part_from_input_audio(part: dict) -> Optional[dict]:
 	return _gemini_inline_data_part(mime, data_b64)
 
 
-def _gemini_part_from_input_file(part: dict) -> Optional[dict]:
+def _gemini_file_data_part(mime_type: str, file_uri: str) -> dict[str, Any]:
+	return {"file_data": {"mime_type": mime_type, "file_uri": file_uri}}
+
+
+def _gemini_part_from_input_file(part: dict, upload_file: Optional[callable] = None) -> Optional[dict]:
+	file_path = part.get("file_path")
+	if upload_file is not None and isinstance(file_path, str) and os.path.isfile(file_path):
+		mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+		if not _is_text_media_type(mime):
+			# Binary documents go through the File API once and are then
+			# referenced by URI; fall back to inline bytes if the upload fails.
+			try:
+				record = upload_file(file_path)
+			except (APIError, OSError):
+				record = None
+			if record and record.get("uri"):
+				return _gemini_file_data_part(record.get("mime") or mime, record["uri"])
 	data_url, filename, mime = _input_file_to_data_url(part)
 	if data_url:
 		raw, resolved_mime = _decode_data_url_to_bytes(data_url)
@@ -114,7 +134,7 @@ def _gemini_part_from_input_file(part: dict) -> Optional[dict]:
 	return None
 
 
-def _openai_content_to_gemini_parts(content: Any) -> list[dict]:
+def _openai_content_to_gemini_parts(content: Any, upload_file: Optional[callable] = None) -> list[dict]:
 	if isinstance(content, str):
 		return [_gemini_text_part(content)] if content else []
 	if not isinstance(content, list):
@@ -134,7 +154,7 @@ def _openai_content_to_gemini_parts(content: Any) -> list[dict]:
 			if gp:
 				parts.append(gp)
 		elif typ == ContentType.INPUT_FILE:
-			gp = _gemini_part_from_input_file(part)
+			gp = _gemini_part_from_input_file(part, upload_file=upload_file)
 			if gp:
 				parts.append(gp)
 		elif typ == ContentType.INPUT_AUDIO:
@@ -144,7 +164,10 @@ def _openai_content_to_gemini_parts(content: Any) -> list[dict]:
 	return parts
 
 
-def messages_to_gemini_contents(messages: list) -> tuple[Optional[dict], list[dict]]:
+def messages_to_gemini_contents(
+	messages: list,
+	upload_file: Optional[callable] = None,
+) -> tuple[Optional[dict], list[dict]]:
 	"""Convert OpenAI-style messages to Gemini ``systemInstruction`` + ``contents``."""
 	system_chunks: list[str] = []
 	contents: list[dict] = []
@@ -154,7 +177,10 @@ def messages_to_gemini_contents(messages: list) -> tuple[Optional[dict], list[di
 		if not isinstance(msg, dict):
 			continue
 		role = str(msg.get("role") or Role.USER).lower()
-		parts = _openai_content_to_gemini_parts(msg.get("content"))
+		parts = convert_content(
+			"gemini", msg, lambda c: _openai_content_to_gemini_parts(c, upload_file=upload_file),
+			memo=msg is not messages[-1],
+		)
 		if not parts:
 			continue
 		if role in (Role.SYSTEM, Role.DEVELOPER):
@@ -167,7 +193,8 @@ def messages_to_gemini_contents(messages: list) -> tuple[Optional[dict], list[di
 		if contents and contents[-1].get("role") == gemini_role:
 			contents[-1]["parts"].extend(parts)
 		else:
-			contents.append({"role": gemini_role, "parts": parts})
+			# Copy: converted parts are shared with later requests (see _message_memo).
+			contents.append({"role": gemini_role, "parts": list(parts)})
 	system_instruction = None
 	if system_chunks:
 		system_instruction = {"parts": [_gemini_text_part("\n\n".join(system_chunks))]}
@@ -248,9 +275,14 @@ def _apply_gemini_generation_config(body: dict[str, Any], model_id: str, kwargs:
 		body["generationConfig"] = gen
 
 
-def build_gemini_generate_content_body(model_id: str, messages: list, kwargs: dict) -> dict[str, Any]:
+def build_gemini_generate_content_body(
+	model_id: str,
+	messages: list,
+	kwargs: dict,
+	upload_file: Optional[callable] = None,
+) -> dict[str, Any]:
 	"""Build a native ``generateContent`` JSON body."""
-	system_instruction, contents = messages_to_gemini_contents(messages)
+	system_instruction, contents = messages_to_gemini_contents(messages, upload_file=upload_file)
 	if not contents:
 		raise APIError("No valid messages for Gemini generateContent request.")
 	body: dict[str, Any] = {"contents": contents}
@@ -275,8 +307,9 @@ def create_gemini_generate_content_request(
 	messages: list,
 	stream: bool,
 	kwargs: dict,
+	upload_file: Optional[callable] = None,
 ) -> tuple[str, dict[str, str], dict[str, Any]]:
 	url = gemini_model_url(model_id, stream=stream)
 	headers = build_google_native_headers(api_key)
-	body = build_gemini_generate_content_body(model_id, messages, kwargs)
+	body = build_gemini_generate_content_body(model_id, messages, kwargs, upload_file=upload_file)
 	return url, headers, body
@@ -5,12 +5,20 @@ the openai/anthropic SDKs into NVDA's runtime.
 """
 from __future__ import annotations
 
+import http.client
 import json
+import socket
 import ssl
+import threading
+import time
 import urllib.error
+import urllib.parse
 import urllib.request
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
 
+from . import _json
+from ._cancel import APICancelledError, CancelToken, current_cancel_token
 from ._errors import APIConnectionError, APIStatusError, _resolve_error_message
 
 # User-Agent crafted to look like a regular browser so Cloudflare-fronted
@@ -33,10 +41,622 @@ _AUDIO_MIME = {
 }
 
 
+# Keep-alive pool tuning. Idle sockets older than this are closed rather than
+# reused: most API front-ends drop idle keep-alive connections after ~60 s.
+_POOL_IDLE_TIMEOUT = 45.0
+_POOL_MAX_IDLE_PER_HOST = 4
+# Bytes we are willing to drain from a partially-read response (e.g. a stream
+# closed right after ``[DONE]``) so its connection can go back to the pool.
+# The drain as a whole gets ``_POOL_DRAIN_TIMEOUT`` seconds; a tail still
+# trickling in after that is not worth waiting for and the socket is closed.
+_POOL_DRAIN_LIMIT = 64 * 1024
+_POOL_DRAIN_TIMEOUT = 0.25
+# Redirects followed per request, as urllib's HTTPRedirectHandler does.
+_MAX_REDIRECTS = 10
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Errors meaning a reused keep-alive socket was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (
+	http.client.RemoteDisconnected,
+	http.client.BadStatusLine,
+	BrokenPipeError,
+	ConnectionResetError,
+	ConnectionAbortedError,
+)
+
+_ssl_context: Optional[ssl.SSLContext] = None
+_ssl_context_lock = threading.Lock()
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+	"""Return the process-wide default SSL context (built once, on first use)."""
+	global _ssl_context
+	with _ssl_context_lock:
+		if _ssl_context is None:
+			_ssl_context = ssl.create_default_context()
+		return _ssl_context
+
+
+class NetworkTiming:
+	"""Per-phase timing of the last request opened inside ``capture_network_timing``.
+
+	Durations are in seconds and ``None`` when a phase did not happen (a reused
+	keep-alive connection has no DNS, connect or TLS phase) or could not be
+	measured (requests sent through a proxy only report ``headers``).
+	``firstByte`` is filled in later, by whichever thread first reads the body.
+	"""
+
+	__slots__ = (
+		"requests", "reused", "dns", "connect", "tls", "upload", "uploadBytes",
+		"headers", "firstByte", "_sentAt",
+	)
+
+	def __init__(self):
+		self.requests = 0
+		self._reset()
+
+	def _reset(self) -> None:
+		self.reused: Optional[bool] = None
+		self.dns: Optional[float] = None
+		self.connect: Optional[float] = None
+		self.tls: Optional[float] = None
+		self.upload: Optional[float] = None
+		self.uploadBytes: Optional[int] = None
+		self.headers: Optional[float] = None
+		self.firstByte: Optional[float] = None
+		self._sentAt: Optional[float] = None
+
+	def begin_request(self) -> None:
+		"""Start over for a new request (retries keep only the last attempt)."""
+		self.requests += 1
+		self._reset()
+
+	def mark_first_byte(self) -> None:
+		if self.firstByte is None and self._sentAt is not None:
+			self.firstByte = time.perf_counter() - self._sentAt
+
+	def as_dict(self) -> dict:
+		"""Timing keys for ``HistoryBlock.timing`` (phases that did not happen are omitted)."""
+		out: dict = {}
+		for key, value in (
+			("netDnsSec", self.dns),
+			("netConnectSec", self.connect),
+			("netTlsSec", self.tls),
+			("netUploadSec", self.upload),
+			("netHeadersSec", self.headers),
+			("netFirstByteSec", self.firstByte),
+		):
+			if value is not None:
+				out[key] = round(value, 4)
+		if self.uploadBytes is not None:
+			out["netUploadBytes"] = self.uploadBytes
+		if self.reused is not None:
+			out["netConnectionReused"] = self.reused
+		if self.requests > 1:
+			out["netRequests"] = self.requests
+		return out
+
+
+_timing_local = threading.local()
+
+
+@contextmanager
+def capture_network_timing() -> Iterator[NetworkTiming]:
+	"""Record per-phase timing of requests opened by this thread within the block."""
+	previous = getattr(_timing_local, "current", None)
+	timing = NetworkTiming()
+	_timing_local.current = timing
+	try:
+		yield timing
+	finally:
+		_timing_local.current = previous
+
+
+def _current_timing() -> Optional[NetworkTiming]:
+	return getattr(_timing_local, "current", None)
+
+
+def _timed_connect(conn: http.client.HTTPConnection, scheme: str, host: str, port: int, timeout: float, timing: NetworkTiming) -> None:
+	"""Open ``conn``'s socket ourselves so DNS, TCP connect and TLS can be timed separately.
+
+	Mirrors ``HTTP(S)Connection.connect`` for the non-proxied case; http.client
+	skips its own connect once ``conn.sock`` is set.
+	"""
+	t0 = time.perf_counter()
+	infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+	t1 = time.perf_counter()
+	timing.dns = t1 - t0
+	sock = None
+	last_err: Optional[OSError] = None
+	for family, socktype, proto, _canon, addr in infos:
+		sock = socket.socket(family, socktype, proto)
+		try:
+			sock.settimeout(timeout)
+			sock.connect(addr)
+			break
+		except OSError as err:
+			last_err = err
+			sock.close()
+			sock = None
+	if sock is None:
+		raise last_err or OSError(f"getaddrinfo returned no addresses for {host}")
+	try:
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	except OSError:
+		pass
+	t2 = time.perf_counter()
+	timing.connect = t2 - t1
+	if scheme == "https":
+		try:
+			sock = _get_ssl_context().wrap_socket(sock, server_hostname=host)
+		except BaseException:
+			sock.close()
+			raise
+		timing.tls = time.perf_counter() - t2
+	conn.sock = sock
+
+
+def _body_size(body: Any, headers: dict) -> Optional[int]:
+	for name, value in headers.items():
+		if name.lower() == "content-length":
+			try:
+				return int(value)
+			except (TypeError, ValueError):
+				break
+	if body is None:
+		return 0
+	if isinstance(body, (bytes, bytearray, memoryview)):
+		return len(body)
+	if isinstance(body, str):
+		return len(body.encode("iso-8859-1", errors="replace"))
+	return None
+
+
+class _ConnectionPool:
+	"""Thread-safe pool of idle keep-alive connections keyed by (scheme, host, port).
+
+	Connections are only ever used by one request at a time: ``acquire`` hands
+	an idle connection out exclusively and ``release`` puts it back once its
+	response has been fully read.
+	"""
+
+	def __init__(self, idle_timeout: float = _POOL_IDLE_TIMEOUT, max_idle_per_host: int = _POOL_MAX_IDLE_PER_HOST):
+		self.idle_timeout = idle_timeout
+		self.max_idle_per_host = max_idle_per_host
+		self._idle: dict[tuple[str, str, int], list[tuple[http.client.HTTPConnection, float]]] = {}
+		self._lock = threading.Lock()
+
+	def acquire(self, key: tuple[str, str, int], timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+		"""Return ``(connection, reused)`` for ``key``, creating one when none is idle."""
+		now = time.monotonic()
+		stale: list[http.client.HTTPConnection] = []
+		conn = None
+		with self._lock:
+			entries = self._idle.get(key) or []
+			while entries:
+				candidate, last_used = entries.pop()
+				if now - last_used > self.idle_timeout:
+					stale.append(candidate)
+					continue
+				conn = candidate
+				break
+		for old in stale:
+			_close_quietly(old)
+		if conn is not None:
+			conn.timeout = timeout
+			if conn.sock is not None:
+				try:
+					conn.sock.settimeout(timeout)
+				except OSError:
+					_close_quietly(conn)
+					conn = None
+			if conn is not None:
+				return conn, True
+		return _new_connection(key, timeout), False
+
+	def has_idle(self, key: tuple[str, str, int]) -> bool:
+		with self._lock:
+			return bool(self._idle.get(key))
+
+	def release(self, key: tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+		"""Return ``conn`` to the idle list (or close it when the host is full)."""
+		if conn.sock is None:
+			return
+		with self._lock:
+			entries = self._idle.setdefault(key, [])
+			if len(entries) < self.max_idle_per_host:
+				entries.append((conn, time.monotonic()))
+				return
+		_close_quietly(conn)
+
+	def evict_idle(self) -> None:
+		"""Close idle connections that exceeded ``idle_timeout``."""
+		now = time.monotonic()
+		stale: list[http.client.HTTPConnection] = []
+		with self._lock:
+			for key, entries in list(self._idle.items()):
+				keep = []
+				for conn, last_used in entries:
+					if now - last_used > self.idle_timeout:
+						stale.append(conn)
+					else:
+						keep.append((conn, last_used))
+				if keep:
+					self._idle[key] = keep
+				else:
+					del self._idle[key]
+		for conn in stale:
+			_close_quietly(conn)
+
+	def clear(self) -> None:
+		"""Close every idle connection (used on add-on termination)."""
+		with self._lock:
+			entries = [conn for lst in self._idle.values() for conn, _t in lst]
+			self._idle.clear()
+		for conn in entries:
+			_close_quietly(conn)
+
+
+def _new_connection(key: tuple[str, str, int], timeout: float) -> http.client.HTTPConnection:
+	scheme, host, port = key
+	if scheme == "https":
+		return http.client.HTTPSConnection(host, port, timeout=timeout, context=_get_ssl_context())
+	return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+def _close_quietly(conn: http.client.HTTPConnection) -> None:
+	try:
+		conn.close()
+	except Exception:
+		pass
+
+
+def _shutdown_socket(sock) -> None:
+	"""Shut ``sock`` down in both directions so blocked reads/writes return now."""
+	if sock is None:
+		return
+	try:
+		sock.shutdown(socket.SHUT_RDWR)
+	except (OSError, ValueError):
+		pass
+
+
+def _urllib_response_socket(resp):
+	"""Best-effort access to the socket under a urllib response (proxy fallback path)."""
+	raw = getattr(getattr(resp, "fp", None), "raw", None)
+	return getattr(raw, "_sock", None)
+
+
+def _raise_if_cancelled(token: Optional[CancelToken], err: Optional[BaseException] = None) -> None:
+	"""Turn whatever a shut-down socket produced into ``APICancelledError``."""
+	if token is not None and token.cancelled:
+		if err is not None:
+			raise APICancelledError() from err
+		raise APICancelledError()
+
+
+_POOL = _ConnectionPool()
+
+
+class _PooledResponse:
+	"""Wrap an ``http.client.HTTPResponse`` and recycle its connection on close.
+
+	Exposes the small subset of the urllib response API used by this package
+	(``status``, ``headers``, ``read``, line iteration, context manager).
+	"""
+
+	def __init__(
+		self,
+		resp: http.client.HTTPResponse,
+		conn: http.client.HTTPConnection,
+		key: tuple[str, str, int],
+		timing: Optional[NetworkTiming] = None,
+		cancel_token: Optional[CancelToken] = None,
+		cancel_handle: Optional[int] = None,
+	):
+		self._resp = resp
+		self._conn = conn
+		self._key = key
+		self._released = False
+		self._timing = timing
+		self._cancelToken = cancel_token
+		self._cancelHandle = cancel_handle
+		self.status = resp.status
+		self.reason = resp.reason
+		self.headers = resp.headers
+
+	def getcode(self) -> int:
+		return self.status
+
+	def _first_byte(self, data):
+		# Only the first successful read is timed; after that this is a no-op.
+		if data and self._timing is not None:
+			self._timing.mark_first_byte()
+			self._timing = None
+		return data
+
+	def read(self, amt: Optional[int] = None) -> bytes:
+		return self._first_byte(self._resp.read() if amt is None else self._resp.read(amt))
+
+	def read1(self, amt: int = -1) -> bytes:
+		return self._first_byte(self._resp.read1(amt))
+
+	def readinto(self, b) -> int:
+		return self._first_byte(self._resp.readinto(b))
+
+	def readline(self, limit: int = -1) -> bytes:
+		return self._first_byte(self._resp.readline(limit))
+
+	def __iter__(self):
+		while True:
+			line = self.readline()
+			if not line:
+				return
+			yield line
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+	def abort(self) -> None:
+		"""Shut the socket down so a read blocked on another thread returns immediately."""
+		_shutdown_socket(self._conn.sock)
+
+	def close(self) -> None:
+		if self._released:
+			return
+		self._released = True
+		token = self._cancelToken
+		if token is not None:
+			token.unregister(self._cancelHandle)
+		resp, conn = self._resp, self._conn
+		# A cancelled request's socket has been shut down: never pool it.
+		cancelled = token is not None and token.cancelled
+		reusable = not cancelled and not resp.will_close and self._drain(resp, conn)
+		try:
+			resp.close()
+		except Exception:
+			reusable = False
+		if reusable:
+			_POOL.release(self._key, conn)
+		else:
+			_close_quietly(conn)
+
+	@staticmethod
+	def _drain(resp: http.client.HTTPResponse, conn: http.client.HTTPConnection) -> bool:
+		"""Consume a small unread tail so the socket can be reused; False if not worth it."""
+		if resp.isclosed():
+			return True
+		sock = conn.sock
+		if sock is None:
+			return False
+		deadline = time.monotonic() + _POOL_DRAIN_TIMEOUT
+		try:
+			previous = sock.gettimeout()
+			remaining = _POOL_DRAIN_LIMIT
+			while remaining > 0:
+				left = deadline - time.monotonic()
+				if left <= 0:
+					return False
+				sock.settimeout(left)
+				# read1: one recv at most, so the deadline is checked between arrivals.
+				chunk = resp.read1(min(8192, remaining))
+				if not chunk:
+					break
+				remaining -= len(chunk)
+			sock.settimeout(previous)
+		except (OSError, http.client.HTTPException):
+			return False
+		return resp.isclosed()
+
+
+class _FallbackResponse:
+	"""A urllib response (proxy path) whose cancel callback is dropped on close."""
+
+	def __init__(self, resp, cancel_token: Optional[CancelToken], cancel_handle: Optional[int]):
+		self._resp = resp
+		self._cancelToken = cancel_token
+		self._cancelHandle = cancel_handle
+
+	def __getattr__(self, name):
+		return getattr(self._resp, name)
+
+	def __iter__(self):
+		return iter(self._resp)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.close()
+
+	def close(self) -> None:
+		token, self._cancelToken = self._cancelToken, None
+		if token is not None:
+			token.unregister(self._cancelHandle)
+		self._resp.close()
+
+
+class _PooledOpener:
+	"""Drop-in for ``urllib.request.OpenerDirector.open`` backed by ``_POOL``.
+
+	Requests go through persistent ``http.client`` connections so consecutive
+	turns skip the TCP connect and TLS handshake. When a proxy is configured
+	for the scheme we fall back to a plain urllib opener, which knows how to
+	tunnel through it. Redirects are followed with urllib's rules (a POST is
+	only followed, as a GET, on 301-303), up to ``_MAX_REDIRECTS``.
+	"""
+
+	def __init__(self):
+		self._fallback = None
+		self._redirectHandler = urllib.request.HTTPRedirectHandler()
+
+	def open(self, req: urllib.request.Request, timeout: float = 60):
+		redirects = 0
+		while True:
+			resp = self._open_once(req, timeout)
+			if resp.status not in _REDIRECT_CODES:
+				return resp
+			location = resp.headers.get("Location") or resp.headers.get("URI")
+			new_req = self._redirect_request(req, resp, location) if location else None
+			if new_req is None:
+				return resp
+			resp.close()
+			redirects += 1
+			if redirects > _MAX_REDIRECTS:
+				raise urllib.error.HTTPError(req.full_url, resp.status, "Too many redirects", resp.headers, None)
+			req = new_req
+
+	def _redirect_request(self, req: urllib.request.Request, resp, location: str) -> Optional[urllib.request.Request]:
+		"""The request following ``resp``'s redirect, or None when urllib would not follow it."""
+		new_url = urllib.parse.urljoin(req.full_url, location)
+		if urllib.parse.urlsplit(new_url).scheme.lower() not in ("http", "https"):
+			return None
+		try:
+			return self._redirectHandler.redirect_request(req, None, resp.status, resp.reason, resp.headers, new_url)
+		except urllib.error.HTTPError:
+			return None
+
+	def _open_once(self, req: urllib.request.Request, timeout: float):
+		parts = urllib.parse.urlsplit(req.full_url)
+		scheme = (parts.scheme or "").lower()
+		timing = _current_timing()
+		if timing is not None:
+			timing.begin_request()
+		token = current_cancel_token()
+		_raise_if_cancelled(token)
+		if scheme not in ("http", "https") or _proxy_for(scheme):
+			t0 = time.perf_counter()
+			resp = self._fallback_opener().open(req, timeout=timeout)
+			if timing is not None:
+				timing.headers = time.perf_counter() - t0
+			if token is None:
+				return resp
+			# Only the body read can be interrupted on this path.
+			handle = token.register(lambda: _shutdown_socket(_urllib_response_socket(resp)))
+			return _FallbackResponse(resp, token, handle)
+		host = parts.hostname or ""
+		port = parts.port or (443 if scheme == "https" else 80)
+		key = (scheme, host, port)
+		path = parts.path or "/"
+		if parts.query:
+			path = f"{path}?{parts.query}"
+		method = req.get_method()
+		headers = dict(req.header_items())
+		body = req.data
+		_POOL.evict_idle()
+		while True:
+			conn, reused = _POOL.acquire(key, timeout)
+			# Registered for the whole request: connect, upload, wait for headers and body.
+			handle = token.register(lambda c=conn: _shutdown_socket(c.sock)) if token is not None else None
+			try:
+				if timing is not None:
+					timing.reused = reused
+					if not reused:
+						_timed_connect(conn, scheme, host, port, timeout, timing)
+					t_send = time.perf_counter()
+				conn.request(method, path, body=body, headers=headers)
+				if timing is not None:
+					t_sent = time.perf_counter()
+					timing.upload = t_sent - t_send
+					timing.uploadBytes = _body_size(body, headers)
+					timing._sentAt = t_sent
+				resp = conn.getresponse()
+				if timing is not None:
+					timing.headers = time.perf_counter() - t_sent
+			except _STALE_CONNECTION_ERRORS as err:
+				_close_quietly(conn)
+				if token is not None:
+					token.unregister(handle)
+				_raise_if_cancelled(token, err)
+				if reused and _rewind_body(body):
+					# The server closed the idle socket under us; retry on a fresh one.
+					if timing is not None:
+						timing.begin_request()
+					continue
+				raise
+			except BaseException as err:
+				_close_quietly(conn)
+				if token is not None:
+					token.unregister(handle)
+				_raise_if_cancelled(token, err)
+				raise
+			return _PooledResponse(resp, conn, key, timing, token, handle)
+
+	def _fallback_opener(self):
+		if self._fallback is None:
+			self._fallback = urllib.request.build_opener(
+				urllib.request.HTTPSHandler(context=_get_ssl_context())
+			)
+		return self._fallback
+
+
+def _proxy_for(scheme: str) -> bool:
+	try:
+		return bool(urllib.request.getproxies().get(scheme))
+	except Exception:
+		return False
+
+
+def _rewind_body(body: Any) -> bool:
+	"""True when ``body`` can be sent again (bytes, or a seekable file rewound to 0)."""
+	if body is None or isinstance(body, (bytes, bytearray, memoryview, str)):
+		return True
+	seek = getattr(body, "seek", None)
+	if seek is None:
+		return False
+	try:
+		seek(0)
+	except (OSError, ValueError):
+		return False
+	return True
+
+
+_shared_opener = _PooledOpener()
+
+
 def _create_opener():
-	"""Create a urllib opener with default SSL context."""
-	ctx = ssl.create_default_context()
-	return urllib.request.build_opener(urllib.request.HTTPSHandler(context=ctx))
+	"""Return the shared keep-alive opener (one connection pool per process)."""
+	return _shared_opener
+
+
+def preconnect(url: str, timeout: float = 10) -> Optional[threading.Thread]:
+	"""Open a keep-alive connection to ``url``'s host in the background.
+
+	DNS, TCP connect and TLS then overlap with whatever the caller does before
+	its first request (building messages, encoding attachments); the socket
+	is parked in the pool, where that request picks it up. Returns the
+	connecting thread, or None when an idle connection already exists or the
+	scheme goes through a proxy.
+	"""
+	parts = urllib.parse.urlsplit(url)
+	scheme = (parts.scheme or "").lower()
+	if scheme not in ("http", "https") or _proxy_for(scheme) or not parts.hostname:
+		return None
+	port = parts.port or (443 if scheme == "https" else 80)
+	key = (scheme, parts.hostname, port)
+	if _POOL.has_idle(key):
+		return None
+
+	def _connect():
+		conn = _new_connection(key, timeout)
+		try:
+			_timed_connect(conn, scheme, parts.hostname, port, timeout, NetworkTiming())
+		except (OSError, ssl.SSLError):
+			_close_quietly(conn)
+			return
+		_POOL.release(key, conn)
+
+	thread = threading.Thread(target=_connect, name="AIHubPreconnect", daemon=True)
+	thread.start()
+	return thread
+
+
+def close_idle_connections() -> None:
+	"""Close every pooled keep-alive connection."""
+	_POOL.clear()
 
 
 def _build_headers(api_key: str, organization: Optional[str] = None) -> dict:
@@ -72,8 +692,12 @@ def _open_streaming(opener, req, *, timeout: int) -> Any:
 
 	Returns the response object directly (no `with` block) so the caller
 	can keep reading after this function returns. Raises APIStatusError
-	if the initial status is not 200.
+	if the initial status is not 200. When a cancellation token is active
+	(``use_cancel_token``), cancelling it shuts the stream's socket down and
+	the reader sees end-of-stream at once.
 	"""
+	token = current_cancel_token()
+	_raise_if_cancelled(token)
 	try:
 		resp = opener.open(req, timeout=timeout)
 	except urllib.error.HTTPError as e:
@@ -83,7 +707,8 @@ def _open_streaming(opener, req, *, timeout: int) -> Any:
 			status_code=e.code,
 			response_body=text,
 		)
-	except (urllib.error.URLError, OSError, ConnectionError) as e:
+	except (urllib.error.URLError, http.client.HTTPException, OSError, ConnectionError) as e:
+		_raise_if_cancelled(token, e)
 		raise APIConnectionError(str(e)) from e
 	if resp.status != 200:
 		text = resp.read().decode("utf-8", errors="replace")
@@ -101,24 +726,40 @@ def _open_streaming(opener, req, *, timeout: int) -> Any:
 
 def _open_json(opener, req, *, timeout: int) -> dict:
 	"""Open a request and return the parsed JSON body. Always closes the response."""
+	return _open_json_with_headers(opener, req, timeout=timeout)[0]
+
+
+def _open_json_with_headers(opener, req, *, timeout: int) -> tuple[dict, Any]:
+	"""Like ``_open_json`` but also return the response headers (``(data, headers)``)."""
+	token = current_cancel_token()
+	_raise_if_cancelled(token)
 	try:
 		with opener.open(req, timeout=timeout) as resp:
-			raw = resp.read().decode("utf-8", errors="replace")
+			raw = resp.read()
+			# A shut-down socket reads as a truncated body rather than an error.
+			_raise_if_cancelled(token)
 			if resp.status != 200:
+				text = raw.decode("utf-8", errors="replace")
 				raise APIStatusError(
-					_resolve_error_message(raw, resp.status),
+					_resolve_error_message(text, resp.status),
 					status_code=resp.status,
-					response_body=raw,
+					response_body=text,
 				)
 			if not raw:
-				return {}
+				return {}, resp.headers
 			try:
-				return json.loads(raw)
+				# Decode straight from bytes; no intermediate str copy.
+				return _json.loads(raw), resp.headers
+			except ValueError:
+				pass
+			text = raw.decode("utf-8", errors="replace")
+			try:
+				return json.loads(text), resp.headers
 			except json.JSONDecodeError:
 				raise APIStatusError(
-					_resolve_error_message(raw, resp.status),
+					_resolve_error_message(text, resp.status),
 					status_code=resp.status,
-					response_body=raw,
+					response_body=text,
 				)
 	except urllib.error.HTTPError as e:
 		text = e.read().decode("utf-8", errors="replace") if e.fp else ""
@@ -127,12 +768,15 @@ def _open_json(opener, req, *, timeout: int) -> dict:
 			status_code=e.code,
 			response_body=text,
 		)
-	except (urllib.error.URLError, OSError, ConnectionError) as e:
+	except (urllib.error.URLError, http.client.HTTPException, OSError, ConnectionError) as e:
+		_raise_if_cancelled(token, e)
 		raise APIConnectionError(str(e)) from e
 
 
 def _open_bytes(opener, req, *, timeout: int) -> tuple[bytes, str]:
 	"""Open a request and return (raw_bytes, content_type). Always closes the response."""
+	token = current_cancel_token()
+	_raise_if_cancelled(token)
 	try:
 		with opener.open(req, timeout=timeout) as resp:
 			if resp.status != 200:
@@ -143,7 +787,9 @@ def _open_bytes(opener, req, *, timeout: int) -> tuple[bytes, str]:
 					response_body=text,
 				)
 			content_type = (resp.headers.get("Content-Type") or "").lower()
-			return resp.read(), content_type
+			raw = resp.read()
+			_raise_if_cancelled(token)
+			return raw, content_type
 	except urllib.error.HTTPError as e:
 		text = e.read().decode("utf-8", errors="replace") if e.fp else ""
 		raise APIStatusError(
@@ -151,5 +797,6 @@ def _open_bytes(opener, req, *, timeout: int) -> tuple[bytes, str]:
 			status_code=e.code,
 			response_body=text,
 		)
-	except (urllib.error.URLError, OSError, ConnectionError) as e:
+	except (urllib.error.URLError, http.client.HTTPException, OSError, ConnectionError) as e:
+		_raise_if_cancelled(token, e)
 		raise APIConnectionError(str(e)) from e
@@ -0,0 +1,147 @@
+"""JSON codec used on the request/response hot paths.
+
+Every streamed event and every response body goes through ``loads``. At import
+time we pick the fastest decoder available: ``orjson`` or ``ujson`` when one
+is vendored in the add-on's ``libs`` folder, otherwise the standard library.
+Nothing here is required — without a vendored package behaviour is exactly
+the stdlib's.
+
+``loads`` accepts ``bytes``, ``bytearray`` and ``memoryview`` directly, so
+callers never need a ``.decode("utf-8")`` copy first. All backends raise a
+``ValueError`` subclass on malformed input (``UnicodeDecodeError`` included).
+``benchmark`` compares the selected backend with the stdlib on stream
+payloads of each provider and on a request body.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any, Callable
+
+from ..consts import ADDON_LIBS_DIR
+
+# Name of the selected backend ("orjson", "ujson" or "json"), for debug logs.
+BACKEND = "json"
+
+_fast_loads: Callable[[Any], Any] | None = None
+_fast_dumps: Callable[[Any], bytes] | None = None
+
+sys.path.insert(0, ADDON_LIBS_DIR)
+try:
+	import orjson  # noqa: E402
+
+	_fast_loads = orjson.loads
+	_fast_dumps = orjson.dumps
+	BACKEND = "orjson"
+except ImportError:
+	try:
+		import ujson  # noqa: E402
+
+		_fast_loads = ujson.loads
+
+		def _fast_dumps(obj: Any) -> bytes:
+			return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+		BACKEND = "ujson"
+	except ImportError:
+		pass
+finally:
+	sys.path.remove(ADDON_LIBS_DIR)
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+	"""Decode one JSON document from text or UTF-8 bytes."""
+	if _fast_loads is not None:
+		if isinstance(data, memoryview) and BACKEND != "orjson":
+			data = data.tobytes()
+		try:
+			return _fast_loads(data)
+		except (ValueError, OverflowError):
+			# Some backends reject documents the stdlib accepts (huge ints,
+			# NaN, a UTF-8 BOM); let the reference decoder have the last word.
+			pass
+	if isinstance(data, memoryview):
+		data = data.tobytes()
+	return json.loads(data)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+	"""Encode ``obj`` as compact UTF-8 JSON bytes for a request body."""
+	if _fast_dumps is not None:
+		try:
+			return _fast_dumps(obj)
+		except (TypeError, ValueError, OverflowError):
+			pass
+	return json.dumps(obj).encode("utf-8")
+
+
+def _best(func, items, repeat: int) -> float:
+	best = None
+	for _i in range(repeat):
+		start = time.perf_counter()
+		for item in items:
+			func(item)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best or 1e-9
+
+
+def benchmark(events: int = 20000, turns: int = 40, repeat: int = 3) -> list[dict]:
+	"""Time ``loads`` on each provider's stream payloads and ``dumps_bytes`` on a request body.
+
+	Run it from the NVDA Python console::
+
+		from globalPlugins.AIHub.apiclient import _json
+		for row in _json.benchmark():
+			print(row)
+
+	The payloads are the ``data:`` fields of ``_sse.sample_stream`` (OpenAI
+	chat chunks with usage, Anthropic events, Gemini chunks, Responses
+	events); the request body is a chat request with ``turns`` history
+	messages. Each row has the stdlib time next to the ``BACKEND`` one (the
+	same when nothing is vendored); best of ``repeat`` runs.
+	"""
+	from ._sse import SAMPLE_SHAPES, _ReplayResponse, iter_sse_data_blocks, sample_stream
+
+	rows = []
+	for shape in SAMPLE_SHAPES:
+		payloads = [
+			payload for payload in iter_sse_data_blocks(_ReplayResponse(sample_stream(shape, events), 1 << 16))
+			if payload[:1] == b"{"
+		]
+		stdlib = _best(json.loads, payloads, repeat)
+		selected = _best(loads, payloads, repeat)
+		rows.append({
+			"case": f"loads {shape}",
+			"backend": BACKEND,
+			"items": len(payloads),
+			"bytes": sum(len(payload) for payload in payloads),
+			"stdlibSec": round(stdlib, 4),
+			"backendSec": round(selected, 4),
+			"speedup": round(stdlib / selected, 2),
+		})
+	body = {
+		"model": "gpt-4o-mini",
+		"stream": True,
+		"stream_options": {"include_usage": True},
+		"messages": [
+			{
+				"role": "user" if i % 2 == 0 else "assistant",
+				"content": f"Turn {i}: " + "Ünïcödé text, \"quotes\", code `x = {1: [2, 3]}` and 快速的狐狸. " * 40,
+			}
+			for i in range(turns)
+		],
+	}
+	stdlib = _best(lambda obj: json.dumps(obj).encode("utf-8"), [body], repeat * 10)
+	selected = _best(dumps_bytes, [body], repeat * 10)
+	rows.append({
+		"case": "dumps_bytes request",
+		"backend": BACKEND,
+		"items": 1,
+		"bytes": len(dumps_bytes(body)),
+		"stdlibSec": round(stdlib, 4),
+		"backendSec": round(selected, 4),
+		"speedup": round(stdlib / selected, 2),
+	})
+	return rows
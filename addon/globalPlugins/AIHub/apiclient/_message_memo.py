@@ -0,0 +1,92 @@
+"""Per-message memo of provider-format content conversions.
+
+History messages come from the conversation page's incremental message list
+and are the same dict objects from one request to the next, so their
+converted content can be reused: a turn's images are not split out of their
+data URLs (Anthropic) or decoded and re-encoded (Gemini) again on every turn.
+
+Entries are keyed by format and message identity. Each entry keeps a
+reference to its message, so the id cannot be recycled while the entry
+lives, and the message's ``content`` object is compared as well. Messages
+with ``input_file`` parts are converted every time: their conversion may
+upload to an account-specific Files API. The last message of a request is
+the turn being sent: it is rebuilt as a history message on the next turn, so
+callers pass ``memo=False`` for it instead of leaving a one-off entry.
+
+The memo is bounded by the size of the content it pins (``_MAX_BYTES`` of
+text and base64 payloads), not by entry count, so a few screenshots of a
+closed page cannot hold hundreds of megabytes.
+
+Converted values are shared between requests: callers copy before mutating.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from ..consts import ContentType
+
+# Content bytes (strings in the parts) the entries may pin; converted values roughly double it.
+_MAX_BYTES = 32 * 1024 * 1024
+
+_lock = threading.Lock()
+_entries: OrderedDict[tuple, tuple] = OrderedDict()
+_total_bytes = 0
+
+
+def _memoizable(content: Any) -> bool:
+	if not isinstance(content, list):
+		return False
+	return not any(
+		isinstance(part, dict) and part.get("type") == ContentType.INPUT_FILE
+		for part in content
+	)
+
+
+def _content_bytes(value: Any) -> int:
+	"""Approximate size of the strings in ``value`` (text, data URLs, base64 audio)."""
+	if isinstance(value, str):
+		return len(value)
+	if isinstance(value, dict):
+		return sum(_content_bytes(item) for item in value.values())
+	if isinstance(value, list):
+		return sum(_content_bytes(item) for item in value)
+	return 0
+
+
+def convert_content(fmt: str, message: dict, convert: Callable[[Any], Any], memo: bool = True) -> Any:
+	"""``convert(message["content"])``, reused while ``message`` and its content are unchanged.
+
+	With ``memo`` False the result is neither looked up nor stored.
+	"""
+	global _total_bytes
+	content = message.get("content", "")
+	if not memo or not _memoizable(content):
+		return convert(content)
+	key = (fmt, id(message))
+	with _lock:
+		entry = _entries.get(key)
+		if entry is not None and entry[0] is message and entry[1] is content:
+			_entries.move_to_end(key)
+			return entry[2]
+	converted = convert(content)
+	size = _content_bytes(content)
+	if size > _MAX_BYTES:
+		return converted
+	with _lock:
+		old = _entries.pop(key, None)
+		if old is not None:
+			_total_bytes -= old[3]
+		_entries[key] = (message, content, converted, size)
+		_total_bytes += size
+		while _total_bytes > _MAX_BYTES:
+			_total_bytes -= _entries.popitem(last=False)[1][3]
+	return converted
+
+
+def clear() -> None:
+	global _total_bytes
+	with _lock:
+		_entries.clear()
+		_total_bytes = 0
@@ -0,0 +1,211 @@
+"""Streaming ``multipart/form-data`` encoder.
+
+Upload bodies (documents, recordings) are never materialised in memory: the
+encoder is a read-only file-like object that yields the form headers and then
+copies each file straight from disk in fixed-size blocks. ``http.client``
+(and urllib) send it with ``read(blocksize)`` calls, so peak memory stays at
+one block whatever the size of the file.
+
+When every file's size is known up front the exact ``Content-Length`` is
+precomputed; otherwise ``content_length`` is ``None`` and the HTTP layer
+falls back to chunked transfer encoding.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from typing import Any, BinaryIO, Optional, Union
+
+# Block size used when copying file parts into the request body.
+_READ_BLOCK_SIZE = 64 * 1024
+
+
+def _sanitize_filename(name: str) -> str:
+	for ch in '\r\n"\\':
+		name = name.replace(ch, "_")
+	return name
+
+
+class _FilePart:
+	"""One ``name=file`` part whose payload is read lazily from disk."""
+
+	def __init__(self, source: Union[str, BinaryIO]):
+		self.path: Optional[str] = source if isinstance(source, str) else None
+		self._external = None if isinstance(source, str) else source
+		self._start = 0
+		if self._external is not None:
+			try:
+				self._start = self._external.tell()
+			except (AttributeError, OSError, ValueError):
+				self._start = 0
+		self._fh: Optional[BinaryIO] = None
+		self.size = self._compute_size()
+
+	def _compute_size(self) -> Optional[int]:
+		if self.path is not None:
+			try:
+				return os.path.getsize(self.path)
+			except OSError:
+				return None
+		try:
+			return os.fstat(self._external.fileno()).st_size - self._start
+		except (AttributeError, OSError, ValueError):
+			return None
+
+	def open(self) -> BinaryIO:
+		if self._fh is None:
+			if self.path is not None:
+				self._fh = open(self.path, "rb")
+			else:
+				self._external.seek(self._start)
+				self._fh = self._external
+		return self._fh
+
+	def close(self) -> None:
+		# Only close handles we opened ourselves; callers own theirs.
+		if self._fh is not None and self.path is not None:
+			try:
+				self._fh.close()
+			except OSError:
+				pass
+		self._fh = None
+
+
+class MultipartEncoder:
+	"""Build a ``multipart/form-data`` body that streams its file parts from disk.
+
+	Add parts in wire order with :meth:`add_field` and :meth:`add_file`, then
+	pass the encoder itself as the request body along with :meth:`headers`.
+	The encoder can be rewound with ``seek(0)`` so a request can be retried.
+	"""
+
+	def __init__(self, boundary: Optional[str] = None):
+		self.boundary = boundary or uuid.uuid4().hex
+		# Each entry is either ``bytes`` (headers, small fields) or a ``_FilePart``.
+		self._segments: list[Union[bytes, _FilePart]] = []
+		self._finished = False
+		self._index = 0
+		self._offset = 0
+
+	@property
+	def content_type(self) -> str:
+		return f"multipart/form-data; boundary={self.boundary}"
+
+	def add_field(self, name: str, value: Any) -> None:
+		"""Append a text field. ``None`` is skipped, lists repeat the field, dicts become JSON."""
+		if value is None:
+			return
+		if isinstance(value, (list, tuple)):
+			for item in value:
+				self.add_field(name, item)
+			return
+		if isinstance(value, dict):
+			value = json.dumps(value, ensure_ascii=False)
+		self._append(
+			(
+				f'--{self.boundary}\r\n'
+				f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+				f'{value}\r\n'
+			).encode("utf-8")
+		)
+
+	def add_file(
+		self,
+		name: str,
+		source: Union[str, BinaryIO],
+		filename: Optional[str] = None,
+		content_type: str = "application/octet-stream",
+	) -> None:
+		"""Append a file part read from ``source`` (a path or a binary file object)."""
+		if filename is None:
+			raw_name = source if isinstance(source, str) else getattr(source, "name", "")
+			filename = os.path.basename(raw_name or "") or "file"
+		self._append(
+			(
+				f'--{self.boundary}\r\n'
+				f'Content-Disposition: form-data; name="{name}"; filename="{_sanitize_filename(filename)}"\r\n'
+				f'Content-Type: {content_type}\r\n\r\n'
+			).encode("utf-8")
+		)
+		self._segments.append(_FilePart(source))
+		self._append(b"\r\n")
+
+	def _append(self, data: bytes) -> None:
+		if self._finished:
+			raise RuntimeError("Cannot add parts after the body has started streaming")
+		if self._segments and isinstance(self._segments[-1], bytes):
+			self._segments[-1] += data
+		else:
+			self._segments.append(data)
+
+	def _finish(self) -> None:
+		if not self._finished:
+			self._append(f"--{self.boundary}--\r\n".encode("utf-8"))
+			self._finished = True
+
+	@property
+	def content_length(self) -> Optional[int]:
+		"""Exact body size in bytes, or ``None`` when a file's size is unknown."""
+		self._finish()
+		total = 0
+		for seg in self._segments:
+			if isinstance(seg, bytes):
+				total += len(seg)
+			elif seg.size is None:
+				return None
+			else:
+				total += seg.size
+		return total
+
+	def headers(self) -> dict:
+		"""``Content-Type`` plus ``Content-Length`` when the size is known.
+
+		Without a length, ``http.client`` / urllib switch to chunked transfer
+		encoding themselves (and encode the chunks), so no header is set here.
+		"""
+		length = self.content_length
+		headers = {"Content-Type": self.content_type}
+		if length is not None:
+			headers["Content-Length"] = str(length)
+		return headers
+
+	def read(self, size: int = -1) -> bytes:
+		"""Return up to ``size`` bytes of the encoded body (everything when negative)."""
+		self._finish()
+		if size is None or size < 0:
+			out = bytearray()
+			while True:
+				chunk = self.read(_READ_BLOCK_SIZE)
+				if not chunk:
+					return bytes(out)
+				out += chunk
+		while self._index < len(self._segments):
+			seg = self._segments[self._index]
+			if isinstance(seg, bytes):
+				if self._offset < len(seg):
+					chunk = seg[self._offset:self._offset + size]
+					self._offset += len(chunk)
+					return chunk
+			else:
+				chunk = seg.open().read(size)
+				if chunk:
+					return chunk
+				seg.close()
+			self._index += 1
+			self._offset = 0
+		return b""
+
+	def seek(self, offset: int, whence: int = 0) -> int:
+		"""Rewind to the start of the body; other positions are not supported."""
+		if offset != 0 or whence != 0:
+			raise ValueError("MultipartEncoder can only be rewound to the start")
+		self.close()
+		self._index = 0
+		self._offset = 0
+		return 0
+
+	def close(self) -> None:
+		for seg in self._segments:
+			if isinstance(seg, _FilePart):
+				seg.close()
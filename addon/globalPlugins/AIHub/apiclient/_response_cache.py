@@ -0,0 +1,287 @@
+"""Opt-in on-disk cache of deterministic chat completions.
+
+Describing the same screenshot twice, or regenerating with a fixed seed,
+sends a byte-identical request. When the request is deterministic
+(``temperature`` 0 or an explicit ``seed``) its answer is stored under a
+canonical hash of provider, endpoint, model, messages and parameters, and an
+identical request later is answered from disk without a network round trip.
+
+Replays work for both call shapes: a non-streaming request gets a
+``ChatCompletion`` back, a streaming one gets a short simulated stream of
+``StreamEvent`` objects. Replayed answers carry no usage, since no tokens
+were spent on them.
+
+The cache is a directory of one JSON file per entry. Total size is capped;
+the least recently used entries (file mtime, refreshed on every hit) are
+evicted first.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Generator, Iterable, Optional
+
+from ..consts import DATA_DIR
+from ._types import ChatCompletion, Choice, ChoiceMessage, build_stream_event
+
+RESPONSE_CACHE_DIR = os.path.join(DATA_DIR, "response_cache")
+RESPONSE_CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Parameters that never affect the answer and are left out of the key.
+_KEY_EXCLUDED_PARAMS = frozenset({"stream", "stream_options"})
+
+# Requests whose answer depends on more than the prompt (live search, server-side
+# tools, stored conversation state) are never cached.
+_UNCACHEABLE_PARAMS = frozenset({
+	"web_search_options",
+	"search_parameters",
+	"tools",
+	"previous_response_id",
+	"xai_encrypted_reasoning_input",
+})
+
+# Size of each content chunk in a simulated stream.
+_REPLAY_CHUNK_CHARS = 512
+
+
+def is_cacheable_request(params: dict) -> bool:
+	"""True for deterministic requests (``temperature`` 0 or a fixed ``seed``)."""
+	if any(params.get(k) is not None for k in _UNCACHEABLE_PARAMS):
+		return False
+	if params.get("seed") is not None:
+		return True
+	temperature = params.get("temperature")
+	return temperature is not None and float(temperature) == 0.0
+
+
+def request_key(provider: str, base_url: str, model: str, messages: list, params: dict) -> str:
+	"""SHA-256 of the canonical JSON form of everything that shapes the answer."""
+	payload = {
+		"v": RESPONSE_CACHE_VERSION,
+		"provider": str(provider),
+		"baseUrl": base_url,
+		"model": model,
+		"messages": messages,
+		"params": {k: v for k, v in params.items() if k not in _KEY_EXCLUDED_PARAMS and v is not None},
+	}
+	canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+	return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _record_from_completion(completion: ChatCompletion) -> Optional[dict]:
+	if not completion.choices:
+		return None
+	message = completion.choices[0].message
+	return {
+		"content": message.content,
+		"reasoning": message.reasoning,
+		"audio": message.audio,
+		"responseId": completion.response_id,
+		"citations": completion.citations,
+		"finishReason": "stop",
+	}
+
+
+def _completion_from_record(record: dict) -> ChatCompletion:
+	message = ChoiceMessage(
+		content=record.get("content") or "",
+		audio=record.get("audio"),
+		reasoning=record.get("reasoning") or "",
+	)
+	return ChatCompletion(
+		choices=[Choice(message)],
+		response_id=record.get("responseId") or "",
+		citations=record.get("citations"),
+	)
+
+
+def _replay_stream(record: dict) -> Generator:
+	reasoning = record.get("reasoning") or ""
+	if reasoning:
+		yield build_stream_event(reasoning=reasoning)
+	content = record.get("content") or ""
+	for start in range(0, len(content), _REPLAY_CHUNK_CHARS):
+		yield build_stream_event(content=content[start:start + _REPLAY_CHUNK_CHARS])
+	yield build_stream_event(
+		finish_reason=record.get("finishReason") or "stop",
+		response_id=record.get("responseId") or "",
+		citations=record.get("citations"),
+	)
+
+
+class ResponseCache:
+	"""Thread-safe, size-capped LRU cache of completions stored under ``path``."""
+
+	def __init__(self, path: str = RESPONSE_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		# key -> file size, least recently used first; loaded on first use.
+		self._index: Optional[OrderedDict] = None
+		self._size = 0
+		self._lock = threading.Lock()
+
+	def _file(self, key: str) -> str:
+		return os.path.join(self.path, f"{key}.json")
+
+	def _load_index(self) -> OrderedDict:
+		if self._index is not None:
+			return self._index
+		found = []
+		try:
+			with os.scandir(self.path) as it:
+				for entry in it:
+					if not entry.name.endswith(".json"):
+						continue
+					try:
+						st = entry.stat()
+					except OSError:
+						continue
+					found.append((st.st_mtime, entry.name[:-5], st.st_size))
+		except OSError:
+			pass
+		found.sort()
+		self._index = OrderedDict((key, size) for _mtime, key, size in found)
+		self._size = sum(self._index.values())
+		return self._index
+
+	def _drop(self, key: str) -> None:
+		size = self._index.pop(key, None)
+		if size is not None:
+			self._size -= size
+		try:
+			os.remove(self._file(key))
+		except OSError:
+			pass
+
+	def _evict(self) -> None:
+		while self._index and self._size > self.max_bytes:
+			self._drop(next(iter(self._index)))
+
+	def get(self, key: str) -> Optional[dict]:
+		"""Return the cached record for ``key`` and mark it most recently used."""
+		with self._lock:
+			index = self._load_index()
+			if key not in index:
+				self.misses += 1
+				return None
+			try:
+				with open(self._file(key), "r", encoding="utf-8") as f:
+					data = json.load(f)
+				record = data["record"] if data.get("version") == RESPONSE_CACHE_VERSION else None
+			except (OSError, ValueError, KeyError, AttributeError):
+				record = None
+			if not isinstance(record, dict):
+				self._drop(key)
+				self.misses += 1
+				return None
+			index.move_to_end(key)
+			try:
+				os.utime(self._file(key))
+			except OSError:
+				pass
+			self.hits += 1
+			return record
+
+	def put(self, key: str, record: dict) -> None:
+		payload = json.dumps(
+			{"version": RESPONSE_CACHE_VERSION, "record": record},
+			ensure_ascii=False,
+		).encode("utf-8")
+		with self._lock:
+			index = self._load_index()
+			if len(payload) > self.max_bytes:
+				return
+			try:
+				os.makedirs(self.path, exist_ok=True)
+				tmp = f"{self._file(key)}.tmp"
+				with open(tmp, "wb") as f:
+					f.write(payload)
+				os.replace(tmp, self._file(key))
+			except OSError:
+				return
+			self._size -= index.pop(key, 0)
+			index[key] = len(payload)
+			self._size += len(payload)
+			self._evict()
+
+	def configure(self, max_bytes: int) -> None:
+		with self._lock:
+			self.max_bytes = max_bytes
+			if self._index is not None:
+				self._evict()
+
+	def replay(self, record: dict, stream: bool):
+		"""Rebuild the response shape the caller asked for from a cached record."""
+		return _replay_stream(record) if stream else _completion_from_record(record)
+
+	def store_completion(self, key: str, completion: ChatCompletion) -> ChatCompletion:
+		record = _record_from_completion(completion)
+		if record is not None:
+			self.put(key, record)
+		return completion
+
+	def record_stream(self, key: str, events: Iterable[Any]) -> Generator:
+		"""Pass ``events`` through and store the assembled answer once it is complete.
+
+		The answer is complete when a finish reason arrived; it is stored when
+		the stream ends or is closed, whichever comes first, as readers stop at
+		the finish chunk and close the stream before the trailing usage or
+		``message_stop`` event. Nothing is stored when the stream reports an
+		error or stops without a finish reason (abandoned, cancelled or cut off
+		by the network).
+		"""
+		content: list[str] = []
+		reasoning: list[str] = []
+		record: dict = {"responseId": "", "citations": [], "finishReason": None}
+		failed = False
+		try:
+			for event in events:
+				if getattr(event, "error", None):
+					failed = True
+				if event.reconcile_reasoning is not None:
+					reasoning = [event.reconcile_reasoning]
+				if event.reconcile_content is not None:
+					content = [event.reconcile_content]
+				for choice in event.choices:
+					delta = choice.delta
+					if delta.reasoning:
+						reasoning.append(delta.reasoning)
+					if delta.content:
+						content.append(delta.content)
+					if choice.finish_reason:
+						record["finishReason"] = choice.finish_reason
+				if event.response_id:
+					record["responseId"] = event.response_id
+				if event.citations:
+					record["citations"] = list(event.citations)
+				yield event
+		finally:
+			if not failed and record["finishReason"] not in (None, "error"):
+				record["content"] = "".join(content)
+				record["reasoning"] = "".join(reasoning)
+				if record["content"] or record["reasoning"]:
+					self.put(key, record)
+
+	def stats(self) -> dict:
+		with self._lock:
+			index = self._load_index()
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"entries": len(index),
+				"bytes": self._size,
+			}
+
+	def clear(self) -> None:
+		with self._lock:
+			for key in list(self._load_index()):
+				self._drop(key)
+
+
+response_cache = ResponseCache()
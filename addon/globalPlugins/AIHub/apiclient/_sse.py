@@ -10,12 +10,17 @@ Implements the subset of the SSE spec we need:
 
 This module exposes only one public iterator so every stream parser uses the
 exact same SSE handling — no more split implementations to keep in sync.
+``benchmark`` times it on synthetic streams shaped like each provider's
+(``sample_stream``).
 """
 from __future__ import annotations
 
 import json
+import time
 from typing import Any, Iterable, Iterator, Optional
 
+from . import _json
+
 
 # Sentinel returned for ``data: [DONE]`` so callers don't have to string-compare.
 DONE = object()
@@ -27,62 +32,101 @@ def iter_sse_data_blocks(resp) -> Iterator[bytes]:
 	Each yielded value is the *joined* payload (multi-line ``data:`` fields are
 	concatenated with ``\n`` per spec). Empty events and non-data fields are
 	filtered out so callers only see actual payloads.
+
+	The response is read in large chunks into one ``bytearray`` with an offset
+	cursor. All complete lines of a read are split in a single pass and
+	consumed bytes are only discarded once enough of them pile up, so framing
+	stays linear in the stream size however many events one read carries.
 	"""
-	buf = b""
+	buf = bytearray()
+	pos = 0
 	current: list[bytes] = []
-	for chunk in resp:
+	for chunk in _iter_chunks(resp):
 		if not chunk:
 			continue
 		buf += chunk
-		while True:
-			# Find the next end-of-line: prefer "\r\n", then "\n", then bare "\r".
-			nl = _find_line_end(buf)
-			if nl is None:
-				break
-			line, buf = _split_line(buf, nl)
-			if not line:
-				if current:
-					yield b"\n".join(current)
-					current = []
-				continue
-			# Skip comment lines (start with ":").
-			if line[:1] == b":":
-				continue
-			field, _, value = line.partition(b":")
-			if field != b"data":
-				# Ignore event:/id:/retry: and any other field types.
-				continue
-			# Spec: a single optional space after the colon is stripped.
-			if value.startswith(b" "):
-				value = value[1:]
-			current.append(value)
-	# Yield any final event that wasn't terminated by a blank line.
+		# Bytes before this chunk held no terminator (bar a held-back "\r"),
+		# so only the new tail needs scanning.
+		end = _last_complete_line_end(buf, max(pos, len(buf) - len(chunk) - 1))
+		if end < 0:
+			continue
+		block = bytes(buf[pos:end])
+		pos = end
+		if b"\r" in block:
+			block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+		# ``block`` ends with a terminator, so the last split item is empty.
+		for line in block.split(b"\n")[:-1]:
+			payload = _consume_line(line, current)
+			if payload is not None:
+				yield payload
+		if pos == len(buf):
+			buf.clear()
+			pos = 0
+		elif pos >= _COMPACT_THRESHOLD:
+			del buf[:pos]
+			pos = 0
+	# Flush a last unterminated line, then any event not closed by a blank line.
+	if pos < len(buf):
+		tail = bytes(buf[pos:]).rstrip(b"\r")
+		payload = _consume_line(tail, current) if tail else None
+		if payload is not None:
+			yield payload
 	if current:
 		yield b"\n".join(current)
 
 
-def _find_line_end(buf: bytes) -> Optional[tuple[int, int]]:
-	"""Return ``(end_offset, after_offset)`` for the next line terminator, or None."""
-	# Look at \r and \n separately so we can collapse a stray \r\n into one break.
-	cr = buf.find(b"\r")
-	nl = buf.find(b"\n")
-	if cr < 0 and nl < 0:
-		return None
-	if cr < 0:
-		return (nl, nl + 1)
-	if nl < 0:
-		return (cr, cr + 1)
-	if cr < nl:
-		# Possible \r\n pair: if next byte is \n, consume both.
-		if cr + 1 == nl:
-			return (cr, nl + 1)
-		return (cr, cr + 1)
-	return (nl, nl + 1)
+def _last_complete_line_end(buf: bytearray, start: int) -> int:
+	"""Offset just past the last line terminator in ``buf[start:]``, or -1 if none.
+
+	A ``\r`` in the very last byte is held back: it may be the first half of
+	a ``\r\n`` pair split across two reads.
+	"""
+	limit = len(buf)
+	if limit > start and buf[limit - 1] == 0x0D:
+		limit -= 1
+	end = max(buf.rfind(b"\n", start, limit), buf.rfind(b"\r", start, limit))
+	return end + 1 if end >= 0 else -1
+
+
+# Read size for SSE streams; ``read1`` returns as soon as any data is available.
+_READ_SIZE = 64 * 1024
+# Discard consumed bytes from the framing buffer once this many accumulate.
+_COMPACT_THRESHOLD = 64 * 1024
 
 
-def _split_line(buf: bytes, ends: tuple[int, int]) -> tuple[bytes, bytes]:
-	end_offset, after_offset = ends
-	return buf[:end_offset], buf[after_offset:]
+def _iter_chunks(resp) -> Iterator[bytes]:
+	"""Yield raw chunks using ``read1`` when available, else by iterating ``resp``."""
+	read1 = getattr(resp, "read1", None)
+	if read1 is None:
+		yield from resp
+		return
+	while True:
+		chunk = read1(_READ_SIZE)
+		if not chunk:
+			return
+		yield chunk
+
+
+def _consume_line(line: bytes, current: list[bytes]) -> Optional[bytes]:
+	"""Apply one SSE line to ``current``; return a dispatched payload on blank lines."""
+	if not line:
+		if current:
+			payload = b"\n".join(current)
+			current.clear()
+			return payload
+		return None
+	# Skip comment lines (start with ":").
+	if line[:1] == b":":
+		return None
+	field, _, value = line.partition(b":")
+	if field != b"data":
+		# Ignore event:/id:/retry: and any other field types.
+		return None
+	# Spec: a single optional space after the colon is stripped.
+	if value[:1] == b" ":
+		value = value[1:]
+	current.append(value)
+	return None
 
 
 def decode_sse_payload(payload: bytes) -> Any:
@@ -92,17 +136,25 @@ def decode_sse_payload(payload: bytes) -> Any:
 	* Empty payloads return ``None``.
 	* Anything else is parsed as JSON; ``None`` is returned on parse errors so
 	  callers can simply skip malformed/heartbeat-style chunks.
+
+	Payloads are decoded from bytes by the ``_json`` codec (no UTF-8 ``str``
+	copy); the common ``{...}`` event skips the strip/``[DONE]`` checks.
 	"""
 	if not payload:
 		return None
+	if payload[:1] == b"{":
+		try:
+			return _json.loads(payload)
+		except ValueError:
+			return None
 	stripped = payload.strip()
 	if not stripped:
 		return None
 	if stripped == b"[DONE]":
 		return DONE
 	try:
-		return json.loads(stripped.decode("utf-8"))
-	except (UnicodeDecodeError, json.JSONDecodeError):
+		return _json.loads(stripped)
+	except ValueError:
 		return None
 
 
@@ -116,3 +168,115 @@ def iter_sse_events(resp) -> Iterable[Any]:
 		if value is None:
 			continue
 		yield value
+
+
+# Stream shapes for ``benchmark``, as each provider frames a text answer.
+SAMPLE_SHAPES = ("openai_chat", "anthropic", "gemini", "responses")
+
+_DELTAS = (
+	"The quick ", "brown fox ", "jumps over ", "the lazy dog", ". Ünïcödé ", "快速的狐狸 ",
+	"and a \"quoted\" word", ",\n", "then code: `x = {1: [2, 3]}`", " done.",
+)
+
+
+def sample_stream(shape: str, events: int) -> bytes:
+	"""Synthetic SSE body of ``events`` text deltas framed as ``shape`` (see ``SAMPLE_SHAPES``).
+
+	* ``openai_chat``: chat completion chunks with ``stream_options.include_usage``
+	  (``"usage": null`` on every chunk, a final usage-only chunk, ``[DONE]``).
+	* ``anthropic``: Messages API events with ``event:`` lines and pings.
+	* ``gemini``: ``streamGenerateContent?alt=sse`` chunks, CRLF line endings.
+	* ``responses``: Responses API ``response.output_text.delta`` events.
+	"""
+	out = []
+	if shape == "openai_chat":
+		base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 1760000000, "model": "gpt-4o-mini", "system_fingerprint": "fp_bench"}
+		out.append(dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "logprobs": None, "finish_reason": None}], usage=None))
+		for i in range(events):
+			out.append(dict(base, choices=[{"index": 0, "delta": {"content": _DELTAS[i % len(_DELTAS)]}, "logprobs": None, "finish_reason": None}], usage=None))
+		out.append(dict(base, choices=[{"index": 0, "delta": {}, "logprobs": None, "finish_reason": "stop"}], usage=None))
+		out.append(dict(base, choices=[], usage={"prompt_tokens": 1200, "completion_tokens": events, "total_tokens": 1200 + events}))
+		return b"".join(b"data: " + json.dumps(item).encode("utf-8") + b"\n\n" for item in out) + b"data: [DONE]\n\n"
+	if shape == "anthropic":
+		out.append(("message_start", {"type": "message_start", "message": {"id": "msg_bench", "type": "message", "role": "assistant", "model": "claude-bench", "content": [], "stop_reason": None, "usage": {"input_tokens": 1200, "output_tokens": 1}}}))
+		out.append(("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}))
+		for i in range(events):
+			out.append(("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": _DELTAS[i % len(_DELTAS)]}}))
+			if i % 50 == 49:
+				out.append(("ping", {"type": "ping"}))
+		out.append(("content_block_stop", {"type": "content_block_stop", "index": 0}))
+		out.append(("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": events}}))
+		out.append(("message_stop", {"type": "message_stop"}))
+		return b"".join(
+			b"event: " + name.encode("ascii") + b"\ndata: " + json.dumps(item).encode("utf-8") + b"\n\n"
+			for name, item in out
+		)
+	if shape == "gemini":
+		for i in range(events):
+			item = {"candidates": [{"content": {"parts": [{"text": _DELTAS[i % len(_DELTAS)]}], "role": "model"}, "index": 0}], "modelVersion": "gemini-bench", "responseId": "bench"}
+			if i == events - 1:
+				item["candidates"][0]["finishReason"] = "STOP"
+			item["usageMetadata"] = {"promptTokenCount": 1200, "candidatesTokenCount": i + 1, "totalTokenCount": 1201 + i}
+			out.append(item)
+		return b"".join(b"data: " + json.dumps(item).encode("utf-8") + b"\r\n\r\n" for item in out)
+	if shape == "responses":
+		item_id = "msg_bench"
+		out.append({"type": "response.created", "sequence_number": 0, "response": {"id": "resp_bench", "object": "response", "status": "in_progress", "model": "gpt-4.1-mini", "output": []}})
+		out.append({"type": "response.output_item.added", "sequence_number": 1, "output_index": 0, "item": {"id": item_id, "type": "message", "status": "in_progress", "role": "assistant", "content": []}})
+		for i in range(events):
+			out.append({"type": "response.output_text.delta", "sequence_number": i + 2, "item_id": item_id, "output_index": 0, "content_index": 0, "delta": _DELTAS[i % len(_DELTAS)], "logprobs": []})
+		out.append({"type": "response.completed", "sequence_number": events + 2, "response": {"id": "resp_bench", "object": "response", "status": "completed", "model": "gpt-4.1-mini", "output": [], "usage": {"input_tokens": 1200, "output_tokens": events, "total_tokens": 1200 + events}}})
+		return b"".join(
+			b"event: " + item["type"].encode("ascii") + b"\ndata: " + json.dumps(item).encode("utf-8") + b"\n\n"
+			for item in out
+		)
+	raise ValueError(f"Unknown stream shape: {shape}")
+
+
+class _ReplayResponse:
+	"""Serve ``body`` through ``read1`` at most ``chunk`` bytes at a time, like a socket."""
+
+	def __init__(self, body: bytes, chunk: int):
+		self._view = memoryview(body)
+		self._pos = 0
+		self._chunk = chunk
+
+	def read1(self, amt: int = -1) -> bytes:
+		size = self._chunk if amt < 0 else min(amt, self._chunk)
+		data = self._view[self._pos:self._pos + size].tobytes()
+		self._pos += len(data)
+		return data
+
+
+def benchmark(events: int = 20000, chunk_sizes=(256, 1400, 16384), repeat: int = 3) -> list[dict]:
+	"""Time SSE framing and decoding of each provider's stream shape.
+
+	Run it from the NVDA Python console::
+
+		from globalPlugins.AIHub.apiclient import _sse
+		for row in _sse.benchmark():
+			print(row)
+
+	Each body (``sample_stream``) is replayed in ``chunk_sizes`` reads, from
+	a few deltas per read to many. ``framingSec`` is ``iter_sse_data_blocks``
+	alone, ``decodeSec`` is ``iter_sse_events`` (framing plus the ``_json``
+	decode of every payload); best of ``repeat`` runs.
+	"""
+	rows = []
+	for shape in SAMPLE_SHAPES:
+		body = sample_stream(shape, events)
+		for chunk in chunk_sizes:
+			row = {"shape": shape, "chunkBytes": chunk, "bytes": len(body)}
+			for label, iterate in (("framingSec", iter_sse_data_blocks), ("decodeSec", iter_sse_events)):
+				best = None
+				for _i in range(repeat):
+					start = time.perf_counter()
+					count = sum(1 for _item in iterate(_ReplayResponse(body, chunk)))
+					elapsed = time.perf_counter() - start
+					best = elapsed if best is None else min(best, elapsed)
+				row["events"] = count
+				row[label] = round(best, 4)
+			row["eventsPerSec"] = int(row["events"] / max(row["decodeSec"], 1e-9))
+			row["MBPerSec"] = round(len(body) / max(row["decodeSec"], 1e-9) / (1024 * 1024), 1)
+			rows.append(row)
+	return rows
@@ -121,6 +121,18 @@ def _normalize_usage(usage: Any) -> dict:
 		_to_int(usage.get("cache_creation_input_tokens"))
 		or _to_int(prompt_tokens_details.get("cache_write_tokens"))
 	)
+	# Anthropic reports ``input_tokens`` net of prompt-cache reads and writes;
+	# fold them back in so input totals mean the same thing for every provider
+	# (cached tokens are a subset of input tokens, as with OpenAI).
+	if (
+		"prompt_tokens" not in usage
+		and ("cache_read_input_tokens" in usage or "cache_creation_input_tokens" in usage)
+	):
+		cache_total = _to_int(usage.get("cache_read_input_tokens")) + _to_int(usage.get("cache_creation_input_tokens"))
+		if cache_total:
+			input_tokens += cache_total
+			if not _first_int(usage, "total_tokens"):
+				total_tokens = input_tokens + output_tokens
 
 	input_audio_tokens = (
 		_to_int(prompt_tokens_details.get("audio_tokens"))
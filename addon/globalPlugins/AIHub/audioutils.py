@@ -1,11 +1,17 @@
 """
-Audio utilities - silence trimming, resampling for voice recordings.
+Audio utilities - silence trimming, resampling for voice recordings, and the
+cache of encoded audio sent back with the conversation history.
 Uses only Python standard library (wave, struct).
 """
+import base64
+import hashlib
 import os
 import struct
 import tempfile
+import threading
 import wave
+from collections import OrderedDict
+from typing import Optional
 
 from logHandler import log
 
@@ -15,12 +21,19 @@ from .consts import MIN_SAMPLES_FOR_TRIM, TEMP_DIR, ensure_temp_dir
 VOICE_TARGET_RATE = 16000
 
 
-def downsample_to_voice_wav(input_path: str, target_rate: int = VOICE_TARGET_RATE) -> str:
+def downsample_to_voice_wav(
+	input_path: str,
+	target_rate: int = VOICE_TARGET_RATE,
+	output_path: str = None,
+) -> str:
 	"""
 	Downsample WAV to target_rate mono 16-bit. Reduces file size for voice
 	(e.g. 48kHz stereo 3 sec ~576KB -> 16kHz mono ~96KB).
-	Returns input_path if already OK or on error.
+	Replaces input_path unless output_path is given.
+	Returns the path written, or input_path if already OK or on error.
 	"""
+	if output_path is None:
+		output_path = input_path
 	if not os.path.exists(input_path) or os.path.getsize(input_path) < 100:
 		return input_path
 	try:
@@ -50,20 +63,23 @@ def downsample_to_voice_wav(input_path: str, target_rate: int = VOICE_TARGET_RAT
 		out_samples = [samples[int(i * ratio)] for i in range(out_len)]
 
 	frame_data = struct.pack(f"<{len(out_samples)}h", *out_samples)
-	ensure_temp_dir()
-	fd, write_path = tempfile.mkstemp(suffix=".wav", dir=TEMP_DIR)
-	os.close(fd)
+	write_path = output_path
+	if output_path == input_path:
+		ensure_temp_dir()
+		fd, write_path = tempfile.mkstemp(suffix=".wav", dir=TEMP_DIR)
+		os.close(fd)
 	try:
 		with wave.open(write_path, "wb") as wav_out:
 			wav_out.setnchannels(1)
 			wav_out.setsampwidth(2)
 			wav_out.setframerate(target_rate)
 			wav_out.writeframes(frame_data)
-		os.replace(write_path, input_path)
-		return input_path
+		if write_path != output_path:
+			os.replace(write_path, input_path)
+		return output_path
 	except Exception as e:
 		log.debug(f"downsample_to_voice: could not write: {e}")
-		if os.path.exists(write_path):
+		if write_path != input_path and os.path.exists(write_path):
 			try:
 				os.remove(write_path)
 			except Exception:
@@ -209,3 +225,131 @@ def trim_silence_wav(
 			except Exception:
 				pass
 		return input_path
+
+
+# Upper bound on the base64 text kept by the audio part cache (characters ~ bytes).
+AUDIO_PART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_HASH_CHUNK = 1024 * 1024
+
+
+class AudioPartCache:
+	"""Thread-safe store of encoded audio attachments and their transcripts, keyed by file hash.
+
+	History audio goes back to the model on every turn that lacks transcripts.
+	Each file is hashed once per (path, mtime, size); the base64 payload is
+	then kept per (hash, downsampled), so unchanged recordings, and copies of
+	the same recording, are read and encoded once. WAV files can be sent as
+	16 kHz mono (``downsample_to_voice_wav`` into a temporary file; the
+	attachment itself is left alone). Transcripts are kept per hash as well,
+	so a recording is only transcribed once. The bound is on the total length
+	of cached payloads.
+	"""
+
+	def __init__(self, max_bytes: int = AUDIO_PART_CACHE_MAX_BYTES):
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self._digests: "OrderedDict[tuple, str]" = OrderedDict()
+		self._payloads: "OrderedDict[tuple, str]" = OrderedDict()
+		self._transcripts: "OrderedDict[str, str]" = OrderedDict()
+		self._size = 0
+		self._lock = threading.Lock()
+
+	def digest(self, path: str) -> str:
+		"""SHA-256 of the file at ``path``; recomputed only when its mtime or size changes."""
+		st = os.stat(path)
+		key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+		with self._lock:
+			digest = self._digests.get(key)
+			if digest is not None:
+				self._digests.move_to_end(key)
+				return digest
+		h = hashlib.sha256()
+		with open(path, "rb") as f:
+			for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+				h.update(chunk)
+		digest = h.hexdigest()
+		with self._lock:
+			self._digests[key] = digest
+			while len(self._digests) > 1024:
+				self._digests.popitem(last=False)
+		return digest
+
+	def get_data(self, path: str, downsample: bool = False) -> str:
+		"""Base64 content of ``path``; WAV files at voice quality when ``downsample``."""
+		downsample = bool(downsample) and path.lower().endswith(".wav")
+		key = (self.digest(path), downsample)
+		with self._lock:
+			data = self._payloads.get(key)
+			if data is not None:
+				self._payloads.move_to_end(key)
+				self.hits += 1
+				return data
+			self.misses += 1
+		data = base64.b64encode(_read_audio(path, downsample)).decode("ascii")
+		with self._lock:
+			if key not in self._payloads:
+				self._payloads[key] = data
+				self._size += len(data)
+				while self._size > self.max_bytes and len(self._payloads) > 1:
+					_old_key, old_data = self._payloads.popitem(last=False)
+					self._size -= len(old_data)
+		return data
+
+	def get_transcript(self, path: str) -> Optional[str]:
+		try:
+			digest = self.digest(path)
+		except OSError:
+			return None
+		with self._lock:
+			return self._transcripts.get(digest)
+
+	def put_transcript(self, path: str, text: str) -> None:
+		"""Remember the transcript of ``path``; an empty one records that there is no speech to use."""
+		if text is None:
+			return
+		try:
+			digest = self.digest(path)
+		except OSError:
+			return
+		with self._lock:
+			self._transcripts[digest] = text
+			while len(self._transcripts) > 1024:
+				self._transcripts.popitem(last=False)
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"entries": len(self._payloads),
+				"bytes": self._size,
+			}
+
+	def clear(self) -> None:
+		with self._lock:
+			self._digests.clear()
+			self._payloads.clear()
+			self._transcripts.clear()
+			self._size = 0
+
+
+def _read_audio(path: str, downsample: bool) -> bytes:
+	if downsample:
+		ensure_temp_dir()
+		fd, tmp_path = tempfile.mkstemp(suffix=".wav", dir=TEMP_DIR)
+		os.close(fd)
+		try:
+			if downsample_to_voice_wav(path, output_path=tmp_path) == tmp_path:
+				with open(tmp_path, "rb") as f:
+					return f.read()
+		finally:
+			try:
+				os.remove(tmp_path)
+			except OSError:
+				pass
+	with open(path, "rb") as f:
+		return f.read()
+
+
+audio_part_cache = AudioPartCache()
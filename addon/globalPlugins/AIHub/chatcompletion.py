@@ -13,12 +13,31 @@ import addonHandler
 import gui
 from logHandler import log
 
-from .apiclient import Choice, ChatCompletion, configure_client_for_provider
+from .apiclient import (
+	APICancelledError,
+	CancelToken,
+	Choice,
+	ChatCompletion,
+	configure_client_for_provider,
+	response_cache,
+	truncate_error_for_user,
+	use_cancel_token,
+)
+from .apiclient._http import capture_network_timing
 from .apiclient._think_tags import (
 	_apply_think_chain_to_chunk,
 	_flush_think_chain,
 	_new_think_chain_states,
 )
+from . import tokenizer
+from .contextbudget import (
+	SummaryCache,
+	TrimState,
+	fit_messages,
+	has_attachments,
+	prompt_budget,
+	summarization_request,
+)
 from .consts import (
 	ContentType,
 	Provider,
@@ -33,7 +52,9 @@ from .consts import (
 	TTS_DEFAULT_VOICE,
 	stop_progress_sound,
 )
+from .audioutils import audio_part_cache
 from .history import HistoryBlock
+from .imagehelper import image_part_cache
 from .mediastore import persist_local_file
 from .recordthread import transcribe_audio_file
 from .reasoningrequest import (
@@ -41,6 +62,7 @@ from .reasoningrequest import (
 	apply_reasoning_enabled,
 )
 from .resultevent import ResultEvent
+from .streampipeline import StreamPipeline
 
 addonHandler.initTranslation()
 
@@ -81,6 +103,19 @@ _STREAM_USAGE_PROVIDERS = (
 	Provider.Ollama,
 )
 
+# Context-budget figures copied from the template block to every compare block.
+_CONTEXT_BUDGET_TIMING_KEYS = (
+	"contextBudgetTokens",
+	"promptTokensBeforeBudget",
+	"estimatedPromptTokens",
+	"droppedAttachmentTurns",
+	"droppedTurns",
+	"historySummarized",
+)
+
+# Output limit for the request that summarizes turns dropped from the context.
+_HISTORY_SUMMARY_MAX_TOKENS = 512
+
 # Providers that cap stop sequences at 4 (per OpenAI chat-completions docs);
 # every other provider supports the more generous Anthropic 16-sequence cap.
 _STOP_SEQUENCE_CAP_4_PROVIDERS = (Provider.OpenAI, Provider.CustomOpenAI)
@@ -322,17 +357,141 @@ def _params_for_error_log(params):
 	return out
 
 
+class _CompareRun:
+	"""State of one model's request in a compare fan-out."""
+
+	def __init__(self, model, block):
+		self.model = model
+		self.block = block
+		self.client = None
+		self.params = None
+		self.useStream = False
+		self.error = None
+		self.thread = None
+		# Set once the request has been answered (or failed) and once it is fully consumed.
+		self.started = threading.Event()
+		self.done = threading.Event()
+
+
 class CompletionThread(threading.Thread):
-	def __init__(self, notifyWindow):
+	def __init__(self, notifyWindow, compareTargets=None):
+		"""``compareTargets`` is a list of ``(model, account)`` pairs; when given, the
+		prompt is sent to every target concurrently instead of to the selected model."""
 		threading.Thread.__init__(self, daemon=True)
 		self._notifyWindow = notifyWindow
 		self._wantAbort = False
+		# Cancelling shuts down the sockets of every request this worker has open,
+		# so a read blocked on a silent stream returns immediately.
+		self.cancelToken = CancelToken()
 		self.lastTime = int(time.time())
+		self._compareTargets = list(compareTargets or [])
+		# Whether the prompt estimate covered text only (and may calibrate the tokenizer).
+		self._estimateTextOnly = False
 
 	def _log_timing(self, debug, label, elapsed):
 		if debug and elapsed is not None:
 			log.info("OpenAI [timing] %s: %.2fs", label, elapsed)
 
+	def _preconnect(self, model, account_id):
+		"""Connect to the provider while the messages and their attachments are being prepared."""
+		try:
+			configure_client_for_provider(
+				self._notifyWindow.client, model.provider, account_id=account_id, clone=True
+			).preconnect()
+		except Exception:
+			log.debug("Preconnect skipped", exc_info=True)
+
+	def _transcribeCached(self, path):
+		"""Transcript of the audio file ``path``; a file transcribed before is not sent again."""
+		cached = audio_part_cache.get_transcript(path)
+		if cached is not None:
+			return cached
+		wnd = self._notifyWindow
+		text = transcribe_audio_file(path, wnd.conf["audio"], wnd.client)
+		if text is None:
+			# Not transcribed (no client yet, unsupported file): try again next time.
+			return ""
+		text = text.strip()
+		audio_part_cache.put_transcript(path, text)
+		return text
+
+	def _transcribeHistoryAudio(self, current_block, debug):
+		"""Transcribe earlier audio turns in the background, so later requests send them as text.
+
+		Only with the ``transcribeHistory`` setting. The request does not wait:
+		recordings without a transcript yet are sent as audio. Each recording
+		is transcribed once (``audio_part_cache``) and the transcripts are kept
+		on its block, which is then saved with the conversation; a recording
+		that failed is not tried again on the same page.
+		"""
+		wnd = self._notifyWindow
+		if not wnd.conf["audio"]["transcribeHistory"]:
+			return
+		page = getattr(wnd, "_worker_page", None)
+		running = getattr(page, "historyTranscriptionThread", None)
+		if running is not None and running.is_alive():
+			return
+		failed = getattr(page, "historyTranscriptionFailed", None)
+		if failed is None:
+			failed = set()
+			if page is not None:
+				page.historyTranscriptionFailed = failed
+		pending = []
+		block = (page or wnd).firstBlock
+		while block is not None and block is not current_block:
+			paths = getattr(block, "audioPathList", None)
+			tlist = getattr(block, "audioTranscriptList", None)
+			if paths and not (tlist and len(tlist) == len(paths) and all(tlist)):
+				pending.append(block)
+			block = block.next
+		if not pending:
+			return
+		thread = threading.Thread(
+			target=self._transcribeHistoryBlocks,
+			args=(pending, failed, debug),
+			name="AIHubHistoryTranscription",
+			daemon=True,
+		)
+		if page is not None:
+			page.historyTranscriptionThread = thread
+		thread.start()
+
+	def _transcribeHistoryBlocks(self, blocks, failed, debug):
+		t_start = time.perf_counter()
+		for block in blocks:
+			paths = block.audioPathList
+			tlist = getattr(block, "audioTranscriptList", None)
+			if not tlist or len(tlist) != len(paths):
+				tlist = [""] * len(paths)
+			transcripts = list(tlist)
+			for i, path in enumerate(paths):
+				path_str = path if isinstance(path, str) else getattr(path, "path", str(path))
+				if transcripts[i] or path_str in failed:
+					continue
+				try:
+					transcripts[i] = self._transcribeCached(path_str)
+				except Exception as err:
+					log.warning(f"History audio transcription failed for {path_str}: {err}")
+					failed.add(path_str)
+			if transcripts != tlist:
+				block.audioTranscriptList = transcripts
+		self._log_timing(debug, "history audio transcription (background)", time.perf_counter() - t_start)
+
+	def _noteResponseCache(self, client, block, debug):
+		"""Flag ``block`` when its answer was replayed from the response cache."""
+		if getattr(client, "last_response_cached", False):
+			block.timing["responseCached"] = True
+		if debug and getattr(client, "response_cache", None) is not None:
+			stats = client.response_cache.stats()
+			log.info(
+				"OpenAI [timing] response cache: %s (%d hit(s), %d miss(es), %d entries, %.1f MB)",
+				"hit" if block.timing.get("responseCached") else "miss",
+				stats["hits"],
+				stats["misses"],
+				stats["entries"],
+				stats["bytes"] / (1024 * 1024),
+			)
+
 	def _configureReasoning(
 		self,
 		params: dict,
@@ -471,7 +630,7 @@ class CompletionThread(threading.Thread):
 		if cost > 0:
 			usage["cost"] = float(cost)
 
-	def _record_usage_in_ledger(self, wnd, block, model, *, kind):
+	def _record_usage_in_ledger(self, wnd, block, model, *, kind, metrics=None):
 		"""Append this API call to the tab's append-only usage ledger."""
 		from .usage_ledger import append_usage_event, ensure_block_uid
 
@@ -496,6 +655,7 @@ class CompletionThread(threading.Thread):
 			kind=kind,
 			block_id=ensure_block_uid(block),
 			at=finished_at,
+			metrics=metrics,
 		)
 
 	def _maybe_build_document_support_error(self, err, provider, document_count):
@@ -558,7 +718,15 @@ class CompletionThread(threading.Thread):
 			)
 		return f"{base_message}\n\n{hint}"
 
+	def _isAborted(self):
+		stop_request = getattr(self._notifyWindow, "stopRequest", None)
+		return self._wantAbort or (stop_request is not None and stop_request.is_set())
+
 	def run(self):
+		with use_cancel_token(self.cancelToken):
+			self._run()
+
+	def _run(self):
 		wnd = self._notifyWindow
 		client = wnd.client
 		conf = wnd.conf
@@ -635,8 +803,7 @@ class CompletionThread(threading.Thread):
 				transcripts = []
 				for path in audio_source:
 					path_str = path if isinstance(path, str) else getattr(path, "path", str(path))
-					t = transcribe_audio_file(path_str, wnd.conf["audio"], wnd.client)
-					transcripts.append((t or "").strip())
+					transcripts.append(self._transcribeCached(path_str))
 				self._log_timing(debug, "transcription", time.perf_counter() - t_transcribe_start)
 				block.audioTranscriptList = transcripts
 				current_audio_transcripts = transcripts
@@ -663,6 +830,10 @@ class CompletionThread(threading.Thread):
 			# Translators: Text in chat completion status and error messages.
 			wx.PostEvent(self._notifyWindow, ResultEvent(_("Invalid top P")))
 			return
+		account = wnd.getCurrentAccount() if hasattr(wnd, "getCurrentAccount") else None
+		account_id = account.get("id") if account and account.get("provider") == model.provider else None
+		self._preconnect(model, account_id)
+		self._transcribeHistoryAudio(block, debug)
 		t_build_start = time.perf_counter()
 		wnd._historyUntilBlock = regenerate_block if is_regenerate else None
 		try:
@@ -670,6 +841,9 @@ class CompletionThread(threading.Thread):
 		finally:
 			wnd._historyUntilBlock = None
 		self._log_timing(debug, "build messages (incl. history)", time.perf_counter() - t_build_start)
+		compare = bool(self._compareTargets) and not is_regenerate
+		budget_models = [target[0] for target in self._compareTargets] if compare else [model]
+		messages = self._applyContextBudget(messages, budget_models, maxTokens, block, model, account_id, debug)
 		nbImages = 0
 		nbAudio = 0
 		nbDocuments = 0
@@ -697,9 +871,151 @@ class CompletionThread(threading.Thread):
 		wnd.message(msg)
 		if conf["chatFeedback"]["sndTaskInProgress"]:
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
-		account = wnd.getCurrentAccount() if hasattr(wnd, "getCurrentAccount") else None
-		account_id = account.get("id") if account and account.get("provider") == model.provider else None
-		client = configure_client_for_provider(client, model.provider, account_id=account_id, clone=True)
+		if compare:
+			self._runCompare(
+				block,
+				messages,
+				stream=stream,
+				maxTokens=maxTokens,
+				temperature=temperature,
+				topP=topP,
+				advanced_on=_advanced_on,
+				nbAudio=nbAudio,
+				debug=debug,
+			)
+			return
+		client, params, use_stream = self._prepareRequest(
+			model,
+			account_id,
+			messages,
+			stream=stream,
+			maxTokens=maxTokens,
+			temperature=temperature,
+			topP=topP,
+			advanced_on=_advanced_on,
+			is_regenerate=is_regenerate,
+			nbAudio=nbAudio,
+		)
+		messages = params["messages"]
+		# Resolve the provider once up-front: it's needed for the error path further down.
+		provider = model.provider
+		if debug:
+			log.info("Client base URL: %s", client.base_url)
+			log.info("OpenAI [timing] Messages in request: %d", len(messages))
+			if nbImages:
+				log.info("%d images", nbImages)
+			log.info(json.dumps(_params_for_error_log(params), indent=2, ensure_ascii=False))
+		try:
+			t_api_start = time.perf_counter()
+			block.timing["requestSentAt"] = time.time()
+			with capture_network_timing() as net_timing:
+				response = client.chat.completions.create(**params)
+			self._log_timing(debug, "API call", time.perf_counter() - t_api_start)
+			block.timing["responseReceivedAt"] = time.time()
+			self._noteResponseCache(client, block, debug)
+			if conf["chatFeedback"]["sndResponseSent"]:
+				winsound.PlaySound(SND_CHAT_RESPONSE_SENT, winsound.SND_ASYNC)
+		except Exception as err:
+			if isinstance(err, APICancelledError) or self._isAborted():
+				log.debug("Request for model %s cancelled: %s", model.id, err)
+				stop_progress_sound()
+				wx.PostEvent(self._notifyWindow, ResultEvent())
+				return
+			log.error("Error when calling the API for model %s: %s", model.id, err, exc_info=True)
+			log.error("Parameters used (messages omitted): %s", _params_for_error_log(params))
+			stop_progress_sound()
+			doc_error = self._maybe_build_document_support_error(err, provider, nbDocuments)
+			wx.PostEvent(self._notifyWindow, ResultEvent(doc_error if doc_error else err))
+			return
+		if not is_regenerate:
+			if wnd.lastBlock is None:
+				wnd.firstBlock = wnd.lastBlock = block
+			else:
+				wnd.lastBlock.next = block
+				block.previous = wnd.lastBlock
+				wnd.lastBlock = block
+			wnd.previousPrompt = wnd.promptTextCtrl.GetValue()
+			wnd.promptTextCtrl.Clear()
+		else:
+			wnd.lastBlock = block
+			if wnd.firstBlock is None:
+				wnd.firstBlock = block
+		try:
+			t_resp_start = time.perf_counter()
+			if use_stream:
+				self._responseWithStream(response, block, debug, model=model)
+			else:
+				self._responseWithoutStream(response, block, debug)
+		except Exception as err:
+			if not (isinstance(err, APICancelledError) or self._isAborted()):
+				log.error("Error processing response for model %s: %s", model.id, err, exc_info=True)
+				stop_progress_sound()
+				wx.PostEvent(self._notifyWindow, ResultEvent(err))
+				return
+			# The socket was shut down under the reader: keep what arrived so far.
+			log.debug("Response for model %s cancelled: %s", model.id, err)
+			block.responseTerminated = True
+		try:
+			self._reconcileUsageEstimate(block, model, calibrate=not params.get("previous_response_id"))
+			self._apply_pricing_if_missing(block, model)
+			from .usage_ledger import USAGE_KIND_ABORTED, USAGE_KIND_COMPLETION
+			self._record_usage_in_ledger(
+				wnd,
+				block,
+				model,
+				kind=USAGE_KIND_ABORTED if self._isAborted() else USAGE_KIND_COMPLETION,
+				metrics={"usageEstimated": True} if block.timing.get("usageEstimated") else None,
+			)
+			self._log_timing(debug, "response processing", time.perf_counter() - t_resp_start)
+		except Exception as err:
+			log.error("Error processing response for model %s: %s", model.id, err, exc_info=True)
+			stop_progress_sound()
+			wx.PostEvent(self._notifyWindow, ResultEvent(err))
+			return
+		total = time.perf_counter() - t0
+		block.timing["finishedAt"] = time.time()
+		block.timing["elapsedSec"] = round(total, 3)
+		# The first body byte may have been read on the stream reader thread,
+		# so the network phases are only complete once the response is consumed.
+		block.timing.update(net_timing.as_dict())
+		self._finalize_timing_metrics(block)
+		self._log_network_timing(debug, block.timing)
+		self._log_prompt_estimate(debug, block)
+		self._log_timing(debug, "total", total)
+		if debug and total > 10:
+			log.info("OpenAI [timing] Request took %.1fs. If 'history' is dominant, reduce conversation length.", total)
+		wnd.filesList.clear()
+		wnd.audioPathList.clear()
+		wx.PostEvent(self._notifyWindow, ResultEvent())
+
+	def _prepareRequest(
+		self,
+		model,
+		account_id,
+		messages,
+		*,
+		stream,
+		maxTokens,
+		temperature,
+		topP,
+		advanced_on,
+		is_regenerate,
+		nbAudio,
+	):
+		"""Build the provider client and request parameters for ``model``.
+
+		Returns ``(client, params, use_stream)``. ``messages`` is shared between
+		calls (compare mode sends one payload to several models) and is never
+		mutated; provider-specific rewrites produce new lists.
+		"""
+		wnd = self._notifyWindow
+		conf = wnd.conf
+		data = wnd.data
+		client = configure_client_for_provider(wnd.client, model.provider, account_id=account_id, clone=True)
+		cache_conf = conf["responseCache"]
+		if cache_conf["enabled"]:
+			response_cache.configure(cache_conf["maxSizeMB"] * 1024 * 1024)
+			client.response_cache = response_cache
 		audio_output = getattr(model, "audioOutput", False)
 		use_stream = stream and not audio_output
 		params = {
@@ -709,6 +1025,8 @@ class CompletionThread(threading.Thread):
 		}
 		if use_stream and model.provider in _STREAM_USAGE_PROVIDERS:
 			params["stream_options"] = {"include_usage": True}
+		if model.provider == Provider.Anthropic and conf["promptCaching"]["anthropic"]:
+			params["prompt_cache"] = True
 		if audio_output or nbAudio > 0:
 			voice = conf.get("TTSVoice") or TTS_DEFAULT_VOICE
 			params["modalities"] = ["text", "audio"]
@@ -718,7 +1036,7 @@ class CompletionThread(threading.Thread):
 			params_to_add.append(("temperature", temperature))
 		if "top_p" in model.supportedParameters:
 			params_to_add.append(("top_p", topP))
-		if _advanced_on and "top_k" in model.supportedParameters and hasattr(wnd, "advancedTopKSpinCtrl"):
+		if advanced_on and "top_k" in model.supportedParameters and hasattr(wnd, "advancedTopKSpinCtrl"):
 			_tk = wnd.advancedTopKSpinCtrl.GetValue()
 			if _tk > 0:
 				params_to_add.append(("top_k", int(_tk)))
@@ -734,7 +1052,7 @@ class CompletionThread(threading.Thread):
 			params[k] = v
 			if k == "top_k":
 				data["top_k_%s" % model.id] = v
-		if _advanced_on:
+		if advanced_on:
 			if "seed" in model.supportedParameters and hasattr(wnd, "advancedSeedSpinCtrl"):
 				sv = wnd.advancedSeedSpinCtrl.GetValue()
 				if sv >= 0:
@@ -765,9 +1083,6 @@ class CompletionThread(threading.Thread):
 				params["thinking_budget_tokens"] = thinkingBudget
 		if maxTokens > 0:
 			params["max_completion_tokens" if useReasoning else "max_tokens"] = maxTokens
-		# Resolve the provider once up-front: it's needed both for provider-specific
-		# request shaping below AND for the error path further down (so it must be
-		# defined regardless of which optional branches fire).
 		provider = model.provider
 		_apply_web_search_settings(params, model, wnd, provider)
 		_apply_x_search_settings(params, model, wnd, provider)
@@ -784,72 +1099,319 @@ class CompletionThread(threading.Thread):
 				params["xai_encrypted_reasoning_input"] = enc_input
 			messages = _messages_for_xai_responses(wnd, messages, is_regenerate)
 			params["messages"] = messages
+		return client, params, use_stream
+
+	def _runCompare(
+		self,
+		template,
+		messages,
+		*,
+		stream,
+		maxTokens,
+		temperature,
+		topP,
+		advanced_on,
+		nbAudio,
+		debug,
+	):
+		"""Send one prepared prompt to every compare target concurrently.
+
+		Each target gets its own ``HistoryBlock`` (sharing ``compareGroup``) and its
+		own worker thread; all of them reuse ``messages`` and the process-wide
+		connection pool. Responses stream in the background and are revealed in
+		history one after the other, in selection order, since the history view
+		only appends to its last block.
+		"""
+		wnd = self._notifyWindow
+		group = uuid.uuid4().hex
+		runs = []
+		for model, account in self._compareTargets:
+			block = HistoryBlock()
+			block.system = getattr(template, "system", "")
+			block.prompt = template.prompt
+			block.filesList = list(template.filesList or [])
+			block.audioPathList = list(template.audioPathList or [])
+			block.audioTranscriptList = template.audioTranscriptList
+			block.maxTokens = maxTokens
+			block.temperature = temperature
+			block.topP = topP
+			block.model = model.id
+			block.compareGroup = group
+			block.timing = {"startedAt": template.timing.get("startedAt", time.time())}
+			for key in _CONTEXT_BUDGET_TIMING_KEYS:
+				if key in template.timing:
+					block.timing[key] = template.timing[key]
+			run = _CompareRun(model, block)
+			try:
+				account_id = account.get("id") if account and account.get("provider") == model.provider else None
+				run.client, run.params, run.useStream = self._prepareRequest(
+					model,
+					account_id,
+					messages,
+					stream=stream,
+					maxTokens=maxTokens,
+					temperature=temperature,
+					topP=topP,
+					advanced_on=advanced_on,
+					is_regenerate=False,
+					nbAudio=nbAudio,
+				)
+			except Exception as err:
+				log.error("Compare: could not prepare request for %s: %s", model.id, err, exc_info=True)
+				run.error = err
+			runs.append(run)
 		if debug:
-			log.info("Client base URL: %s", client.base_url)
-			log.info("OpenAI [timing] Messages in request: %d", len(messages))
-			if nbImages:
-				log.info("%d images", nbImages)
-			log.info(json.dumps(_params_for_error_log(params), indent=2, ensure_ascii=False))
-		try:
-			t_api_start = time.perf_counter()
-			block.timing["requestSentAt"] = time.time()
-			response = client.chat.completions.create(**params)
-			self._log_timing(debug, "API call", time.perf_counter() - t_api_start)
-			block.timing["responseReceivedAt"] = time.time()
-			if conf["chatFeedback"]["sndResponseSent"]:
-				winsound.PlaySound(SND_CHAT_RESPONSE_SENT, winsound.SND_ASYNC)
-		except Exception as err:
-			log.error("Error when calling the API for model %s: %s", model.id, err, exc_info=True)
-			log.error("Parameters used (messages omitted): %s", _params_for_error_log(params))
-			stop_progress_sound()
-			doc_error = self._maybe_build_document_support_error(err, provider, nbDocuments)
-			wx.PostEvent(self._notifyWindow, ResultEvent(doc_error if doc_error else err))
-			return
-		if not is_regenerate:
+			log.info("OpenAI [timing] Compare: %d model(s): %s", len(runs), ", ".join(r.model.id for r in runs))
+		t_fanout = time.perf_counter()
+		for run in runs:
+			if run.error is not None:
+				self._finishCompareRun(run, None)
+				continue
+			run.thread = threading.Thread(
+				target=self._compareWorker,
+				args=(run, debug),
+				name=f"AIHubCompare-{run.model.id}",
+				daemon=True,
+			)
+			run.thread.start()
+		if wnd.conf["chatFeedback"]["sndResponseSent"]:
+			winsound.PlaySound(SND_CHAT_RESPONSE_SENT, winsound.SND_ASYNC)
+		first = True
+		for run in runs:
+			while not run.started.wait(0.1):
+				if self._wantAbort or wnd.stopRequest.is_set():
+					break
+			if first:
+				first = False
+				wnd.previousPrompt = wnd.promptTextCtrl.GetValue()
+				wnd.promptTextCtrl.Clear()
+			block = run.block
 			if wnd.lastBlock is None:
 				wnd.firstBlock = wnd.lastBlock = block
 			else:
 				wnd.lastBlock.next = block
 				block.previous = wnd.lastBlock
 				wnd.lastBlock = block
-			wnd.previousPrompt = wnd.promptTextCtrl.GetValue()
-			wnd.promptTextCtrl.Clear()
-		else:
-			wnd.lastBlock = block
-			if wnd.firstBlock is None:
-				wnd.firstBlock = block
-		try:
-			t_resp_start = time.perf_counter()
-			if use_stream:
-				self._responseWithStream(response, block, debug)
-			else:
-				self._responseWithoutStream(response, block, debug)
-			self._apply_pricing_if_missing(block, model)
-			from .usage_ledger import USAGE_KIND_ABORTED, USAGE_KIND_COMPLETION
-			aborted = self._wantAbort or wnd.stopRequest.is_set()
+			# Translators: Announced when compare mode starts showing the next model's answer.
+			wnd.message(_("Response from %s") % (run.model.name or run.model.id), speechOnly=True)
+			self._waitForCompareDisplay(run)
+		from .usage_ledger import USAGE_KIND_ABORTED, USAGE_KIND_COMPLETION
+		aborted = self._wantAbort or wnd.stopRequest.is_set()
+		for run in runs:
+			timing = run.block.timing or {}
+			metrics = {"compareGroup": group, "provider": str(run.model.provider)}
+			for key in ("timeToFirstTokenSec", "outputTokensPerSec", "elapsedSec", "usageEstimated"):
+				if timing.get(key) is not None:
+					metrics[key] = timing[key]
 			self._record_usage_in_ledger(
 				wnd,
-				block,
-				model,
+				run.block,
+				run.model,
 				kind=USAGE_KIND_ABORTED if aborted else USAGE_KIND_COMPLETION,
+				metrics=metrics,
 			)
-			self._log_timing(debug, "response processing", time.perf_counter() - t_resp_start)
-		except Exception as err:
-			log.error("Error processing response for model %s: %s", model.id, err, exc_info=True)
-			stop_progress_sound()
-			wx.PostEvent(self._notifyWindow, ResultEvent(err))
-			return
-		total = time.perf_counter() - t0
-		block.timing["finishedAt"] = time.time()
-		block.timing["elapsedSec"] = round(total, 3)
-		self._finalize_timing_metrics(block)
-		self._log_timing(debug, "total", total)
-		if debug and total > 10:
-			log.info("OpenAI [timing] Request took %.1fs. If 'history' is dominant, reduce conversation length.", total)
+			if debug:
+				self._log_prompt_estimate(debug, run.block)
+				log.info(
+					"OpenAI [timing] Compare %s: ttft %s, %s tok/s, cost %s%s",
+					run.model.id,
+					timing.get("timeToFirstTokenSec"),
+					timing.get("outputTokensPerSec"),
+					(run.block.usage or {}).get("cost"),
+					" (error)" if run.error is not None else "",
+				)
+		self._log_timing(debug, "compare total", time.perf_counter() - t_fanout)
 		wnd.filesList.clear()
 		wnd.audioPathList.clear()
 		wx.PostEvent(self._notifyWindow, ResultEvent())
 
+	def _compareWorker(self, run, debug):
+		block = run.block
+		net_timing = None
+		try:
+			with use_cancel_token(self.cancelToken):
+				block.timing["requestSentAt"] = time.time()
+				with capture_network_timing() as net_timing:
+					response = run.client.chat.completions.create(**run.params)
+				block.timing["responseReceivedAt"] = time.time()
+				self._noteResponseCache(run.client, block, debug)
+				run.started.set()
+				if run.useStream:
+					self._responseWithStream(response, block, debug, speak=False, model=run.model)
+				else:
+					self._responseWithoutStream(response, block, debug, speak=False)
+			# The prompt estimate used the selected model's tokenizer: never calibrate from it here.
+			self._reconcileUsageEstimate(block, run.model, calibrate=False)
+			self._apply_pricing_if_missing(block, run.model)
+		except Exception as err:
+			if isinstance(err, APICancelledError) or self._isAborted():
+				log.debug("Compare: request to %s cancelled: %s", run.model.id, err)
+			else:
+				log.error("Compare: request to %s failed: %s", run.model.id, err, exc_info=True)
+				run.error = err
+		self._finishCompareRun(run, net_timing)
+
+	def _finishCompareRun(self, run, net_timing):
+		block = run.block
+		if run.error is not None:
+			# Translators: Shown in history in place of a compare-mode answer whose request failed.
+			block.appendResponse(_("Error: %s") % truncate_error_for_user(run.error))
+		block.responseTerminated = True
+		now = time.time()
+		block.timing["finishedAt"] = now
+		started = block.timing.get("startedAt")
+		if isinstance(started, (int, float)):
+			block.timing["elapsedSec"] = round(now - started, 3)
+		if net_timing is not None:
+			block.timing.update(net_timing.as_dict())
+		self._finalize_timing_metrics(block)
+		run.started.set()
+		run.done.set()
+
+	def _waitForCompareDisplay(self, run, settle_timeout=5.0):
+		"""Block until ``run`` has finished and the UI timer has rendered all of it."""
+		wnd = self._notifyWindow
+		block = run.block
+		while not run.done.wait(0.1):
+			if self._wantAbort or wnd.stopRequest.is_set():
+				return
+		deadline = time.monotonic() + settle_timeout
+		while time.monotonic() < deadline:
+			if not block.displayHeader and block.lastLen >= block.responseLen():
+				return
+			time.sleep(0.05)
+
+	def _applyContextBudget(self, messages, models, maxTokens, block, model, account_id, debug):
+		"""Trim ``messages`` to fit the smallest context window among ``models``.
+
+		Records the estimate in ``block.timing`` (also when the budget is off)
+		and returns the list to send.
+		"""
+		wnd = self._notifyWindow
+		budget_conf = wnd.conf["contextBudget"]
+		t_budget = time.perf_counter()
+		counter = tokenizer.counter_for_model(model)
+		budget = 0
+		if budget_conf["enabled"]:
+			budget = min(prompt_budget(m, maxTokens, budget_conf["maxPromptTokens"]) for m in models)
+		summarize = None
+		page = getattr(wnd, "_worker_page", None)
+		trim_state = getattr(page, "historyTrimState", None)
+		if trim_state is None:
+			trim_state = TrimState()
+			if page is not None:
+				page.historyTrimState = trim_state
+		if budget_conf["enabled"] and budget_conf["summarize"]:
+			cache = getattr(page, "historySummaryCache", None)
+			if cache is None:
+				cache = SummaryCache()
+				if page is not None:
+					page.historySummaryCache = cache
+
+			def _summarize_dropped(dropped):
+				return cache.get_or_build(
+					dropped,
+					lambda previous, new: self._summarizeHistory(previous, new, model, account_id, debug),
+				)
+
+			summarize = _summarize_dropped
+
+		result = fit_messages(
+			messages,
+			budget,
+			keep_attachment_turns=budget_conf["keepAttachmentTurns"],
+			summarize=summarize,
+			count_text=counter.count,
+			state=trim_state,
+		)
+		block.timing.update(result.as_dict())
+		self._estimateTextOnly = not has_attachments(result.messages)
+		if debug:
+			log.info(
+				"OpenAI [timing] context budget: %d token(s), estimated prompt (%s) %d -> %d "
+				"(%d turn(s) without attachments, %d turn(s) dropped%s) in %.3fs",
+				budget,
+				counter.name,
+				result.originalTokens,
+				result.estimatedTokens,
+				result.droppedAttachments,
+				result.droppedTurns,
+				", summarized" if result.summarized else "",
+				time.perf_counter() - t_budget,
+			)
+		return result.messages
+
+	def _summarizeHistory(self, previous_summary, new_messages, model, account_id, debug):
+		"""Ask ``model`` for a rolling summary of turns dropped from the context."""
+		from .usage_ledger import USAGE_KIND_SUMMARY, append_usage_event
+
+		wnd = self._notifyWindow
+		client = configure_client_for_provider(wnd.client, model.provider, account_id=account_id, clone=True)
+		t_summary = time.perf_counter()
+		response = client.chat.completions.create(
+			model=model.id,
+			messages=summarization_request(previous_summary, new_messages),
+			max_tokens=_HISTORY_SUMMARY_MAX_TOKENS,
+			stream=False,
+		)
+		self._log_timing(debug, "history summary", time.perf_counter() - t_summary)
+		summary = (response.choices[0].message.content or "").strip() if response.choices else ""
+		usage_holder = HistoryBlock()
+		usage_holder.usage = self._usage_for_block(getattr(response, "usage", None))
+		self._apply_pricing_if_missing(usage_holder, model)
+		page = getattr(wnd, "_worker_page", None)
+		if page is not None and usage_holder.usage:
+			if not isinstance(getattr(page, "usageLedger", None), list):
+				page.usageLedger = []
+			append_usage_event(page.usageLedger, usage=usage_holder.usage, model=model.id, kind=USAGE_KIND_SUMMARY)
+		return summary
+
+	def _reconcileUsageEstimate(self, block, model, *, calibrate=True):
+		"""Calibrate the local token count against billed usage, or stand in for missing usage.
+
+		When the provider reported no usage at all, ``block.usage`` is filled
+		from the prompt estimate and a count of the answer, so the ledger and
+		pricing still see the call; ``usageEstimated`` marks it in the timing.
+		"""
+		timing = getattr(block, "timing", None) or {}
+		estimated = timing.get("estimatedPromptTokens")
+		if estimated is None or timing.get("responseCached"):
+			return
+		usage = block.usage if isinstance(block.usage, dict) else {}
+		actual = usage.get("input_tokens") or usage.get("prompt_tokens")
+		if actual:
+			if calibrate and self._estimateTextOnly:
+				tokenizer.calibrate(model, estimated, actual)
+			return
+		if usage.get("output_tokens") or usage.get("completion_tokens"):
+			return
+		counter = tokenizer.counter_for_model(model)
+		output_tokens = counter.count(block.responseText or "") + counter.count(block.reasoningText or "")
+		block.usage = {
+			"input_tokens": int(estimated),
+			"output_tokens": output_tokens,
+			"total_tokens": int(estimated) + output_tokens,
+		}
+		timing["usageEstimated"] = True
+
+	def _log_prompt_estimate(self, debug, block):
+		"""Log the context budget's prompt estimate next to the billed input tokens."""
+		timing = getattr(block, "timing", None) or {}
+		estimated = timing.get("estimatedPromptTokens")
+		if not debug or estimated is None:
+			return
+		usage = getattr(block, "usage", None) or {}
+		actual = usage.get("input_tokens") or usage.get("prompt_tokens")
+		if actual and not timing.get("usageEstimated"):
+			log.info(
+				"OpenAI [timing]   prompt tokens: estimated %d, actual %d (%+.0f%%)",
+				estimated,
+				actual,
+				(estimated - actual) * 100.0 / actual,
+			)
+		else:
+			log.info("OpenAI [timing]   prompt tokens: estimated %d, actual not reported", estimated)
+
 	def _getMessages(self, system=None, prompt=None, current_audio_transcripts=None):
 		wnd = self._notifyWindow
 		debug = wnd.conf.get("debug", False)
@@ -858,12 +1420,19 @@ class CompletionThread(threading.Thread):
 			messages.append({"role": Role.SYSTEM, "content": system})
 		until_block = getattr(wnd, "_historyUntilBlock", None)
 		t_hist = time.perf_counter()
+		cache_before = image_part_cache.stats() if debug else None
+		scope = getattr(wnd, "_conversation_scope", None)
+		message_cache = getattr(scope(), "messageCache", None) if debug and scope else None
+		message_cache_before = message_cache.stats() if message_cache is not None else None
 		if until_block is not None:
 			wnd.getMessages(messages, until_block=until_block)
 			self._log_timing(debug, "  history (prior blocks)", time.perf_counter() - t_hist)
+			self._log_message_cache(message_cache, message_cache_before)
+			self._log_image_cache(cache_before)
 			return messages
 		wnd.getMessages(messages)
 		self._log_timing(debug, "  history (prior blocks)", time.perf_counter() - t_hist)
+		self._log_message_cache(message_cache, message_cache_before)
 		t_cur = time.perf_counter()
 		content_parts = []
 		if prompt:
@@ -871,21 +1440,56 @@ class CompletionThread(threading.Thread):
 		if wnd.filesList:
 			content_parts.extend(wnd.getFilesContent(prompt=None))
 		if wnd.audioPathList:
-			if current_audio_transcripts and any(t for t in current_audio_transcripts):
-				for t in current_audio_transcripts:
-					if t:
-						content_parts.append({"type": ContentType.TEXT, "text": t})
-			else:
-				content_parts.extend(wnd.getAudioContent(prompt=None))
+			transcripts = current_audio_transcripts or []
+			if len(transcripts) != len(wnd.audioPathList):
+				transcripts = [""] * len(wnd.audioPathList)
+			for t in transcripts:
+				if t:
+					content_parts.append({"type": ContentType.TEXT, "text": t})
+			untranscribed = [path for path, t in zip(wnd.audioPathList, transcripts) if not t]
+			if untranscribed:
+				content_parts.extend(wnd.getAudioContent(untranscribed, prompt=None))
 		self._log_timing(debug, "  current message (images/audio)", time.perf_counter() - t_cur)
+		self._log_image_cache(cache_before)
 		if content_parts:
 			messages.append({"role": Role.USER, "content": content_parts})
 		elif prompt:
 			messages.append({"role": Role.USER, "content": prompt})
 		return messages
 
+	def _log_message_cache(self, cache, before):
+		"""Log how many history blocks were reused from the page message cache this turn."""
+		if cache is None or before is None:
+			return
+		after = cache.stats()
+		log.info(
+			"OpenAI [timing]   history blocks: %d reused, %d built, %d cached",
+			after["hits"] - before["hits"],
+			after["misses"] - before["misses"],
+			after["entries"],
+		)
+
+	def _log_image_cache(self, before):
+		"""Log image part cache hits/misses for this turn (``before`` is None when not debugging)."""
+		if before is None:
+			return
+		after = image_part_cache.stats()
+		hits = after["hits"] - before["hits"]
+		misses = after["misses"] - before["misses"]
+		if not hits and not misses:
+			return
+		log.info(
+			"OpenAI [timing]   image cache: %d hit(s), %d miss(es) (%.0f%% hit rate), %d entries, %.1f MB",
+			hits,
+			misses,
+			100.0 * hits / (hits + misses),
+			after["entries"],
+			after["bytes"] / (1024 * 1024),
+		)
+
 	def abort(self):
 		self._wantAbort = True
+		self.cancelToken.cancel()
 
 	def stop(self):
 		"""Same as ``abort``; matches ``RecordThread.stop`` for shared shutdown code."""
@@ -912,6 +1516,12 @@ class CompletionThread(threading.Thread):
 			timing["timeToFirstTokenSec"] = round(first_token - request_sent, 3)
 		if finished is not None and request_sent is not None and finished >= request_sent:
 			timing["timeFromRequestSentToEndSec"] = round(finished - request_sent, 3)
+		net_phases = [_as_float(timing.get(k)) for k in ("netDnsSec", "netConnectSec", "netTlsSec")]
+		net_phases = [v for v in net_phases if v is not None]
+		if net_phases:
+			timing["netSetupSec"] = round(sum(net_phases), 4)
+		elif timing.get("netConnectionReused"):
+			timing["netSetupSec"] = 0.0
 		if finished is not None and first_token is not None and finished >= first_token:
 			generation_sec = finished - first_token
 			timing["generationDurationSec"] = round(generation_sec, 3)
@@ -929,17 +1539,42 @@ class CompletionThread(threading.Thread):
 				if total_tokens > 0:
 					timing["totalTokensPerSec"] = round(total_tokens / generation_sec, 3)
 
-	def _responseWithStream(self, response, block, debug=False):
+	def _log_network_timing(self, debug, timing):
+		if not debug:
+			return
+		reused = timing.get("netConnectionReused")
+		if reused is not None:
+			log.info("OpenAI [timing]   connection: %s", "reused" if reused else "new")
+		for key, label in (
+			("netDnsSec", "DNS"),
+			("netConnectSec", "TCP connect"),
+			("netTlsSec", "TLS handshake"),
+			("netUploadSec", "request upload"),
+			("netHeadersSec", "response headers"),
+			("netFirstByteSec", "first byte"),
+		):
+			value = timing.get(key)
+			if value is not None:
+				log.info("OpenAI [timing]   %s: %.1fms", label, value * 1000)
+		if timing.get("netUploadBytes") is not None:
+			log.info("OpenAI [timing]   request body: %d bytes", timing["netUploadBytes"])
+
+	def _responseWithStream(self, response, block, debug=False, speak=True, model=None):
+		"""Consume a streamed response into ``block``.
+
+		``model`` is the model that answers (a compare target's, not necessarily
+		the selected one); it defaults to the window's current model.
+		"""
 		wnd = self._notifyWindow
 		speechBuffer = ""
 		latest_usage = None
 		first_speech_emitted = False
-		model = None
-		try:
-			if hasattr(wnd, "getCurrentModel"):
-				model = wnd.getCurrentModel()
-		except Exception:
-			pass
+		if model is None:
+			try:
+				if hasattr(wnd, "getCurrentModel"):
+					model = wnd.getCurrentModel()
+			except Exception:
+				pass
 		# xAI Responses API uses structured summary + output_text channels.
 		use_think_strip = not (model and model.provider == Provider.xAI)
 		think_states = _new_think_chain_states() if use_think_strip else None
@@ -952,7 +1587,7 @@ class CompletionThread(threading.Thread):
 			``first_speech_emitted`` only on a real spoken utterance.
 			"""
 			nonlocal first_speech_emitted
-			if not text:
+			if not text or not speak:
 				return False
 			if not (hasattr(wnd, "canAutoReadStreamingResponse") and wnd.canAutoReadStreamingResponse()):
 				return False
@@ -988,13 +1623,9 @@ class CompletionThread(threading.Thread):
 					return len(speechBuffer)
 			return 0
 
-		for event in response:
-			if time.time() - self.lastTime > 4:
-				self.lastTime = int(time.time())
-				if wnd.conf["chatFeedback"]["sndResponsePending"]:
-					winsound.PlaySound(SND_CHAT_RESPONSE_PENDING, winsound.SND_ASYNC)
-			if self._wantAbort or wnd.stopRequest.is_set():
-				break
+		def _handle_event(event) -> bool:
+			"""Apply one stream event to ``block``; return True when the stream has finished."""
+			nonlocal latest_usage, speechBuffer
 			usage = getattr(event, "usage", None)
 			if isinstance(usage, dict) and usage:
 				latest_usage = usage
@@ -1019,7 +1650,7 @@ class CompletionThread(threading.Thread):
 				block._needsHistoryRerender = True
 			choices = getattr(event, "choices", None)
 			if not choices:
-				continue
+				return False
 			choice = choices[0]
 			delta = getattr(choice, "delta", None)
 			reasoning_chunk = getattr(delta, "reasoning", "") if delta else ""
@@ -1029,30 +1660,66 @@ class CompletionThread(threading.Thread):
 			if reasoning_chunk:
 				if "firstTokenAt" not in block.timing:
 					block.timing["firstTokenAt"] = time.time()
-				block.reasoningText += reasoning_chunk
+				block.appendReasoning(reasoning_chunk)
 			if content_chunk:
 				if think_states:
 					content_chunk, think_from_tags = _apply_think_chain_to_chunk(content_chunk, think_states)
 					if think_from_tags:
-						block.reasoningText += think_from_tags
+						block.appendReasoning(think_from_tags)
 				if not content_chunk:
-					continue
+					return False
 				if "firstTokenAt" not in block.timing:
 					block.timing["firstTokenAt"] = time.time()
 				speechBuffer += content_chunk
-				block.responseText += content_chunk
+				block.appendResponse(content_chunk)
+			return bool(getattr(choice, "finish_reason", None))
+
+		# Network reads and SSE parsing run on the pipeline's reader thread; this
+		# thread only applies coalesced batches, so slow consumers never stall the socket.
+		pipeline = StreamPipeline(response)
+		finished = False
+		try:
+			for events in pipeline.batches():
+				if time.time() - self.lastTime > 4:
+					self.lastTime = int(time.time())
+					if wnd.conf["chatFeedback"]["sndResponsePending"]:
+						winsound.PlaySound(SND_CHAT_RESPONSE_PENDING, winsound.SND_ASYNC)
+				for event in events:
+					if self._wantAbort or wnd.stopRequest.is_set():
+						finished = True
+						break
+					if _handle_event(event):
+						finished = True
+						break
+				# Segment speech once per batch rather than once per token.
 				cut = _decide_speech_cut()
 				if cut > 0:
 					to_speak = speechBuffer[:cut]
 					speechBuffer = speechBuffer[cut:]
 					_emit_speech(to_speak)
-			if getattr(choice, "finish_reason", None):
-				break
+				if finished or self._wantAbort or wnd.stopRequest.is_set():
+					break
+		finally:
+			pipeline.close()
+			metrics = pipeline.metrics()
+			if isinstance(block.timing, dict):
+				block.timing.update(metrics)
+			if debug:
+				log.info(
+					"OpenAI [timing]   stream pipeline: %d event(s) in %d batch(es) (max %d), "
+					"max queue depth %d, lag mean %.1fms / max %.1fms",
+					metrics["streamEvents"],
+					metrics["streamBatches"],
+					metrics["streamMaxBatchSize"],
+					metrics["streamMaxQueueDepth"],
+					metrics["streamMeanLagSec"] * 1000,
+					metrics["streamMaxLagSec"] * 1000,
+				)
 		flushed_content, flushed_reasoning = _flush_think_chain(think_states) if think_states else ("", "")
 		if flushed_reasoning:
-			block.reasoningText += flushed_reasoning
+			block.appendReasoning(flushed_reasoning)
 		if flushed_content:
-			block.responseText += flushed_content
+			block.appendResponse(flushed_content)
 			speechBuffer += flushed_content
 		if speechBuffer:
 			_emit_speech(speechBuffer)
@@ -1067,11 +1734,11 @@ class CompletionThread(threading.Thread):
 			block.responseText or "",
 		)
 		if citations_footer:
-			block.responseText += citations_footer
+			block.appendResponse(citations_footer)
 			wnd.updateResponse(block, citations_footer)
 		block.responseTerminated = True
 
-	def _responseWithoutStream(self, response, block, debug=False):
+	def _responseWithoutStream(self, response, block, debug=False, speak=True):
 		wnd = self._notifyWindow
 		text = ""
 		played_audio = False
@@ -1087,7 +1754,7 @@ class CompletionThread(threading.Thread):
 					break
 				msg = choice.message
 				text += msg.content or ""
-				block.reasoningText += getattr(msg, "reasoning", "") or ""
+				block.appendReasoning(getattr(msg, "reasoning", "") or "")
 				audio = getattr(msg, "audio", None)
 				if isinstance(audio, dict) and audio.get("data"):
 					transcript = audio.get("transcript") or ""
@@ -1117,11 +1784,11 @@ class CompletionThread(threading.Thread):
 		else:
 			raise TypeError(f"Invalid response type: {type(response)}")
 		citations_footer = _apply_xai_response_metadata(block, response, text)
-		block.responseText += text
+		block.appendResponse(text)
 		if citations_footer:
-			block.responseText += citations_footer
+			block.appendResponse(citations_footer)
 			text += citations_footer
-		if not played_audio and text:
+		if speak and not played_audio and text:
 			if hasattr(wnd, "canAutoReadStreamingResponse") and wnd.canAutoReadStreamingResponse():
 				speech_plain = _strip_markdown_for_speech(text)
 				if speech_plain:
@@ -28,11 +28,15 @@ confSpecs = {
 	"blockEscapeKey": "boolean(default=False)",
 	"saveSystem": "boolean(default=true)",
 	"autoSaveConversation": "boolean(default=True)",
+	"conversationStorage": "option(json, sqlite, default=json)",
 	"images": {
 		"maxHeight": "integer(min=0, default=720)",
 		"maxWidth": "integer(min=0, default=0)",
 		"quality": "integer(min=0, max=100, default=85)",
 		"resize": "boolean(default=False)",
+		"optimizeForModel": "boolean(default=False)",
+		"optimizeMinScale": "integer(min=25, max=100, default=75)",
+		"reuseRecognitions": "boolean(default=True)",
 		"resizeInfoDisplayed": "boolean(default=False)",
 		"useCustomPrompt": "boolean(default=False)",
 		"customPromptText": 'string(default="")'
@@ -51,7 +55,9 @@ confSpecs = {
 		"channels": "integer(min=1, max=2, default=1)",
 		"dtype": "string(default=int16)",
 		"trimSilence": "boolean(default=True)",
-		"minSilenceSec": "integer(min=1, max=10, default=2)"
+		"minSilenceSec": "integer(min=1, max=10, default=2)",
+		"downsampleHistory": "boolean(default=True)",
+		"transcribeHistory": "boolean(default=False)",
 	},
 	"chatFeedback": {
 		"sndResponsePending": "boolean(default=True)",
@@ -61,6 +67,20 @@ confSpecs = {
 		"focusHistoryOnAssistantResponse": "boolean(default=False)",
 		"speechResponseReceived": "boolean(default=True)",
 	},
+	"responseCache": {
+		"enabled": "boolean(default=False)",
+		"maxSizeMB": "integer(min=1, max=2048, default=64)",
+	},
+	"promptCaching": {
+		"anthropic": "boolean(default=True)",
+		"prewarmOnLoad": "boolean(default=False)",
+	},
+	"contextBudget": {
+		"enabled": "boolean(default=True)",
+		"maxPromptTokens": "integer(min=0, max=10000000, default=0)",
+		"keepAttachmentTurns": "integer(min=0, max=100, default=2)",
+		"summarize": "boolean(default=False)",
+	},
 	"renewClient": "boolean(default=False)",
 	"debug": "boolean(default=False)",
 }
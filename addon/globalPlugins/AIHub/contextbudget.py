@@ -0,0 +1,429 @@
+"""Fit a chat message list into the model's context window before it is sent.
+
+The conversation dialog rebuilds the full thread on every turn, so a long
+conversation keeps growing until the provider rejects it, and every old image
+or document is uploaded again each time. ``fit_messages`` estimates the
+prompt size and, only when it exceeds the budget, applies in order:
+
+1. attachment dropping: images, audio and documents of older turns are
+   replaced by a short text placeholder (the text of those turns is kept);
+2. sliding window: the oldest turns are removed, optionally replaced by a
+   rolling summary held in a ``SummaryCache``.
+
+The system message and the current user turn are never touched. Once
+trimming is needed the list is cut below the budget by a margin, and the cut
+is remembered per page in a ``TrimState``: later requests reuse it while the
+kept window still fits the budget, and only move it (by another cut below the
+margin) when it no longer does. Between moves the kept prefix, and the
+summary in the system message, stay identical, so provider prompt caches keep
+hitting and no new summary is requested.
+
+Text is counted with the ``tokenizer`` package (approximate BPE counts for OpenAI
+models whose vocabulary is installed, a calibrated heuristic otherwise); attachments get
+fixed allowances. The budget keeps a safety margin for the estimation error.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Callable, Optional
+
+from . import tokenizer
+from .consts import ContentType, Role
+
+# Fraction of the context window kept free to absorb estimation error.
+SAFETY_MARGIN = 0.05
+# When the cut moves, aim this far below the budget so it can stay put for a few turns.
+TRIM_TARGET = 0.8
+# Output reservation when neither the request nor the model sets a limit.
+DEFAULT_OUTPUT_RESERVE = 4096
+
+# Per-message overhead for role and formatting tokens.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Rough sizes of non-text parts (vision models bill 0.5k-1.6k per image).
+IMAGE_TOKENS = 1200
+# ~10 audio tokens per second of 16 kHz 16-bit mono audio.
+AUDIO_BYTES_PER_TOKEN = 3200
+# Documents: extracted text is far smaller than the file for PDFs/Office files.
+DOCUMENT_BYTES_PER_TOKEN = 16
+DOCUMENT_MIN_TOKENS = 1000
+REMOTE_DOCUMENT_TOKENS = 2000
+
+# Token allowance kept for the summary text when old turns are summarized.
+SUMMARY_MAX_TOKENS = 800
+
+
+def estimate_text_tokens(text: str) -> int:
+	"""Provider-neutral count; pass ``tokenizer.counter_for_model(m).count`` for a model."""
+	return tokenizer.estimate_tokens(text)
+
+
+def _b64_size(data: str) -> int:
+	if "," in data[:256] and data.startswith("data:"):
+		data = data.split(",", 1)[1]
+	return len(data) * 3 // 4
+
+
+def _file_size(path: str) -> int:
+	try:
+		return os.path.getsize(path)
+	except OSError:
+		return 0
+
+
+def estimate_part_tokens(part, count_text: Callable[[str], int] = estimate_text_tokens) -> int:
+	"""Estimate one ``content`` part (text, image, audio or document).
+
+	Audio and documents may be described by a ``file_path`` instead of their
+	data, which lets callers estimate attachments without encoding them.
+	"""
+	if isinstance(part, str):
+		return count_text(part)
+	if not isinstance(part, dict):
+		return 0
+	ptype = part.get("type")
+	if ptype == ContentType.TEXT:
+		return count_text(part.get("text") or "")
+	if ptype == ContentType.IMAGE_URL:
+		return IMAGE_TOKENS
+	if ptype == ContentType.INPUT_AUDIO:
+		audio = part.get("input_audio") or {}
+		path = audio.get("file_path")
+		size = _file_size(path) if path else _b64_size(audio.get("data") or "")
+		return max(1, size // AUDIO_BYTES_PER_TOKEN)
+	if ptype == ContentType.INPUT_FILE:
+		path = part.get("file_path")
+		if isinstance(path, str) and path:
+			return max(DOCUMENT_MIN_TOKENS, _file_size(path) // DOCUMENT_BYTES_PER_TOKEN)
+		data = part.get("file_data")
+		if isinstance(data, str) and data:
+			return max(DOCUMENT_MIN_TOKENS, _b64_size(data) // DOCUMENT_BYTES_PER_TOKEN)
+		return REMOTE_DOCUMENT_TOKENS
+	return 0
+
+
+def estimate_message_tokens(message: dict, count_text: Callable[[str], int] = estimate_text_tokens) -> int:
+	content = message.get("content")
+	if isinstance(content, list):
+		body = sum(estimate_part_tokens(p, count_text) for p in content)
+	else:
+		body = count_text(content if isinstance(content, str) else "")
+	return MESSAGE_OVERHEAD_TOKENS + body
+
+
+def estimate_messages_tokens(messages: list, count_text: Callable[[str], int] = estimate_text_tokens) -> int:
+	return sum(estimate_message_tokens(m, count_text) for m in messages if isinstance(m, dict))
+
+
+def has_attachments(messages: list) -> bool:
+	"""True when any message carries a non-text part."""
+	for message in messages:
+		content = message.get("content") if isinstance(message, dict) else None
+		if isinstance(content, list):
+			for part in content:
+				if isinstance(part, dict) and part.get("type") != ContentType.TEXT:
+					return True
+	return False
+
+
+def prompt_budget(model, max_tokens: int = 0, configured: int = 0) -> int:
+	"""Tokens available for the prompt: context window minus output reserve and margin.
+
+	``configured`` (when positive) lowers the budget further. Returns 0 when
+	the model does not declare a context window and nothing is configured.
+	"""
+	window = getattr(model, "contextWindow", 0) or 0
+	if window <= 0:
+		return max(0, configured)
+	if max_tokens and max_tokens > 0:
+		reserve = max_tokens
+	elif getattr(model, "maxOutputToken", 0) and model.maxOutputToken > 0:
+		reserve = model.maxOutputToken
+	else:
+		reserve = DEFAULT_OUTPUT_RESERVE
+	# Models reporting max output == context window would leave nothing.
+	reserve = min(reserve, window // 2)
+	auto = int((window - reserve) * (1 - SAFETY_MARGIN))
+	if configured and configured > 0:
+		return min(configured, auto)
+	return auto
+
+
+def _attachment_placeholder(part: dict) -> Optional[dict]:
+	ptype = part.get("type")
+	if ptype == ContentType.IMAGE_URL:
+		label = "[image omitted]"
+	elif ptype == ContentType.INPUT_AUDIO:
+		label = "[audio omitted]"
+	elif ptype == ContentType.INPUT_FILE:
+		name = part.get("filename") or os.path.basename(part.get("file_path") or "") or "document"
+		label = f"[document omitted: {name}]"
+	else:
+		return None
+	return {"type": ContentType.TEXT, "text": label}
+
+
+def _without_attachments(message: dict) -> Optional[dict]:
+	"""Copy of ``message`` with non-text parts replaced; None if it had none."""
+	content = message.get("content")
+	if not isinstance(content, list):
+		return None
+	parts = []
+	changed = False
+	for part in content:
+		placeholder = _attachment_placeholder(part) if isinstance(part, dict) else None
+		if placeholder is not None:
+			parts.append(placeholder)
+			changed = True
+		else:
+			parts.append(part)
+	if not changed:
+		return None
+	return dict(message, content=parts)
+
+
+def message_text(message: dict) -> str:
+	"""Plain text of a message (attachments as placeholders), for summaries."""
+	content = message.get("content")
+	if isinstance(content, str):
+		return content
+	if not isinstance(content, list):
+		return ""
+	out = []
+	for part in content:
+		if not isinstance(part, dict):
+			continue
+		if part.get("type") == ContentType.TEXT:
+			out.append(part.get("text") or "")
+		else:
+			placeholder = _attachment_placeholder(part)
+			if placeholder is not None:
+				out.append(placeholder["text"])
+	return "\n".join(t for t in out if t)
+
+
+def _split_turns(history: list) -> list[list]:
+	"""Group history into turns, each starting at a user message."""
+	turns: list[list] = []
+	for msg in history:
+		if msg.get("role") == Role.USER or not turns:
+			turns.append([msg])
+		else:
+			turns[-1].append(msg)
+	return turns
+
+
+def _fingerprint(messages: list) -> str:
+	h = hashlib.sha256()
+	for m in messages:
+		h.update(str(m.get("role")).encode("utf-8"))
+		h.update(b"\0")
+		h.update(message_text(m).encode("utf-8"))
+		h.update(b"\1")
+	return h.hexdigest()
+
+
+class TrimState:
+	"""Where ``fit_messages`` last cut one page's history.
+
+	``stripped`` turns lost their attachments and the first ``dropped`` were
+	removed; ``key`` fingerprints those turns so an edited or different
+	history starts over.
+	"""
+
+	__slots__ = ("stripped", "dropped", "key")
+
+	def __init__(self):
+		self.reset()
+
+	def reset(self) -> None:
+		self.stripped = 0
+		self.dropped = 0
+		self.key = ""
+
+
+class SummaryCache:
+	"""Rolling summaries of dropped turns, reused and extended across requests.
+
+	Entries are keyed by a fingerprint of the exact messages they cover. When
+	more turns fall out of the window, the longest cached summary covering a
+	prefix of them is extended with just the newly dropped turns.
+	"""
+
+	MAX_ENTRIES = 8
+
+	def __init__(self):
+		self._entries: dict[str, tuple[int, str]] = {}
+
+	_fingerprint = staticmethod(_fingerprint)
+
+	def get_or_build(self, dropped: list, summarize: Callable[[Optional[str], list], str]) -> str:
+		"""Summary of ``dropped``; ``summarize(previous_summary, new_messages)`` fills gaps."""
+		best_n, best_text = 0, None
+		for n in range(len(dropped), 0, -1):
+			entry = self._entries.get(self._fingerprint(dropped[:n]))
+			if entry is not None:
+				best_n, best_text = n, entry[1]
+				break
+		if best_n == len(dropped):
+			return best_text
+		text = summarize(best_text, dropped[best_n:])
+		if len(self._entries) >= self.MAX_ENTRIES:
+			self._entries.pop(next(iter(self._entries)))
+		self._entries[self._fingerprint(dropped)] = (len(dropped), text)
+		return text
+
+
+class BudgetResult:
+	"""Outcome of ``fit_messages``; ``messages`` is what should be sent."""
+
+	__slots__ = (
+		"messages",
+		"budget",
+		"originalTokens",
+		"estimatedTokens",
+		"droppedAttachments",
+		"droppedTurns",
+		"summarized",
+	)
+
+	def __init__(self, messages: list, budget: int, originalTokens: int):
+		self.messages = messages
+		self.budget = budget
+		self.originalTokens = originalTokens
+		self.estimatedTokens = originalTokens
+		self.droppedAttachments = 0
+		self.droppedTurns = 0
+		self.summarized = False
+
+	@property
+	def changed(self) -> bool:
+		return bool(self.droppedAttachments or self.droppedTurns)
+
+	def as_dict(self) -> dict:
+		return {
+			"contextBudgetTokens": self.budget,
+			"promptTokensBeforeBudget": self.originalTokens,
+			"estimatedPromptTokens": self.estimatedTokens,
+			"droppedAttachmentTurns": self.droppedAttachments,
+			"droppedTurns": self.droppedTurns,
+			"historySummarized": self.summarized,
+		}
+
+
+def fit_messages(
+	messages: list,
+	budget: int,
+	*,
+	keep_attachment_turns: int = 2,
+	summarize: Optional[Callable[[list], str]] = None,
+	count_text: Callable[[str], int] = estimate_text_tokens,
+	state: Optional[TrimState] = None,
+) -> BudgetResult:
+	"""Return ``messages`` trimmed to ``budget`` estimated tokens.
+
+	The input list is not modified. ``summarize(dropped_messages)`` returns a
+	summary text for turns removed by the sliding window; without it dropped
+	turns are simply omitted. ``count_text`` counts plain text, typically
+	``tokenizer.counter_for_model(model).count``. With ``state``, the previous
+	cut of the same page is kept while the window after it fits ``budget``;
+	otherwise the cut moves until the window fits ``TRIM_TARGET`` of it, and
+	``state`` is updated. The result may still exceed the budget when the
+	system prompt and current turn alone do.
+	"""
+	original = estimate_messages_tokens(messages, count_text)
+	result = BudgetResult(messages, budget, original)
+	if budget <= 0 or original <= budget or len(messages) < 2:
+		if state is not None:
+			state.reset()
+		return result
+	target = int(budget * TRIM_TARGET)
+	system = [m for m in messages[:1] if m.get("role") == Role.SYSTEM]
+	current = messages[-1]
+	history = messages[len(system):-1]
+	raw_turns = _split_turns(history)
+	turns = list(raw_turns)
+	fixed = estimate_messages_tokens(system, count_text) + estimate_message_tokens(current, count_text)
+	turn_tokens = [estimate_messages_tokens(t, count_text) for t in turns]
+	strip_limit = max(0, len(turns) - keep_attachment_turns)
+	summary_allowance = SUMMARY_MAX_TOKENS if summarize is not None else 0
+
+	def _strip(i: int) -> None:
+		stripped_msgs = [_without_attachments(m) or m for m in turns[i]]
+		if any(a is not b for a, b in zip(stripped_msgs, turns[i])):
+			turns[i] = stripped_msgs
+			turn_tokens[i] = estimate_messages_tokens(stripped_msgs, count_text)
+			result.droppedAttachments += 1
+
+	def _kept_tokens() -> int:
+		return fixed + sum(turn_tokens[drop:]) + (summary_allowance if drop else 0)
+
+	# The previous cut, when it was made on this same history.
+	stripped = drop = 0
+	if state is not None and state.key:
+		covered = max(state.stripped, state.dropped)
+		if covered <= len(turns) and state.key == _fingerprint([m for t in raw_turns[:covered] for m in t]):
+			stripped, drop = min(state.stripped, strip_limit), state.dropped
+	for i in range(drop, stripped):
+		_strip(i)
+
+	if _kept_tokens() > budget:
+		# 1. Attachments of older turns, oldest first.
+		while stripped < strip_limit and _kept_tokens() > target:
+			if stripped >= drop:
+				_strip(stripped)
+			stripped += 1
+		# 2. Sliding window over whole turns.
+		while drop < len(turns) and _kept_tokens() > target:
+			drop += 1
+	if state is not None:
+		state.stripped, state.dropped = stripped, drop
+		state.key = _fingerprint([m for t in raw_turns[:max(stripped, drop)] for m in t])
+
+	kept: list = [m for t in turns[drop:] for m in t]
+	system_out = list(system)
+	if drop:
+		result.droppedTurns = drop
+		if summarize is not None:
+			dropped_msgs = [m for t in raw_turns[:drop] for m in t]
+			try:
+				summary = summarize(dropped_msgs)
+			except Exception:
+				summary = ""
+			if summary:
+				result.summarized = True
+				note = "Summary of the earlier part of this conversation (older messages were omitted):\n" + summary
+				if system_out:
+					base = system_out[0].get("content")
+					base_text = base if isinstance(base, str) else message_text(system_out[0])
+					system_out[0] = dict(system_out[0], content=f"{base_text}\n\n{note}")
+				else:
+					system_out = [{"role": Role.SYSTEM, "content": note}]
+	result.messages = system_out + kept + [current]
+	result.estimatedTokens = estimate_messages_tokens(result.messages, count_text)
+	return result
+
+
+def summarization_request(previous_summary: Optional[str], new_messages: list) -> list:
+	"""Messages asking a model to (re)summarize dropped turns."""
+	lines = []
+	for m in new_messages:
+		text = message_text(m).strip()
+		if text:
+			lines.append(f"{str(m.get('role')).capitalize()}: {text}")
+	transcript = "\n\n".join(lines)
+	instructions = (
+		"Summarize the conversation excerpt below in a compact way so it can replace the "
+		"original messages as context. Keep facts, decisions, names, numbers and open "
+		"questions; drop pleasantries. Answer with the summary only, in the language of "
+		"the conversation."
+	)
+	user = ""
+	if previous_summary:
+		user += f"Summary of what came before this excerpt:\n{previous_summary}\n\n"
+	user += f"Excerpt:\n{transcript}"
+	return [
+		{"role": Role.SYSTEM, "content": instructions},
+		{"role": Role.USER, "content": user},
+	]
+
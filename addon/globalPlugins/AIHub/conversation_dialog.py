@@ -1,12 +1,9 @@
-import base64
 import ctypes
 import datetime
 import json
-import mimetypes
 import os
 import re
 import sys
-import tempfile
 import threading
 import time
 import winsound
@@ -27,11 +24,11 @@ from . import conversations
 from .audiohandlers import AudioHandlersMixin
 from .chatcompletion import CompletionThread
 from .historyhandlers import HistoryHandlersMixin
+from .model import getModels
 from .filehandlers import FileHandlersMixin
 from .modelhandlers_core import ModelHandlersMixin
 from .consts import (
-	ADDON_DIR, ADDON_LIBS_DIR, DATA_DIR, LIBS_BASE, TEMP_DIR, cleanup_temp_dir, stop_progress_sound,
-	ensure_temp_dir,
+	ADDON_DIR, ADDON_LIBS_DIR, DATA_DIR, LIBS_BASE, cleanup_temp_dir, stop_progress_sound,
 	ContentType,
 	Provider,
 	Role,
@@ -46,7 +43,11 @@ from .consts import (
 )
 from .history import HistoryBlock, TextSegment
 from .detached_branch import assistant_label_for_block
-from .imagehelper import encode_image, get_image_dimensions, resize_image
+from .audioutils import audio_part_cache
+from .imagehelper import get_image_dimensions, image_part_cache
+from .recognitionindex import recognition_index
+from .messagecache import block_fingerprint
+from .visiontokens import profile_for_model
 from .image_file import AttachmentFile, AttachmentFileTypes, get_display_size, URL_PATTERN
 from .recordthread import RecordThread, WhisperTranscription, AudioInputResult
 from .thread_shutdown import stop_worker_thread
@@ -863,6 +864,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		page.session_lazy_load = True
 		page.firstBlock = None
 		page.lastBlock = None
+		page.messageCache.clear()
 		page.previousPrompt = None
 		page.usageLedger = []
 		page.detachedBranch = None
@@ -901,6 +903,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		page.session_lazy_load = False
 		page.firstBlock = None
 		page.lastBlock = None
+		page.messageCache.clear()
 		page.previousPrompt = None
 		page.usageLedger = []
 		page.detachedBranch = None
@@ -937,11 +940,12 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self._captureEphemeralToPage(active)
 		self._captureConversationChromeToPage(active)
 		tab_entries = []
-		for i in range(self.notebook.GetPageCount()):
-			page = self.notebook.GetPage(i)
-			cid = self._persistPageConversation(page)
-			if cid:
-				tab_entries.append({"id": cid})
+		with conversations.batch():
+			for i in range(self.notebook.GetPageCount()):
+				page = self.notebook.GetPage(i)
+				cid = self._persistPageConversation(page)
+				if cid:
+					tab_entries.append({"id": cid})
 		try:
 			if tab_entries:
 				conversations.write_hub_session_snapshot(tabs=tab_entries)
@@ -1207,7 +1211,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		p0 = self.get_active_page()
 		if p0.filesList:
 			p0.promptTextCtrl.SetValue(
-				self.getDefaultFilesDescriptionPrompt()
+				self.getDefaultFilesDescriptionPrompt(p0.filesList)
 			)
 		self.updateFilesList()
 		self.updateAudioList()
@@ -1363,8 +1367,16 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		)
 		self.toolsBtn.Bind(wx.EVT_BUTTON, self.onProviderTools)
 
+		self.compareBtn = wx.Button(
+			content_panel,
+			# Translators: Button sending the prompt to several models at once to compare their answers.
+			label=_("Co&mpare models...")
+		)
+		self.compareBtn.Bind(wx.EVT_BUTTON, self.onCompareModels)
+
 		for btn in (
 			self.toolsBtn,
+			self.compareBtn,
 		):
 			buttonsSizer.Add(btn, 0, wx.ALL, UI_SECTION_SPACING_PX)
 		mainSizer.Add(buttonsSizer, 0, wx.ALL, UI_SECTION_SPACING_PX)
@@ -1670,6 +1682,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self._clearMessagesSegments()
 		self.firstBlock = None
 		self.lastBlock = None
+		active_pg.messageCache.clear()
 		system = data.get("system", "")
 		if system and self.conf["saveSystem"]:
 			self.systemTextCtrl.ChangeValue(system)
@@ -1738,6 +1751,56 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 			self._scheduleFocusMessageHistory()
 		if self.get_active_page() is active_pg:
 			self._syncEphemeralChromeFromPage(active_pg)
+		# Deferred so the conversation's model and account are selected first.
+		wx.CallAfter(self._prewarmPromptCache, active_pg)
+
+	def _prewarmPromptCache(self, page):
+		"""Write the Anthropic prompt cache for a just-loaded conversation (opt-in).
+
+		The history is sent once with a one-token reply so that the user's first
+		question reads the cached prefix. Breakpoints on history messages only
+		carry over when extended thinking is off; the system prompt is reused
+		either way.
+		"""
+		caching = self.conf["promptCaching"]
+		if not (caching["anthropic"] and caching["prewarmOnLoad"]):
+			return
+		if self.get_active_page() is not page or self.firstBlock is None or self.worker:
+			return
+		model = self.getCurrentModel()
+		if model is None or model.provider != Provider.Anthropic:
+			return
+		account = self.getCurrentAccount()
+		account_id = account.get("id") if account and account.get("provider") == model.provider else None
+		system = self.systemTextCtrl.GetValue().strip()
+		client = configure_client_for_provider(self.client, model.provider, account_id=account_id, clone=True)
+
+		def _run():
+			# Built here, not on the UI thread: history images are resized and encoded.
+			messages = [{"role": Role.SYSTEM, "content": system}] if system else []
+			try:
+				self.getMessages(messages, page=page)
+			except Exception:
+				log.debug("Prompt cache pre-warm: could not build history", exc_info=True)
+				return
+			try:
+				usage = client.anthropic_prewarm_prompt_cache(model=model.id, messages=messages)
+			except Exception as err:
+				log.debug("Prompt cache pre-warm failed for %s: %s", model.id, err)
+				return
+			wx.CallAfter(self._recordPrewarmUsage, page, model.id, usage)
+
+		threading.Thread(target=_run, name="AIHubPromptCachePrewarm", daemon=True).start()
+
+	def _recordPrewarmUsage(self, page, model_id, usage):
+		from .usage_ledger import USAGE_KIND_CACHE_PREWARM, append_usage_event
+
+		if self.conf.get("debug", False):
+			log.info("Prompt cache pre-warm for %s: %s", model_id, usage)
+		ledger = getattr(page, "usageLedger", None)
+		if not isinstance(ledger, list):
+			page.usageLedger = ledger = []
+		append_usage_event(ledger, usage=usage, model=model_id, kind=USAGE_KIND_CACHE_PREWARM)
 
 	def _getBlocksForSave(self):
 		"""Collect all blocks from firstBlock to lastBlock for saving."""
@@ -1917,8 +1980,10 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 
 		submit_files = regenerate_block.filesList if regenerate_block else self.filesList
 		submit_audio = regenerate_block.audioPathList if regenerate_block else self.audioPathList
+		# Compare targets were filtered for attachment support when they were picked.
+		comparing = bool(getattr(self, "_compareTargets", None)) and not regenerate_block
 		ok, validation_message = self.validateAttachmentsForProvider(provider=model.provider, filesList=submit_files or [])
-		if not ok:
+		if not ok and not comparing:
 			gui.messageBox(
 				validation_message,
 				# Translators: Title for unsupported-attachments validation error.
@@ -1929,7 +1994,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 				page._regenerateBlock = None
 			return
 
-		if not model.vision and submit_files:
+		if not model.vision and submit_files and not comparing:
 			visionModels = [m.id for m in self._models if m.vision]
 			gui.messageBox(
 				# Translators: Error text when current model cannot process image attachments.
@@ -1947,7 +2012,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 			if regenerate_block:
 				page._regenerateBlock = None
 			return
-		if submit_audio and not getattr(model, "audioInput", False):
+		if submit_audio and not getattr(model, "audioInput", False) and not comparing:
 			audioModels = [m.id for m in self._models if getattr(m, "audioInput", False)]
 			gui.messageBox(
 				# Translators: Error text when current model cannot process audio attachments.
@@ -1996,9 +2061,128 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		page.conversationAccountKey = account["key"]
 		self._worker_page = page
 		page.stopRequest = threading.Event()
-		page.worker = CompletionThread(self)
+		compare_targets = getattr(self, "_compareTargets", None)
+		self._compareTargets = None
+		page.worker = CompletionThread(self, compareTargets=None if regenerate_block else compare_targets)
 		page.worker.start()
 
+	def _compareAccounts(self, has_files: bool) -> list:
+		"""Ready accounts whose provider accepts the pending attachments."""
+		if not getattr(self, "_accounts", None):
+			self._loadAccounts()
+		provider_ok = {}
+		accounts = []
+		for account in self._accounts:
+			provider = account["provider"]
+			if provider not in provider_ok:
+				provider_ok[provider] = not has_files or self.validateAttachmentsForProvider(
+					provider=provider, filesList=self.filesList
+				)[0]
+			if provider_ok[provider]:
+				accounts.append(account)
+		return accounts
+
+	def _compareCandidates(self, accounts, has_files: bool, has_audio: bool) -> list:
+		"""``(label, model, account)`` for every model of ``accounts`` usable with the pending prompt.
+
+		Listing an account's models may query its provider; runs on a worker thread.
+		"""
+		candidates = []
+		for account in accounts:
+			try:
+				models = getModels(account["provider"], account_id=account.get("id"))
+			except Exception as err:
+				log.warning("Compare: could not list models for %s: %s", account.get("key"), err)
+				continue
+			for model in models:
+				# Audio replies are played back, which makes no sense for several models at once.
+				if getattr(model, "audioOutput", False):
+					continue
+				if has_files and not model.vision:
+					continue
+				if has_audio and not getattr(model, "audioInput", False):
+					continue
+				label = f"{self._accountLabel(account)}: {model.name or model.id}"
+				candidates.append((label, model, account))
+		return candidates
+
+	def onCompareModels(self, evt):
+		"""Send the current prompt to several models at once, each answer in its own message."""
+		if self.worker or getattr(self, "_compareLoading", False):
+			return
+		if not self.promptTextCtrl.GetValue().strip() and not self.filesList and not self.audioPathList:
+			self.promptTextCtrl.SetFocus()
+			return
+		has_files = bool(self.filesList)
+		has_audio = bool(self.audioPathList)
+		accounts = self._compareAccounts(has_files)
+		self._compareLoading = True
+		# Translators: Spoken while the models that can answer a comparison are being listed.
+		self.message(_("Loading models..."))
+
+		def _run():
+			try:
+				candidates = self._compareCandidates(accounts, has_files, has_audio)
+			except Exception:
+				log.error("Compare: could not list the candidate models", exc_info=True)
+				candidates = []
+			wx.CallAfter(self._onCompareCandidates, candidates)
+
+		threading.Thread(target=_run, name="AIHubCompareModels", daemon=True).start()
+
+	def _onCompareCandidates(self, candidates):
+		if not self:
+			return
+		self._compareLoading = False
+		if self.worker:
+			return
+		if len(candidates) < 2:
+			gui.messageBox(
+				# Translators: Error when fewer than two models can take part in a comparison.
+				_("At least two models compatible with this prompt are needed to compare answers."),
+				# Translators: Title of the compare models dialog.
+				_("Compare models"),
+				wx.OK | wx.ICON_ERROR
+			)
+			return
+		dlg = wx.MultiChoiceDialog(
+			self,
+			# Translators: Message of the dialog choosing which models answer the same prompt.
+			_("Select the models that should answer this prompt:"),
+			# Translators: Title of the compare models dialog.
+			_("Compare models"),
+			[label for label, _model, _account in candidates],
+		)
+		current = self.getCurrentModel()
+		current_account = self.getCurrentAccount()
+		preselect = [
+			i for i, (_label, model, account) in enumerate(candidates)
+			if current is not None and current_account is not None
+			and model.id == current.id and account["key"] == current_account["key"]
+		]
+		dlg.SetSelections(preselect)
+		try:
+			if dlg.ShowModal() != wx.ID_OK:
+				return
+			selections = dlg.GetSelections()
+		finally:
+			dlg.Destroy()
+		if len(selections) < 2:
+			gui.messageBox(
+				# Translators: Error when the user selected fewer than two models to compare.
+				_("Select at least two models to compare."),
+				# Translators: Title of the compare models dialog.
+				_("Compare models"),
+				wx.OK | wx.ICON_ERROR
+			)
+			return
+		self._compareTargets = [(candidates[i][1], candidates[i][2]) for i in selections]
+		try:
+			self.onSubmit(None)
+		finally:
+			# Consumed by _onSubmitImpl; never let it leak into the next plain submit.
+			self._compareTargets = None
+
 	def onCancel(self, evt):
 		stop_progress_sound()  # Stop all sounds (progress, etc.) first
 		global addToSession, activeChatDlg
@@ -2056,6 +2240,18 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self.timer.Stop()
 		self.Destroy()
 
+	def _recordRecognitionResponse(self, block=None):
+		"""Remember the answer as the description of the screenshots it was about.
+
+		``block`` defaults to the last block of the page the request ran on; the
+		active tab may be another conversation by the time the answer arrives.
+		"""
+		if block is None:
+			page = getattr(self, "_result_snapshot_page", None)
+			block = page.lastBlock if page is not None else None
+		if block is not None and block.filesList:
+			recognition_index.record_response(block.filesList, block.responseText)
+
 	def OnResult(self, event):
 		stop_progress_sound()
 		is_success = (
@@ -2068,6 +2264,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self._result_snapshot_page = getattr(self, "_worker_page", None)
 		try:
 			if not event.data:
+				self._recordRecognitionResponse()
 				self._autoSaveConversation()
 				if getattr(self, "_askQuestionDeferred", False):
 					self._askQuestionDeferred = False
@@ -2131,6 +2328,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 					self.lastBlock = historyBlock
 				self.previousPrompt = self.promptTextCtrl.GetValue()
 				self.promptTextCtrl.Clear()
+				self._recordRecognitionResponse(historyBlock)
 				self._autoSaveConversation()
 				if getattr(self, "_askQuestionDeferred", False):
 					self._askQuestionDeferred = False
@@ -2231,19 +2429,23 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 						if tlist and any(t for t in tlist):
 							prompt_text = "\n".join(t for t in tlist if t).strip()
 					block.segmentPrompt = TextSegment(self.messagesTextCtrl, (prompt_text or "") + "\n", block)
-					# Translators: Prefix shown before assistant response in streaming history updates.
-					# Translators: Prefix shown before assistant response in streaming history updates.
-					block.segmentResponseLabel = TextSegment(self.messagesTextCtrl, _("Assistant:") + ' ', block)
+					assistant_label = assistant_label_for_block(
+						self._conversation_scope(),
+						block,
+						# Translators: Prefix shown before assistant response in streaming history updates.
+						default_label=_("Assistant:") + ' ',
+					)
+					block.segmentResponseLabel = TextSegment(self.messagesTextCtrl, assistant_label, block)
 					block.displayHeader = False
 					# Position the caret just after the "Assistant:" label synchronously, before the
 					# first token is appended, so the latest reply reads from the start of its content.
 					self._move_caret_to_assistant_content_impl(block)
-			l = len(block.responseText)
+			l = block.responseLen()
 			if block.lastLen == 0 and l > 0:
 				block.responseText = block.responseText.lstrip()
-				l = len(block.responseText)
+				l = block.responseLen()
 			if l > block.lastLen:
-				newText = block.responseText[block.lastLen:]
+				newText = block.responseSince(block.lastLen)
 				first_assistant_content = block.lastLen == 0 and bool(newText.strip())
 				block.lastLen = l
 				if first_assistant_content:
@@ -2271,10 +2473,10 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 							pass
 					self._move_caret_to_assistant_content(block)
 					self._schedule_focus_message_history_on_assistant_response(ip_after_label)
-			reasoning_len = len(block.reasoningText or "")
+			reasoning_len = block.reasoningLen()
 			last_reasoning_len = getattr(block, "lastReasoningLen", 0)
 			if self._showThinkingInHistory and reasoning_len > last_reasoning_len:
-				reasoning_delta = (block.reasoningText or "")[last_reasoning_len:]
+				reasoning_delta = block.reasoningSince(last_reasoning_len)
 				if block.segmentReasoning is not None:
 					block.segmentReasoning.appendText(reasoning_delta)
 				elif not (block.responseText or "").strip():
@@ -2355,6 +2557,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		accelEntries = []
 		self.addEntry(accelEntries, wx.ACCEL_CTRL, wx.WXK_UP, self.onPreviousPrompt)
 		self.addEntry(accelEntries, wx.ACCEL_CTRL, ord("r"), self.onRecord)
+		self.addEntry(accelEntries, wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord("E"), self.onEstimateRequest)
 		accelTable = wx.AcceleratorTable(accelEntries)
 		page.promptTextCtrl.SetAcceleratorTable(accelTable)
 
@@ -2368,6 +2571,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self.addEntry(accelEntries, wx.ACCEL_CTRL, ord("u"), self.onFileDescriptionFromURL)
 		self.addEntry(accelEntries, wx.ACCEL_CTRL, ord("e"), self.onFileDescriptionFromScreenshot)
 		self.addEntry(accelEntries, wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord("T"), self.onProviderTools)
+		self.addEntry(accelEntries, wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord("M"), self.onCompareModels)
 		self.addEntry(accelEntries, wx.ACCEL_CTRL, ord("W"), self._onCloseConversationTab)
 		accelTable = wx.AcceleratorTable(accelEntries)
 		self.SetAcceleratorTable(accelTable)
@@ -2378,7 +2582,6 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		prompt: str = None
 	) -> list:
 		"""Build OpenAI-style content parts (image_url / input_file) for the given attachments."""
-		conf = self.conf
 		if not filesList:
 			filesList = self.filesList
 		parts = []
@@ -2387,6 +2590,12 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 				"type": ContentType.TEXT,
 				"text": prompt
 			})
+		# Cached per (path, mtime, size, resize settings): history images are
+		# only resized and base64-encoded once, not on every turn. Screenshots
+		# still in memory are encoded from the capture, without a file round-trip.
+		# Local images are prepared in parallel, then placed in attachment order.
+		local_images = [a.source for a in filesList if a.type == AttachmentFileTypes.IMAGE_LOCAL]
+		data_urls = iter(image_part_cache.get_data_urls(local_images, **self._imagePartSettings()))
 		for attachment in filesList:
 			path = attachment.path
 			if attachment.type == AttachmentFileTypes.IMAGE_URL:
@@ -2394,25 +2603,9 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 			elif attachment.type == AttachmentFileTypes.DOCUMENT_URL:
 				parts.append({"type": ContentType.INPUT_FILE, "file_url": path, "filename": attachment.name})
 			elif attachment.type == AttachmentFileTypes.IMAGE_LOCAL:
-				if conf["images"]["resize"]:
-					ensure_temp_dir()
-					fd, path_resized_image = tempfile.mkstemp(suffix=".jpg", dir=TEMP_DIR)
-					os.close(fd)
-					if resize_image(
-						path,
-						max_width=conf["images"]["maxWidth"],
-						max_height=conf["images"]["maxHeight"],
-						quality=conf["images"]["quality"],
-						target=path_resized_image
-					):
-						path = path_resized_image
-				base64_image = encode_image(path)
-				mime_type, _ = mimetypes.guess_type(path)
 				parts.append({
 					"type": ContentType.IMAGE_URL,
-					"image_url": {
-						"url": f"data:{mime_type};base64,{base64_image}"
-					}
+					"image_url": {"url": next(data_urls)}
 				})
 			elif attachment.type == AttachmentFileTypes.DOCUMENT_LOCAL:
 				parts.append({
@@ -2424,8 +2617,28 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 				raise ValueError(f"Invalid attachment type for {path}")
 		return parts
 
-	def getAudioContent(self, audioPaths=None, prompt=None):
-		"""Build input_audio content for audio-capable models."""
+	def _imagePartSettings(self) -> dict:
+		"""Keyword arguments of ``image_part_cache.get_data_url`` for the settings and current model."""
+		images_conf = self.conf["images"]
+		settings = {
+			"resize": bool(images_conf["resize"]),
+			"max_width": images_conf["maxWidth"],
+			"max_height": images_conf["maxHeight"],
+			"quality": images_conf["quality"],
+		}
+		if images_conf["optimizeForModel"]:
+			profile = profile_for_model(self.getCurrentModel())
+			if profile is not None:
+				settings["vision_profile"] = profile
+				settings["min_scale"] = images_conf["optimizeMinScale"] / 100
+		return settings
+
+	def getAudioContent(self, audioPaths=None, prompt=None, downsample=False):
+		"""Build input_audio content for audio-capable models.
+
+		Payloads come from ``audio_part_cache`` (encoded once per file hash);
+		with ``downsample``, WAV files are sent as 16 kHz mono.
+		"""
 		audioPaths = audioPaths or self.audioPathList
 		if not audioPaths:
 			return []
@@ -2438,57 +2651,143 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 				continue
 			ext = os.path.splitext(path_str)[1].lower()
 			fmt = AUDIO_EXT_TO_FORMAT.get(ext, "wav")
-			with open(path_str, "rb") as f:
-				data_b64 = base64.b64encode(f.read()).decode("utf-8")
+			data_b64 = audio_part_cache.get_data(path_str, downsample=downsample)
 			content.append({
 				"type": ContentType.INPUT_AUDIO,
 				"input_audio": {"data": data_b64, "format": fmt}
 			})
 		return content
 
+	def _estimateAttachmentParts(self, filesList=None, audioPaths=None) -> list:
+		"""Content parts standing in for attachments in size estimates; nothing is read or encoded."""
+		parts = []
+		for attachment in filesList or []:
+			if attachment.type in (AttachmentFileTypes.IMAGE_LOCAL, AttachmentFileTypes.IMAGE_URL):
+				parts.append({"type": ContentType.IMAGE_URL})
+			elif attachment.type == AttachmentFileTypes.DOCUMENT_LOCAL:
+				parts.append({"type": ContentType.INPUT_FILE, "file_path": attachment.path})
+			elif attachment.type == AttachmentFileTypes.DOCUMENT_URL:
+				parts.append({"type": ContentType.INPUT_FILE})
+		for path in audioPaths or []:
+			path_str = path if isinstance(path, str) else getattr(path, "path", str(path))
+			parts.append({"type": ContentType.INPUT_AUDIO, "input_audio": {"file_path": path_str}})
+		return parts
+
 	def getMessages(
 		self,
 		messages: list,
 		*,
 		until_block=None,
+		estimate_only=False,
+		page=None,
 	):
 		"""Append chat history blocks to ``messages``.
 
 		When ``until_block`` is set, include every prior turn (user + assistant) and
 		only the user turn for ``until_block`` (no assistant reply), then stop.
+		Of a run of compare-mode blocks answering the same prompt, only the last
+		one is sent back as context. With ``estimate_only``, attachments are
+		replaced by the lightweight parts of ``_estimateAttachmentParts``.
+		Messages of unchanged blocks come from the page's ``messageCache``;
+		only blocks added or changed since the previous call are built.
+		``page`` walks that page instead of the current one (for callers on
+		a worker thread, where the active page can change meanwhile).
 		"""
-		block = self.firstBlock
+		scope = page if page is not None else self._conversation_scope()
+		cache = getattr(scope, "messageCache", None)
+		if cache is None:
+			self._walkBlockMessages(messages, scope, None, until_block, estimate_only)
+			return
+		# Walks from the request worker and the prompt cache pre-warm may overlap.
+		with cache.lock:
+			self._walkBlockMessages(messages, scope, cache, until_block, estimate_only)
+
+	def _walkBlockMessages(self, messages, scope, cache, until_block, estimate_only):
+		"""The ``getMessages`` walk over the blocks of ``scope``."""
+		if estimate_only:
+			mode, settings = "estimate", None
+		else:
+			mode = "wire"
+			settings = (
+				tuple((key, getattr(value, "name", value)) for key, value in self._imagePartSettings().items()),
+				bool(self.conf["audio"]["downsampleHistory"]),
+			)
+		if cache is not None:
+			cache.begin(mode, settings)
+		position = 0
+		block = scope.firstBlock
 		while block:
-			userContent = []
-			if block.filesList or getattr(block, "audioPathList", None):
-				if block.prompt:
-					userContent.append({"type": ContentType.TEXT, "text": block.prompt})
-				if block.filesList:
-					userContent.extend(self.getFilesContent(block.filesList, prompt=None))
-				if getattr(block, "audioPathList", None):
-					tlist = getattr(block, "audioTranscriptList", None)
-					if tlist is not None and len(tlist) == len(block.audioPathList) and any(t for t in tlist):
-						for t in tlist:
-							if t:
-								userContent.append({"type": ContentType.TEXT, "text": t})
-					else:
-						userContent.extend(self.getAudioContent(block.audioPathList, prompt=None))
-			elif block.prompt:
-				userContent = block.prompt
-			if userContent:
-				messages.append({
-					"role": Role.USER,
-					"content": userContent
-				})
+			group = getattr(block, "compareGroup", None)
+			if (
+				group
+				and block is not until_block
+				and block.next is not None
+				and getattr(block.next, "compareGroup", None) == group
+			):
+				block = block.next
+				continue
 			stop_after = until_block is not None and block is until_block
-			if not stop_after and block.responseText:
-				messages.append({
-					"role": Role.ASSISTANT,
-					"content": block.responseText
-				})
+			if cache is None:
+				built = self._buildBlockMessages(block, user_only=stop_after, estimate_only=estimate_only)
+			else:
+				built = cache.messages_for(
+					mode,
+					position,
+					block,
+					block_fingerprint(block, user_only=stop_after),
+					lambda: self._buildBlockMessages(block, user_only=stop_after, estimate_only=estimate_only),
+				)
+			messages.extend(built)
+			position += 1
 			if stop_after:
 				break
 			block = block.next
+		else:
+			if cache is not None:
+				cache.end(mode, position)
+
+	def _buildBlockMessages(self, block, *, user_only=False, estimate_only=False) -> list:
+		"""The user (and, unless ``user_only``, assistant) messages of one history block."""
+		messages = []
+		userContent = []
+		if block.filesList or getattr(block, "audioPathList", None):
+			if block.prompt:
+				userContent.append({"type": ContentType.TEXT, "text": block.prompt})
+			if block.filesList:
+				if estimate_only:
+					userContent.extend(self._estimateAttachmentParts(block.filesList))
+				else:
+					userContent.extend(self.getFilesContent(block.filesList, prompt=None))
+			if getattr(block, "audioPathList", None):
+				# Recordings with a transcript go as text, the others as audio.
+				tlist = getattr(block, "audioTranscriptList", None) or []
+				if len(tlist) != len(block.audioPathList):
+					tlist = [""] * len(block.audioPathList)
+				for t in tlist:
+					if t:
+						userContent.append({"type": ContentType.TEXT, "text": t})
+				untranscribed = [path for path, t in zip(block.audioPathList, tlist) if not t]
+				if untranscribed and estimate_only:
+					userContent.extend(self._estimateAttachmentParts(audioPaths=untranscribed))
+				elif untranscribed:
+					userContent.extend(self.getAudioContent(
+						untranscribed,
+						prompt=None,
+						downsample=self.conf["audio"]["downsampleHistory"],
+					))
+		elif block.prompt:
+			userContent = block.prompt
+		if userContent:
+			messages.append({
+				"role": Role.USER,
+				"content": userContent
+			})
+		if not user_only and block.responseText:
+			messages.append({
+				"role": Role.ASSISTANT,
+				"content": block.responseText
+			})
+		return messages
 
 	def onSetFocus(self, evt):
 		global activeChatDlg
@@ -2770,6 +3069,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self.closeBtn.Disable()
 		self.toolbarCloseBtn.Disable()
 		self.toolsBtn.Disable()
+		self.compareBtn.Disable()
 		if hasattr(self, "_generation_chrome"):
 			self._generation_chrome.disable_all()
 		self.maxTokensSpinCtrl.Disable()
@@ -2815,6 +3115,7 @@ class ConversationDialog(ModelHandlersMixin, AttachmentListUIMixin, FileHandlers
 		self.closeBtn.Enable()
 		self.toolbarCloseBtn.Enable()
 		self.toolsBtn.Enable()
+		self.compareBtn.Enable()
 		try:
 			model = self.getCurrentModel()
 			if model:
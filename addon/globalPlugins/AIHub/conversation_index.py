@@ -0,0 +1,259 @@
+"""``index.json`` held in memory, written back atomically and in batches.
+
+The index lists every saved conversation with what the history list shows
+(name, dates, format, summary). It used to be read, parsed and rewritten by
+every save, rename and delete, so closing the hub with several tabs, or
+deleting many conversations, rewrote it once per conversation.
+
+``ConversationIndex`` reads the file once per process and keeps its entries
+in a dict updated in place. Each change marks the index dirty and writes it
+right away, except inside ``begin``/``end`` (``conversations.batch``), where
+changes are coalesced and written once when the outermost batch ends.
+
+Writes go to a temporary file renamed over the index. Several NVDA instances
+(portable and installed copies) can share the data directory: a write holds
+``index.json.lock`` and, when the file changed since it was last read,
+reloads it and applies this process's pending changes on top instead of
+overwriting the other instance's. Reads notice such changes from the file's
+``(mtime, size)`` and reload too.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from logHandler import log
+
+try:
+	import msvcrt
+except ImportError:  # not Windows
+	msvcrt = None
+	import fcntl
+
+INDEX_VERSION = 1
+LOCK_SUFFIX = ".lock"
+# Seconds to wait for another instance to release the lock before writing anyway.
+LOCK_TIMEOUT = 5.0
+
+
+class FileLock:
+	"""Exclusive lock between processes on ``path``; the OS releases it if the holder dies."""
+
+	def __init__(self, path: str, timeout: float = LOCK_TIMEOUT):
+		self.path = path
+		self.timeout = timeout
+		self._file = None
+		self.locked = False
+
+	def __enter__(self):
+		self._file = open(self.path, "a+b")
+		deadline = time.monotonic() + self.timeout
+		while True:
+			try:
+				_lock_file(self._file)
+				self.locked = True
+				break
+			except OSError:
+				if time.monotonic() >= deadline:
+					# The replace below is still atomic; at worst a concurrent change is lost.
+					log.warning(f"conversations: {self.path} still locked after {self.timeout}s, writing anyway")
+					break
+				time.sleep(0.05)
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		try:
+			if self.locked:
+				_unlock_file(self._file)
+		finally:
+			self._file.close()
+			self._file = None
+			self.locked = False
+		return False
+
+
+def _lock_file(f) -> None:
+	if msvcrt is not None:
+		f.seek(0)
+		msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+	else:
+		fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock_file(f) -> None:
+	if msvcrt is not None:
+		f.seek(0)
+		msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+	else:
+		fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _file_signature(path: str):
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_mtime_ns, st.st_size)
+
+
+class ConversationIndex:
+	"""Entries of ``index.json`` by conversation id, kept in memory; every method is thread-safe."""
+
+	def __init__(self, path: str):
+		self.path = path
+		self._lock = threading.RLock()
+		self._loaded = False
+		self._extra: dict = {}
+		self._entries: dict[str, dict] = {}
+		# (mtime_ns, size) of the file as last read or written by this process.
+		self._signature = None
+		# Changes not written yet, re-applied over the file if another instance wrote it.
+		self._upserts: dict[str, dict] = {}
+		self._removals: set[str] = set()
+		self._replaced = False
+		self._depth = 0
+		self.dirty = False
+		self.reads = 0
+		self.writes = 0
+
+	def _read_file(self) -> None:
+		entries = {}
+		extra = {}
+		if os.path.exists(self.path):
+			try:
+				with open(self.path, "r", encoding="utf-8") as f:
+					data = json.load(f)
+				extra = {key: value for key, value in data.items() if key != "entries"}
+				for entry in data.get("entries") or []:
+					if isinstance(entry, dict) and entry.get("id"):
+						entries[entry["id"]] = entry
+			except Exception as err:
+				log.error(f"conversations: read index: {err}", exc_info=True)
+		self._signature = _file_signature(self.path)
+		self._extra = extra
+		self._entries = entries
+		self._loaded = True
+		self.reads += 1
+		if self._replaced:
+			self._entries = dict(self._upserts)
+			return
+		for conv_id in self._removals:
+			self._entries.pop(conv_id, None)
+		self._entries.update(self._upserts)
+
+	def _refresh(self) -> None:
+		"""Load the file on first use, and again when another process rewrote it."""
+		if not self._loaded or _file_signature(self.path) != self._signature:
+			self._read_file()
+
+	def entries(self) -> list[dict]:
+		"""Copies of all entries, in file order."""
+		with self._lock:
+			self._refresh()
+			return [dict(entry) for entry in self._entries.values()]
+
+	def get(self, conv_id: str) -> Optional[dict]:
+		with self._lock:
+			self._refresh()
+			entry = self._entries.get(conv_id)
+			return dict(entry) if entry is not None else None
+
+	def put(self, entry: dict) -> None:
+		"""Add or replace the entry of ``entry["id"]``."""
+		with self._lock:
+			self._refresh()
+			conv_id = entry["id"]
+			self._entries[conv_id] = entry
+			self._upserts[conv_id] = entry
+			self._removals.discard(conv_id)
+			self._changed()
+
+	def update(self, conv_id: str, **fields) -> bool:
+		"""Change some fields of an entry; False when there is none for ``conv_id``."""
+		with self._lock:
+			self._refresh()
+			entry = self._entries.get(conv_id)
+			if entry is None:
+				return False
+			self.put(dict(entry, **fields))
+			return True
+
+	def remove(self, conv_ids: Iterable[str]) -> None:
+		with self._lock:
+			self._refresh()
+			for conv_id in conv_ids:
+				self._entries.pop(conv_id, None)
+				self._upserts.pop(conv_id, None)
+				self._removals.add(conv_id)
+			self._changed()
+
+	def replace(self, entries: Iterable[dict]) -> None:
+		"""Make ``entries`` the whole index."""
+		with self._lock:
+			self._refresh()
+			self._entries = {entry["id"]: entry for entry in entries}
+			self._upserts = dict(self._entries)
+			self._removals.clear()
+			self._replaced = True
+			self._changed()
+
+	def begin(self) -> None:
+		"""Start a batch: changes are written when the outermost batch ends."""
+		with self._lock:
+			self._depth += 1
+
+	def end(self) -> None:
+		with self._lock:
+			self._depth -= 1
+			if self._depth > 0:
+				return
+			try:
+				self.flush()
+			except Exception:
+				# Kept dirty: the next change or batch retries the write.
+				pass
+
+	def _changed(self) -> None:
+		self.dirty = True
+		if self._depth == 0:
+			self.flush()
+
+	def flush(self) -> None:
+		"""Write the index if it has unwritten changes (raises when the write fails)."""
+		with self._lock:
+			if not self.dirty:
+				return
+			os.makedirs(os.path.dirname(self.path), exist_ok=True)
+			try:
+				with FileLock(self.path + LOCK_SUFFIX):
+					if _file_signature(self.path) != self._signature:
+						# Another instance wrote the index since we read it: start from its version.
+						self._read_file()
+					data = dict(self._extra)
+					data.setdefault("version", INDEX_VERSION)
+					data["entries"] = list(self._entries.values())
+					tmp_path = self.path + ".tmp"
+					with open(tmp_path, "w", encoding="utf-8") as f:
+						json.dump(data, f, indent=2, ensure_ascii=False)
+					os.replace(tmp_path, self.path)
+					self._signature = _file_signature(self.path)
+			except Exception as err:
+				log.error(f"conversations: write index: {err}", exc_info=True)
+				raise
+			self._upserts.clear()
+			self._removals.clear()
+			self._replaced = False
+			self.dirty = False
+			self.writes += 1
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"entries": len(self._entries),
+				"reads": self.reads,
+				"writes": self.writes,
+				"dirty": self.dirty,
+			}
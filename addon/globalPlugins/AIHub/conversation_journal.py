@@ -0,0 +1,287 @@
+"""Append-only journal of conversation saves.
+
+A saved conversation is a base snapshot, ``<id>.json`` (the format every
+reader already understands), plus ``<id>.journal``: one JSON line per save
+since the snapshot, holding the operations that turn the previous state into
+the new one. Autosave after a turn appends a line with the new block instead
+of rewriting the whole history, so its cost follows what changed, not the
+length of the conversation.
+
+Operations (``op`` key):
+
+* ``set`` / ``del``: a top-level field (name, system prompt, draft...) was
+  replaced or removed;
+* ``extend``: a top-level list grew at its end (the usage ledger);
+* ``add``: blocks were appended (a new turn);
+* ``edit``: the block at ``index`` was replaced (edited prompt, regenerated
+  or completed answer);
+* ``delete``: the block at ``index`` was removed;
+* ``truncate``: blocks from ``length`` on were dropped (a regenerate from an
+  earlier turn, followed by ``add``).
+
+Crash safety: each line is written in one call and fsynced; a torn last line
+is ignored on replay and cut off by the next append. Snapshots are written to
+a temporary file, fsynced and renamed over the base; they record the last
+journal line folded in (``journalSeq``), so lines up to it are skipped when a
+crash came between the rename and the trimming of the journal.
+``conversations`` compacts a conversation that way, in the background, once
+``COMPACT_AFTER`` lines have piled up.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Optional
+
+JOURNAL_SUFFIX = ".journal"
+# Journal lines after which the conversation is folded into a new snapshot.
+COMPACT_AFTER = 50
+# Key of the snapshot field naming the last journal line it includes.
+SEQ_KEY = "journalSeq"
+
+
+class JournalState:
+	"""Replayed content of a conversation and the position of its journal."""
+
+	__slots__ = ("data", "seq", "base_seq", "journal_size", "signature", "compacting")
+
+	def __init__(self, data: dict, seq: int, base_seq: int, journal_size: int, signature):
+		self.data = data
+		# Last journal line applied, and the last one included in the snapshot.
+		self.seq = seq
+		self.base_seq = base_seq
+		# Length of the valid part of the journal; a torn tail lies beyond it.
+		self.journal_size = journal_size
+		self.signature = signature
+		self.compacting = False
+
+	@property
+	def pending(self) -> int:
+		"""Journal lines not folded into the snapshot yet."""
+		return self.seq - self.base_seq
+
+
+def journal_path(base_path: str) -> str:
+	return os.path.splitext(base_path)[0] + JOURNAL_SUFFIX
+
+
+def signature(base_path: str):
+	"""``(mtime, size)`` of the snapshot and the journal; None when there is no snapshot."""
+	try:
+		st = os.stat(base_path)
+	except OSError:
+		return None
+	try:
+		jst = os.stat(journal_path(base_path))
+		journal = (jst.st_mtime_ns, jst.st_size)
+	except OSError:
+		journal = None
+	return (st.st_mtime_ns, st.st_size, journal)
+
+
+def read(base_path: str) -> JournalState:
+	"""Load the snapshot and replay the journal over it (raises like ``json.load`` on a bad snapshot)."""
+	sig = signature(base_path)
+	with open(base_path, "r", encoding="utf-8") as f:
+		data = json.load(f)
+	base_seq = _to_int(data.pop(SEQ_KEY, 0))
+	seq = base_seq
+	valid = 0
+	try:
+		with open(journal_path(base_path), "rb") as f:
+			for line in f:
+				if not line.endswith(b"\n"):
+					break
+				try:
+					record = json.loads(line)
+					line_seq = _to_int(record.get("seq"))
+					ops = record.get("ops") or []
+				except (ValueError, AttributeError):
+					break
+				valid += len(line)
+				if line_seq <= base_seq:
+					continue
+				apply(data, ops)
+				seq = line_seq
+	except FileNotFoundError:
+		pass
+	return JournalState(data, seq, base_seq, valid, sig)
+
+
+def apply(data: dict, ops: list) -> None:
+	"""Replay ``ops`` on ``data`` in place."""
+	blocks = data.get("blocks")
+	if not isinstance(blocks, list):
+		blocks = data["blocks"] = []
+	for op in ops:
+		kind = op.get("op")
+		if kind == "set":
+			data[op["key"]] = op.get("value")
+		elif kind == "del":
+			data.pop(op["key"], None)
+		elif kind == "extend":
+			current = data.get(op["key"])
+			data[op["key"]] = (current if isinstance(current, list) else []) + list(op.get("items") or [])
+		elif kind == "add":
+			blocks.extend(op.get("blocks") or [])
+		elif kind == "edit":
+			blocks[op["index"]] = op["block"]
+		elif kind == "delete":
+			del blocks[op["index"]]
+		elif kind == "truncate":
+			del blocks[op["length"]:]
+
+
+def diff(old: dict, new: dict) -> list:
+	"""Operations turning ``old`` into ``new`` (both conversation dicts)."""
+	ops = []
+	for key, value in new.items():
+		if key == "blocks":
+			continue
+		if key in old and old[key] == value:
+			continue
+		previous = old.get(key)
+		if (
+			isinstance(previous, list) and isinstance(value, list)
+			and len(value) > len(previous) and value[:len(previous)] == previous
+		):
+			ops.append({"op": "extend", "key": key, "items": value[len(previous):]})
+		else:
+			ops.append({"op": "set", "key": key, "value": value})
+	for key in old:
+		if key != "blocks" and key not in new:
+			ops.append({"op": "del", "key": key})
+	ops.extend(_diff_blocks(old.get("blocks") or [], new.get("blocks") or []))
+	return ops
+
+
+def _diff_blocks(old: list, new: list) -> list:
+	prefix = 0
+	limit = min(len(old), len(new))
+	while prefix < limit and old[prefix] == new[prefix]:
+		prefix += 1
+	old_tail = old[prefix:]
+	new_tail = new[prefix:]
+	if not old_tail:
+		return [{"op": "add", "blocks": new_tail}] if new_tail else []
+	old_ids = [block.get("id") for block in old_tail]
+	new_ids = [block.get("id") for block in new_tail]
+	if all(old_ids) and all(new_ids) and len(set(old_ids)) == len(old_ids) and len(set(new_ids)) == len(new_ids):
+		ops = []
+		kept = set(new_ids)
+		# Deletions from the end, so earlier indexes stay valid.
+		for i in range(len(old_ids) - 1, -1, -1):
+			if old_ids[i] not in kept:
+				ops.append({"op": "delete", "index": prefix + i})
+		remaining = [block for block in old_tail if block.get("id") in kept]
+		if [block.get("id") for block in remaining] == new_ids[:len(remaining)]:
+			for i, block in enumerate(remaining):
+				if block != new_tail[i]:
+					ops.append({"op": "edit", "index": prefix + i, "block": new_tail[i]})
+			if len(new_tail) > len(remaining):
+				ops.append({"op": "add", "blocks": new_tail[len(remaining):]})
+			return ops
+	ops = [{"op": "truncate", "length": prefix}]
+	if new_tail:
+		ops.append({"op": "add", "blocks": new_tail})
+	return ops
+
+
+def append(base_path: str, state: JournalState, ops: list) -> None:
+	"""Append one fsynced journal line with ``ops`` and apply it to ``state``.
+
+	``state.data`` gets the decoded line, exactly what a replay produces, and
+	never shares objects with the caller's. It is replaced, not modified, so a
+	compaction can keep writing the previous one.
+	"""
+	seq = state.seq + 1
+	text = json.dumps({"seq": seq, "ops": ops}, ensure_ascii=False, separators=(",", ":"))
+	line = (text + "\n").encode("utf-8")
+	path = journal_path(base_path)
+	mode = "r+b" if os.path.exists(path) else "wb"
+	with open(path, mode) as f:
+		# Drop a torn tail left by a crash before appending after it.
+		f.seek(state.journal_size)
+		f.truncate()
+		f.write(line)
+		f.flush()
+		os.fsync(f.fileno())
+	data = dict(state.data)
+	data["blocks"] = list(state.data.get("blocks") or [])
+	apply(data, json.loads(text)["ops"])
+	state.data = data
+	state.seq = seq
+	state.journal_size += len(line)
+	state.signature = signature(base_path)
+
+
+def write_snapshot(base_path: str, data: dict, seq: int = 0) -> None:
+	"""Write ``data`` as the snapshot including journal lines up to ``seq`` (atomic, fsynced)."""
+	commit_snapshot(prepare_snapshot(base_path, data, seq), base_path)
+
+
+def prepare_snapshot(base_path: str, data: dict, seq: int = 0, suffix: str = ".tmp") -> str:
+	"""Write and fsync the snapshot next to ``base_path``; returns the file for ``commit_snapshot``."""
+	payload = dict(data, **{SEQ_KEY: seq}) if seq else data
+	tmp_path = base_path + suffix
+	with open(tmp_path, "w", encoding="utf-8") as f:
+		json.dump(payload, f, indent=2, ensure_ascii=False)
+		f.flush()
+		os.fsync(f.fileno())
+	return tmp_path
+
+
+def commit_snapshot(tmp_path: str, base_path: str) -> None:
+	os.replace(tmp_path, base_path)
+
+
+def trim(base_path: str, state: JournalState, upto: int) -> None:
+	"""Drop journal lines up to ``upto`` (now in the snapshot); later lines are kept."""
+	path = journal_path(base_path)
+	kept = []
+	try:
+		with open(path, "rb") as f:
+			valid = f.read(state.journal_size)
+	except FileNotFoundError:
+		valid = b""
+	for line in valid.splitlines(keepends=True):
+		try:
+			if _to_int(json.loads(line).get("seq")) > upto:
+				kept.append(line)
+		except (ValueError, AttributeError):
+			break
+	if kept:
+		tmp_path = path + ".tmp"
+		with open(tmp_path, "wb") as f:
+			f.writelines(kept)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp_path, path)
+	else:
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+	state.base_seq = upto
+	state.journal_size = sum(len(line) for line in kept)
+	state.signature = signature(base_path)
+
+
+def remove(base_path: str) -> None:
+	"""Delete the journal of ``base_path`` (the snapshot is left alone)."""
+	for path in (journal_path(base_path), journal_path(base_path) + ".tmp"):
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+
+
+def needs_compaction(state: Optional[JournalState]) -> bool:
+	return state is not None and not state.compacting and state.pending >= COMPACT_AFTER
+
+
+def _to_int(value) -> int:
+	try:
+		return int(value or 0)
+	except (TypeError, ValueError):
+		return 0
@@ -5,6 +5,7 @@ import wx
 import addonHandler
 
 from .consts import UI_SECTION_SPACING_PX
+from .messagecache import MessageCache
 
 addonHandler.initTranslation()
 
@@ -47,6 +48,8 @@ class ConversationSessionPanel(wx.Panel):
 		self.stopRequest = None
 		self.firstBlock = None
 		self.lastBlock = None
+		# Built history messages per block; see messagecache.
+		self.messageCache = MessageCache()
 		# Per-tab "Files" attachment list (images + documents). The on-disk JSON
 		# key is still ``pathList`` for backward compatibility, but the in-code
 		# attribute uses the neutral ``filesList`` name.
@@ -140,11 +143,14 @@ class ConversationSessionPanel(wx.Panel):
 		self.filesListCtrl.InsertColumn(3, _("Dimensions"))
 		# Translators: AI-Hub conversation tab (one notebook page): read-only explanatory line next to controls.
 		self.filesListCtrl.InsertColumn(4, _("description"))
+		# Translators: AI-Hub conversation tab (one notebook page): column title for the image tokens the selected model is expected to bill.
+		self.filesListCtrl.InsertColumn(5, _("Tokens"))
 		self.filesListCtrl.SetColumnWidth(0, 100)
 		self.filesListCtrl.SetColumnWidth(1, 200)
 		self.filesListCtrl.SetColumnWidth(2, 100)
 		self.filesListCtrl.SetColumnWidth(3, 100)
 		self.filesListCtrl.SetColumnWidth(4, 200)
+		self.filesListCtrl.SetColumnWidth(5, 80)
 		att_sz.Add(self.filesLabel, 0, wx.LEFT | wx.RIGHT | wx.TOP, UI_SECTION_SPACING_PX)
 		att_sz.Add(self.filesListCtrl, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, UI_SECTION_SPACING_PX)
 		self.filesListCtrl.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, host.onFilesListContextMenu)
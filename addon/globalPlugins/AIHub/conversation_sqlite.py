@@ -0,0 +1,444 @@
+"""SQLite storage of conversations, with a full-text index of what was said.
+
+An optional alternative to the JSON files of ``conversations`` (selected in
+the settings), behind the same module API. One database, ``conversations.db``
+next to the JSON directory:
+
+* ``conversations``: one row per conversation, with the list columns (name,
+  dates, format), the history-list ``summary`` and the remaining top-level
+  fields (system prompt, draft, ledger...) as JSON;
+* ``blocks``: one row per block, in order, with its prompt (plus audio
+  transcripts), response and reasoning as columns and the whole block dict
+  as JSON;
+* ``blocks_fts``: an FTS5 index over those three columns, kept in sync by
+  triggers, so a content search is an index lookup instead of opening every
+  conversation. Without FTS5 in the bundled SQLite, searches fall back to
+  ``LIKE`` scans of the same columns.
+
+A save writes the conversation row and only the blocks whose JSON changed
+(an added turn is one insert), in one transaction. The database uses WAL
+journaling: a crash loses at most the last transactions, never consistency.
+Copying between the JSON layout and the database is done by
+``conversations.migrate_storage``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+try:
+	import sqlite3
+except ImportError:  # Python built without the sqlite3 extension module
+	sqlite3 = None
+
+DB_FILENAME = "conversations.db"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+	key TEXT PRIMARY KEY,
+	value TEXT
+);
+CREATE TABLE IF NOT EXISTS conversations (
+	id TEXT PRIMARY KEY,
+	name TEXT NOT NULL DEFAULT '',
+	created INTEGER NOT NULL DEFAULT 0,
+	updated INTEGER NOT NULL DEFAULT 0,
+	format TEXT NOT NULL DEFAULT '',
+	revision INTEGER NOT NULL DEFAULT 1,
+	summary TEXT NOT NULL DEFAULT '{}',
+	fields TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS conversations_updated ON conversations(updated);
+CREATE TABLE IF NOT EXISTS blocks (
+	id INTEGER PRIMARY KEY,
+	conv_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+	position INTEGER NOT NULL,
+	prompt TEXT NOT NULL DEFAULT '',
+	response TEXT NOT NULL DEFAULT '',
+	reasoning TEXT NOT NULL DEFAULT '',
+	data TEXT NOT NULL,
+	UNIQUE (conv_id, position)
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS blocks_fts USING fts5(
+	prompt, response, reasoning,
+	content='blocks', content_rowid='id',
+	tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS blocks_fts_insert AFTER INSERT ON blocks BEGIN
+	INSERT INTO blocks_fts(rowid, prompt, response, reasoning)
+	VALUES (new.id, new.prompt, new.response, new.reasoning);
+END;
+CREATE TRIGGER IF NOT EXISTS blocks_fts_delete AFTER DELETE ON blocks BEGIN
+	INSERT INTO blocks_fts(blocks_fts, rowid, prompt, response, reasoning)
+	VALUES ('delete', old.id, old.prompt, old.response, old.reasoning);
+END;
+CREATE TRIGGER IF NOT EXISTS blocks_fts_update AFTER UPDATE OF prompt, response, reasoning ON blocks BEGIN
+	INSERT INTO blocks_fts(blocks_fts, rowid, prompt, response, reasoning)
+	VALUES ('delete', old.id, old.prompt, old.response, old.reasoning);
+	INSERT INTO blocks_fts(rowid, prompt, response, reasoning)
+	VALUES (new.id, new.prompt, new.response, new.reasoning);
+END;
+"""
+
+
+def available() -> bool:
+	"""Whether this Python has the sqlite3 module."""
+	return sqlite3 is not None
+
+
+def _dumps(value) -> str:
+	return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def block_text(block) -> tuple[str, str, str]:
+	"""Searchable ``(prompt, response, reasoning)`` of a block dict; transcripts count as prompt."""
+	if not isinstance(block, dict):
+		return "", "", ""
+	prompt = block.get("prompt") or ""
+	transcripts = [t for t in (block.get("audioTranscriptList") or []) if isinstance(t, str) and t]
+	if transcripts:
+		prompt = "\n".join([prompt] + transcripts if prompt else transcripts)
+	return str(prompt), str(block.get("responseText") or ""), str(block.get("reasoningText") or "")
+
+
+def _fts_phrase(term: str) -> str:
+	"""``term`` as an FTS5 prefix phrase: matches words starting like it, in order."""
+	return '"' + term.replace('"', '""') + '"*'
+
+
+def _like_pattern(term: str) -> str:
+	escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+	return f"%{escaped}%"
+
+
+class ConversationStore:
+	"""Conversations in one SQLite database; every method is thread-safe."""
+
+	def __init__(self, path: str):
+		if sqlite3 is None:
+			raise RuntimeError("sqlite3 is not available")
+		self.path = path
+		self._lock = threading.RLock()
+		self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute("PRAGMA synchronous=NORMAL")
+		self._conn.execute("PRAGMA foreign_keys=ON")
+		self._conn.executescript(_SCHEMA)
+		try:
+			self._conn.executescript(_FTS_SCHEMA)
+			self.fts = True
+		except sqlite3.OperationalError:
+			# SQLite compiled without FTS5: searches scan the block columns instead.
+			self.fts = False
+		self._conn.execute(
+			"INSERT OR IGNORE INTO meta(key, value) VALUES ('schema', ?)",
+			(str(SCHEMA_VERSION),),
+		)
+
+	def close(self) -> None:
+		with self._lock:
+			if self._conn is not None:
+				self._conn.close()
+				self._conn = None
+
+	def _transaction(self):
+		return _Transaction(self._conn)
+
+	def exists(self, conv_id: str) -> bool:
+		with self._lock:
+			row = self._conn.execute("SELECT 1 FROM conversations WHERE id=?", (conv_id,)).fetchone()
+		return row is not None
+
+	def revision(self, conv_id: str) -> Optional[int]:
+		"""Number bumped by every write of ``conv_id``; None when it is not stored."""
+		with self._lock:
+			row = self._conn.execute("SELECT revision FROM conversations WHERE id=?", (conv_id,)).fetchone()
+		return row[0] if row is not None else None
+
+	def count(self) -> int:
+		with self._lock:
+			return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+	def get(self, conv_id: str) -> Optional[dict]:
+		"""Conversation dict as the JSON layout stores it (a new object on every call)."""
+		with self._lock:
+			row = self._conn.execute("SELECT fields FROM conversations WHERE id=?", (conv_id,)).fetchone()
+			if row is None:
+				return None
+			blocks = self._conn.execute(
+				"SELECT data FROM blocks WHERE conv_id=? ORDER BY position", (conv_id,)
+			).fetchall()
+		data = json.loads(row[0])
+		data["blocks"] = [json.loads(text) for (text,) in blocks]
+		return data
+
+	def iter_data(self) -> Iterator[tuple[str, dict]]:
+		"""``(id, conversation dict)`` of every stored conversation."""
+		with self._lock:
+			ids = [conv_id for (conv_id,) in self._conn.execute("SELECT id FROM conversations")]
+		for conv_id in ids:
+			data = self.get(conv_id)
+			if data is not None:
+				yield conv_id, data
+
+	def list(self) -> list[dict]:
+		"""Index entries (id, name, created, updated, format, summary), newest first."""
+		with self._lock:
+			rows = self._conn.execute(
+				"SELECT id, name, created, updated, format, summary FROM conversations ORDER BY updated DESC"
+			).fetchall()
+		return [
+			{
+				"id": conv_id,
+				"name": name,
+				"created": created,
+				"updated": updated,
+				"format": conv_format,
+				"summary": json.loads(summary),
+			}
+			for conv_id, name, created, updated, conv_format, summary in rows
+		]
+
+	def put(self, conv_id: str, data: dict, summary: dict) -> None:
+		"""Store ``data`` (a conversation dict) as ``conv_id``; unchanged blocks are not rewritten."""
+		self.put_many([(conv_id, data, summary)])
+
+	def put_many(self, items: Iterable[tuple[str, dict, dict]]) -> None:
+		"""``put`` several conversations in one transaction."""
+		with self._lock, self._transaction():
+			for conv_id, data, summary in items:
+				self._put(conv_id, data, summary)
+
+	def _put(self, conv_id: str, data: dict, summary: dict) -> None:
+		conn = self._conn
+		fields = {key: value for key, value in data.items() if key != "blocks"}
+		conn.execute(
+			"INSERT INTO conversations(id, name, created, updated, format, summary, fields) "
+			"VALUES (?, ?, ?, ?, ?, ?, ?) "
+			"ON CONFLICT(id) DO UPDATE SET name=excluded.name, created=excluded.created, "
+			"updated=excluded.updated, format=excluded.format, revision=conversations.revision + 1, "
+			"summary=excluded.summary, fields=excluded.fields",
+			(
+				conv_id,
+				str(data.get("name") or ""),
+				int(data.get("created") or 0),
+				int(data.get("updated") or 0),
+				str(data.get("format") or ""),
+				_dumps(summary or {}),
+				_dumps(fields),
+			),
+		)
+		blocks = data.get("blocks") or []
+		stored = dict(conn.execute("SELECT position, data FROM blocks WHERE conv_id=?", (conv_id,)))
+		for position, block in enumerate(blocks):
+			text = _dumps(block)
+			previous = stored.get(position)
+			if previous == text:
+				continue
+			prompt, response, reasoning = block_text(block)
+			if previous is None:
+				conn.execute(
+					"INSERT INTO blocks(conv_id, position, prompt, response, reasoning, data) VALUES (?, ?, ?, ?, ?, ?)",
+					(conv_id, position, prompt, response, reasoning, text),
+				)
+			else:
+				conn.execute(
+					"UPDATE blocks SET prompt=?, response=?, reasoning=?, data=? WHERE conv_id=? AND position=?",
+					(prompt, response, reasoning, text, conv_id, position),
+				)
+		if len(stored) > len(blocks):
+			conn.execute("DELETE FROM blocks WHERE conv_id=? AND position>=?", (conv_id, len(blocks)))
+
+	def rename(self, conv_id: str, name: str, updated: int) -> bool:
+		with self._lock:
+			row = self._conn.execute("SELECT fields FROM conversations WHERE id=?", (conv_id,)).fetchone()
+			if row is None:
+				return False
+			fields = json.loads(row[0])
+			fields["name"] = name
+			fields["updated"] = updated
+			with self._transaction():
+				self._conn.execute(
+					"UPDATE conversations SET name=?, updated=?, revision=revision + 1, fields=? WHERE id=?",
+					(name, updated, _dumps(fields), conv_id),
+				)
+		return True
+
+	def delete(self, conv_id: str) -> bool:
+		with self._lock, self._transaction():
+			self._conn.execute("DELETE FROM blocks WHERE conv_id=?", (conv_id,))
+			cursor = self._conn.execute("DELETE FROM conversations WHERE id=?", (conv_id,))
+		return cursor.rowcount > 0
+
+	def search(self, terms: Iterable[str]) -> set[str]:
+		"""Ids of the conversations whose prompts, responses or reasoning contain every term.
+
+		A term matches words starting with it (a quoted term, a phrase); terms
+		may be found in different blocks.
+		"""
+		result = None
+		for term in terms:
+			term = (term or "").strip()
+			if not term:
+				continue
+			ids = self._search_term(term)
+			result = ids if result is None else result & ids
+			if not result:
+				break
+		return result if result is not None else set()
+
+	def _search_term(self, term: str) -> set[str]:
+		with self._lock:
+			if self.fts:
+				try:
+					rows = self._conn.execute(
+						"SELECT DISTINCT blocks.conv_id FROM blocks_fts "
+						"JOIN blocks ON blocks.id = blocks_fts.rowid WHERE blocks_fts MATCH ?",
+						(_fts_phrase(term),),
+					).fetchall()
+					if rows or any(ch.isalnum() for ch in term):
+						return {conv_id for (conv_id,) in rows}
+				except sqlite3.OperationalError:
+					pass
+			# No FTS5, or a term of punctuation only that the tokenizer drops.
+			pattern = _like_pattern(term)
+			rows = self._conn.execute(
+				"SELECT DISTINCT conv_id FROM blocks WHERE prompt LIKE ?1 ESCAPE '\\' "
+				"OR response LIKE ?1 ESCAPE '\\' OR reasoning LIKE ?1 ESCAPE '\\'",
+				(pattern,),
+			).fetchall()
+		return {conv_id for (conv_id,) in rows}
+
+
+class _Transaction:
+	"""``BEGIN IMMEDIATE`` ... ``COMMIT`` (``ROLLBACK`` on error) on an autocommit connection."""
+
+	def __init__(self, conn):
+		self._conn = conn
+
+	def __enter__(self):
+		self._conn.execute("BEGIN IMMEDIATE")
+		return self._conn
+
+	def __exit__(self, exc_type, exc, tb):
+		self._conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+		return False
+
+
+_WORDS = (
+	"alpha beta gamma delta error code python window focus speech braille review table list "
+	"image screen model token answer question summary network driver update install message "
+	"keyboard gesture volume printer document spreadsheet email browser"
+).split()
+_SYLLABLES = "ka lo mi ne ru sa ti vo be da fe gu ha ji ko".split()
+# Common words plus 3375 rarer made-up ones, for a realistic spread of search hits.
+_VOCABULARY = _WORDS * 20 + [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES]
+
+
+def _synthetic_conversation(rng: random.Random, index: int, turns: int) -> dict:
+	def sentence(words: int) -> str:
+		return " ".join(rng.choice(_VOCABULARY) for _ in range(words))
+
+	now = int(time.time()) - index
+	return {
+		"version": 1,
+		"id": f"bench-{index:06d}",
+		"name": sentence(4),
+		"created": now,
+		"updated": now,
+		"system": "",
+		"model": "bench-model",
+		"format": "generic",
+		"blocks": [
+			{
+				"id": f"b{index}-{turn}",
+				"prompt": sentence(20),
+				"responseText": sentence(120),
+				"reasoningText": sentence(30) if turn % 2 else "",
+				"model": "bench-model",
+				"pathList": [],
+				"audioPathList": [],
+				"audioTranscriptList": [],
+			}
+			for turn in range(turns)
+		],
+	}
+
+
+def benchmark(count: int = 10000, turns: int = 6, samples: int = 200, seed: int = 1) -> dict:
+	"""Time the store against a scan of the JSON layout on ``count`` synthetic conversations.
+
+	Runs in a temporary directory; returns seconds (and the database size)
+	per operation. ``json_scan_search`` is what a content search costs
+	without the database: opening and searching every conversation file.
+	"""
+	rng = random.Random(seed)
+	conversations = [_synthetic_conversation(rng, i, turns) for i in range(count)]
+	summary = {"messages": turns}
+	tmp_dir = tempfile.mkdtemp(prefix="aihub_sqlite_bench_")
+	results = {"conversations": count, "turns": turns, "fts": False}
+	try:
+		store = ConversationStore(os.path.join(tmp_dir, DB_FILENAME))
+		results["fts"] = store.fts
+		start = time.perf_counter()
+		store.put_many((data["id"], data, summary) for data in conversations)
+		results["bulk_import"] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		entries = store.list()
+		results["list"] = time.perf_counter() - start
+
+		picks = [rng.choice(conversations) for _ in range(samples)]
+		start = time.perf_counter()
+		for data in picks:
+			store.get(data["id"])
+		results["load_each"] = (time.perf_counter() - start) / samples
+
+		start = time.perf_counter()
+		for data in picks:
+			data["blocks"].append(dict(data["blocks"][0], id=f"{data['id']}-extra"))
+			data["updated"] += 1
+			store.put(data["id"], data, summary)
+		results["save_new_turn_each"] = (time.perf_counter() - start) / samples
+
+		queries = [rng.choice(_WORDS) for _ in range(5)] + [rng.choice(_VOCABULARY[len(_WORDS) * 20:]) for _ in range(5)]
+		start = time.perf_counter()
+		matched = [len(store.search([query])) for query in queries]
+		results["search_each"] = (time.perf_counter() - start) / len(queries)
+		results["search_hits"] = matched
+
+		for data in picks[: samples // 2]:
+			store.delete(data["id"])
+		results["remaining"] = store.count()
+		store.close()
+		results["db_bytes"] = os.path.getsize(os.path.join(tmp_dir, DB_FILENAME))
+
+		json_dir = os.path.join(tmp_dir, "json")
+		os.makedirs(json_dir)
+		for data in conversations:
+			with open(os.path.join(json_dir, f"{data['id']}.json"), "w", encoding="utf-8") as f:
+				json.dump(data, f, indent=2, ensure_ascii=False)
+		query = queries[-1]
+		start = time.perf_counter()
+		hits = 0
+		for name in os.listdir(json_dir):
+			with open(os.path.join(json_dir, name), "r", encoding="utf-8") as f:
+				data = json.load(f)
+			if any(query in " ".join(block_text(block)).lower() for block in data.get("blocks") or []):
+				hits += 1
+		results["json_scan_search"] = time.perf_counter() - start
+		results["json_scan_hits"] = hits
+		results["listed"] = len(entries)
+	finally:
+		shutil.rmtree(tmp_dir, ignore_errors=True)
+	return results
@@ -1,19 +1,25 @@
 """Conversation storage: save, load, list, rename, delete."""
 import base64
+import contextlib
+import copy
 import json
 import os
 import re
 import shutil
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from enum import StrEnum, auto
 
 import addonHandler
+import config
 from logHandler import log
 
+from . import conversation_index, conversation_journal, conversation_sqlite
 from .consts import DATA_DIR, ensure_dir_exists
 from .image_file import AttachmentFile
-from .mediastore import persist_local_file
+from .mediastore import media_refs, persist_local_file
 from .usage_ledger import (
 	CONVERSATION_JSON_VERSION,
 	conversation_json_version,
@@ -30,7 +36,9 @@ ATTACHMENTS_DIR = os.path.join(CONVERSATIONS_DIR, "attachments")
 INDEX_FILENAME = "index.json"
 INDEX_PATH = os.path.join(CONVERSATIONS_DIR, INDEX_FILENAME)
 DEFAULT_TITLE_LEN = 50
-INDEX_VERSION = 1
+SQLITE_PATH = os.path.join(DATA_DIR, conversation_sqlite.DB_FILENAME)
+STORAGE_JSON = "json"
+STORAGE_SQLITE = "sqlite"
 
 
 def _atomic_write_json(path: str, data):
@@ -40,6 +48,340 @@ def _atomic_write_json(path: str, data):
 	os.replace(tmp_path, path)
 
 
+# Replayed state of the conversations saved or loaded in this session, keyed by id
+# (see ``conversation_journal``). Guarded by ``_journal_lock``, as are their files.
+_journal_states: dict = {}
+_journal_lock = threading.RLock()
+
+
+def _journal_state(conv_id: str, path: str):
+	"""Cached ``JournalState`` of ``conv_id``, re-read when its files changed; None if not saved."""
+	signature = conversation_journal.signature(path)
+	if signature is None:
+		_journal_states.pop(conv_id, None)
+		return None
+	state = _journal_states.get(conv_id)
+	if state is None or state.signature != signature:
+		state = conversation_journal.read(path)
+		_journal_states[conv_id] = state
+	return state
+
+
+def _read_conversation_data(path: str, conv_id: str = "") -> dict:
+	"""Conversation JSON at ``path`` with its journal replayed. Callers must not modify it."""
+	with _journal_lock:
+		state = _journal_states.get(conv_id) if conv_id else None
+		if state is not None and state.signature == conversation_journal.signature(path):
+			return state.data
+	return conversation_journal.read(path).data
+
+
+def _compact_journal(conv_id: str, path: str, state) -> None:
+	"""Fold the journal of ``conv_id`` into a new snapshot (runs in a background thread)."""
+	try:
+		with _journal_lock:
+			data, seq = state.data, state.seq
+		tmp_path = conversation_journal.prepare_snapshot(path, data, seq, suffix=".compact.tmp")
+		with _journal_lock:
+			if _journal_states.get(conv_id) is not state or not os.path.isfile(path):
+				os.remove(tmp_path)
+				return
+			conversation_journal.commit_snapshot(tmp_path, path)
+			conversation_journal.trim(path, state, seq)
+	except Exception as err:
+		log.error(f"conversations: compact {conv_id}: {err}", exc_info=True)
+	finally:
+		state.compacting = False
+
+
+def _schedule_compaction(conv_id: str, path: str, state) -> None:
+	"""Start a background compaction when enough journal lines piled up. Holds ``_journal_lock``."""
+	if not conversation_journal.needs_compaction(state):
+		return
+	state.compacting = True
+	threading.Thread(
+		target=_compact_journal,
+		args=(conv_id, path, state),
+		name="AIHubConversationCompaction",
+		daemon=True,
+	).start()
+
+
+# SQLite store (see ``conversation_sqlite``), opened on first use when it is the configured
+# storage. ``_store_failed`` keeps a database that cannot be opened from being retried (and
+# logged) on every call; the JSON files are used instead, and ``FALLBACK_MARKER`` records it
+# so what was saved meanwhile is merged into the store when it opens again.
+FALLBACK_MARKER = SQLITE_PATH + ".fallback"
+_store = None
+_store_failed = False
+_store_lock = threading.Lock()
+
+
+def configured_storage() -> str:
+	"""``STORAGE_SQLITE`` when selected in the settings and available, else ``STORAGE_JSON``."""
+	try:
+		value = config.conf["AIHub"]["conversationStorage"]
+	except KeyError:
+		return STORAGE_JSON
+	if value == STORAGE_SQLITE and conversation_sqlite.available():
+		return STORAGE_SQLITE
+	return STORAGE_JSON
+
+
+def _open_store(fill: bool = True):
+	"""The SQLite store; with ``fill``, a new database is filled from the JSON layout."""
+	global _store
+	with _store_lock:
+		if _store is None:
+			ensure_conversations_dir()
+			created = not os.path.exists(SQLITE_PATH)
+			store = conversation_sqlite.ConversationStore(SQLITE_PATH)
+			if created and fill:
+				_mirror_json_to_store(store)
+			elif os.path.exists(FALLBACK_MARKER):
+				_merge_json_into_store(store)
+			_store = store
+		return _store
+
+
+def _sqlite_store():
+	"""The SQLite store when it is the configured storage, else None (JSON files)."""
+	global _store_failed
+	if _store_failed or configured_storage() != STORAGE_SQLITE:
+		return None
+	try:
+		return _open_store()
+	except Exception as err:
+		_store_failed = True
+		log.error(f"conversations: open {SQLITE_PATH}, using JSON files: {err}", exc_info=True)
+		try:
+			ensure_conversations_dir()
+			with open(FALLBACK_MARKER, "a", encoding="utf-8"):
+				pass
+		except OSError:
+			pass
+		return None
+
+
+def close_store() -> None:
+	global _store
+	with _store_lock:
+		if _store is not None:
+			_store.close()
+			_store = None
+
+
+def _same_entry(a: dict | None, b: dict | None) -> bool:
+	"""Whether two index entries describe the same saved state of a conversation."""
+	if not a or not b:
+		return False
+	return all(a.get(key) == b.get(key) for key in ("updated", "name", "summary"))
+
+
+def _json_entries() -> list:
+	entries = _index.entries()
+	_backfill_index_summaries(entries, from_json=True)
+	return entries
+
+
+def _mirror_json_to_store(store, progress=None) -> int:
+	"""Make ``store`` a copy of the JSON layout; returns the number of conversations copied.
+
+	``progress(done, total)`` is called as conversations are compared or copied.
+	"""
+	entries = {e["id"]: e for e in _json_entries()}
+	stored = {e["id"]: e for e in store.list()}
+	copied = [0]
+
+	def _items():
+		for done, (conv_id, entry) in enumerate(entries.items(), 1):
+			if progress is not None:
+				progress(done, len(entries))
+			if _same_entry(entry, stored.get(conv_id)):
+				continue
+			path = get_conversation_path(conv_id)
+			try:
+				data = copy.deepcopy(_read_conversation_data(path, conv_id))
+			except Exception as err:
+				log.error(f"conversations: migrate {conv_id}: {err}", exc_info=True)
+				continue
+			copied[0] += 1
+			yield conv_id, data, entry.get("summary") or {}
+
+	store.put_many(_items())
+	for conv_id in stored.keys() - entries.keys():
+		store.delete(conv_id)
+	return copied[0]
+
+
+def _merge_json_into_store(store) -> int:
+	"""Copy into ``store`` the JSON conversations saved while it could not be opened.
+
+	Conversations missing from the store, or saved later in JSON, are copied;
+	nothing is removed, as the JSON files also hold conversations deleted
+	while the store was in use. Clears ``FALLBACK_MARKER``; returns the number
+	copied.
+	"""
+	stored = {e["id"]: e for e in store.list()}
+	items = []
+	for entry in _json_entries():
+		conv_id = entry["id"]
+		known = stored.get(conv_id)
+		if known is not None and (entry.get("updated") or 0) <= (known.get("updated") or 0):
+			continue
+		try:
+			data = copy.deepcopy(_read_conversation_data(get_conversation_path(conv_id), conv_id))
+		except Exception as err:
+			log.error(f"conversations: merge {conv_id}: {err}", exc_info=True)
+			continue
+		items.append((conv_id, data, entry.get("summary") or {}))
+	store.put_many(items)
+	try:
+		os.remove(FALLBACK_MARKER)
+	except OSError:
+		pass
+	if items:
+		log.info(f"conversations: merged {len(items)} conversations saved as JSON while {SQLITE_PATH} was unavailable")
+	return len(items)
+
+
+def _mirror_store_to_json(store, progress=None) -> int:
+	"""Make the JSON layout a copy of ``store``; returns the number of conversations copied.
+
+	``progress(done, total)`` is called as conversations are compared or copied.
+	"""
+	ensure_conversations_dir()
+	current = {e["id"]: e for e in _index.entries()}
+	entries = store.list()
+	copied = 0
+	for done, entry in enumerate(entries, 1):
+		if progress is not None:
+			progress(done, len(entries))
+		conv_id = entry["id"]
+		path = get_conversation_path(conv_id)
+		if _same_entry(entry, current.get(conv_id)) and os.path.exists(path):
+			continue
+		data = store.get(conv_id)
+		if data is None:
+			continue
+		with _journal_lock:
+			conversation_journal.remove(path)
+			conversation_journal.write_snapshot(path, data)
+			_journal_states.pop(conv_id, None)
+		copied += 1
+	kept = {entry["id"] for entry in entries}
+	for conv_id in current.keys() - kept:
+		path = get_conversation_path(conv_id)
+		with _journal_lock:
+			_journal_states.pop(conv_id, None)
+			conversation_journal.remove(path)
+			try:
+				os.remove(path)
+			except FileNotFoundError:
+				pass
+	_index.replace(entries)
+	return copied
+
+
+def migrate_storage(target: str, progress=None) -> int:
+	"""Copy the saved conversations into ``target`` storage from the other one.
+
+	The target becomes a copy of the source: conversations missing from it or
+	saved differently are copied, those the source no longer has are removed
+	(their media files are left alone). Conversations saved as JSON while the
+	database could not be opened are merged into it first. Returns the number
+	of conversations copied; raises when the database cannot be opened.
+
+	Reads and writes every conversation the first time: run it off the UI
+	thread. ``progress(done, total)`` is called along the way.
+	"""
+	if not conversation_sqlite.available():
+		return 0
+	if target == STORAGE_SQLITE:
+		return _mirror_json_to_store(_open_store(fill=False), progress)
+	if _store is None and not os.path.exists(SQLITE_PATH):
+		return 0
+	return _mirror_store_to_json(_open_store(), progress)
+
+
+def search_conversations(terms) -> set:
+	"""Ids of saved conversations whose prompts, responses or reasoning contain every term.
+
+	The SQLite storage answers from its full-text index (terms match word
+	starts). With JSON files, every conversation is read and its text kept in
+	memory while it is unchanged, so later searches only read what changed.
+	"""
+	terms = [t.strip().lower() for t in terms if isinstance(t, str) and t.strip()]
+	if not terms:
+		return set()
+	store = _sqlite_store()
+	if store is not None:
+		try:
+			return store.search(terms)
+		except Exception as err:
+			log.error(f"conversations: search: {err}", exc_info=True)
+			return set()
+	matches = set()
+	for entry in _index.entries():
+		conv_id = entry["id"]
+		text = _conversation_text(conv_id)
+		if text and all(term in text for term in terms):
+			matches.add(conv_id)
+	return matches
+
+
+# Lowercased searchable text of JSON conversations: conv_id -> (file signature, text), least
+# recently used first, holding at most ``_TEXT_CACHE_MAX_CHARS`` characters in total.
+_TEXT_CACHE: OrderedDict = OrderedDict()
+_TEXT_CACHE_MAX_CHARS = 32 * 1024 * 1024
+_text_cache_chars = 0
+_text_cache_lock = threading.Lock()
+
+
+def _forget_text(conv_id: str) -> None:
+	global _text_cache_chars
+	with _text_cache_lock:
+		cached = _TEXT_CACHE.pop(conv_id, None)
+		if cached is not None:
+			_text_cache_chars -= len(cached[1])
+
+
+def _remember_text(conv_id: str, signature, text: str) -> None:
+	global _text_cache_chars
+	_forget_text(conv_id)
+	if len(text) > _TEXT_CACHE_MAX_CHARS:
+		return
+	with _text_cache_lock:
+		_TEXT_CACHE[conv_id] = (signature, text)
+		_text_cache_chars += len(text)
+		while _text_cache_chars > _TEXT_CACHE_MAX_CHARS:
+			_text_cache_chars -= len(_TEXT_CACHE.popitem(last=False)[1][1])
+
+
+def _conversation_text(conv_id: str) -> str:
+	path = get_conversation_path(conv_id)
+	signature = conversation_journal.signature(path)
+	if signature is None:
+		_forget_text(conv_id)
+		return ""
+	with _text_cache_lock:
+		cached = _TEXT_CACHE.get(conv_id)
+		if cached is not None and cached[0] == signature:
+			_TEXT_CACHE.move_to_end(conv_id)
+			return cached[1]
+	try:
+		data = _read_conversation_data(path, conv_id)
+	except Exception as err:
+		log.error(f"conversations: search {conv_id}: {err}", exc_info=True)
+		return ""
+	parts = []
+	for block in data.get("blocks") or []:
+		parts.extend(conversation_sqlite.block_text(block))
+	text = "\n".join(part for part in parts if part).lower()
+	_remember_text(conv_id, signature, text)
+	return text
+
+
 class ConversationFormat(StrEnum):
 	@staticmethod
 	def _generate_next_value_(name, start, count, last_values):
@@ -232,6 +574,37 @@ def _collect_referenced_local_paths(data: dict, conv_id: str = "") -> set[str]:
 	return paths
 
 
+def _media_paths(data: dict) -> set[str]:
+	"""Files under the data directory referenced by conversation ``data`` (see ``media_refs``)."""
+	return {p for p in _collect_referenced_local_paths(data) if _is_under_data_dir(p)}
+
+
+def _iter_conversation_media():
+	"""``(conv_id, media paths)`` of every saved conversation, to rebuild ``media_refs``."""
+	store = _sqlite_store()
+	if store is not None:
+		for conv_id, data in store.iter_data():
+			yield conv_id, _media_paths(data)
+		return
+	if not os.path.isdir(CONVERSATIONS_DIR):
+		return
+	for name in os.listdir(CONVERSATIONS_DIR):
+		if not name.endswith(".json") or name == INDEX_FILENAME:
+			continue
+		try:
+			data = _read_conversation_data(os.path.join(CONVERSATIONS_DIR, name))
+		except Exception:
+			continue
+		conv_id = str(data.get("id") or os.path.splitext(name)[0])
+		yield conv_id, _media_paths(data)
+
+
+def _media_refs():
+	"""``media_refs``, loaded (or rebuilt from the saved conversations) on first use."""
+	media_refs.load(_iter_conversation_media)
+	return media_refs
+
+
 def _collect_file_entries(data: dict) -> list[dict]:
 	files = []
 	seen = set()
@@ -323,6 +696,15 @@ def get_default_title(first_message: str) -> str:
 	return text[:DEFAULT_TITLE_LEN].rstrip() + "…"
 
 
+def _persist_attachment(att) -> str:
+	"""Stored path of an image/document attachment; in-memory captures are written out now."""
+	persist = getattr(att, "persist", None)
+	if callable(persist):
+		return persist()
+	path = getattr(att, "path", att) if hasattr(att, "path") else att
+	return persist_local_file(path, "images", prefix="image", fallback_ext=".png")
+
+
 def _block_to_dict(block) -> dict:
 	"""Serialize a HistoryBlock to JSON-safe dict."""
 	d = {
@@ -352,12 +734,7 @@ def _block_to_dict(block) -> dict:
 	if files_list:
 		d["pathList"] = [
 			{
-				"path": persist_local_file(
-					(getattr(att, "path", att) if hasattr(att, "path") else att),
-					"images",
-					prefix="image",
-					fallback_ext=".png",
-				),
+				"path": _persist_attachment(att),
 				"name": getattr(att, "name", ""),
 			}
 			for att in files_list
@@ -394,6 +771,9 @@ def _block_to_dict(block) -> dict:
 	encrypted = getattr(block, "xaiEncryptedReasoning", None)
 	if isinstance(encrypted, list) and encrypted:
 		d["xaiEncryptedReasoning"] = encrypted
+	compare_group = getattr(block, "compareGroup", None)
+	if isinstance(compare_group, str) and compare_group:
+		d["compareGroup"] = compare_group
 	return d
 
 
@@ -489,6 +869,8 @@ def _dict_to_block(d: dict, conv_id: str = "", block_idx: int = 0):
 	block.uid = block_id if isinstance(block_id, str) and block_id else str(uuid.uuid4())
 	xai_rid = d.get("xaiResponseId")
 	block.xaiResponseId = xai_rid.strip() if isinstance(xai_rid, str) and xai_rid.strip() else None
+	compare_group = d.get("compareGroup")
+	block.compareGroup = compare_group if isinstance(compare_group, str) and compare_group else None
 	raw_citations = d.get("citations")
 	if isinstance(raw_citations, list):
 		block.citations = [c for c in raw_citations if isinstance(c, str) and c.strip()]
@@ -504,27 +886,25 @@ def _dict_to_block(d: dict, conv_id: str = "", block_idx: int = 0):
 	return block
 
 
-def _read_index():
-	if not os.path.exists(INDEX_PATH):
-		return {"version": INDEX_VERSION, "entries": []}
-	try:
-		with open(INDEX_PATH, "r", encoding="utf-8") as f:
-			data = json.load(f)
-		if not isinstance(data.get("entries"), list):
-			data["entries"] = []
-		return data
-	except Exception as err:
-		log.error(f"conversations: read index: {err}", exc_info=True)
-		return {"version": INDEX_VERSION, "entries": []}
+# index.json, read once per process (see ``conversation_index``).
+_index = conversation_index.ConversationIndex(INDEX_PATH)
 
 
-def _write_index(data: dict):
-	ensure_conversations_dir()
+@contextlib.contextmanager
+def batch():
+	"""Write index.json once for all the saves, renames and deletes made inside.
+
+	Batches nest; the index is written when the outermost one ends, even on
+	error. With the SQLite storage each change is already its own
+	transaction and this does nothing.
+	"""
+	_index.begin()
+	media_refs.begin()
 	try:
-		_atomic_write_json(INDEX_PATH, data)
-	except Exception as err:
-		log.error(f"conversations: write index: {err}", exc_info=True)
-		raise
+		yield
+	finally:
+		media_refs.end()
+		_index.end()
 
 
 def list_conversations() -> list:
@@ -532,39 +912,46 @@ def list_conversations() -> list:
 
 	Each entry carries a lightweight ``summary`` (see ``SUMMARY_FIELDS``) so the history
 	list can render columns and apply filters without opening every conversation file.
-	Legacy entries without a summary are backfilled once and the index is rewritten.
+	Legacy entries without a summary are backfilled once and written back to the index.
 	"""
-	idx = _read_index()
-	entries = idx.get("entries", [])
-	changed = _backfill_index_summaries(entries)
-	if changed:
-		idx["entries"] = entries
+	store = _sqlite_store()
+	if store is not None:
 		try:
-			_write_index(idx)
+			return store.list()
 		except Exception as err:
-			log.error(f"conversations: persist backfilled summaries: {err}", exc_info=True)
+			log.error(f"conversations: list: {err}", exc_info=True)
+			return []
+	entries = _index.entries()
+	_backfill_index_summaries(entries)
 	# Sort by updated desc
 	entries = sorted(entries, key=lambda e: e.get("updated", 0), reverse=True)
 	return entries
 
 
-def _backfill_index_summaries(entries: list) -> bool:
-	"""Add a ``summary`` to any index entry missing one. Returns True if anything changed."""
+def _backfill_index_summaries(entries: list, from_json: bool = False) -> bool:
+	"""Add a ``summary`` to any index entry missing one and store it. Returns True if anything changed.
+
+	``from_json`` reads the conversations from the JSON files whatever the configured storage.
+	"""
 	changed = False
-	for entry in entries:
-		if not isinstance(entry, dict):
-			continue
-		summary = entry.get("summary")
-		if isinstance(summary, dict) and "messages" in summary:
-			continue
-		props = get_conversation_properties(entry.get("id"))
-		entry["summary"] = summary_from_properties(props)
-		changed = True
+	with batch():
+		for entry in entries:
+			summary = entry.get("summary")
+			if isinstance(summary, dict) and "messages" in summary:
+				continue
+			if from_json:
+				props = _json_conversation_properties(entry.get("id"))
+			else:
+				props = get_conversation_properties(entry.get("id"))
+			entry["summary"] = summary_from_properties(props)
+			_index.put(dict(entry))
+			changed = True
 	return changed
 
 
 # Cache of full properties keyed by conv_id -> (file_signature, props). The signature is
-# (mtime_ns, size); any save rewrites the file (changing it), so the cache self-invalidates.
+# (mtime_ns, size) of the snapshot and its journal, or the store revision with SQLite; any
+# save changes it, so the cache self-invalidates.
 _PROPERTIES_CACHE: dict = {}
 
 # Fields needed to render the history list columns and evaluate filters, stored in the index
@@ -581,11 +968,7 @@ SUMMARY_FIELDS = (
 
 
 def _properties_file_signature(path: str):
-	try:
-		st = os.stat(path)
-	except OSError:
-		return None
-	return (st.st_mtime_ns, st.st_size)
+	return conversation_journal.signature(path)
 
 
 def summary_from_properties(props: dict | None) -> dict:
@@ -610,6 +993,32 @@ def get_conversation_properties(conv_id: str, *, use_cache: bool = True) -> dict
 	repeatedly reading the same conversation (e.g. filtering/sorting the history list) does
 	not re-parse unchanged files.
 	"""
+	store = _sqlite_store()
+	if store is None:
+		return _json_conversation_properties(conv_id, use_cache=use_cache)
+	try:
+		revision = store.revision(conv_id)
+		signature = ("sqlite", revision) if revision is not None else None
+		if signature is None:
+			_PROPERTIES_CACHE.pop(conv_id, None)
+			return None
+		if use_cache:
+			cached = _PROPERTIES_CACHE.get(conv_id)
+			if cached is not None and cached[0] == signature:
+				return cached[1]
+		data = store.get(conv_id)
+	except Exception as err:
+		log.error(f"conversations: properties {conv_id}: {err}", exc_info=True)
+		return None
+	if data is None:
+		return None
+	props = _compute_properties_from_data(data, conv_id)
+	if props is not None:
+		_PROPERTIES_CACHE[conv_id] = (signature, props)
+	return props
+
+
+def _json_conversation_properties(conv_id: str, *, use_cache: bool = True) -> dict | None:
 	path = get_conversation_path(conv_id)
 	signature = _properties_file_signature(path)
 	if signature is None:
@@ -620,8 +1029,7 @@ def get_conversation_properties(conv_id: str, *, use_cache: bool = True) -> dict
 		if cached is not None and cached[0] == signature:
 			return cached[1]
 	try:
-		with open(path, "r", encoding="utf-8") as f:
-			data = json.load(f)
+		data = _read_conversation_data(path, conv_id)
 	except Exception as err:
 		log.error(f"conversations: properties {conv_id}: {err}", exc_info=True)
 		return None
@@ -767,6 +1175,13 @@ def remove_hub_session_file() -> None:
 def conversation_file_exists(conv_id: str) -> bool:
 	if not conv_id or not isinstance(conv_id, str):
 		return False
+	store = _sqlite_store()
+	if store is not None:
+		try:
+			return store.exists(conv_id)
+		except Exception as err:
+			log.error(f"conversations: exists {conv_id}: {err}", exc_info=True)
+			return False
 	return os.path.isfile(get_conversation_path(conv_id))
 
 
@@ -816,12 +1231,22 @@ def prune_hub_session_references(removed_ids) -> None:
 
 def load_conversation(conv_id: str) -> dict | None:
 	"""Load conversation by id. Returns dict with keys: id, name, system, blocks, model, draftPrompt, accountKey, uiState."""
+	store = _sqlite_store()
 	path = get_conversation_path(conv_id)
-	if not os.path.exists(path):
+	if store is None and not os.path.exists(path):
 		return None
 	try:
-		with open(path, "r", encoding="utf-8") as f:
-			data = json.load(f)
+		if store is not None:
+			data = store.get(conv_id)
+			if data is None:
+				return None
+		else:
+			with _journal_lock:
+				state = _journal_state(conv_id, path)
+			if state is None:
+				return None
+			# Blocks and the dialog may modify what they get; the journal state must stay as saved.
+			data = copy.deepcopy(state.data)
 		blocks_data = data.get("blocks", [])
 		blocks = []
 		for idx, bd in enumerate(blocks_data):
@@ -881,6 +1306,10 @@ def save_conversation(
 	"""
 	Save conversation. Returns conversation id.
 	If conv_id given and exists, updates. Otherwise creates new.
+
+	An update appends what changed to the conversation's journal (see
+	``conversation_journal``) instead of rewriting the file; with the SQLite
+	storage, only the changed block rows are written.
 	"""
 	ensure_conversations_dir()
 	draftPathList = draftPathList or []
@@ -891,7 +1320,7 @@ def save_conversation(
 		if not isinstance(path, str) or not path:
 			continue
 		serialized_draft_paths.append({
-			"path": persist_local_file(path, "images", prefix="image", fallback_ext=".png"),
+			"path": _persist_attachment(img),
 			"name": getattr(img, "name", "") if hasattr(img, "name") else "",
 		})
 	serialized_draft_audio = []
@@ -906,82 +1335,111 @@ def save_conversation(
 	ui_payload = ui_state if isinstance(ui_state, dict) else {}
 	ledger_payload = deserialize_ledger(usage_ledger) if usage_ledger is not None else None
 	detached_payload = serialize_detached_branch(detached_branch, _block_to_dict) if detached_branch else None
+	store = _sqlite_store()
 	path = get_conversation_path(conv_id) if conv_id else ""
-	if conv_id and os.path.exists(path):
-		try:
-			with open(path, "r", encoding="utf-8") as f:
-				existing = json.load(f)
-		except Exception:
-			existing = {}
-		if ledger_payload is None:
-			ledger_payload = resolve_ledger_for_saved_data(existing)
-		existing["version"] = CONVERSATION_JSON_VERSION
-		existing["updated"] = now
-		if name is not None:
-			existing["name"] = name
-		existing["system"] = system
-		existing["model"] = model
-		existing["accountKey"] = account_key or ""
-		existing["uiState"] = ui_payload
-		existing["draftPrompt"] = draftPrompt or ""
-		existing["draftPathList"] = serialized_draft_paths
-		existing["draftAudioPathList"] = serialized_draft_audio
-		existing["format"] = normalized_format.value
-		existing["formatData"] = _serialize_format_data(normalized_format, format_data)
-		existing["blocks"] = [_block_to_dict(b) for b in blocks]
-		existing["usageLedger"] = ledger_payload
-		if detached_payload:
-			existing["detachedBranch"] = detached_payload
+	with _journal_lock:
+		state = None
+		previous = None
+		if conv_id and store is not None:
+			try:
+				previous = store.get(conv_id)
+			except Exception as err:
+				log.error(f"conversations: read {conv_id} before save: {err}", exc_info=True)
+				raise
+		elif conv_id and os.path.exists(path):
+			try:
+				state = _journal_state(conv_id, path)
+			except Exception as err:
+				log.error(f"conversations: read {conv_id} before save: {err}", exc_info=True)
+			previous = state.data if state is not None else {}
+		if previous is not None:
+			existing = dict(previous)
+			if ledger_payload is None:
+				ledger_payload = resolve_ledger_for_saved_data(existing)
+			existing["version"] = CONVERSATION_JSON_VERSION
+			existing["updated"] = now
+			if name is not None:
+				existing["name"] = name
+			existing["system"] = system
+			existing["model"] = model
+			existing["accountKey"] = account_key or ""
+			existing["uiState"] = ui_payload
+			existing["draftPrompt"] = draftPrompt or ""
+			existing["draftPathList"] = serialized_draft_paths
+			existing["draftAudioPathList"] = serialized_draft_audio
+			existing["format"] = normalized_format.value
+			existing["formatData"] = _serialize_format_data(normalized_format, format_data)
+			existing["blocks"] = [_block_to_dict(b) for b in blocks]
+			existing["usageLedger"] = ledger_payload
+			if detached_payload:
+				existing["detachedBranch"] = detached_payload
+			else:
+				existing.pop("detachedBranch", None)
 		else:
-			existing.pop("detachedBranch", None)
-	else:
-		conv_id = conv_id or str(uuid.uuid4())
-		if ledger_payload is None:
-			ledger_payload = migrate_ledger_from_block_dicts([_block_to_dict(b) for b in blocks])
-		if name is None and blocks:
-			first = blocks[0]
-			prompt = getattr(first, "prompt", "") or ""
-			tlist = getattr(first, "audioTranscriptList", None)
-			if not prompt and tlist and any(t for t in tlist):
-				prompt = "\n".join(t for t in tlist if t).strip()
-			name = get_default_title(prompt)
-		existing = {
-			"version": CONVERSATION_JSON_VERSION,
-			"id": conv_id,
-			# Translators: Text in conversation metadata/properties shown to the user.
-			"name": name or _("Untitled conversation"),
-			"created": now,
-			"updated": now,
-			"system": system,
-			"model": model,
-			"accountKey": account_key or "",
-			"uiState": ui_payload,
-			"draftPrompt": draftPrompt or "",
-			"draftPathList": serialized_draft_paths,
-			"draftAudioPathList": serialized_draft_audio,
-			"format": normalized_format.value,
-			"formatData": _serialize_format_data(normalized_format, format_data),
-			"blocks": [_block_to_dict(b) for b in blocks],
-			"usageLedger": ledger_payload,
-		}
-		if detached_payload:
-			existing["detachedBranch"] = detached_payload
-	path = get_conversation_path(conv_id)
-	try:
-		_atomic_write_json(path, existing)
-	except Exception as err:
-		log.error(f"conversations: save {conv_id}: {err}", exc_info=True)
-		raise
-	# Update index. Compute the lightweight summary from the in-memory data we just wrote so
-	# the history list can render without re-opening this file later.
-	try:
-		summary = summary_from_properties(_compute_properties_from_data(existing, conv_id))
-	except Exception as err:
-		log.error(f"conversations: summary {conv_id}: {err}", exc_info=True)
-		summary = summary_from_properties(None)
-	idx = _read_index()
-	entries = {e["id"]: e for e in idx.get("entries", [])}
-	entries[conv_id] = {
+			conv_id = conv_id or str(uuid.uuid4())
+			if ledger_payload is None:
+				ledger_payload = migrate_ledger_from_block_dicts([_block_to_dict(b) for b in blocks])
+			if name is None and blocks:
+				first = blocks[0]
+				prompt = getattr(first, "prompt", "") or ""
+				tlist = getattr(first, "audioTranscriptList", None)
+				if not prompt and tlist and any(t for t in tlist):
+					prompt = "\n".join(t for t in tlist if t).strip()
+				name = get_default_title(prompt)
+			existing = {
+				"version": CONVERSATION_JSON_VERSION,
+				"id": conv_id,
+				# Translators: Text in conversation metadata/properties shown to the user.
+				"name": name or _("Untitled conversation"),
+				"created": now,
+				"updated": now,
+				"system": system,
+				"model": model,
+				"accountKey": account_key or "",
+				"uiState": ui_payload,
+				"draftPrompt": draftPrompt or "",
+				"draftPathList": serialized_draft_paths,
+				"draftAudioPathList": serialized_draft_audio,
+				"format": normalized_format.value,
+				"formatData": _serialize_format_data(normalized_format, format_data),
+				"blocks": [_block_to_dict(b) for b in blocks],
+				"usageLedger": ledger_payload,
+			}
+			if detached_payload:
+				existing["detachedBranch"] = detached_payload
+		# Compute the lightweight summary from the in-memory data so the history list can
+		# render without re-opening this conversation later.
+		try:
+			summary = summary_from_properties(_compute_properties_from_data(existing, conv_id))
+		except Exception as err:
+			log.error(f"conversations: summary {conv_id}: {err}", exc_info=True)
+			summary = summary_from_properties(None)
+		try:
+			# Recorded before the conversation is written, so the table never misses a file in use.
+			_media_refs().record(conv_id, _media_paths(existing))
+		except Exception as err:
+			log.error(f"conversations: media references {conv_id}: {err}", exc_info=True)
+			media_refs.invalidate()
+		path = get_conversation_path(conv_id)
+		try:
+			if store is not None:
+				store.put(conv_id, existing, summary)
+			elif state is not None:
+				ops = conversation_journal.diff(state.data, existing)
+				if ops:
+					conversation_journal.append(path, state, ops)
+				_schedule_compaction(conv_id, path, state)
+			else:
+				# New (or unreadable) conversation: a fresh snapshot, without journal.
+				conversation_journal.remove(path)
+				conversation_journal.write_snapshot(path, existing)
+				_journal_states[conv_id] = conversation_journal.read(path)
+		except Exception as err:
+			log.error(f"conversations: save {conv_id}: {err}", exc_info=True)
+			raise
+	if store is not None:
+		return conv_id
+	_index.put({
 		"id": conv_id,
 		# Translators: Text in conversation metadata/properties shown to the user.
 		"name": existing.get("name", _("Untitled conversation")),
@@ -989,30 +1447,34 @@ def save_conversation(
 		"updated": now,
 		"format": normalize_conversation_format(existing.get("format", ConversationFormat.GENERIC.value)).value,
 		"summary": summary,
-	}
-	idx["entries"] = list(entries.values())
-	_write_index(idx)
+	})
 	return conv_id
 
 
 def rename_conversation(conv_id: str, new_name: str) -> bool:
+	store = _sqlite_store()
+	if store is not None:
+		try:
+			# Translators: Text in conversation metadata/properties shown to the user.
+			return store.rename(conv_id, new_name.strip() or _("Untitled conversation"), int(time.time()))
+		except Exception as err:
+			log.error(f"conversations: rename {conv_id}: {err}", exc_info=True)
+			return False
 	path = get_conversation_path(conv_id)
 	if not os.path.exists(path):
 		return False
 	try:
-		with open(path, "r", encoding="utf-8") as f:
-			data = json.load(f)
-		# Translators: Text in conversation metadata/properties shown to the user.
-		data["name"] = new_name.strip() or _("Untitled conversation")
-		data["updated"] = int(time.time())
-		_atomic_write_json(path, data)
-		idx = _read_index()
-		for e in idx.get("entries", []):
-			if e.get("id") == conv_id:
-				e["name"] = data["name"]
-				e["updated"] = data["updated"]
-				break
-		_write_index(idx)
+		with _journal_lock:
+			state = _journal_state(conv_id, path)
+			if state is None:
+				return False
+			data = dict(state.data)
+			# Translators: Text in conversation metadata/properties shown to the user.
+			data["name"] = new_name.strip() or _("Untitled conversation")
+			data["updated"] = int(time.time())
+			conversation_journal.append(path, state, conversation_journal.diff(state.data, data))
+			_schedule_compaction(conv_id, path, state)
+		_index.update(conv_id, name=data["name"], updated=data["updated"])
 		return True
 	except Exception as err:
 		log.error(f"conversations: rename {conv_id}: {err}", exc_info=True)
@@ -1020,38 +1482,42 @@ def rename_conversation(conv_id: str, new_name: str) -> bool:
 
 
 def delete_conversation(conv_id: str) -> bool:
+	store = _sqlite_store()
 	path = get_conversation_path(conv_id)
-	if not os.path.exists(path):
+	if store is None and not os.path.exists(path):
 		return False
 	try:
+		if store is not None:
+			data = store.get(conv_id)
+			if data is None:
+				return False
+		else:
+			try:
+				data = _read_conversation_data(path, conv_id)
+			except Exception:
+				data = {}
+		own_media = _media_paths(data)
 		try:
-			with open(path, "r", encoding="utf-8") as f:
-				data = json.load(f)
-		except Exception:
-			data = {}
-		to_delete_candidates = _collect_referenced_local_paths(data, conv_id=conv_id)
-		other_refs = set()
-		if to_delete_candidates and os.path.isdir(CONVERSATIONS_DIR):
-			for name in os.listdir(CONVERSATIONS_DIR):
-				if not name.endswith(".json"):
-					continue
-				other_path = os.path.join(CONVERSATIONS_DIR, name)
-				if os.path.abspath(other_path) == os.path.abspath(path):
-					continue
-				try:
-					with open(other_path, "r", encoding="utf-8") as f:
-						other_data = json.load(f)
-					other_conv_id = str(other_data.get("id", ""))
-					other_refs |= _collect_referenced_local_paths(other_data, conv_id=other_conv_id)
-				except Exception:
-					continue
-		os.remove(path)
-		idx = _read_index()
-		idx["entries"] = [e for e in idx.get("entries", []) if e.get("id") != conv_id]
-		_write_index(idx)
-		for p in to_delete_candidates:
-			if p in other_refs:
-				continue
+			refs = _media_refs()
+		except Exception as err:
+			log.error(f"conversations: media references: {err}", exc_info=True)
+			refs = None
+		if store is not None:
+			store.delete(conv_id)
+		else:
+			with _journal_lock:
+				_journal_states.pop(conv_id, None)
+				os.remove(path)
+				conversation_journal.remove(path)
+			_index.remove([conv_id])
+		# Files no other conversation references; none when the table is unavailable.
+		unreferenced = set()
+		if refs is not None:
+			try:
+				unreferenced = refs.release(conv_id, own_media)
+			except Exception as err:
+				log.error(f"conversations: media references {conv_id}: {err}", exc_info=True)
+		for p in unreferenced:
 			if not _is_under_data_dir(p):
 				continue
 			try:
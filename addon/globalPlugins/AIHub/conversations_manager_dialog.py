@@ -27,6 +27,11 @@ from .tool_voxtral_tts_dialog import VoxtralTTSToolDialog
 
 addonHandler.initTranslation()
 
+# Milliseconds of typing pause before a text: filter searches the conversations
+# (with JSON storage the first search reads every one of them).
+CONTENT_SEARCH_DELAY_MS = 400
+
+
 def format_date(ts: int) -> str:
 	if not ts:
 		return ""
@@ -86,6 +91,8 @@ class ConversationsManagerDialog(wx.Dialog):
 		self._plugin = plugin
 		self._all_entries = []
 		self._entries = []
+		self._contentMatches = None
+		self._contentSearchTimer = None
 		main = wx.BoxSizer(wx.VERTICAL)
 		main.Add(
 			wx.StaticText(
@@ -242,6 +249,9 @@ class ConversationsManagerDialog(wx.Dialog):
 		filter_text = self._filterTextCtrl.GetValue().strip() if hasattr(self, "_filterTextCtrl") else ""
 		keyed_terms, plain_terms = self._parse_filter_query(filter_text)
 		has_keyed = bool(keyed_terms)
+		# Content terms are answered once for all entries, from the store's full-text search.
+		content_terms = [value for key, value in keyed_terms if key in ("text", "content")]
+		self._contentMatches = conversations.search_conversations(content_terms) if content_terms else None
 		filtered = []
 		for entry in list(self._all_entries):
 			summary = self._entry_summary(entry)
@@ -289,11 +299,27 @@ class ConversationsManagerDialog(wx.Dialog):
 			self._propertiesText.SetValue("")
 
 	def onFilterChanged(self, evt):
+		evt.Skip()
+		keyed_terms, plain_terms = self._parse_filter_query(self._filterTextCtrl.GetValue().strip())
+		if any(key in ("text", "content") for key, value in keyed_terms):
+			# Content searches wait for a pause in typing instead of running on every keystroke.
+			if self._contentSearchTimer is not None and self._contentSearchTimer.IsRunning():
+				self._contentSearchTimer.Restart(CONTENT_SEARCH_DELAY_MS)
+			else:
+				self._contentSearchTimer = wx.CallLater(CONTENT_SEARCH_DELAY_MS, self._refreshFilter)
+			return
+		if self._contentSearchTimer is not None:
+			self._contentSearchTimer.Stop()
+		self._refreshFilter()
+
+	def _refreshFilter(self):
+		if not self:
+			# Closed before a delayed content search ran.
+			return
 		# Keep keyboard focus in the filter field while typing; still refresh list selection and properties below.
 		self._applyFilterAndRender(focus_list=False)
 		# Reassert focus after list rebuild — some wx builds shift focus when the ListCtrl is cleared/repopulated.
 		wx.CallAfter(self._filterTextCtrl.SetFocus)
-		evt.Skip()
 
 	def onFilterKeyDown(self, evt):
 		key = evt.GetKeyCode()
@@ -337,12 +363,15 @@ class ConversationsManagerDialog(wx.Dialog):
 			"- tokens:>=1000 has:usage",
 			"- empty:true",
 			"- has:draft",
+			'- text:"error code" model:gpt',
 			"",
 			# Translators: Label before the list of allowed filter field names in the F1 help text.
 			_("Supported keys:"),
 			# Translators: Comma-separated list of filter keys as shown in F1 help; keep English key names so they match the search box.
-			_("name/title, model, format/type, id, date/updated, messages/msg/msgs, tokens/token, draft/draftlen, empty, has"),
+			_("name/title, model, format/type, id, date/updated, messages/msg/msgs, tokens/token, draft/draftlen, empty, has, text/content"),
 			"",
+			# Translators: Help line explaining the text: filter key, which searches what was said instead of the title.
+			_("text: (or content:) searches the prompts, responses and reasoning of the conversations; quote several words to find them together."),
 			# Translators: Help line listing comparison operators allowed for numeric filters; placeholder is backtick-wrapped operator list.
 			_("Numeric operators: %s (for messages/tokens/draft).") % operator_literals,
 			# Translators: Help line listing accepted true/false spellings for the empty: filter; placeholder is literal token list.
@@ -444,6 +473,9 @@ class ConversationsManagerDialog(wx.Dialog):
 			elif key in ("draft", "draftlen"):
 				if not self._match_numeric_expr(draft_len, val):
 					return False
+			elif key in ("text", "content"):
+				if self._contentMatches is None or entry.get("id") not in self._contentMatches:
+					return False
 			elif key == "empty":
 				b = self._parse_bool(val)
 				if b is None or is_empty != b:
@@ -856,11 +888,12 @@ class ConversationsManagerDialog(wx.Dialog):
 			return
 		deleted = 0
 		deleted_ids = []
-		for entry in list(entries):
-			cid = entry["id"]
-			if conversations.delete_conversation(cid):
-				deleted_ids.append(cid)
-				deleted += 1
+		with conversations.batch():
+			for entry in list(entries):
+				cid = entry["id"]
+				if conversations.delete_conversation(cid):
+					deleted_ids.append(cid)
+					deleted += 1
 		if deleted_ids:
 			conversations.prune_hub_session_references(deleted_ids)
 		self.refresh_list()
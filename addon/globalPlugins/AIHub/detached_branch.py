@@ -99,8 +99,12 @@ def is_detached_branch_anchor(page, block) -> bool:
 
 
 def assistant_label_for_block(page, block, *, default_label: str) -> str:
-	"""History assistant prefix; marks the anchor block when a branch is archived."""
+	"""History assistant prefix; marks the anchor block when a branch is archived
+	and names the model on compare-mode answers."""
 	if not is_detached_branch_anchor(page, block):
+		if getattr(block, "compareGroup", None) and getattr(block, "model", ""):
+			# Translators: Assistant response label in history for one answer of a multi-model comparison.
+			return _("Assistant [%s]:") % block.model + " "
 		return default_label
 	branch = page.detachedBranch
 	tail_count, _had_response = detached_branch_summary(branch)
@@ -17,11 +17,12 @@ import addonHandler
 import gui
 from logHandler import log
 
-from .imagehelper import get_image_dimensions, resize_image
-from .image_file import AttachmentFile, AttachmentFileTypes, URL_PATTERN
+from .imagehelper import fitted_size, get_image_dimensions, resize_image
+from .image_file import AttachmentFile, AttachmentFileTypes, CapturedImageFile, URL_PATTERN
 from .consts import Provider, TEMP_DIR
 from .mediastore import persist_local_file
 from .url_safety import build_http_fetch_opener, validate_http_fetch_url
+from .visiontokens import predict_tokens
 
 addonHandler.initTranslation()
 
@@ -209,7 +210,8 @@ class FileHandlersMixin:
 		"""Append one image/document attachment to the active tab's Files list.
 
 		Accepts:
-		* an :class:`AttachmentFile` instance (already-built attachment),
+		* an :class:`AttachmentFile` instance (already-built attachment); a
+		  :class:`CapturedImageFile` stays in memory until its conversation is saved,
 		* a ``str`` path (local file or URL),
 		* a ``(path, name)`` tuple (e.g. screenshot capture with a friendly label).
 		"""
@@ -217,7 +219,9 @@ class FileHandlersMixin:
 			return
 		page = self.get_active_page()
 		fl = page.filesList
-		if isinstance(path, AttachmentFile):
+		if isinstance(path, CapturedImageFile):
+			fl.append(path)
+		elif isinstance(path, AttachmentFile):
 			path.path = persist_local_file(path.path, "images", prefix="image", fallback_ext=".png")
 			fl.append(path)
 		elif isinstance(path, str):
@@ -232,7 +236,10 @@ class FileHandlersMixin:
 		else:
 			raise ValueError(f"Invalid path: {path}")
 
-	def getDefaultFilesDescriptionPrompt(self):
+	def getDefaultFilesDescriptionPrompt(self, files=None):
+		for attachment in reversed(files or []):
+			if getattr(attachment, "prompt", None):
+				return attachment.prompt
 		if self.conf["images"]["useCustomPrompt"]:
 			return self.conf["images"]["customPromptText"]
 		# Translators: AI-Hub conversation — attachments and files: entry in a right-click or application context menu.
@@ -354,10 +361,36 @@ class FileHandlersMixin:
 				attachment.path,
 				attachment.size,
 				f"{attachment.dimensions[0]}x{attachment.dimensions[1]}" if isinstance(attachment.dimensions, tuple) else "N/A",
-				attachment.description or "N/A"
+				attachment.description or "N/A",
+				self._predictedImageTokens(attachment),
 			])
 		self._attachment_list_end_refresh(files_ctrl, focus_prompt_if_empty=False)
 
+	def _predictedImageTokens(self, attachment) -> str:
+		"""Vision tokens the current model is expected to bill for ``attachment``, as list text."""
+		if attachment.type != AttachmentFileTypes.IMAGE_LOCAL or not isinstance(attachment.dimensions, tuple):
+			return "N/A"
+		width, height = attachment.dimensions
+		images_conf = self.conf["images"]
+		model = self.getCurrentModel()
+		if images_conf["optimizeForModel"]:
+			tokens = predict_tokens(model, width, height, images_conf["optimizeMinScale"] / 100)
+		else:
+			if images_conf["resize"]:
+				width, height = fitted_size(width, height, images_conf["maxWidth"], images_conf["maxHeight"])
+			tokens = predict_tokens(model, width, height)
+		return str(tokens) if tokens is not None else "N/A"
+
+	def refreshFilesTokenColumn(self):
+		"""Recompute the predicted tokens column, e.g. after the model changed."""
+		page = self.get_active_page()
+		files = getattr(page, "filesList", None) or []
+		files_ctrl = page.filesListCtrl
+		if files_ctrl.GetItemCount() != len(files):
+			return
+		for index, attachment in enumerate(files):
+			files_ctrl.SetItem(index, 5, self._predictedImageTokens(attachment))
+
 	def ensureModelVisionSelected(self):
 		model = self.getCurrentModel()
 		if model and model.vision:
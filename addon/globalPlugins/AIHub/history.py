@@ -4,7 +4,9 @@ Multiline wx.TextCtrl stores ``\\n`` as CRLF; measure inserted spans with
 ``GetInsertionPoint()``, not ``len(text)``.
 """
 
+import threading
 import uuid
+from bisect import bisect_right
 
 
 def _shift_index_after_insert(pos: int, insert_at: int, insert_len: int) -> int:
@@ -117,12 +119,70 @@ class TextSegment:
 		return control.lastSegment
 
 
+class TextBuffer:
+	"""Append-only text kept as a list of chunks.
+
+	Streaming appends one token at a time; ``append`` is O(1), ``since(offset)``
+	returns only the text past ``offset`` (O(delta)), and the full string is
+	joined lazily by ``getvalue`` and cached until the next append. The stream
+	worker appends while the UI thread reads, so every method holds a lock.
+	"""
+
+	__slots__ = ("_chunks", "_ends", "_joined", "_lock")
+
+	def __init__(self, text: str = ""):
+		self._chunks: list[str] = [text] if text else []
+		self._ends: list[int] = [len(text)] if text else []
+		self._joined = text or ""
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		with self._lock:
+			return self._ends[-1] if self._ends else 0
+
+	def append(self, text: str) -> None:
+		if not text:
+			return
+		with self._lock:
+			end = self._ends[-1] if self._ends else 0
+			self._chunks.append(text)
+			self._ends.append(end + len(text))
+			self._joined = None
+
+	def since(self, offset: int) -> str:
+		"""Text from ``offset`` to the end."""
+		with self._lock:
+			if offset <= 0:
+				return self._join()
+			if not self._ends or offset >= self._ends[-1]:
+				return ""
+			if self._joined is not None:
+				return self._joined[offset:]
+			i = bisect_right(self._ends, offset)
+			start = self._ends[i - 1] if i else 0
+			head = self._chunks[i][offset - start:]
+			if i + 1 == len(self._chunks):
+				return head
+			return head + "".join(self._chunks[i + 1:])
+
+	def getvalue(self) -> str:
+		with self._lock:
+			return self._join()
+
+	def _join(self) -> str:
+		if self._joined is None:
+			joined = "".join(self._chunks)
+			# Collapse so later joins only cover chunks appended after this one.
+			self._chunks = [joined]
+			self._ends = [len(joined)]
+			self._joined = joined
+		return self._joined
+
+
 class HistoryBlock:
 	previous = None
 	next = None
 	prompt = ""
-	responseText = ""
-	reasoningText = ""
 	segmentBreakLine = None
 	segmentPromptLabel = None
 	segmentPrompt = None
@@ -159,6 +219,48 @@ class HistoryBlock:
 	xaiResponseId = None
 	citations = None
 	xaiEncryptedReasoning = None
+	# Compare mode: blocks answering the same prompt with different models share this id.
+	compareGroup = None
 
 	def __init__(self):
 		self.uid = str(uuid.uuid4())
+		self._responseBuffer = TextBuffer()
+		self._reasoningBuffer = TextBuffer()
+
+	# ``responseText`` / ``reasoningText`` read and assign like plain strings;
+	# streaming code should use the ``append*`` / ``*Len`` / ``*Since`` helpers,
+	# which never join the whole text.
+
+	@property
+	def responseText(self) -> str:
+		return self._responseBuffer.getvalue()
+
+	@responseText.setter
+	def responseText(self, value) -> None:
+		self._responseBuffer = TextBuffer(value or "")
+
+	@property
+	def reasoningText(self) -> str:
+		return self._reasoningBuffer.getvalue()
+
+	@reasoningText.setter
+	def reasoningText(self, value) -> None:
+		self._reasoningBuffer = TextBuffer(value or "")
+
+	def appendResponse(self, text: str) -> None:
+		self._responseBuffer.append(text)
+
+	def appendReasoning(self, text: str) -> None:
+		self._reasoningBuffer.append(text)
+
+	def responseLen(self) -> int:
+		return len(self._responseBuffer)
+
+	def reasoningLen(self) -> int:
+		return len(self._reasoningBuffer)
+
+	def responseSince(self, offset: int) -> str:
+		return self._responseBuffer.since(offset)
+
+	def reasoningSince(self, offset: int) -> str:
+		return self._reasoningBuffer.since(offset)
@@ -10,6 +10,9 @@ import api
 import ui
 from logHandler import log
 
+from . import tokenizer
+from .consts import ContentType, Role
+from .contextbudget import estimate_messages_tokens, prompt_budget
 from .history import TextSegment, get_textctrl_selected_text, update_textctrl_saved_selection
 from .image_file import AttachmentFile, AttachmentFileTypes, URL_PATTERN
 from .propertiesutils import aggregate_blocks_usage, build_message_properties_html
@@ -276,6 +279,42 @@ class HistoryHandlersMixin:
 		if value:
 			self.promptTextCtrl.SetValue(value)
 
+	def onEstimateRequest(self, evt):
+		"""Announce the estimated prompt size and input cost of the request as it would be sent now."""
+		model = self.getCurrentModel()
+		if model is None:
+			return
+		messages = []
+		system = self.systemTextCtrl.GetValue().strip()
+		if system:
+			messages.append({"role": Role.SYSTEM, "content": system})
+		self.getMessages(messages, estimate_only=True)
+		current = []
+		prompt = self.promptTextCtrl.GetValue().strip()
+		if prompt:
+			current.append({"type": ContentType.TEXT, "text": prompt})
+		current.extend(self._estimateAttachmentParts(self.filesList, self.audioPathList))
+		if current:
+			messages.append({"role": Role.USER, "content": current})
+		total = estimate_messages_tokens(messages, tokenizer.counter_for_model(model).count)
+		# Translators: Announced by the request size estimate (Ctrl+Shift+E in the prompt); %s is a token count.
+		parts = [_("About %s prompt tokens") % f"{total:,}"]
+		budget_conf = self.conf["contextBudget"]
+		if budget_conf["enabled"]:
+			budget = prompt_budget(model, self.maxTokensSpinCtrl.GetValue(), budget_conf["maxPromptTokens"])
+			if budget and total > budget:
+				# Translators: Part of the request size estimate; %s is the token budget the history will be trimmed to.
+				parts.append(_("older history will be trimmed to fit %s") % f"{budget:,}")
+		pricing = model.extraInfo.get("pricing", {}) if isinstance(model.extraInfo, dict) else {}
+		try:
+			rate = float(pricing.get("prompt") or 0.0) if isinstance(pricing, dict) else 0.0
+		except (TypeError, ValueError):
+			rate = 0.0
+		if rate > 0:
+			# Translators: Part of the request size estimate; %s is a price in US dollars.
+			parts.append(_("input cost about $%s") % f"{total * rate:.4f}")
+		self.message(", ".join(parts))
+
 	def _setMessagesInsertionPoint(self, pos: int) -> None:
 		self.messagesTextCtrl.SetInsertionPoint(pos)
 		update_textctrl_saved_selection(self.messagesTextCtrl)
@@ -509,6 +548,7 @@ class HistoryHandlersMixin:
 	def _detachBlocksAfterForRegenerate(self, block):
 		"""Archive the focused block's prior response and later turns for optional restore."""
 		page = self._conversation_scope()
+		page.messageCache.invalidate_from(block)
 		detach_tail_for_regenerate(page, block)
 
 	def _announceDetachedBranchIfAny(self):
@@ -528,6 +568,7 @@ class HistoryHandlersMixin:
 
 	def _resetBlockForRegenerate(self, block):
 		"""Clear assistant output on ``block`` so a new response can stream in."""
+		self._conversation_scope().messageCache.invalidate_from(block)
 		block.responseText = ""
 		block.reasoningText = ""
 		block.responseTerminated = False
@@ -578,6 +619,7 @@ class HistoryHandlersMixin:
 			self.message(_("Archived branch is no longer available."))
 			return
 		self.lastBlock = new_last
+		page.messageCache.invalidate_from(anchor)
 		self._rerenderMessages(anchor_block=anchor, anchor_part="response")
 		# Translators: AI-Hub conversation — message history area: brief status feedback (speech/braille), not a full dialog.
 		self.message(_("Previous branch restored."))
@@ -589,6 +631,7 @@ class HistoryHandlersMixin:
 		if segment is None:
 			return
 		page = self._conversation_scope()
+		page.messageCache.invalidate_from(block)
 		branch = getattr(page, "detachedBranch", None)
 		if isinstance(branch, dict):
 			anchor_uid = branch.get("anchorBlockId")
@@ -841,6 +884,10 @@ class HistoryHandlersMixin:
 		# Translators: AI-Hub conversation — message history area: entry in a context menu or submenu.
 		menu.Append(item_id, _("Paste (file or text)") + "\tCtrl+V")
 		self.Bind(wx.EVT_MENU, self.onPromptPasteSmart, id=item_id)
+		item_id = wx.NewIdRef()
+		# Translators: AI-Hub conversation — message history area: entry in a context menu or submenu.
+		menu.Append(item_id, _("&Estimate request size") + " (Ctrl+Shift+E)")
+		self.Bind(wx.EVT_MENU, self.onEstimateRequest, id=item_id)
 		if self.previousPrompt:
 			menu.AppendSeparator()
 			item_id = wx.NewIdRef()
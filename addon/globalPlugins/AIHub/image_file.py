@@ -11,9 +11,12 @@ identifiers were renamed.
 import os
 import re
 import mimetypes
+import threading
+import time
 import urllib.parse
 
 from .imagehelper import get_image_dimensions
+from .mediastore import build_media_path
 
 URL_PATTERN = re.compile(
 	r"^(?:http)s?://(?:[A-Z0-9-]+\.)+[A-Z]{2,6}(?::\d+)?(?:/?|[/?]\S+)$",
@@ -104,5 +107,47 @@ class AttachmentFile:
 				return None
 		return None
 
+	@property
+	def source(self):
+		"""What ``imagehelper.image_part_cache`` encodes for this attachment."""
+		return self.path
+
 	def __str__(self):
 		return f"{self.name} ({self.path}, {self.size}, {self.dimensions}, {self.description})"
+
+
+class CapturedImageFile(AttachmentFile):
+	"""A screenshot attachment held in memory until its conversation is saved.
+
+	Until then ``path`` is only a file name (for display and type checks) and
+	the capture is encoded straight into requests. ``persist`` writes it to
+	the media store as PNG and points ``path`` at that file.
+	"""
+
+	_persist_lock = threading.Lock()
+
+	def __init__(self, capture, name: str = None, prefix: str = "screen", prompt: str = None):
+		self.capture = capture
+		# Default prompt for this capture, e.g. for a changed region (see ``recognitionindex``).
+		self.prompt = prompt
+		self.path = f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}.png"
+		self.type = AttachmentFileTypes.IMAGE_LOCAL
+		self.name = name or self.path
+		self.description = None
+		self.size = "N/A"
+		self.dimensions = capture.size
+
+	@property
+	def source(self):
+		return self.capture if self.capture is not None else self.path
+
+	def persist(self) -> str:
+		"""Write the capture to the media store (once) and return its path."""
+		with self._persist_lock:
+			if self.capture is not None:
+				path = build_media_path("images", ".png", prefix="image")
+				self.capture.save(path)
+				self.path = path
+				self.size = get_display_size(os.path.getsize(path))
+				self.capture = None
+		return self.path
@@ -1,14 +1,27 @@
 """Image utilities: screenshots, dimensions, resize. Requires Pillow in libs/."""
 import base64
+import contextlib
+import io
+import itertools
+import mimetypes
 import os
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from .consts import ADDON_DIR, ADDON_LIBS_DIR
 
 sys.path.insert(0, ADDON_LIBS_DIR)
-from PIL import Image, ImageGrab  # noqa: E402
+from PIL import Image, ImageGrab, features  # noqa: E402
 sys.path.remove(ADDON_LIBS_DIR)
 
+from .visiontokens import target_size  # noqa: E402
+
+_WEBP_SUPPORTED = bool(features.check("webp"))
+
 RESAMPLE = (
 	getattr(getattr(Image, "Resampling", None), "LANCZOS", None)
 	or getattr(Image, "LANCZOS", None)
@@ -23,34 +36,287 @@ def get_image_dimensions(path_or_file):
 		return img.size
 
 
+class CapturedImage:
+	"""A screen capture kept in memory.
+
+	It is encoded straight into the request payload (see ``ImagePartCache``)
+	and only written to disk when ``save`` is called, i.e. when the
+	conversation holding it is saved.
+	"""
+
+	_ids = itertools.count(1)
+
+	def __init__(self, image):
+		self.image = image
+		self.id = next(self._ids)
+
+	@property
+	def size(self) -> tuple:
+		return self.image.size
+
+	def save(self, path: str) -> None:
+		self.image.save(path, "PNG")
+
+	def crop(self, box: tuple) -> "CapturedImage":
+		return CapturedImage(self.image.crop(box))
+
+
+def capture_screen(bbox=None):
+	"""Capture the screen or the ``bbox`` region; a ``CapturedImage``, or None on failure."""
+	try:
+		return CapturedImage(ImageGrab.grab(bbox=bbox))
+	except OSError:
+		return None
+
+
 def save_screenshot(path: str, bbox=None) -> bool:
 	"""Capture screen or region, save as PNG. Returns True on success."""
+	capture = capture_screen(bbox=bbox)
+	if capture is None:
+		return False
 	try:
-		img = ImageGrab.grab(bbox=bbox)
-		img.save(path, "PNG")
+		capture.save(path)
 		return True
 	except OSError:
 		return False
 
 
-def resize_image(src: str, max_width: int = 0, max_height: int = 0, quality: int = 85, target: str = "Compressed.PNG"):
-	"""Resize image to fit within max dimensions. Returns True on success."""
+def resize_image(src, max_width: int = 0, max_height: int = 0, quality: int = 85, target="Compressed.PNG", format=None):
+	"""Resize image to fit within max dimensions. Returns True on success.
+
+	``src`` may be a path or an open ``PIL.Image``; ``target`` may be a path or
+	a binary file object (then pass ``format``).
+	"""
 	if max_width <= 0 and max_height <= 0:
 		return False
-	image = Image.open(src)
-	orig_w, orig_h = image.size
+	image = src if isinstance(src, Image.Image) else Image.open(src)
+	image.resize(fitted_size(*image.size, max_width, max_height), RESAMPLE).save(
+		target, format=format, optimize=True, quality=quality
+	)
+	return True
+
+
+def fitted_size(width: int, height: int, max_width: int = 0, max_height: int = 0) -> tuple:
+	"""Size ``resize_image`` gives a ``width`` x ``height`` image (0 = no bound on that side)."""
+	if max_width <= 0 and max_height <= 0:
+		return width, height
 	if max_width > 0 and max_height > 0:
-		ratio = min(max_width / orig_w, max_height / orig_h)
+		ratio = min(max_width / width, max_height / height)
 	elif max_width > 0:
-		ratio = max_width / orig_w
+		ratio = max_width / width
 	else:
-		ratio = max_height / orig_h
-	new_w, new_h = int(orig_w * ratio), int(orig_h * ratio)
-	image.resize((new_w, new_h), RESAMPLE).save(target, optimize=True, quality=quality)
-	return True
+		ratio = max_height / height
+	return int(width * ratio), int(height * ratio)
 
 
 def encode_image(image_path):
 	with open(image_path, "rb") as f:
 		return base64.b64encode(f.read()).decode("utf-8")
 
+
+# Upper bound on the base64 text kept by the image part cache (characters ~ bytes).
+IMAGE_PART_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Threads preparing image attachments in parallel. Pillow releases the GIL
+# while decoding, resizing and encoding, so threads scale without the cost
+# (and, inside NVDA, the impossibility) of spawning worker processes.
+IMAGE_POOL_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+
+def _get_image_pool() -> ThreadPoolExecutor:
+	global _image_pool
+	with _image_pool_lock:
+		if _image_pool is None:
+			_image_pool = ThreadPoolExecutor(max_workers=IMAGE_POOL_MAX_WORKERS, thread_name_prefix="AIHubImage")
+		return _image_pool
+
+
+def shutdown_image_pool() -> None:
+	"""Stop the image worker threads (add-on termination); queued work is dropped."""
+	global _image_pool
+	with _image_pool_lock:
+		pool, _image_pool = _image_pool, None
+	if pool is not None:
+		pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ImagePartCache:
+	"""Thread-safe LRU of ready ``data:`` URLs for local image attachments.
+
+	Entries are keyed by absolute path, mtime, size and the resize settings,
+	so an unchanged file is only resized and base64-encoded once however many
+	turns reference it. In-memory captures (``CapturedImage``) are keyed by
+	their id. The bound is on the total length of cached URLs.
+	"""
+
+	def __init__(self, max_bytes: int = IMAGE_PART_CACHE_MAX_BYTES):
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+		self._size = 0
+		self._lock = threading.Lock()
+
+	def get_data_url(
+		self,
+		path,
+		resize: bool = False,
+		max_width: int = 0,
+		max_height: int = 0,
+		quality: int = 85,
+		vision_profile=None,
+		min_scale: float = 1.0,
+	) -> str:
+		"""Return ``data:<mime>;base64,...`` for ``path``, resized per settings when ``resize``.
+
+		``path`` may also be a ``CapturedImage``, encoded without touching the disk.
+		With a ``vision_profile`` (see ``visiontokens``) the size and format are
+		chosen for the fewest billed tokens and bytes instead.
+		"""
+		if vision_profile is not None:
+			settings = ("vision", vision_profile.name, min_scale, quality)
+		else:
+			settings = (max_width, max_height, quality) if resize else None
+		if isinstance(path, CapturedImage):
+			key = ("capture", path.id, settings)
+		else:
+			st = os.stat(path)
+			key = (os.path.abspath(path), st.st_mtime_ns, st.st_size, settings)
+		with self._lock:
+			url = self._entries.get(key)
+			if url is not None:
+				self._entries.move_to_end(key)
+				self.hits += 1
+				return url
+			self.misses += 1
+		if vision_profile is not None:
+			url = _build_optimized_data_url(path, vision_profile, min_scale, quality)
+		else:
+			url = _build_image_data_url(path, resize, max_width, max_height, quality)
+		with self._lock:
+			if key not in self._entries:
+				self._entries[key] = url
+				self._size += len(url)
+				while self._size > self.max_bytes and len(self._entries) > 1:
+					_old_key, old_url = self._entries.popitem(last=False)
+					self._size -= len(old_url)
+		return url
+
+	def get_data_urls(self, paths: list, **settings) -> list:
+		"""``get_data_url`` for each of ``paths`` (or captures), in the same order; misses are built in parallel."""
+		if len(paths) < 2 or IMAGE_POOL_MAX_WORKERS < 2:
+			return [self.get_data_url(path, **settings) for path in paths]
+		pool = _get_image_pool()
+		futures = [pool.submit(self.get_data_url, path, **settings) for path in paths]
+		return [future.result() for future in futures]
+
+	def stats(self) -> dict:
+		with self._lock:
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"entries": len(self._entries),
+				"bytes": self._size,
+			}
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+			self._size = 0
+
+
+def _build_image_data_url(path, resize: bool, max_width: int, max_height: int, quality: int) -> str:
+	captured = isinstance(path, CapturedImage)
+	if resize and (max_width > 0 or max_height > 0):
+		buf = io.BytesIO()
+		src = path.image if captured else path
+		if resize_image(src, max_width=max_width, max_height=max_height, quality=quality, target=buf, format="JPEG"):
+			return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+	if captured:
+		buf = io.BytesIO()
+		path.image.save(buf, "PNG")
+		return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+	mime_type, _ = mimetypes.guess_type(path)
+	return f"data:{mime_type};base64,{encode_image(path)}"
+
+
+def _open_image(path):
+	if isinstance(path, CapturedImage):
+		return contextlib.nullcontext(path.image)
+	return Image.open(path)
+
+
+def _build_optimized_data_url(path, profile, min_scale: float, quality: int) -> str:
+	"""Encode ``path`` at the size ``profile`` bills least for, in the smallest suitable format.
+
+	PNG is kept when it is at most a quarter larger than the best lossy
+	encoding: text in screenshots stays crisp for little extra upload.
+	"""
+	with _open_image(path) as img:
+		img.load()
+		has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+		if img.mode not in ("RGB", "RGBA", "L"):
+			img = img.convert("RGBA" if has_alpha else "RGB")
+		width, height = img.size
+		size = target_size(profile, width, height, min_scale)
+		if size != (width, height):
+			img = img.resize(size, RESAMPLE)
+		encoded = {}
+		for fmt in profile.formats:
+			if (fmt == "WEBP" and not _WEBP_SUPPORTED) or (fmt == "JPEG" and has_alpha):
+				continue
+			buf = io.BytesIO()
+			if fmt == "PNG":
+				img.save(buf, format=fmt, optimize=True)
+			else:
+				img.save(buf, format=fmt, quality=quality)
+			encoded[fmt] = buf.getvalue()
+	fmt = min(encoded, key=lambda name: len(encoded[name]))
+	if "PNG" in encoded and len(encoded["PNG"]) <= len(encoded[fmt]) * 1.25:
+		fmt = "PNG"
+	return f"data:image/{fmt.lower()};base64," + base64.b64encode(encoded[fmt]).decode("ascii")
+
+
+image_part_cache = ImagePartCache()
+
+
+def benchmark(counts=(1, 10, 50), size=(1920, 1080), resize: bool = True, max_width: int = 0, max_height: int = 720, quality: int = 85) -> list:
+	"""Wall time to prepare ``counts`` screenshot-sized images, one by one and with the pool.
+
+	Run it from the NVDA Python console::
+
+		from globalPlugins.AIHub import imagehelper
+		for row in imagehelper.benchmark():
+			print(row)
+
+	The images are synthetic PNGs (gradient plus noise, so they neither
+	compress to nothing nor decode trivially) written to a temporary folder;
+	each measurement starts from an empty cache.
+	"""
+	rows = []
+	settings = {"resize": resize, "max_width": max_width, "max_height": max_height, "quality": quality}
+	with tempfile.TemporaryDirectory(prefix="aihub_imgbench_") as folder:
+		paths = []
+		for i in range(max(counts)):
+			gradient = Image.linear_gradient("L").resize(size).rotate(i * 7 % 360)
+			noise = Image.effect_noise(size, 32 + i % 32)
+			img = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+			path = os.path.join(folder, f"screenshot{i:03d}.png")
+			img.save(path, "PNG")
+			paths.append(path)
+		for count in counts:
+			row = {"images": count, "workers": IMAGE_POOL_MAX_WORKERS}
+			for label, parallel in (("sequentialSec", False), ("pooledSec", True)):
+				cache = ImagePartCache(max_bytes=1 << 40)
+				start = time.perf_counter()
+				if parallel:
+					cache.get_data_urls(paths[:count], **settings)
+				else:
+					for path in paths[:count]:
+						cache.get_data_url(path, **settings)
+				row[label] = round(time.perf_counter() - start, 3)
+			row["speedup"] = round(row["sequentialSec"] / max(row["pooledSec"], 1e-9), 2)
+			rows.append(row)
+	return rows
@@ -5,13 +5,19 @@ import hashlib
 import json
 import os
 import shutil
+import threading
 import uuid
 
+from logHandler import log
+
 from .consts import DATA_DIR, ensure_dir_exists
+from .conversation_index import FileLock
 
 MEDIA_DIR = os.path.join(DATA_DIR, "media")
 MEDIA_INDEX_PATH = os.path.join(MEDIA_DIR, "index.json")
 MEDIA_INDEX_VERSION = 1
+MEDIA_REFS_PATH = os.path.join(MEDIA_DIR, "refs.json")
+MEDIA_REFS_VERSION = 1
 
 
 def ensure_media_dir():
@@ -111,3 +117,166 @@ def persist_local_file(path: str, category: str, prefix: str = "asset", fallback
 	index_data["entries"] = entries
 	_save_media_index(index_data)
 	return dst
+
+
+def _file_signature(path: str):
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_mtime_ns, st.st_size)
+
+
+class MediaRefs:
+	"""Conversations referencing each stored media file: path -> set of conversation ids.
+
+	Kept in memory and in ``refs.json``, so deleting a conversation finds the
+	files nobody else uses without opening every other conversation. When the
+	file is missing or unreadable, ``load`` rebuilds the table from the
+	conversations once.
+
+	The table may list references that no longer exist (a file is then kept
+	too long) but must never miss one (a file still in use would be deleted):
+	conversations record their media here before they are written, new
+	references are written at once, and only removals wait for the end of a
+	batch. Writes hold ``refs.json.lock``; a table written by another NVDA
+	instance is reloaded and this process's pending changes applied on top.
+	"""
+
+	def __init__(self, path: str):
+		self.path = path
+		self._lock = threading.RLock()
+		self._refs: dict[str, set[str]] = {}
+		self._by_conv: dict[str, set[str]] = {}
+		self._loaded = False
+		self._signature = None
+		# conv_id -> its paths, for changes not written yet.
+		self._pending: dict[str, frozenset] = {}
+		self._depth = 0
+		self._stale = False
+		self.dirty = False
+
+	def load(self, rebuild) -> None:
+		"""Read the table, or build it from ``rebuild()`` (``(conv_id, paths)`` pairs) when missing."""
+		with self._lock:
+			if self._loaded and not self._stale and _file_signature(self.path) == self._signature:
+				return
+			if not self._stale and self._read_file():
+				return
+			log.info("mediastore: building the media reference table")
+			self._refs.clear()
+			self._by_conv.clear()
+			for conv_id, paths in rebuild():
+				self._assign(conv_id, paths)
+			for conv_id, paths in self._pending.items():
+				self._assign(conv_id, paths)
+			self._loaded = True
+			self._stale = False
+			self.dirty = True
+			self.flush()
+
+	def invalidate(self) -> None:
+		"""Rebuild the table on next ``load``: a change could not be recorded."""
+		with self._lock:
+			self._stale = True
+
+	def _read_file(self) -> bool:
+		try:
+			with open(self.path, "r", encoding="utf-8") as f:
+				data = json.load(f)
+			refs = data["refs"]
+			if not isinstance(refs, dict):
+				return False
+		except FileNotFoundError:
+			return False
+		except Exception as err:
+			log.error(f"mediastore: read {self.path}: {err}", exc_info=True)
+			return False
+		self._refs.clear()
+		self._by_conv.clear()
+		for path, conv_ids in refs.items():
+			for conv_id in conv_ids or ():
+				self._refs.setdefault(path, set()).add(conv_id)
+				self._by_conv.setdefault(conv_id, set()).add(path)
+		for conv_id, paths in self._pending.items():
+			self._assign(conv_id, paths)
+		self._signature = _file_signature(self.path)
+		self._loaded = True
+		return True
+
+	def _assign(self, conv_id: str, paths) -> None:
+		for path in self._by_conv.pop(conv_id, ()):
+			owners = self._refs.get(path)
+			if owners is not None:
+				owners.discard(conv_id)
+				if not owners:
+					del self._refs[path]
+		paths = set(paths)
+		if paths:
+			self._by_conv[conv_id] = paths
+			for path in paths:
+				self._refs.setdefault(path, set()).add(conv_id)
+
+	def record(self, conv_id: str, paths) -> None:
+		"""Record that ``conv_id`` references exactly ``paths``; new references are written at once."""
+		paths = frozenset(paths)
+		with self._lock:
+			previous = self._by_conv.get(conv_id, set())
+			if paths == previous:
+				return
+			self._assign(conv_id, paths)
+			self._pending[conv_id] = paths
+			self.dirty = True
+			if self._depth == 0 or not paths <= previous:
+				self.flush()
+
+	def release(self, conv_id: str, paths=()) -> set[str]:
+		"""Drop the references of ``conv_id`` (recorded ones and ``paths``); returns those no one holds any more."""
+		with self._lock:
+			candidates = self._by_conv.get(conv_id, set()) | set(paths)
+			self._assign(conv_id, ())
+			self._pending[conv_id] = frozenset()
+			self.dirty = True
+			if self._depth == 0:
+				self.flush()
+			return {path for path in candidates if not self._refs.get(path)}
+
+	def begin(self) -> None:
+		with self._lock:
+			self._depth += 1
+
+	def end(self) -> None:
+		with self._lock:
+			self._depth -= 1
+			if self._depth == 0:
+				try:
+					self.flush()
+				except Exception:
+					# Kept dirty: retried by the next write.
+					pass
+
+	def flush(self) -> None:
+		"""Write the table if it changed (atomic; raises when the write fails)."""
+		with self._lock:
+			if not self.dirty or not self._loaded:
+				return
+			try:
+				ensure_media_dir()
+				with FileLock(self.path + ".lock"):
+					if _file_signature(self.path) != self._signature and os.path.exists(self.path):
+						# Another instance wrote the table since we read it: start from its version.
+						self._read_file()
+					payload = {
+						"version": MEDIA_REFS_VERSION,
+						"refs": {path: sorted(owners) for path, owners in self._refs.items()},
+					}
+					_atomic_write_json(self.path, payload)
+					self._signature = _file_signature(self.path)
+			except Exception as err:
+				log.error(f"mediastore: write {self.path}: {err}", exc_info=True)
+				raise
+			self._pending.clear()
+			self.dirty = False
+
+
+media_refs = MediaRefs(MEDIA_REFS_PATH)
@@ -0,0 +1,111 @@
+"""Incremental wire-message list for one conversation page.
+
+Every request sends the whole history, and building it used to walk the
+block chain and recreate every message, attachment parts included, each
+turn. A page now keeps a ``MessageCache``: per build mode, one entry per
+contributing block in chain order, holding the message dicts built for it
+and a fingerprint of what they were built from (prompt, response,
+attachments, transcripts).
+
+``ConversationDialog.getMessages`` walks the chain and reuses entries while
+the block and its fingerprint match. At the first mismatch (an edited,
+regenerated or deleted block) the cached tail is dropped and rebuilt, so a
+new turn only builds the messages of the blocks added since the last
+request. The dialog also calls ``invalidate_from`` when it changes a block
+in place, without waiting for the next walk to notice.
+
+Reused message dicts are the same objects from one request to the next,
+which lets the client memoize their provider-specific conversion; nothing
+downstream may mutate them. Walks happen on worker threads (the request
+worker, the prompt cache pre-warm) and hold ``lock`` from ``begin`` to ``end``.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional
+
+
+def block_fingerprint(block, user_only: bool = False) -> tuple:
+	"""What the messages of ``block`` are built from; compared by equality on every walk."""
+	return (
+		block.prompt,
+		None if user_only else block.responseText,
+		tuple(block.filesList or ()),
+		tuple(getattr(block, "audioPathList", None) or ()),
+		tuple(getattr(block, "audioTranscriptList", None) or ()),
+	)
+
+
+class _Entry:
+	__slots__ = ("block", "key", "messages")
+
+	def __init__(self, block, key: tuple, messages: list):
+		self.block = block
+		self.key = key
+		self.messages = messages
+
+
+class MessageCache:
+	"""Built messages per block, for each build mode of one page."""
+
+	def __init__(self):
+		self._entries: dict[str, list[_Entry]] = {}
+		self._settings: dict[str, Any] = {}
+		self.lock = threading.RLock()
+		self.hits = 0
+		self.misses = 0
+
+	def begin(self, mode: str, settings: Any = None) -> None:
+		"""Start a walk in ``mode``; entries built under other ``settings`` are dropped."""
+		if self._settings.get(mode) != settings:
+			self._entries.pop(mode, None)
+			self._settings[mode] = settings
+
+	def messages_for(
+		self,
+		mode: str,
+		position: int,
+		block,
+		key: tuple,
+		build: Callable[[], list],
+	) -> list:
+		"""Messages of ``block``, the ``position``-th contributing block of the walk."""
+		entries = self._entries.setdefault(mode, [])
+		if position < len(entries):
+			entry = entries[position]
+			if entry.block is block and entry.key == key:
+				self.hits += 1
+				return entry.messages
+			del entries[position:]
+		messages = build()
+		entries.append(_Entry(block, key, messages))
+		self.misses += 1
+		return messages
+
+	def end(self, mode: str, count: int) -> None:
+		"""Finish a complete walk that used ``count`` entries; later ones are stale."""
+		entries = self._entries.get(mode)
+		if entries is not None:
+			del entries[count:]
+
+	def invalidate_from(self, block: Optional[object] = None) -> None:
+		"""Drop the entry of ``block`` and every later one, in all modes (everything if None)."""
+		for entries in self._entries.values():
+			if block is None:
+				entries.clear()
+				continue
+			for i, entry in enumerate(entries):
+				if entry.block is block:
+					del entries[i:]
+					break
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self._settings.clear()
+
+	def stats(self) -> dict:
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"entries": sum(len(entries) for entries in self._entries.values()),
+		}
@@ -514,6 +514,8 @@ class ModelHandlersMixin:
 				self.reasoningModeRow.Show(False)
 
 		self._apply_thinking_budget_chrome(model, preserve_chrome)
+		if hasattr(self, "refreshFilesTokenColumn"):
+			self.refreshFilesTokenColumn()
 
 		if hasattr(self, "_generation_chrome"):
 			self._generation_chrome.update_for_model(model)
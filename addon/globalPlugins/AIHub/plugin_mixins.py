@@ -6,18 +6,20 @@ so each gesture is registered once.
 
 import ctypes
 import os
+import threading
 import time
 
 import addonHandler
 import api
 import config
 import gui
+import scriptHandler
 import ui
 import wx
 from logHandler import log
 
 from . import apikeymanager
-from .consts import ADDON_DIR, TEMP_DIR, ensure_temp_dir
+from .consts import ADDON_DIR
 from .thread_shutdown import stop_worker_thread
 
 addonHandler.initTranslation()
@@ -204,6 +206,8 @@ class DialogSessionMixin:
 				page.filesList = []
 			instance.addFileToList(attachment, True)
 			instance.updateFilesList()
+			if getattr(attachment, "prompt", None) and not page.promptTextCtrl.GetValue().strip():
+				page.promptTextCtrl.SetValue(attachment.prompt)
 			# If we just dropped the attachment into a still-empty tab, retitle
 			# it to the attachment's display name (Screenshot/Navigator Object).
 			try:
@@ -241,38 +245,109 @@ class DialogSessionMixin:
 					continue
 		return None
 
+	def _recognize(self, kind: str, capture, name: str):
+		"""Describe ``capture`` in a chat session, or repeat its last description.
+
+		Near-identical captures reuse the previous description without a
+		request; captures where only a region changed send that region with
+		the previous description (see ``recognitionindex``). Pressing the
+		gesture twice always asks for a fresh description. The comparison
+		decompresses and diffs full captures, so it runs on a worker thread.
+		"""
+		from .image_file import CapturedImageFile
+
+		if not conf["images"]["reuseRecognitions"]:
+			self.startChatSession(CapturedImageFile(capture, name=name, prefix=kind))
+			return
+		fresh = scriptHandler.getLastScriptRepeatCount() > 0
+		threading.Thread(
+			target=self._recognitionWorker,
+			args=(kind, capture, name, fresh),
+			name="AIHubRecognitionIndex",
+			daemon=True,
+		).start()
+
+	def _recognitionWorker(self, kind: str, capture, name: str, fresh: bool):
+		from .image_file import CapturedImageFile
+
+		try:
+			attachment, reused = self._recognitionAttachment(kind, capture, name, fresh)
+		except Exception:
+			log.error("recognition index: could not compare the capture", exc_info=True)
+			attachment, reused = CapturedImageFile(capture, name=name, prefix=kind), None
+		wx.CallAfter(self._finishRecognition, attachment, reused)
+
+	def _finishRecognition(self, attachment, reused):
+		if reused is not None:
+			# Translators: AI-Hub NVDA menu / global scripts: spoken when the screen (or object) did not change since its last description, followed by that description.
+			ui.message(_("Unchanged since the last description (press twice for a new one): %s") % reused)
+			return
+		self.startChatSession(attachment)
+
+	def _recognitionAttachment(self, kind: str, capture, name: str, fresh: bool):
+		"""``(attachment, None)`` to describe ``capture``, or ``(None, description)`` to reuse one."""
+		from .image_file import CapturedImageFile
+		from .recognitionindex import fingerprint, recognition_index
+
+		attachment = CapturedImageFile(capture, name=name, prefix=kind)
+		print_ = fingerprint(capture.image)
+		match = None if fresh else recognition_index.lookup(kind, capture.size, print_)
+		base = ""
+		if match is not None:
+			recognition_index.count_saving(match)
+			if match.unchanged:
+				self._logRecognitionStats()
+				return None, match.description
+			left, top, right, bottom = match.box
+			width, height = capture.size
+			# Translators: AI-Hub conversation: default prompt sent with the part of a screenshot that changed since the previous one. {left}, {top}, {right}, {bottom} are pixel coordinates, {width} and {height} the size of the whole capture, {description} the previous description.
+			prompt = _(
+				"This image is the region ({left}, {top}) to ({right}, {bottom}) of a {width}x{height} capture, "
+				"the only part that changed since the previous capture. The previous capture was described as follows:\n\n"
+				"{description}\n\nDescribe what changed and what the region shows now."
+			).format(
+				left=left, top=top, right=right, bottom=bottom,
+				width=width, height=height, description=match.description,
+			)
+			# Translators: AI-Hub NVDA menu / global scripts: attachment name of the part of a screenshot that changed since the previous one; %s is the screenshot name.
+			name = _("%s (changed region)") % name
+			attachment = CapturedImageFile(capture.crop(match.box), name=name, prefix=kind, prompt=prompt)
+			base = match.base
+		recognition_index.add(kind, capture.size, print_, attachment, base)
+		self._logRecognitionStats()
+		return attachment, None
+
+	def _logRecognitionStats(self):
+		if conf["debug"]:
+			from .recognitionindex import recognition_index
+			log.info(f"recognition index: {recognition_index.stats()}")
+
 	def script_recognizeScreen(self, gesture):
-		from .imagehelper import save_screenshot
+		from .imagehelper import capture_screen
 
 		if not self.getClient():
 			return ui.message(NO_AUTHENTICATION_KEY_PROVIDED_MSG)
 		now = time.strftime("%Y-%m-%d_-_%H:%M:%S")
-		ensure_temp_dir()
-		tmpPath = os.path.join(TEMP_DIR, f"screen_{now}.png".replace(":", ""))
-		if os.path.exists(tmpPath):
-			return
-		if not save_screenshot(tmpPath):
+		capture = capture_screen()
+		if capture is None:
 			# Translators: AI-Hub NVDA menu / global scripts: brief status feedback (speech/braille), not a full dialog.
 			return ui.message(_("Failed to capture screenshot"))
 		# Translators: AI-Hub NVDA menu / global scripts: brief status feedback (speech/braille), not a full dialog.
 		name = _("Screenshot %s") % (now.split("_-_")[-1])
-		self.startChatSession((tmpPath, name))
+		self._recognize("screen", capture, name)
 
 	def script_recognizeObject(self, gesture):
-		from .imagehelper import save_screenshot
+		from .imagehelper import capture_screen
 
 		if not self.getClient():
 			return ui.message(NO_AUTHENTICATION_KEY_PROVIDED_MSG)
 		now = time.strftime("%Y-%m-%d_-_%H:%M:%S")
-		ensure_temp_dir()
-		tmpPath = os.path.join(TEMP_DIR, f"object_{now}.png".replace(":", ""))
-		if os.path.exists(tmpPath):
-			return
 		nav = api.getNavigatorObject()
 		nav.scrollIntoView()
 		location = nav.location
 		bbox = (location.left, location.top, location.left + location.width, location.top + location.height)
-		if not save_screenshot(tmpPath, bbox=bbox):
+		capture = capture_screen(bbox=bbox)
+		if capture is None:
 			# Translators: AI-Hub NVDA menu / global scripts: brief status feedback (speech/braille), not a full dialog.
 			return ui.message(_("Failed to capture object region"))
 		# Translators: AI-Hub NVDA menu / global scripts: brief status feedback (speech/braille), not a full dialog.
@@ -282,7 +357,7 @@ class DialogSessionMixin:
 			name = default_name
 		else:
 			name = "%s (%s)" % (name.strip(), default_name)
-		self.startChatSession((tmpPath, name))
+		self._recognize("object", capture, name)
 
 
 class AskRecordingMixin:
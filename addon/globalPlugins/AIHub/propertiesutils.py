@@ -196,6 +196,13 @@ def build_message_properties_html(block, unknown_model_label):
 			html.append(_li(label.strip(), value.strip()))
 		else:
 			html.append(f"<li>{_fmt(line)}</li>")
+	if timing.get("usageEstimated"):
+		# Translators: Text in message/conversation properties output; the provider did not report token usage for this answer.
+		html.append(_li(_("Usage source"), _("Estimated locally (not reported by the provider)")))
+	estimated_prompt = timing.get("estimatedPromptTokens")
+	if isinstance(estimated_prompt, int) and not isinstance(estimated_prompt, bool):
+		# Translators: Text in message/conversation properties output; prompt size counted locally before sending.
+		html.append(_li(_("Estimated prompt tokens"), f"{estimated_prompt:,}"))
 	html.append("</ul>")
 
 	timing_items = []
@@ -227,6 +234,37 @@ def build_message_properties_html(block, unknown_model_label):
 	if isinstance(total_tok_s, float):
 		# Translators: Text in message/conversation properties output.
 		timing_items.append((_('Mean total speed'), f"{total_tok_s:.2f} tok/s"))
+	net_items = []
+	if timing.get("responseCached"):
+		# Translators: Text in message/conversation properties output.
+		net_items.append((_('Source'), _('Response cache (no request sent)')))
+	reused = timing.get("netConnectionReused")
+	if isinstance(reused, bool):
+		# Translators: Text in message/conversation properties output.
+		net_items.append((_('Connection'), _('Reused') if reused else _('New')))
+	for key, label in (
+		# Translators: Text in message/conversation properties output.
+		("netSetupSec", _('Connection setup')),
+		# Translators: Text in message/conversation properties output.
+		("netDnsSec", _('DNS lookup')),
+		# Translators: Text in message/conversation properties output.
+		("netConnectSec", _('TCP connect')),
+		# Translators: Text in message/conversation properties output.
+		("netTlsSec", _('TLS handshake')),
+		# Translators: Text in message/conversation properties output.
+		("netUploadSec", _('Request upload')),
+		# Translators: Text in message/conversation properties output.
+		("netHeadersSec", _('Time to response headers')),
+		# Translators: Text in message/conversation properties output.
+		("netFirstByteSec", _('Time to first byte')),
+	):
+		value = _to_float(timing.get(key))
+		if isinstance(value, float):
+			net_items.append((label, f"{value * 1000:.0f} ms"))
+	upload_bytes = timing.get("netUploadBytes")
+	if isinstance(upload_bytes, int) and not isinstance(upload_bytes, bool):
+		# Translators: Text in message/conversation properties output.
+		net_items.append((_('Request size'), f"{upload_bytes:,} bytes"))
 	if not timing_items and not isinstance(elapsed, float):
 		elapsed_fallback = _to_float(timing.get("elapsedSec"))
 		if isinstance(elapsed_fallback, float) and elapsed_fallback > 0:
@@ -244,6 +282,12 @@ def build_message_properties_html(block, unknown_model_label):
 		for label, value in timing_items:
 			html.append(_li(label, value))
 		html.append("</ul>")
+	if net_items:
+		# Translators: Text in message/conversation properties output.
+		html.extend([f"<h2>{_fmt(_('Network'))}</h2>", "<ul>"])
+		for label, value in net_items:
+			html.append(_li(label, value))
+		html.append("</ul>")
 	if reasoning_text:
 		html.extend([
 			# Translators: Text in message/conversation properties output.
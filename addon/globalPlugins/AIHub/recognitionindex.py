@@ -0,0 +1,247 @@
+"""Perceptual-hash index of recent screen and navigator-object recognitions.
+
+Describing the same screen again is common (NVDA+E pressed after a glance
+elsewhere, a dialog that did not change) and each run used to capture,
+encode, upload and pay for a full vision request. Every capture is now
+fingerprinted with a 64-bit difference hash (dHash: a 9x8 grayscale copy,
+one bit per horizontally adjacent pair) and compared with the recent
+captures of the same kind and size:
+
+* the closest entry by Hamming distance is the candidate; beyond
+  ``SIMILAR_MAX_DISTANCE`` bits the capture is new;
+* the capture is then diffed at full resolution against the candidate's
+  (kept as zlib-compressed grayscale in the entry), ignoring brightness
+  changes up to ``PIXEL_TOLERANCE`` and a changed region no larger than a
+  caret: nothing left means the same screen, and the candidate's
+  description can be reused without a request;
+* otherwise, when the changed region covers at most ``MAX_CHANGED_AREA`` of
+  the capture, only that region (with a margin) needs to be sent, together
+  with the previous description.
+
+A capture's description is the first response to the turn that sent it;
+later answers in the conversation are not descriptions of the capture. The
+description of a cropped capture is the one of the full capture it was cut
+from followed by the answer about the region, so successive crops do not
+pile up earlier answers. The comparison is too slow for NVDA's script
+thread; callers run it on a worker thread.
+Bytes saved are counted as uncompressed pixels (3 bytes each) not sent: the
+encoded size of a capture that is never encoded is unknown.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import weakref
+import zlib
+from typing import Optional
+
+from .consts import ADDON_LIBS_DIR
+
+sys.path.insert(0, ADDON_LIBS_DIR)
+from PIL import Image, ImageChops  # noqa: E402
+sys.path.remove(ADDON_LIBS_DIR)
+
+from .imagehelper import RESAMPLE  # noqa: E402
+
+# Recent captures kept in the index (all kinds together).
+MAX_ENTRIES = 16
+# dHash bits that may differ for a capture to be compared with an entry.
+SIMILAR_MAX_DISTANCE = 12
+# zlib level of the kept captures: screens compress well even at the fastest level.
+FRAME_COMPRESSION = 1
+# Grayscale difference below which a pixel counts as unchanged (anti-aliasing, dithering).
+PIXEL_TOLERANCE = 16
+# A changed region at most this wide and high is taken for a blinking caret.
+CARET_MAX_WIDTH = 3
+CARET_MAX_HEIGHT = 48
+# Largest changed region, as a fraction of the capture, sent as a crop.
+MAX_CHANGED_AREA = 0.5
+# Margin added around the changed region, in capture pixels.
+CROP_MARGIN = 24
+
+
+def dhash(image, size: int = 8) -> int:
+	"""Difference hash of ``image``: ``size * size`` bits, one per adjacent pixel pair."""
+	small = image.convert("L").resize((size + 1, size), RESAMPLE)
+	pixels = list(small.getdata())
+	value = 0
+	for row in range(size):
+		offset = row * (size + 1)
+		for col in range(size):
+			value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+	return value
+
+
+def hamming(a: int, b: int) -> int:
+	return bin(a ^ b).count("1")
+
+
+def fingerprint(image) -> tuple:
+	"""``(dhash, grayscale image)`` of ``image``, as ``lookup`` and ``add`` take it."""
+	gray = image.convert("L")
+	return dhash(gray), gray
+
+
+class _Entry:
+	__slots__ = ("kind", "size", "hash", "frame", "base", "description", "_attachment")
+
+	def __init__(self, kind: str, size: tuple, hash_: int, frame: bytes, attachment, base: str = ""):
+		self.kind = kind
+		self.size = size
+		self.hash = hash_
+		# The capture's grayscale pixels, zlib-compressed, for the full-resolution diff.
+		self.frame = frame
+		# Description of the full capture a cropped one was cut from.
+		self.base = base
+		self.description = ""
+		self._attachment = weakref.ref(attachment) if attachment is not None else None
+
+	def holds(self, attachment) -> bool:
+		return self._attachment is not None and self._attachment() is attachment
+
+	def image(self):
+		return Image.frombytes("L", self.size, zlib.decompress(self.frame))
+
+
+class RecognitionMatch:
+	"""A recent capture close to the new one.
+
+	``box`` is None when nothing changed, else the changed region (with
+	margin) in capture pixels.
+	"""
+
+	def __init__(self, entry: _Entry, distance: int, box: Optional[tuple]):
+		self.entry = entry
+		self.distance = distance
+		self.box = box
+
+	@property
+	def description(self) -> str:
+		return self.entry.description
+
+	@property
+	def base(self) -> str:
+		"""Description of the full capture behind this one, for a crop cut from it."""
+		return self.entry.base or self.entry.description
+
+	@property
+	def unchanged(self) -> bool:
+		return self.box is None
+
+
+class RecognitionIndex:
+	"""Recent captures with their fingerprints and descriptions, newest first."""
+
+	def __init__(self, max_entries: int = MAX_ENTRIES):
+		self.max_entries = max_entries
+		self._entries: list[_Entry] = []
+		self._lock = threading.Lock()
+		self.lookups = 0
+		self.reused = 0
+		self.cropped = 0
+		self.bytes_saved = 0
+
+	def lookup(self, kind: str, size: tuple, print_: tuple) -> Optional[RecognitionMatch]:
+		"""Closest described capture of ``kind`` similar to the one ``print_`` was taken of; None if none."""
+		image_hash, image = print_
+		with self._lock:
+			self.lookups += 1
+			candidates = [
+				(hamming(entry.hash, image_hash), entry)
+				for entry in self._entries
+				if entry.kind == kind and entry.size == size and entry.description
+			]
+		if not candidates:
+			return None
+		distance, entry = min(candidates, key=lambda item: item[0])
+		if distance > SIMILAR_MAX_DISTANCE:
+			return None
+		box = _changed_box(entry.image(), image)
+		if box is not None:
+			left, top, right, bottom = box
+			if (right - left) * (bottom - top) > MAX_CHANGED_AREA * size[0] * size[1]:
+				return None
+		return RecognitionMatch(entry, distance, box)
+
+	def add(self, kind: str, size: tuple, print_: tuple, attachment, base: str = "") -> None:
+		"""Index a capture; its description is recorded when ``attachment`` gets a response.
+
+		``base`` is the description of the full capture a cropped upload was cut
+		from (``RecognitionMatch.base``); the capture's description is then that
+		followed by the response about the region.
+		"""
+		image_hash, image = print_
+		frame = zlib.compress(image.tobytes(), FRAME_COMPRESSION)
+		entry = _Entry(kind, size, image_hash, frame, attachment, base)
+		with self._lock:
+			self._entries.insert(0, entry)
+			del self._entries[self.max_entries:]
+
+	def count_saving(self, match: RecognitionMatch) -> None:
+		"""Account for a reused description or a cropped upload."""
+		width, height = match.entry.size
+		sent = 0
+		if match.box is not None:
+			left, top, right, bottom = match.box
+			sent = (right - left) * (bottom - top)
+		with self._lock:
+			if match.box is None:
+				self.reused += 1
+			else:
+				self.cropped += 1
+			self.bytes_saved += (width * height - sent) * 3
+
+	def record_response(self, attachments, text: str) -> None:
+		"""Store ``text`` as the description of the indexed captures among ``attachments``.
+
+		Only the first response counts: the entry then lets go of its
+		attachment, so follow-up turns and regenerations never replace it.
+		"""
+		if not attachments or not text:
+			return
+		with self._lock:
+			for entry in self._entries:
+				if any(entry.holds(attachment) for attachment in attachments):
+					entry.description = f"{entry.base}\n\n{text}" if entry.base else text
+					entry._attachment = None
+
+	def stats(self) -> dict:
+		with self._lock:
+			hits = self.reused + self.cropped
+			return {
+				"lookups": self.lookups,
+				"reused": self.reused,
+				"cropped": self.cropped,
+				"hitRate": round(hits / self.lookups, 3) if self.lookups else 0.0,
+				"bytesSaved": self.bytes_saved,
+				"entries": len(self._entries),
+			}
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+
+def _changed_box(old_image, new_image) -> Optional[tuple]:
+	"""Region that changed between two grayscale captures, with ``CROP_MARGIN``; None if the same.
+
+	Differences up to ``PIXEL_TOLERANCE`` and a region no larger than a caret
+	do not count as a change.
+	"""
+	mask = ImageChops.difference(old_image, new_image).point(lambda value: 255 if value > PIXEL_TOLERANCE else 0)
+	bbox = mask.getbbox()
+	if bbox is None:
+		return None
+	left, top, right, bottom = bbox
+	if right - left <= CARET_MAX_WIDTH and bottom - top <= CARET_MAX_HEIGHT:
+		return None
+	width, height = new_image.size
+	return (
+		max(0, left - CROP_MARGIN),
+		max(0, top - CROP_MARGIN),
+		min(width, right + CROP_MARGIN),
+		min(height, bottom + CROP_MARGIN),
+	)
+
+
+recognition_index = RecognitionIndex()
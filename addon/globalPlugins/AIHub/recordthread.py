@@ -23,6 +23,7 @@ import core
 import ui
 
 from . import apikeymanager
+from .apiclient._multipart import MultipartEncoder
 from .apiclient import (
 	Transcription,
 	transcribe_audio_mistral,
@@ -371,23 +372,15 @@ class RecordThread(threading.Thread):
 		if not re.match(r"^https?://", host, re.I):
 			host = "http://" + host
 		url = host + "/inference"
-		boundary = uuid.uuid4().hex
-		with open(filename, "rb") as audio_file:
-			file_data = audio_file.read()
-		body = (
-			f'--{boundary}\r\n'.encode()
-			+ f'Content-Disposition: form-data; name="file"; filename="tmp.wav"\r\n'.encode()
-			+ b'Content-Type: audio/wav\r\n\r\n'
-			+ file_data
-			+ f'\r\n--{boundary}\r\n'.encode()
-			+ b'Content-Disposition: form-data; name="temperature"\r\n\r\n0\r\n'
-			+ f'--{boundary}\r\n'.encode()
-			+ b'Content-Disposition: form-data; name="response-format"\r\n\r\njson\r\n'
-			+ f'--{boundary}--\r\n'.encode()
-		)
-		headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
-		req = Request(url, body, headers)
-		response = urlopen(req, timeout=3600)
+		body = MultipartEncoder()
+		body.add_file("file", filename, filename="tmp.wav", content_type="audio/wav")
+		body.add_field("temperature", 0)
+		body.add_field("response-format", "json")
+		req = Request(url, body, body.headers())
+		try:
+			response = urlopen(req, timeout=3600)
+		finally:
+			body.close()
 		if response.getcode() != 200:
 			raise RuntimeError(f"Error: {response.getcode()}")
 		data = json.loads(response.read().decode("utf-8"))
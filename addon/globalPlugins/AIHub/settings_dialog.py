@@ -1,11 +1,15 @@
 """Addon NVDA preferences panel for AI-Hub."""
 
+import threading
+import time
+
 import addonHandler
 import config
 import gui
 import wx
+from logHandler import log
 
-from . import apikeymanager
+from . import apikeymanager, conversations
 from .consts import (
 	Provider,
 	TranscriptionProvider,
@@ -19,6 +23,97 @@ addonHandler.initTranslation()
 conf = config.conf["AIHub"]
 
 
+class _StorageMigration:
+	"""Copies the saved conversations to another storage on a worker thread.
+
+	A progress dialog follows the copy, which reads and writes every
+	conversation the first time. The new storage is selected when it is done,
+	after a last pass on the UI thread (quick: only what changed meanwhile)
+	picks up conversations saved during the copy.
+	"""
+
+	# The running migration; one at a time.
+	current = None
+	# Seconds between progress dialog updates.
+	UPDATE_INTERVAL = 0.25
+
+	def __init__(self, storage: str):
+		self.storage = storage
+		self._progressDialog = None
+		self._lastUpdate = 0.0
+
+	@classmethod
+	def start(cls, storage: str) -> None:
+		if cls.current is not None:
+			return
+		migration = cls.current = cls(storage)
+		try:
+			migration._progressDialog = wx.ProgressDialog(
+				# Translators: Title of the progress window shown while saved conversations are copied to the newly selected storage.
+				_("Conversation storage"),
+				# Translators: Message of the progress window shown while saved conversations are copied to the newly selected storage.
+				_("Copying saved conversations..."),
+				maximum=100,
+				parent=gui.mainFrame,
+				style=wx.PD_AUTO_HIDE | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME,
+			)
+		except Exception:
+			migration._progressDialog = None
+		threading.Thread(target=migration._run, name="AIHubStorageMigration", daemon=True).start()
+
+	def _run(self):
+		error = None
+		try:
+			conversations.migrate_storage(self.storage, self._onProgress)
+		except Exception as err:
+			error = err
+		wx.CallAfter(self._finish, error)
+
+	def _onProgress(self, done: int, total: int):
+		now = time.monotonic()
+		if done < total and now - self._lastUpdate < self.UPDATE_INTERVAL:
+			return
+		self._lastUpdate = now
+		wx.CallAfter(self._update, done, total)
+
+	def _update(self, done: int, total: int):
+		if self._progressDialog is None:
+			return
+		try:
+			self._progressDialog.Update(
+				min(99, done * 100 // max(1, total)),
+				# Translators: Progress of copying saved conversations to the newly selected storage; the numbers are conversations done and in total.
+				_("Copying saved conversations: {done} of {total}").format(done=done, total=total),
+			)
+		except Exception:
+			pass
+
+	def _finish(self, error):
+		_StorageMigration.current = None
+		if self._progressDialog is not None:
+			try:
+				self._progressDialog.Destroy()
+			except Exception:
+				pass
+			self._progressDialog = None
+		if error is None:
+			try:
+				conversations.migrate_storage(self.storage)
+			except Exception as err:
+				error = err
+		if error is not None:
+			log.error(f"AI-Hub: switch conversation storage to {self.storage}: {error}", exc_info=error)
+			gui.messageBox(
+				# Translators: NVDA Preferences — AI-Hub category: error when saved conversations cannot be copied to the newly selected storage.
+				_("Saved conversations could not be copied to the selected storage; the previous one is kept.\n\n%s") % error,
+				# Translators: Title of the error message box shown when switching the conversation storage fails.
+				_("Conversation storage"),
+				wx.OK | wx.ICON_ERROR,
+			)
+			return
+		conf["conversationStorage"] = self.storage
+
+
 class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 	title = "AI-Hub"
 
@@ -61,6 +156,87 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		self.autoSaveConversation.SetValue(conf.get("autoSaveConversation", True))
 		conversationGroup.addItem(self.autoSaveConversation)
 
+		self._storageValues = [conversations.STORAGE_JSON, conversations.STORAGE_SQLITE]
+		self.conversationStorage = conversationGroup.addLabeledControl(
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — where saved conversations are stored.
+			_("Store saved conversations &in:"),
+			wx.Choice,
+			choices=[
+				# Translators: NVDA Preferences — AI-Hub category: Conversation section — storage choice: one JSON file per conversation.
+				_("JSON files"),
+				# Translators: NVDA Preferences — AI-Hub category: Conversation section — storage choice: one database with a full-text index of the messages.
+				_("SQLite database (full-text search)"),
+			],
+		)
+		self.conversationStorage.SetSelection(self._storageValues.index(conversations.configured_storage()))
+		self.conversationStorage.Enable(conversations.conversation_sqlite.available())
+
+		self.responseCacheEnabled = wx.CheckBox(
+			conversationBox,
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — replay stored answers for repeated deterministic requests.
+			label=_("Reuse stored answers for identical requests with temperature 0 or a fixed seed (response &cache)"),
+		)
+		self.responseCacheEnabled.SetValue(conf["responseCache"]["enabled"])
+		conversationGroup.addItem(self.responseCacheEnabled)
+		self.responseCacheSize = conversationGroup.addLabeledControl(
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — maximum disk space used by the response cache.
+			_("Response cache si&ze (MB):"),
+			wx.SpinCtrl,
+			min=1,
+			max=2048
+		)
+		self.responseCacheSize.SetValue(conf["responseCache"]["maxSizeMB"])
+
+		self.anthropicPromptCaching = wx.CheckBox(
+			conversationBox,
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — mark the stable part of Anthropic requests for prompt caching.
+			label=_("Use Anthropic prompt caching for the system prompt, documents and earlier &turns"),
+		)
+		self.anthropicPromptCaching.SetValue(conf["promptCaching"]["anthropic"])
+		self.anthropicPromptCaching.Bind(wx.EVT_CHECKBOX, self.onAnthropicPromptCaching)
+		conversationGroup.addItem(self.anthropicPromptCaching)
+		self.prewarmPromptCache = wx.CheckBox(
+			conversationBox,
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — send a one-token request when a saved conversation is opened so the next question is served from the prompt cache.
+			label=_("&Pre-warm the Anthropic prompt cache when a conversation is loaded"),
+		)
+		self.prewarmPromptCache.SetValue(conf["promptCaching"]["prewarmOnLoad"])
+		self.prewarmPromptCache.Enable(conf["promptCaching"]["anthropic"])
+		conversationGroup.addItem(self.prewarmPromptCache)
+
+		self.contextBudgetEnabled = wx.CheckBox(
+			conversationBox,
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — trim old history so requests fit the model's context window.
+			label=_("&Fit long conversations into the model's context window"),
+		)
+		self.contextBudgetEnabled.SetValue(conf["contextBudget"]["enabled"])
+		self.contextBudgetEnabled.Bind(wx.EVT_CHECKBOX, self.onContextBudget)
+		conversationGroup.addItem(self.contextBudgetEnabled)
+		self.contextBudgetMaxTokens = conversationGroup.addLabeledControl(
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — upper limit for the estimated prompt size; 0 uses the model's context window.
+			_("Ma&ximum prompt tokens (0 = model context window):"),
+			wx.SpinCtrl,
+			min=0,
+			max=10000000
+		)
+		self.contextBudgetMaxTokens.SetValue(conf["contextBudget"]["maxPromptTokens"])
+		self.contextBudgetKeepAttachments = conversationGroup.addLabeledControl(
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — number of most recent turns whose images, audio and documents are always resent.
+			_("Keep attachments of the &last turns:"),
+			wx.SpinCtrl,
+			min=0,
+			max=100
+		)
+		self.contextBudgetKeepAttachments.SetValue(conf["contextBudget"]["keepAttachmentTurns"])
+		self.contextBudgetSummarize = wx.CheckBox(
+			conversationBox,
+			# Translators: NVDA Preferences — AI-Hub category: Conversation section — replace turns dropped from the context by a model-written summary.
+			label=_("Su&mmarize turns dropped from the context (extra request)"),
+		)
+		self.contextBudgetSummarize.SetValue(conf["contextBudget"]["summarize"])
+		conversationGroup.addItem(self.contextBudgetSummarize)
+		self.onContextBudget(None)
+
 		sHelper.addItem(conversationSizer)
 
 		# Translators: NVDA Preferences — AI-Hub category: title of a bordered settings group.
@@ -110,6 +286,26 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 			max=100
 		)
 		self.quality.SetValue(conf["images"]["quality"])
+		self.optimizeForModel = imageGroup.addItem(
+			# Translators: NVDA Preferences — AI-Hub category: Image description section — scale and encode images for the selected model's image token billing.
+			wx.CheckBox(imageBox, label=_("&Optimize images for the selected model's token billing"))
+		)
+		self.optimizeForModel.SetValue(conf["images"]["optimizeForModel"])
+		self.optimizeForModel.Bind(wx.EVT_CHECKBOX, self.onOptimizeForModel)
+		self.optimizeMinScale = imageGroup.addLabeledControl(
+			# Translators: NVDA Preferences — AI-Hub category: Image description section — smallest size, in percent of what the model would see, that the optimizer may scale an image down to.
+			_("Minimum &kept resolution (%):"),
+			wx.SpinCtrl,
+			min=25,
+			max=100
+		)
+		self.optimizeMinScale.SetValue(conf["images"]["optimizeMinScale"])
+		self.optimizeMinScale.Enable(conf["images"]["optimizeForModel"])
+		self.reuseRecognitions = imageGroup.addItem(
+			# Translators: NVDA Preferences — AI-Hub category: Image description section — reuse the previous description when a new screenshot is (almost) the same, or send only the part that changed.
+			wx.CheckBox(imageBox, label=_("Reuse descriptions of &unchanged screens and objects (press the gesture twice for a new one)"))
+		)
+		self.reuseRecognitions.SetValue(conf["images"]["reuseRecognitions"])
 		self.useCustomPrompt = imageGroup.addItem(
 			# Translators: NVDA Preferences — AI-Hub category: Image description section — allow editing the default describe-image prompt.
 			wx.CheckBox(imageBox, label=_("Customize default text &prompt"))
@@ -250,6 +446,31 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		self.minSilenceSec.Enable(conf["audio"].get("trimSilence", True))
 		recordingGroup.addItem(cleanupSizer)
 
+		historyAudioSizer = wx.StaticBoxSizer(
+			wx.VERTICAL,
+			recordingSizer.GetStaticBox(),
+			# Translators: NVDA Preferences — AI-Hub category: title of a bordered settings group.
+			label=_("Audio in conversation history")
+		)
+		historyAudioGroup = gui.guiHelper.BoxSizerHelper(self, sizer=historyAudioSizer)
+		self.downsampleHistoryAudioCheckbox = historyAudioGroup.addItem(
+			wx.CheckBox(
+				historyAudioSizer.GetStaticBox(),
+				# Translators: NVDA Preferences — AI-Hub category: Recording — Audio in conversation history — resend earlier WAV audio at voice quality.
+				label=_("Send audio of earlier turns at &voice quality (16 kHz mono WAV)")
+			)
+		)
+		self.downsampleHistoryAudioCheckbox.SetValue(conf["audio"]["downsampleHistory"])
+		self.transcribeHistoryAudioCheckbox = historyAudioGroup.addItem(
+			wx.CheckBox(
+				historyAudioSizer.GetStaticBox(),
+				# Translators: NVDA Preferences — AI-Hub category: Recording — Audio in conversation history — replace earlier audio with its transcript.
+				label=_("Replace audio of earlier turns with its trans&cript")
+			)
+		)
+		self.transcribeHistoryAudioCheckbox.SetValue(conf["audio"]["transcribeHistory"])
+		recordingGroup.addItem(historyAudioSizer)
+
 		sHelper.addItem(recordingSizer)
 
 		self.onResize(None)
@@ -304,6 +525,9 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		self.maxHeight.Enable(self.resize.GetValue())
 		self.quality.Enable(self.resize.GetValue())
 
+	def onOptimizeForModel(self, evt):
+		self.optimizeMinScale.Enable(self.optimizeForModel.GetValue())
+
 	def onTranscriptionProviderChange(self, evt):
 		idx = self.transcriptionProviderChoice.GetSelection()
 		is_whisper_cpp = idx == 0
@@ -313,6 +537,15 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		self.openaiTranscriptionAccountChoice.Enable(is_openai)
 		self.mistralTranscriptionAccountChoice.Enable(is_mistral)
 
+	def onAnthropicPromptCaching(self, evt):
+		self.prewarmPromptCache.Enable(self.anthropicPromptCaching.GetValue())
+
+	def onContextBudget(self, evt):
+		enabled = self.contextBudgetEnabled.GetValue()
+		self.contextBudgetMaxTokens.Enable(enabled)
+		self.contextBudgetKeepAttachments.Enable(enabled)
+		self.contextBudgetSummarize.Enable(enabled)
+
 	def onTrimSilenceChange(self, evt):
 		self.minSilenceSec.Enable(self.trimSilenceCheckbox.GetValue())
 
@@ -326,17 +559,37 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		else:
 			self.customPromptText.Enable(False)
 
+	def _saveConversationStorage(self):
+		storage = self._storageValues[self.conversationStorage.GetSelection()]
+		if storage == conversations.configured_storage():
+			return
+		# Copy from the current storage before switching, so nothing saved is left behind;
+		# the new storage is selected once the copy is complete.
+		_StorageMigration.start(storage)
+
 	def onSave(self):
 		conf["blockEscapeKey"] = self.blockEscape.GetValue()
 		conf["renewClient"] = True
 		conf["saveSystem"] = self.saveSystem.GetValue()
 		conf["autoSaveConversation"] = self.autoSaveConversation.GetValue()
+		self._saveConversationStorage()
+		conf["responseCache"]["enabled"] = self.responseCacheEnabled.GetValue()
+		conf["responseCache"]["maxSizeMB"] = int(self.responseCacheSize.GetValue())
+		conf["promptCaching"]["anthropic"] = self.anthropicPromptCaching.GetValue()
+		conf["promptCaching"]["prewarmOnLoad"] = self.prewarmPromptCache.GetValue()
+		conf["contextBudget"]["enabled"] = self.contextBudgetEnabled.GetValue()
+		conf["contextBudget"]["maxPromptTokens"] = int(self.contextBudgetMaxTokens.GetValue())
+		conf["contextBudget"]["keepAttachmentTurns"] = int(self.contextBudgetKeepAttachments.GetValue())
+		conf["contextBudget"]["summarize"] = self.contextBudgetSummarize.GetValue()
 		conf["TTSVoice"] = self.voiceList.GetString(self.voiceList.GetSelection())
 		conf["TTSModel"] = self.modelList.GetString(self.modelList.GetSelection())
 		conf["images"]["resize"] = self.resize.GetValue()
 		conf["images"]["maxWidth"] = int(self.maxWidth.GetValue())
 		conf["images"]["maxHeight"] = int(self.maxHeight.GetValue())
 		conf["images"]["quality"] = int(self.quality.GetValue())
+		conf["images"]["optimizeForModel"] = self.optimizeForModel.GetValue()
+		conf["images"]["optimizeMinScale"] = int(self.optimizeMinScale.GetValue())
+		conf["images"]["reuseRecognitions"] = self.reuseRecognitions.GetValue()
 		if self.useCustomPrompt.GetValue():
 			conf["images"]["useCustomPrompt"] = True
 			conf["images"]["customPromptText"] = self.customPromptText.GetValue()
@@ -361,5 +614,7 @@ class AIHubSettingsPanel(gui.settingsDialogs.SettingsPanel):
 		)
 		conf["audio"]["trimSilence"] = self.trimSilenceCheckbox.GetValue()
 		conf["audio"]["minSilenceSec"] = int(self.minSilenceSec.GetValue())
+		conf["audio"]["downsampleHistory"] = self.downsampleHistoryAudioCheckbox.GetValue()
+		conf["audio"]["transcribeHistory"] = self.transcribeHistoryAudioCheckbox.GetValue()
 		for key, item in self.chatFeedback.items():
 			conf["chatFeedback"][key] = item.GetValue()
@@ -0,0 +1,171 @@
+"""Bounded producer/consumer hand-off between the network reader and the stream consumer.
+
+A streamed completion used to be read, parsed and applied to the history block
+by a single loop, so any slow step on the consumer side (think-tag stripping,
+speech segmentation, UI updates) directly delayed the next socket read. Here a
+dedicated reader thread iterates the ``StreamEvent`` generator and pushes events
+into a bounded queue; the consumer drains whatever has queued up since its last
+visit as one coalesced batch.
+
+The queue is bounded in *batches*, not events: when it is full the reader keeps
+reading and grows its pending batch instead of blocking, so the socket is never
+stalled by the consumer and a burst of arrivals turns into a single hand-off.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Iterable, Iterator, Optional
+
+# Maximum number of batches waiting in the queue before the reader coalesces.
+STREAM_QUEUE_MAX_BATCHES = 64
+
+# How long the consumer waits for data before yielding an empty batch, so it can
+# still poll abort flags and play the "response pending" sound during stalls.
+STREAM_IDLE_POLL_SEC = 0.25
+
+_END = object()
+
+
+class StreamPipeline:
+	"""Read ``source`` on a background thread and hand events over in batches.
+
+	Usage::
+
+		pipeline = StreamPipeline(response)
+		try:
+			for events in pipeline.batches():
+				...
+		finally:
+			pipeline.close()
+
+	An exception raised while iterating ``source`` is re-raised from
+	:meth:`batches` after every event read before it has been delivered.
+	"""
+
+	def __init__(
+		self,
+		source: Iterable[Any],
+		max_batches: int = STREAM_QUEUE_MAX_BATCHES,
+		idle_poll: float = STREAM_IDLE_POLL_SEC,
+	):
+		self._source = source
+		self._queue: queue.Queue = queue.Queue(max_batches)
+		self._idle_poll = idle_poll
+		self._stop = threading.Event()
+		self._error: Optional[BaseException] = None
+		# Producer-side batch; only touched by the reader thread.
+		self._pending: list = []
+		self._thread = threading.Thread(target=self._produce, name="AIHubStreamReader", daemon=True)
+		self._started = False
+		self.events = 0
+		self.batchCount = 0
+		self.maxQueueDepth = 0
+		self.maxBatchSize = 0
+		self._lagTotal = 0.0
+		self.maxLag = 0.0
+
+	def start(self) -> "StreamPipeline":
+		if not self._started:
+			self._started = True
+			self._thread.start()
+		return self
+
+	def _offer(self, item) -> None:
+		self._pending.append(item)
+		try:
+			self._queue.put_nowait(self._pending)
+		except queue.Full:
+			# Consumer is behind: keep reading and hand everything over at once later.
+			return
+		self._pending = []
+		depth = self._queue.qsize()
+		if depth > self.maxQueueDepth:
+			self.maxQueueDepth = depth
+
+	def _produce(self) -> None:
+		try:
+			for event in self._source:
+				if self._stop.is_set():
+					break
+				self._offer((time.perf_counter(), event))
+		except BaseException as err:
+			self._error = err
+		finally:
+			close = getattr(self._source, "close", None)
+			if callable(close):
+				try:
+					close()
+				except Exception:
+					pass
+			self._pending.append((time.perf_counter(), _END))
+			while not self._stop.is_set():
+				try:
+					self._queue.put(self._pending, timeout=self._idle_poll)
+					break
+				except queue.Full:
+					continue
+			self._pending = []
+
+	def batches(self) -> Iterator[list]:
+		"""Yield lists of events in arrival order until the source is exhausted.
+
+		An empty list is yielded whenever nothing arrived for ``idle_poll``
+		seconds. Everything queued at the time of a wake-up is merged into one
+		batch.
+		"""
+		self.start()
+		while True:
+			try:
+				batch = self._queue.get(timeout=self._idle_poll)
+			except queue.Empty:
+				yield []
+				continue
+			while True:
+				try:
+					batch.extend(self._queue.get_nowait())
+				except queue.Empty:
+					break
+			now = time.perf_counter()
+			events = []
+			finished = False
+			for queued_at, event in batch:
+				if event is _END:
+					finished = True
+					break
+				lag = now - queued_at
+				self._lagTotal += lag
+				if lag > self.maxLag:
+					self.maxLag = lag
+				events.append(event)
+			if events:
+				self.events += len(events)
+				self.batchCount += 1
+				if len(events) > self.maxBatchSize:
+					self.maxBatchSize = len(events)
+				yield events
+			if finished:
+				if self._error is not None:
+					raise self._error
+				return
+
+	def close(self) -> None:
+		"""Stop the reader after its current read; pending events are discarded."""
+		self._stop.set()
+		try:
+			while True:
+				self._queue.get_nowait()
+		except queue.Empty:
+			pass
+
+	def metrics(self) -> dict:
+		"""Queue depth, batching and reader-to-consumer lag for timing metadata."""
+		return {
+			"streamEvents": self.events,
+			"streamBatches": self.batchCount,
+			"streamMaxBatchSize": self.maxBatchSize,
+			"streamMaxQueueDepth": self.maxQueueDepth,
+			"streamMaxLagSec": round(self.maxLag, 4),
+			"streamMeanLagSec": round(self._lagTotal / self.events, 4) if self.events else 0.0,
+		}
@@ -11,6 +11,8 @@ def stop_worker_thread(worker: Any, *, join_timeout: float = DEFAULT_JOIN_TIMEOU
 
 	Use this for ``CompletionThread``, ``RecordThread``, plain ``threading.Thread``, or any
 	object that exposes ``stop`` / ``abort`` plus ``join`` when it is a ``threading.Thread``.
+	A ``cancelToken`` attribute (an ``apiclient.CancelToken``) is cancelled as well, which
+	shuts down the sockets of the worker's in-flight requests so blocked reads return at once.
 	Errors from stop/abort/join are swallowed so shutdown paths stay robust.
 	"""
 	if worker is None:
@@ -25,6 +27,12 @@ def stop_worker_thread(worker: Any, *, join_timeout: float = DEFAULT_JOIN_TIMEOU
 			worker.abort()
 		except Exception:
 			pass
+	token = getattr(worker, "cancelToken", None)
+	if token is not None:
+		try:
+			token.cancel()
+		except Exception:
+			pass
 	if isinstance(worker, threading.Thread):
 		try:
 			worker.join(timeout=join_timeout)
@@ -0,0 +1,122 @@
+"""Offline token counting for pre-flight size and cost estimates.
+
+Usage reported by providers only arrives once a request has been answered.
+This package counts tokens locally, before anything is sent:
+
+* OpenAI models (directly or through OpenRouter) use a pure-Python BPE
+  encoder over the ``o200k_base`` / ``cl100k_base`` vocabularies. Counts are
+  approximate: the pre-tokenizer approximates tiktoken's patterns with the
+  standard ``re`` module, so a few tokens can differ around superscripts,
+  combining marks and some scripts. The
+  vocabularies ship as compact binary tables in ``tokenizer/data`` (created by
+  the build from the published tiktoken files, see ``build_table``); they are
+  memory-mapped on first use, so neither start-up time nor resident memory
+  pays for them until a count is needed.
+* Every other model, or an OpenAI model when its table is missing, uses a
+  heuristic scaled per provider and calibrated against billed usage.
+
+Public API:
+
+* ``counter_for_model(model)`` — object with ``count(text)`` (and ``name``).
+* ``count_tokens(text, model=None)`` — shortcut for the above.
+* ``calibrate(model, estimated, actual)`` — feed billed prompt tokens back.
+* ``get_encoding(name)`` — the BPE ``Encoding`` for a vocabulary, or None.
+* ``build_table(source, dest)`` — convert a ``.tiktoken`` file to a table.
+* ``benchmark(...)`` — measure counting throughput.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+from ._bpe import Encoding
+from ._benchmark import benchmark
+from ._heuristic import HeuristicCounter, estimate_tokens
+from ._tables import RankTable, build_table
+
+__all__ = [
+	"Encoding",
+	"HeuristicCounter",
+	"TABLES_DIR",
+	"benchmark",
+	"build_table",
+	"calibrate",
+	"count_tokens",
+	"counter_for_model",
+	"encoding_name_for_model",
+	"estimate_tokens",
+	"get_encoding",
+]
+
+TABLES_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Model id prefixes (after any "openai/" router prefix) and their vocabulary.
+_CL100K_PREFIXES = ("gpt-4-", "gpt-4:", "gpt-3.5", "text-embedding-3", "text-embedding-ada")
+_O200K_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-4.5", "gpt-5", "chatgpt-", "o1", "o3", "o4", "gpt-oss", "codex-")
+
+_lock = threading.Lock()
+_encodings: dict[str, Optional[Encoding]] = {}
+_heuristics: dict[str, HeuristicCounter] = {}
+
+
+def get_encoding(name: str) -> Optional[Encoding]:
+	"""The ``Encoding`` for vocabulary ``name``; None when its table is not installed."""
+	with _lock:
+		if name in _encodings:
+			return _encodings[name]
+		encoding = None
+		path = os.path.join(TABLES_DIR, f"{name}.bin")
+		if os.path.isfile(path):
+			try:
+				encoding = Encoding(name, RankTable(path))
+			except (OSError, ValueError):
+				encoding = None
+		_encodings[name] = encoding
+		return encoding
+
+
+def encoding_name_for_model(model) -> Optional[str]:
+	"""Vocabulary used by ``model`` when it is a known OpenAI model, else None."""
+	provider = str(getattr(model, "provider", "") or "")
+	model_id = str(getattr(model, "id", model) or "").lower()
+	if provider == "OpenRouter":
+		if not model_id.startswith("openai/"):
+			return None
+		model_id = model_id[len("openai/"):]
+	elif provider not in ("OpenAI", ""):
+		return None
+	if model_id == "gpt-4" or model_id.startswith(_CL100K_PREFIXES):
+		return "cl100k_base"
+	if model_id.startswith(_O200K_PREFIXES):
+		return "o200k_base"
+	return None
+
+
+def _heuristic(provider: str) -> HeuristicCounter:
+	with _lock:
+		counter = _heuristics.get(provider)
+		if counter is None:
+			counter = _heuristics[provider] = HeuristicCounter(provider)
+		return counter
+
+
+def counter_for_model(model=None):
+	"""Best available counter for ``model`` (an ``Encoding`` or a ``HeuristicCounter``)."""
+	name = encoding_name_for_model(model) if model is not None else None
+	if name:
+		encoding = get_encoding(name)
+		if encoding is not None:
+			return encoding
+	return _heuristic(str(getattr(model, "provider", "") or ""))
+
+
+def count_tokens(text: str, model=None) -> int:
+	return counter_for_model(model).count(text)
+
+
+def calibrate(model, estimated: int, actual: int) -> None:
+	"""Refine the heuristic of ``model``'s provider; BPE encoders are left as is."""
+	counter = counter_for_model(model)
+	if isinstance(counter, HeuristicCounter):
+		counter.calibrate(estimated, actual)
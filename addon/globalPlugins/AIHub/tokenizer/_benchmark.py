@@ -0,0 +1,80 @@
+"""Throughput benchmark for the offline token counters.
+
+Run it from the NVDA Python console::
+
+	from globalPlugins.AIHub import tokenizer
+	for row in tokenizer.benchmark():
+		print(row)
+
+Each installed BPE table is measured twice: a cold pass (empty piece cache,
+what the first request of a session pays) and warm passes with the piece
+cache filled, as in a conversation whose history is recounted every turn.
+The heuristic is measured as well, for comparison.
+"""
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+_SAMPLE = (
+	"The quick brown fox jumps over the lazy dog. Prompt caching, context windows and "
+	"tokenizers: internationalization isn't trivial!\n"
+	"def fibonacci(n: int) -> int:\n\treturn n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)\n"
+	"Le renard brun saute par-dessus le chien paresseux. Über den Wolken 1234567 ÄÖÜ.\n"
+	"Быстрая коричневая лиса. 快速的棕色狐狸跳过了懒狗。 素早い茶色の狐。\n"
+	"https://example.com/path?query=value&other=42 {\"key\": [1, 2, 3], \"ok\": true}\n"
+)
+
+
+def _measure(count, text: str, repeat: int) -> tuple[int, float]:
+	best = None
+	tokens = 0
+	for _i in range(repeat):
+		start = time.perf_counter()
+		tokens = count(text)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return tokens, best or 1e-9
+
+
+def benchmark(text: Optional[str] = None, *, size: int = 1_000_000, repeat: int = 3) -> list[dict]:
+	"""Count ``text`` (default: ``size`` characters of mixed sample text) with every counter.
+
+	Returns one dict per counter with the token count, the elapsed time and
+	the throughput in characters and tokens per second.
+	"""
+	from . import HeuristicCounter, get_encoding
+
+	if text is None:
+		text = (_SAMPLE * (size // len(_SAMPLE) + 1))[:size]
+	rows = []
+
+	def _row(name, tokens, elapsed, load=None):
+		row = {
+			"counter": name,
+			"chars": len(text),
+			"tokens": tokens,
+			"seconds": round(elapsed, 4),
+			"charsPerSec": int(len(text) / elapsed),
+			"tokensPerSec": int(tokens / elapsed),
+		}
+		if load is not None:
+			row["loadSeconds"] = round(load, 4)
+		rows.append(row)
+
+	for name in ("o200k_base", "cl100k_base"):
+		start = time.perf_counter()
+		encoding = get_encoding(name)
+		load = time.perf_counter() - start
+		if encoding is None:
+			continue
+		encoding._pieces.clear()
+		# Bypass the per-text count cache so repeated passes still do the work.
+		tokens, elapsed = _measure(encoding._count_uncached, text, 1)
+		_row(f"{name} (cold)", tokens, elapsed, load)
+		tokens, elapsed = _measure(encoding._count_uncached, text, repeat)
+		_row(f"{name} (warm)", tokens, elapsed)
+	heuristic = HeuristicCounter()
+	tokens, elapsed = _measure(heuristic.count, text, repeat)
+	_row("heuristic", tokens, elapsed)
+	return rows
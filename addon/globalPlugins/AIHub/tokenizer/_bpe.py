@@ -0,0 +1,140 @@
+"""Byte-pair encoder compatible with tiktoken's ``cl100k_base`` and ``o200k_base``.
+
+Text is first split into pieces by the encoding's pre-tokenizer pattern, then
+each piece's UTF-8 bytes are merged pairwise by rank until no mergeable pair
+is left, exactly like tiktoken's reference ``byte_pair_merge``. Pieces that
+are a whole vocabulary entry (most words) are resolved with a single lookup,
+and recent pieces are cached.
+
+tiktoken's patterns use ``\\p{...}`` Unicode classes, which the standard ``re``
+module lacks, so they are approximated here; this can shift a token here and
+there around unusual scripts and case changes.
+"""
+from __future__ import annotations
+
+import re as _re
+import threading
+from typing import Iterable, Optional
+
+from ._tables import RankTable
+
+_CONTRACTIONS = r"(?i:'s|'t|'re|'ve|'m|'ll|'d)"
+
+# Letters are "word characters that are neither digits nor underscore";
+# upper case is approximated for Latin, Greek and Cyrillic.
+_LETTER = r"[^\W\d_]"
+_NOT_LETTER_OR_DIGIT = r"(?:[^\w\r\n]|_)"
+_UPPER = r"[A-ZÀ-ÖØ-ÞΑ-ΩЀ-Я]"
+_LOWER = rf"(?:(?!{_UPPER}){_LETTER})"
+_CL100K_PATTERN = (
+	_CONTRACTIONS
+	+ rf"""|{_NOT_LETTER_OR_DIGIT}?{_LETTER}+|\d{{1,3}}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+_O200K_PATTERN = "|".join((
+	rf"{_NOT_LETTER_OR_DIGIT}?{_UPPER}*{_LOWER}+{_CONTRACTIONS}?",
+	rf"{_NOT_LETTER_OR_DIGIT}?{_UPPER}+{_LOWER}*{_CONTRACTIONS}?",
+	r"\d{1,3}",
+	r" ?(?:[^\s\w]|_)+[\r\n/]*",
+	r"\s*[\r\n]+",
+	r"\s+(?!\S)",
+	r"\s+",
+))
+
+PATTERNS = {
+	"cl100k_base": _CL100K_PATTERN,
+	"o200k_base": _O200K_PATTERN,
+}
+
+# Pieces remembered per encoding; chat history repeats most words every turn.
+_PIECE_CACHE_SIZE = 16384
+# Whole texts whose count is remembered (history messages are recounted each turn).
+_COUNT_CACHE_SIZE = 512
+_COUNT_CACHE_MIN_CHARS = 256
+
+
+def _byte_pair_merge(table: RankTable, piece: bytes) -> list[int]:
+	"""Token ids of ``piece``, merging the lowest-ranked adjacent pair first."""
+	rank_of = table.rank
+	# parts[i] is the start offset of the i-th current part; the last entry is len(piece).
+	parts = list(range(len(piece) + 1))
+	ranks = [rank_of(piece[i:i + 2]) for i in range(len(piece) - 1)]
+	while ranks:
+		best = None
+		best_i = -1
+		for i, r in enumerate(ranks):
+			if r is not None and (best is None or r < best):
+				best = r
+				best_i = i
+		if best is None:
+			break
+		# Merge parts best_i and best_i + 1.
+		del parts[best_i + 1]
+		del ranks[best_i]
+		if best_i + 2 < len(parts):
+			ranks[best_i] = rank_of(piece[parts[best_i]:parts[best_i + 2]])
+		if best_i > 0:
+			ranks[best_i - 1] = rank_of(piece[parts[best_i - 1]:parts[best_i + 1]])
+	out = []
+	for start, end in zip(parts, parts[1:]):
+		rank = rank_of(piece[start:end])
+		if rank is None:
+			# Byte-level vocabularies contain every single byte; be defensive anyway.
+			out.extend(rank_of(piece[i:i + 1]) or 0 for i in range(start, end))
+		else:
+			out.append(rank)
+	return out
+
+
+class Encoding:
+	"""A named BPE vocabulary with its pre-tokenizer."""
+
+	def __init__(self, name: str, table: RankTable, pattern: Optional[str] = None):
+		self.name = name
+		self.table = table
+		self._split = _re.compile(pattern or PATTERNS[name]).findall
+		self._pieces: dict[bytes, tuple] = {}
+		self._counts: dict[str, int] = {}
+		self._lock = threading.Lock()
+
+	def _encode_piece(self, piece: bytes) -> tuple:
+		cached = self._pieces.get(piece)
+		if cached is not None:
+			return cached
+		rank = self.table.rank(piece)
+		tokens = (rank,) if rank is not None else tuple(_byte_pair_merge(self.table, piece))
+		with self._lock:
+			if len(self._pieces) >= _PIECE_CACHE_SIZE:
+				self._pieces.clear()
+			self._pieces[piece] = tokens
+		return tokens
+
+	def encode(self, text: str) -> list[int]:
+		"""Token ids of ``text`` (special tokens are encoded as ordinary text)."""
+		out: list[int] = []
+		for piece in self._split(text):
+			out.extend(self._encode_piece(piece.encode("utf-8")))
+		return out
+
+	def count(self, text: str) -> int:
+		if not text:
+			return 0
+		cacheable = len(text) >= _COUNT_CACHE_MIN_CHARS
+		if cacheable:
+			cached = self._counts.get(text)
+			if cached is not None:
+				return cached
+		total = self._count_uncached(text)
+		if cacheable:
+			with self._lock:
+				if len(self._counts) >= _COUNT_CACHE_SIZE:
+					self._counts.clear()
+				self._counts[text] = total
+		return total
+
+	def _count_uncached(self, text: str) -> int:
+		encode_piece = self._encode_piece
+		return sum(len(encode_piece(piece.encode("utf-8"))) for piece in self._split(text))
+
+	def decode(self, tokens: Iterable[int]) -> str:
+		data = b"".join(self.table.token_bytes(t) for t in tokens)
+		return data.decode("utf-8", errors="replace")
@@ -0,0 +1,127 @@
+"""Compact, memory-mapped BPE rank tables.
+
+A table maps every token's byte string to its rank (which is also its token
+id). The file is laid out so it can be used straight from a memory map,
+without building a Python dict of 100k-200k entries at load time:
+
+- header: magic, token count, hash slot count, blob size (little-endian u32);
+- offsets: ``count + 1`` u32, token ``r`` is ``blob[offsets[r]:offsets[r + 1]]``;
+- slots: open-addressing hash table of ``rank + 1`` (0 = empty), indexed by
+  ``crc32(token) & (slots - 1)`` with linear probing;
+- blob: all token bytes, concatenated in rank order.
+
+``build_table`` converts a tiktoken ``.tiktoken`` rank file (one
+``base64(token) rank`` pair per line). This module only uses the standard
+library so the build script can load it on its own.
+"""
+from __future__ import annotations
+
+import base64
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from typing import Optional
+
+TABLE_MAGIC = b"AIHBPE1\0"
+_HEADER = struct.Struct("<8sIII")
+
+
+def _slot_count(count: int) -> int:
+	slots = 1
+	while slots < count * 2:
+		slots <<= 1
+	return slots
+
+
+def build_table(source_path: str, dest_path: str) -> int:
+	"""Write the binary table for a ``.tiktoken`` file; returns the token count."""
+	ranks: dict[int, bytes] = {}
+	with open(source_path, "rb") as f:
+		for line in f:
+			line = line.strip()
+			if not line:
+				continue
+			token_b64, rank = line.split()
+			ranks[int(rank)] = base64.b64decode(token_b64)
+	count = max(ranks) + 1 if ranks else 0
+	offsets = array("I", [0] * (count + 1))
+	blob = bytearray()
+	for rank in range(count):
+		offsets[rank] = len(blob)
+		blob += ranks.get(rank, b"")
+	offsets[count] = len(blob)
+	n_slots = _slot_count(count)
+	mask = n_slots - 1
+	slots = array("I", [0] * n_slots)
+	for rank, token in ranks.items():
+		h = zlib.crc32(token) & mask
+		while slots[h]:
+			h = (h + 1) & mask
+		slots[h] = rank + 1
+	if sys.byteorder != "little":
+		offsets.byteswap()
+		slots.byteswap()
+	with open(dest_path, "wb") as f:
+		f.write(_HEADER.pack(TABLE_MAGIC, count, n_slots, len(blob)))
+		f.write(offsets.tobytes())
+		f.write(slots.tobytes())
+		f.write(blob)
+	return count
+
+
+class RankTable:
+	"""Read-only view of a table file; lookups go through the memory map."""
+
+	def __init__(self, path: str):
+		self.path = path
+		with open(path, "rb") as f:
+			self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			magic, count, n_slots, blob_size = _HEADER.unpack_from(self._mmap, 0)
+			if magic != TABLE_MAGIC:
+				raise ValueError(f"not a tokenizer table: {path}")
+			pos = _HEADER.size
+			offsets_end = pos + 4 * (count + 1)
+			slots_end = offsets_end + 4 * n_slots
+			if slots_end + blob_size > len(self._mmap) or n_slots & (n_slots - 1):
+				raise ValueError(f"truncated tokenizer table: {path}")
+			view = memoryview(self._mmap)
+			if sys.byteorder == "little":
+				self._offsets = view[pos:offsets_end].cast("I")
+				self._slots = view[offsets_end:slots_end].cast("I")
+			else:
+				self._offsets = array("I", view[pos:offsets_end])
+				self._offsets.byteswap()
+				self._slots = array("I", view[offsets_end:slots_end])
+				self._slots.byteswap()
+			self._blob_start = slots_end
+		except Exception:
+			self._mmap.close()
+			raise
+		self.count = count
+		self._mask = n_slots - 1
+
+	def rank(self, token: bytes) -> Optional[int]:
+		"""Rank of ``token``, or None when it is not in the vocabulary."""
+		slots = self._slots
+		offsets = self._offsets
+		mm = self._mmap
+		base = self._blob_start
+		size = len(token)
+		h = zlib.crc32(token) & self._mask
+		while True:
+			entry = slots[h]
+			if not entry:
+				return None
+			rank = entry - 1
+			start = offsets[rank]
+			if offsets[rank + 1] - start == size and mm[base + start:base + start + size] == token:
+				return rank
+			h = (h + 1) & self._mask
+
+	def token_bytes(self, rank: int) -> bytes:
+		start = self._offsets[rank]
+		end = self._offsets[rank + 1]
+		return self._mmap[self._blob_start + start:self._blob_start + end]
@@ -1,13 +1,14 @@
 """Base class for single-tool dialogs."""
 
 import os
+import threading
 
 import addonHandler
 import config
 import wx
 
 from . import apikeymanager
-from .apiclient import configure_client_for_provider
+from .apiclient import CancelToken, configure_client_for_provider, use_cancel_token
 
 addonHandler.initTranslation()
 
@@ -39,6 +40,7 @@ class ToolDialogBase(wx.Dialog):
 		self._taskProgressTimer = None
 		self._taskBusySetter = None
 		self._taskCancelRequested = False
+		self._taskCancelToken = CancelToken()
 		self.Bind(wx.EVT_CLOSE, self.onClose)
 		self.Bind(wx.EVT_CHAR_HOOK, self._onCharHook)
 
@@ -59,6 +61,7 @@ class ToolDialogBase(wx.Dialog):
 
 	def begin_long_task(self, status_message: str, set_busy):
 		self._taskCancelRequested = False
+		self._taskCancelToken = CancelToken()
 		self._taskBusySetter = set_busy
 		if callable(set_busy):
 			set_busy(True)
@@ -97,6 +100,24 @@ class ToolDialogBase(wx.Dialog):
 	def is_task_cancel_requested(self) -> bool:
 		return bool(self._taskCancelRequested)
 
+	def start_task_thread(self, target, *args) -> threading.Thread:
+		"""Run ``target(*args)`` on a daemon thread bound to the current task's cancel token.
+
+		HTTP requests made through the add-on's API client on that thread are
+		aborted at the socket as soon as the task is cancelled, either from the
+		progress dialog or by ``stop_worker_thread`` when the dialog closes.
+		"""
+		token = self._taskCancelToken
+
+		def _run():
+			with use_cancel_token(token):
+				target(*args)
+
+		worker = threading.Thread(target=_run, daemon=True)
+		worker.cancelToken = token
+		worker.start()
+		return worker
+
 	def _onTaskProgressTimer(self, evt):
 		if not self._taskProgressDialog:
 			return
@@ -112,6 +133,7 @@ class ToolDialogBase(wx.Dialog):
 		if self._taskCancelRequested:
 			return
 		self._taskCancelRequested = True
+		self._taskCancelToken.cancel()
 		self._destroy_task_progress_dialog()
 		if callable(self._taskBusySetter):
 			self._taskBusySetter(False)
@@ -2,7 +2,6 @@
 
 import base64
 import json
-import threading
 import urllib.parse
 import urllib.request
 import winsound
@@ -11,6 +10,7 @@ import addonHandler
 import wx
 from logHandler import log
 
+from .apiclient._http import _create_opener, _open_json
 from .conversations import ConversationFormat
 from .consts import (
 	Provider,
@@ -228,8 +228,7 @@ class Lyria3ProToolDialog(ToolDialogBase):
 			headers={"Content-Type": "application/json"},
 			method="POST",
 		)
-		with urllib.request.urlopen(req, timeout=300) as resp:
-			return json.loads(resp.read().decode("utf-8", errors="replace"))
+		return _open_json(_create_opener(), req, timeout=300)
 
 	def _get_audio_ext(self, result):
 		if isinstance(result, dict):
@@ -442,9 +441,4 @@ class Lyria3ProToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while Lyria 3 Pro is generating music.
 		self.begin_long_task(_("Music generation in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_generation_thread,
-			args=(acc_id, api_key, prompt, negative, model, options),
-			daemon=True,
-		)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_generation_thread, acc_id, api_key, prompt, negative, model, options)
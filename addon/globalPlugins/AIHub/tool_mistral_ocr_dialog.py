@@ -4,7 +4,6 @@ import base64
 import json
 import mimetypes
 import os
-import threading
 import urllib.request
 import winsound
 
@@ -12,6 +11,7 @@ import addonHandler
 import wx
 from logHandler import log
 
+from .apiclient._http import _create_opener, _open_json
 from .conversations import ConversationFormat
 from .consts import (
 	Provider,
@@ -216,8 +216,7 @@ class MistralOCRToolDialog(ToolDialogBase):
 				headers={"Content-Type": "application/json", "x-api-key": api_key.strip()},
 				method="POST",
 			)
-			with urllib.request.urlopen(req, timeout=180) as resp:
-				payload = json.loads(resp.read().decode("utf-8", errors="replace"))
+			payload = _open_json(_create_opener(), req, timeout=180)
 			text = extract_ocr_text(payload)
 			json_path = build_media_path("documents", ".json", prefix="mistral_ocr")
 			txt_path = build_media_path("documents", ".txt", prefix="mistral_ocr")
@@ -422,9 +421,4 @@ class MistralOCRToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while Mistral OCR is processing the selected file.
 		self.begin_long_task(_("OCR in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_thread,
-			args=(api_key, body),
-			daemon=True,
-		)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_thread, api_key, body)
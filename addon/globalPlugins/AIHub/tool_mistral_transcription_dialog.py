@@ -2,10 +2,8 @@
 
 import json
 import os
-import threading
 import urllib.error
 import urllib.request
-import uuid
 import winsound
 
 import addonHandler
@@ -13,6 +11,8 @@ import wx
 from logHandler import log
 
 from .apiclient import APIConnectionError, APIStatusError, _resolve_error_message
+from .apiclient._http import _create_opener
+from .apiclient._multipart import MultipartEncoder
 from .conversations import ConversationFormat
 from .consts import (
 	Provider,
@@ -204,48 +204,22 @@ class MistralSpeechToTextToolDialog(ToolDialogBase):
 			self._syncOpenButtons()
 
 	def _build_multipart_body(self, file_path, model, language, diarize, context_bias, timestamp_granularities, temperature):
-		boundary = uuid.uuid4().hex
-		with open(file_path, "rb") as f:
-			file_data = f.read()
 		filename = os.path.basename(file_path) or "audio.wav"
 		ext = os.path.splitext(filename)[1].lower() or ".wav"
-		mime = _AUDIO_MIME.get(ext, "audio/wav")
-		parts = []
-
-		def _add_field(name: str, value):
-			if value is None:
-				return
-			if isinstance(value, (list, tuple)):
-				for item in value:
-					_add_field(name, item)
-				return
-			parts.append(
-				(
-					f'--{boundary}\r\n'
-					f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
-					f'{value}\r\n'
-				).encode("utf-8")
-			)
-
-		_add_field("model", model)
+		body = MultipartEncoder()
+		body.add_field("model", model)
 		if language:
-			_add_field("language", language)
+			body.add_field("language", language)
 		if diarize:
-			_add_field("diarize", "true")
+			body.add_field("diarize", "true")
 		if context_bias:
-			_add_field("context_bias", context_bias)
+			body.add_field("context_bias", context_bias)
 		if timestamp_granularities:
-			_add_field("timestamp_granularities", timestamp_granularities)
+			body.add_field("timestamp_granularities", timestamp_granularities)
 		if temperature is not None:
-			_add_field("temperature", temperature)
-
-		file_part = (
-			f'--{boundary}\r\n'
-			f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
-			f"Content-Type: {mime}\r\n\r\n"
-		).encode("utf-8") + file_data + b"\r\n"
-		body = b"".join(parts) + file_part + (f"--{boundary}--\r\n").encode("utf-8")
-		return boundary, body
+			body.add_field("temperature", temperature)
+		body.add_file("file", file_path, filename=filename, content_type=_AUDIO_MIME.get(ext, "audio/wav"))
+		return body
 
 	def _run_thread(self, account_id, file_path, model, language, diarize, context_bias, timestamp_granularities, temperature):
 		err = None
@@ -257,7 +231,7 @@ class MistralSpeechToTextToolDialog(ToolDialogBase):
 				raise ValueError(_("No API key available for the selected Mistral account."))
 			base_url = self.manager.get_base_url(account_id=account_id) or "https://api.mistral.ai/v1"
 			url = base_url.rstrip("/") + "/audio/transcriptions"
-			boundary, body = self._build_multipart_body(
+			body = self._build_multipart_body(
 				file_path=file_path,
 				model=model,
 				language=language,
@@ -269,18 +243,21 @@ class MistralSpeechToTextToolDialog(ToolDialogBase):
 			headers = {
 				"Authorization": f"Bearer {api_key.strip()}",
 				"x-api-key": api_key.strip(),
-				"Content-Type": f"multipart/form-data; boundary={boundary}",
 			}
+			headers.update(body.headers())
 			req = urllib.request.Request(url, data=body, headers=headers, method="POST")
-			with urllib.request.urlopen(req, timeout=300) as resp:
-				if resp.status != 200:
-					text = resp.read().decode("utf-8", errors="replace")
-					raise APIStatusError(
-						_resolve_error_message(text, resp.status),
-						status_code=resp.status,
-						response_body=text,
-					)
-				raw = resp.read().decode("utf-8", errors="replace")
+			try:
+				with _create_opener().open(req, timeout=300) as resp:
+					if resp.status != 200:
+						text = resp.read().decode("utf-8", errors="replace")
+						raise APIStatusError(
+							_resolve_error_message(text, resp.status),
+							status_code=resp.status,
+							response_body=text,
+						)
+					raw = resp.read().decode("utf-8", errors="replace")
+			finally:
+				body.close()
 			result = json.loads(raw) if raw else {}
 		except urllib.error.HTTPError as e:
 			text = e.read().decode("utf-8", errors="replace") if e.fp else ""
@@ -460,9 +437,7 @@ class MistralSpeechToTextToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while Mistral is transcribing the selected audio file.
 		self.begin_long_task(_("Transcription in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_thread,
-			args=(account_id, file_path, model, language, diarize, context_bias, timestamp_granularities, temperature),
-			daemon=True,
+		self._worker = self.start_task_thread(
+			self._run_thread,
+			account_id, file_path, model, language, diarize, context_bias, timestamp_granularities, temperature,
 		)
-		self._worker.start()
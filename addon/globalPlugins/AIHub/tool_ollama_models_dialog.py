@@ -1,14 +1,14 @@
 """Dedicated dialog for Ollama model management actions."""
 
 import json
-import threading
-import urllib.error
 import urllib.request
 import winsound
 
 import addonHandler
 import wx
 
+from .apiclient import APIStatusError
+from .apiclient._http import _create_opener, _open_bytes
 from .consts import (
 	BASE_URLs,
 	Provider,
@@ -271,8 +271,8 @@ class OllamaModelManagerToolDialog(ToolDialogBase):
 			if payload is not None:
 				data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
 			req = urllib.request.Request(url, data=data, headers=self._headers(account_id), method=method)
-			with urllib.request.urlopen(req, timeout=120) as resp:
-				raw = resp.read().decode("utf-8", errors="replace")
+			body, _content_type = _open_bytes(_create_opener(), req, timeout=120)
+			raw = body.decode("utf-8", errors="replace")
 			try:
 				parsed = json.loads(raw) if raw else {}
 			except Exception:
@@ -280,12 +280,8 @@ class OllamaModelManagerToolDialog(ToolDialogBase):
 			formatted = self._format_result(action, parsed)
 			if action in ("pull", "delete", "create", "copy"):
 				clearModelCache(Provider.Ollama)
-		except urllib.error.HTTPError as e:
-			try:
-				body = e.read().decode("utf-8", errors="replace")
-			except Exception:
-				body = str(e)
-			err = f"HTTP {e.code}: {body}"
+		except APIStatusError as e:
+			err = f"HTTP {e.status_code}: {e.response_body or e}"
 		except Exception as e:
 			err = str(e)
 		wx.CallAfter(self._onWorkerDone, formatted, raw, err)
@@ -326,8 +322,7 @@ class OllamaModelManagerToolDialog(ToolDialogBase):
 		self.begin_long_task(_("Running Ollama action..."), self._setBusy)
 		if self.conf["chatFeedback"]["sndTaskInProgress"]:
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
-		self._worker = threading.Thread(target=self._run_worker, args=(account_id, action), daemon=True)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_worker, account_id, action)
 
 	def onShowRaw(self, evt):
 		text = self._rawResult or self.resultText.GetValue()
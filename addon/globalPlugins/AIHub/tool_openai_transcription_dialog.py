@@ -2,7 +2,6 @@
 
 import json
 import os
-import threading
 import winsound
 
 import addonHandler
@@ -469,9 +468,4 @@ class OpenAITranscriptionToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while OpenAI is transcribing or translating the selected audio file.
 		self.begin_long_task(_("Transcription in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_thread,
-			args=(account_id, task, file_path, model, response_format, kwargs),
-			daemon=True,
-		)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_thread, account_id, task, file_path, model, response_format, kwargs)
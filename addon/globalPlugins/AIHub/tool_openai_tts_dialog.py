@@ -1,6 +1,5 @@
 """Dedicated dialog for OpenAI TTS."""
 
-import threading
 import winsound
 
 import addonHandler
@@ -277,9 +276,4 @@ class OpenAITTSToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while OpenAI TTS is synthesizing speech.
 		self.begin_long_task(_("Speech generation in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_thread,
-			args=(account_id, payload),
-			daemon=True,
-		)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_thread, account_id, payload)
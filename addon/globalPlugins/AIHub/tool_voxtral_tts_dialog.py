@@ -1,7 +1,6 @@
 """Dedicated dialog for Mistral Voxtral TTS."""
 
 import base64
-import json
 import threading
 import urllib.request
 import winsound
@@ -10,7 +9,8 @@ import addonHandler
 import wx
 from logHandler import log
 
-from .apiclient import APIConnectionError, APIStatusError
+from .apiclient import APIConnectionError, APIStatusError, CancelToken, use_cancel_token
+from .apiclient._http import _create_opener, _open_json
 from .conversations import ConversationFormat
 from .consts import (
 	Provider,
@@ -325,7 +325,7 @@ class VoxtralTTSToolDialog(ToolDialogBase):
 		else:
 			self.voiceIdText.SetValue("")
 
-	def _fetch_voices_thread(self, api_key):
+	def _fetch_voices_thread(self, api_key, token):
 		error = None
 		labels = []
 		label_to_id = {}
@@ -340,8 +340,8 @@ class VoxtralTTSToolDialog(ToolDialogBase):
 				},
 				method="GET",
 			)
-			with urllib.request.urlopen(req, timeout=30) as resp:
-				data = json.loads(resp.read().decode("utf-8", errors="replace"))
+			with use_cancel_token(token):
+				data = _open_json(_create_opener(), req, timeout=30)
 			items = []
 			if isinstance(data, dict):
 				raw = data.get("items")
@@ -398,11 +398,14 @@ class VoxtralTTSToolDialog(ToolDialogBase):
 			self._voiceLabelToId = {}
 			self._populate_voice_combo()
 			return
+		token = CancelToken()
 		self._voiceFetchWorker = threading.Thread(
 			target=self._fetch_voices_thread,
-			args=(api_key,),
+			args=(api_key, token),
 			daemon=True,
 		)
+		# Cancelled by stop_worker_thread when the dialog closes.
+		self._voiceFetchWorker.cancelToken = token
 		self._voiceFetchWorker.start()
 
 	def onRefreshVoices(self, evt):
@@ -442,9 +445,4 @@ class VoxtralTTSToolDialog(ToolDialogBase):
 			winsound.PlaySound(SND_PROGRESS, winsound.SND_ASYNC | winsound.SND_LOOP)
 		# Translators: Status line on the modal progress window while Voxtral TTS is synthesizing speech.
 		self.begin_long_task(_("Speech generation in progress..."), self._setBusy)
-		self._worker = threading.Thread(
-			target=self._run_thread,
-			args=(acc_id, text, model, voice_id, fmt, ref_b64, ref_audio),
-			daemon=True,
-		)
-		self._worker.start()
+		self._worker = self.start_task_thread(self._run_thread, acc_id, text, model, voice_id, fmt, ref_b64, ref_audio)
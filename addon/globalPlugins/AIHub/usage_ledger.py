@@ -19,6 +19,10 @@ CONVERSATION_JSON_VERSION = 2
 
 USAGE_KIND_COMPLETION = "completion"
 USAGE_KIND_ABORTED = "aborted"
+# Anthropic prompt-cache pre-warm sent when a conversation is loaded.
+USAGE_KIND_CACHE_PREWARM = "cachePrewarm"
+# Rolling summary of old turns dropped by the context budget.
+USAGE_KIND_SUMMARY = "summary"
 
 
 def _to_int(value) -> int:
@@ -223,6 +227,7 @@ def ledger_entry_to_dict(
 	usage: dict,
 	block_id: str | None = None,
 	migrated: bool = False,
+	metrics: dict | None = None,
 ) -> dict:
 	payload = {
 		"id": entry_id,
@@ -235,6 +240,8 @@ def ledger_entry_to_dict(
 		payload["blockId"] = block_id
 	if migrated:
 		payload["migrated"] = True
+	if metrics:
+		payload["metrics"] = dict(metrics)
 	return payload
 
 
@@ -246,8 +253,13 @@ def append_usage_event(
 	kind: str = USAGE_KIND_COMPLETION,
 	block_id: str | None = None,
 	at: float | None = None,
+	metrics: dict | None = None,
 ) -> dict | None:
-	"""Append one billable API event. Returns the new entry or None if usage is empty."""
+	"""Append one billable API event. Returns the new entry or None if usage is empty.
+
+	``metrics`` holds optional per-call measurements (time to first token,
+	tokens/s, compare group) kept alongside the usage for later comparison.
+	"""
 	normalized = normalize_persisted_usage(usage)
 	if not has_usage_signal(normalized):
 		return None
@@ -260,6 +272,7 @@ def append_usage_event(
 		kind=kind,
 		usage=normalized,
 		block_id=block_id,
+		metrics=metrics,
 	)
 	ledger.append(entry)
 	return entry
@@ -339,6 +352,9 @@ def deserialize_ledger(data) -> list:
 			entry["blockId"] = block_id
 		if item.get("migrated"):
 			entry["migrated"] = True
+		metrics = item.get("metrics")
+		if isinstance(metrics, dict) and metrics:
+			entry["metrics"] = dict(metrics)
 		ledger.append(entry)
 	return ledger
 
@@ -0,0 +1,187 @@
+"""Vision token accounting per provider, and the image size that minimizes it.
+
+Providers bill an image by their own geometry, not by its bytes:
+
+* OpenAI tile models (GPT-4o, GPT-4.1, GPT-5, o1, o3): the image is fit in
+  2048x2048, then its short side is brought down to 768 px; every 512-px tile
+  costs a fixed number of tokens on top of a base charge.
+* OpenAI patch models (GPT-4.1 mini/nano, GPT-5 mini/nano, o4-mini): one
+  token per 32-px patch, at most 1536 patches (the image is scaled down to
+  fit), times a per-model multiplier.
+* Anthropic: about ``width * height / 750`` tokens, after the long edge is
+  brought down to 1568 px and the area to about 1.15 megapixels.
+* Google Gemini: 258 tokens when both sides are at most 384 px, otherwise
+  258 per 768-px tile.
+
+``target_size`` searches the scales between what the provider would see
+anyway and ``min_scale`` of it for the fewest billed tokens, preferring the
+largest size among equals: pixels beyond the provider's own downscale are
+only upload bytes, and a few pixels less can save a whole row of tiles.
+Models whose provider bills images differently (or unknown) get no profile.
+"""
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+from .consts import Provider
+
+# Steps of the scale search between ``min_scale`` and the provider's own size.
+_SEARCH_STEPS = 200
+
+
+class VisionProfile:
+	"""Billing geometry of one family of vision models."""
+
+	def __init__(self, name: str, formats: tuple = ("PNG", "JPEG", "WEBP")):
+		self.name = name
+		self.formats = formats
+
+	def effective_size(self, width: int, height: int) -> tuple[int, int]:
+		"""Size the provider downscales the image to before billing it."""
+		return width, height
+
+	def tokens(self, width: int, height: int) -> int:
+		"""Billed tokens for an image sent at ``width`` x ``height``."""
+		raise NotImplementedError
+
+
+class OpenAITileProfile(VisionProfile):
+	def __init__(self, name: str, base: int, per_tile: int):
+		super().__init__(name, formats=("PNG", "JPEG", "WEBP"))
+		self.base = base
+		self.per_tile = per_tile
+
+	def effective_size(self, width, height):
+		scale = min(1.0, 2048 / max(width, height))
+		width, height = width * scale, height * scale
+		if min(width, height) > 768:
+			scale = 768 / min(width, height)
+			width, height = width * scale, height * scale
+		return max(1, int(width)), max(1, int(height))
+
+	def tokens(self, width, height):
+		width, height = self.effective_size(width, height)
+		return self.base + self.per_tile * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class OpenAIPatchProfile(VisionProfile):
+	_PATCH = 32
+	_MAX_PATCHES = 1536
+
+	def __init__(self, name: str, multiplier: float):
+		super().__init__(name, formats=("PNG", "JPEG", "WEBP"))
+		self.multiplier = multiplier
+
+	def effective_size(self, width, height):
+		patch = self._PATCH
+		if math.ceil(width / patch) * math.ceil(height / patch) <= self._MAX_PATCHES:
+			return width, height
+		scale = math.sqrt(patch * patch * self._MAX_PATCHES / (width * height))
+		scale *= min(
+			math.floor(width * scale / patch) / (width * scale / patch),
+			math.floor(height * scale / patch) / (height * scale / patch),
+		)
+		return max(1, int(width * scale)), max(1, int(height * scale))
+
+	def tokens(self, width, height):
+		width, height = self.effective_size(width, height)
+		patches = min(self._MAX_PATCHES, math.ceil(width / self._PATCH) * math.ceil(height / self._PATCH))
+		return math.ceil(patches * self.multiplier)
+
+
+class AnthropicProfile(VisionProfile):
+	_MAX_EDGE = 1568
+	_MAX_PIXELS = 1_150_000
+
+	def __init__(self):
+		super().__init__("anthropic", formats=("PNG", "JPEG", "WEBP"))
+
+	def effective_size(self, width, height):
+		scale = min(1.0, self._MAX_EDGE / max(width, height), math.sqrt(self._MAX_PIXELS / (width * height)))
+		return max(1, int(width * scale)), max(1, int(height * scale))
+
+	def tokens(self, width, height):
+		width, height = self.effective_size(width, height)
+		return math.ceil(width * height / 750)
+
+
+class GeminiProfile(VisionProfile):
+	_TOKENS_PER_TILE = 258
+
+	def __init__(self):
+		super().__init__("gemini", formats=("PNG", "JPEG", "WEBP"))
+
+	def tokens(self, width, height):
+		if width <= 384 and height <= 384:
+			return self._TOKENS_PER_TILE
+		return self._TOKENS_PER_TILE * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+# OpenAI model id prefixes, most specific first.
+_OPENAI_PROFILES = (
+	("gpt-4.1-nano", OpenAIPatchProfile("openai-patch-2.46", 2.46)),
+	("gpt-4.1-mini", OpenAIPatchProfile("openai-patch-1.62", 1.62)),
+	("gpt-5-nano", OpenAIPatchProfile("openai-patch-2.46", 2.46)),
+	("gpt-5-mini", OpenAIPatchProfile("openai-patch-1.62", 1.62)),
+	("o4-mini", OpenAIPatchProfile("openai-patch-1.72", 1.72)),
+	("gpt-4o-mini", OpenAITileProfile("openai-tile-2833", 2833, 5667)),
+	("gpt-5", OpenAITileProfile("openai-tile-70", 70, 140)),
+	("o1", OpenAITileProfile("openai-tile-75", 75, 150)),
+	("o3", OpenAITileProfile("openai-tile-75", 75, 150)),
+	("gpt-4o", OpenAITileProfile("openai-tile-85", 85, 170)),
+	("chatgpt-4o", OpenAITileProfile("openai-tile-85", 85, 170)),
+	("gpt-4.1", OpenAITileProfile("openai-tile-85", 85, 170)),
+	("gpt-4.5", OpenAITileProfile("openai-tile-85", 85, 170)),
+)
+_ANTHROPIC = AnthropicProfile()
+_GEMINI = GeminiProfile()
+
+
+def profile_for_model(model) -> Optional[VisionProfile]:
+	"""Billing profile of ``model`` (directly or through OpenRouter); None when unknown."""
+	if model is None:
+		return None
+	provider = str(getattr(model, "provider", "") or "")
+	model_id = str(getattr(model, "id", "") or "").lower()
+	if provider == Provider.OpenRouter and "/" in model_id:
+		vendor, model_id = model_id.split("/", 1)
+		provider = {"openai": Provider.OpenAI, "anthropic": Provider.Anthropic, "google": Provider.Google}.get(vendor, "")
+	if provider == Provider.Anthropic:
+		return _ANTHROPIC
+	if provider == Provider.Google and model_id.startswith("gemini"):
+		return _GEMINI
+	if provider == Provider.OpenAI:
+		for prefix, profile in _OPENAI_PROFILES:
+			if model_id.startswith(prefix):
+				return profile
+	return None
+
+
+def target_size(profile: VisionProfile, width: int, height: int, min_scale: float = 1.0) -> tuple[int, int]:
+	"""Size to send a ``width`` x ``height`` image at: fewest tokens, then largest.
+
+	Never larger than what the provider bills (its own downscale), never
+	smaller than ``min_scale`` of that.
+	"""
+	eff_w, eff_h = profile.effective_size(width, height)
+	min_scale = min(1.0, max(0.05, min_scale))
+	best = (eff_w, eff_h)
+	best_tokens = profile.tokens(eff_w, eff_h)
+	for step in range(1, _SEARCH_STEPS + 1):
+		scale = 1.0 - (1.0 - min_scale) * step / _SEARCH_STEPS
+		w, h = max(1, int(eff_w * scale)), max(1, int(eff_h * scale))
+		tokens = profile.tokens(w, h)
+		if tokens < best_tokens:
+			best, best_tokens = (w, h), tokens
+	return best
+
+
+def predict_tokens(model, width: int, height: int, min_scale: Optional[float] = None) -> Optional[int]:
+	"""Billed tokens of an image for ``model``; sent at ``target_size`` when ``min_scale`` is given."""
+	profile = profile_for_model(model)
+	if profile is None or width <= 0 or height <= 0:
+		return None
+	if min_scale is not None:
+		width, height = target_size(profile, width, height, min_scale)
+	return profile.tokens(width, height)